@@ -63,3 +63,15 @@ class ClienteAPITestCase(TestCase):
         response = self.client.get(reverse('cliente-list'), {'search': 'TESTE API'})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertGreaterEqual(len(response.data['results']), 1)
+
+    def test_list_clientes_paginacao_por_cursor(self):
+        """Listagem paginada por cursor opaco, sem repetir registros."""
+        for i in range(3):
+            Cliente.objects.create(razao_social=f'CLIENTE CURSOR {i}', cnpj=f'00.000.000/000{i + 2}-00', status='Ativo')
+        response = self.client.get(reverse('cliente-list'), {'page_size': 2})
+        self.assertNotIn('count', response.data)
+        self.assertIn('cursor=', response.data['next'])
+        segunda = self.client.get(response.data['next'])
+        razoes = [c['razao_social'] for c in response.data['results'] + segunda.data['results']]
+        self.assertEqual(len(razoes), len(set(razoes)))
+        self.assertEqual(len(razoes), 4)
@@ -0,0 +1,22 @@
+"""
+Filtros da API v1.
+"""
+from rest_framework.filters import SearchFilter
+
+from notas.services import BuscaService
+
+
+class BuscaTextoFilter(SearchFilter):
+    """
+    SearchFilter que usa o índice de busca textual (BuscaService) nos modelos
+    indexados; nos demais, mantém o comportamento padrão do DRF.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if BuscaService.tipo_do_modelo(queryset.model) is None:
+            return super().filter_queryset(request, queryset, view)
+        termos = self.get_search_terms(request)
+        if not termos:
+            return queryset
+        campos = [campo.lstrip('^=@$') for campo in self.get_search_fields(view, request) or ()]
+        return BuscaService.filtrar(queryset, ' '.join(termos), campos=campos or None)
@@ -0,0 +1,19 @@
+"""
+Paginação da API v1 – cursor opaco em vez de número de página.
+
+Cada página parte da posição da anterior (keyset), então a página N custa o
+mesmo que a primeira e inclusões recentes não deslocam os resultados.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class CursorPaginacao(CursorPagination):
+    """Padrão da API: mais recentes primeiro."""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = '-id'
+
+
+class ClienteCursorPaginacao(CursorPaginacao):
+    ordering = ('razao_social', 'id')
@@ -2,10 +2,11 @@
 Views da API v1 – ViewSets REST para recursos prioritários.
 """
 from rest_framework import viewsets
-from rest_framework.filters import SearchFilter
 
 from notas.models import Cliente
 
+from .filters import BuscaTextoFilter
+from .pagination import ClienteCursorPaginacao
 from .serializers import ClienteSerializer
 
 
@@ -13,10 +14,11 @@ class ClienteViewSet(viewsets.ReadOnlyModelViewSet):
     """
     Lista e detalha clientes.
 
-    - **list**: GET /api/v1/clientes/
+    - **list**: GET /api/v1/clientes/ (paginada por cursor: siga `next`)
     - **retrieve**: GET /api/v1/clientes/{id}/
     """
     queryset = Cliente.objects.all().order_by('razao_social')
     serializer_class = ClienteSerializer
-    filter_backends = [SearchFilter]
+    pagination_class = ClienteCursorPaginacao
+    filter_backends = [BuscaTextoFilter]
     search_fields = ['razao_social', 'nome_fantasia', 'cnpj', 'cidade']
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:52
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+MARCADOR_SAIDA_CAIXA_CLIENTE = re.compile(r'\[SAIDA_CAIXA_CLIENTE:\s*(\d+)\]', re.IGNORECASE)
+MARCADOR_DESCARGA_DEPOSITO = re.compile(r'\[DESCARGA_DEPOSITO:\s*(\d+)\]', re.IGNORECASE)
+
+
+def vincular_marcadores(apps, schema_editor):
+    """
+    Converte os marcadores em texto nos novos vínculos:
+    - CobrancaCarregamento.observacoes "[SAIDA_CAIXA_CLIENTE:<movimento>]"
+      -> MovimentoCaixa.cobranca_recebivel
+    - MovimentoCaixa.descricao "[DESCARGA_DEPOSITO:<carregamento>]"
+      -> MovimentoCaixa.descarga_recebida
+    O texto original é mantido.
+    """
+    MovimentoCaixa = apps.get_model('financeiro', 'MovimentoCaixa')
+    CarregamentoCliente = apps.get_model('financeiro', 'CarregamentoCliente')
+    CobrancaCarregamento = apps.get_model('notas', 'CobrancaCarregamento')
+
+    # Mais recente primeiro: era a cobrança que o serviço encontrava com .first()
+    cobranca_por_movimento = {}
+    cobrancas = CobrancaCarregamento.objects.filter(
+        observacoes__icontains='[SAIDA_CAIXA_CLIENTE:'
+    ).order_by('-criado_em').values_list('pk', 'observacoes')
+    for cobranca_id, observacoes in cobrancas:
+        m = MARCADOR_SAIDA_CAIXA_CLIENTE.search(observacoes or '')
+        if m:
+            cobranca_por_movimento.setdefault(int(m.group(1)), cobranca_id)
+
+    descargas = set(CarregamentoCliente.objects.values_list('pk', flat=True))
+    alterados = []
+    candidatos = MovimentoCaixa.objects.filter(pk__in=list(cobranca_por_movimento)) | \
+        MovimentoCaixa.objects.filter(descricao__icontains='[DESCARGA_DEPOSITO:')
+    for movimento in candidatos.distinct():
+        movimento.cobranca_recebivel_id = cobranca_por_movimento.get(movimento.pk)
+        m = MARCADOR_DESCARGA_DEPOSITO.search(movimento.descricao or '')
+        if m and int(m.group(1)) in descargas:
+            movimento.descarga_recebida_id = int(m.group(1))
+        alterados.append(movimento)
+    MovimentoCaixa.objects.bulk_update(
+        alterados, ['cobranca_recebivel', 'descarga_recebida'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0003_receitaempresa_rotulo_personalizado'),
+        ('notas', '0073_recalcular_totais_romaneios'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimentocaixa',
+            name='cobranca_recebivel',
+            field=models.ForeignKey(blank=True, help_text='Cobrança pendente gerada por uma saída de caixa com cliente', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimentos_caixa_origem', to='notas.cobrancacarregamento', verbose_name='Cobrança a Receber Gerada'),
+        ),
+        migrations.AddField(
+            model_name='movimentocaixa',
+            name='descarga_recebida',
+            field=models.ForeignKey(blank=True, help_text='Descarga por depósito baixada por esta entrada', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recebimentos_descarga', to='financeiro.carregamentocliente', verbose_name='Descarga (Depósito) Recebida'),
+        ),
+        migrations.RunPython(vincular_marcadores, migrations.RunPython.noop),
+    ]
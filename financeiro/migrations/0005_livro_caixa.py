@@ -0,0 +1,75 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:37
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+def preencher_livro_caixa(apps, schema_editor):
+    """Calcula o acumulado de cada movimento e os totais de cada período."""
+    MovimentoCaixa = apps.get_model('financeiro', 'MovimentoCaixa')
+    PeriodoMovimentoCaixa = apps.get_model('financeiro', 'PeriodoMovimentoCaixa')
+
+    for periodo in PeriodoMovimentoCaixa.objects.all():
+        entradas = saidas = acumulado = Decimal('0.00')
+        alterados = []
+        movimentos = MovimentoCaixa.objects.filter(periodo=periodo).order_by('data', 'criado_em', 'pk')
+        for mov in movimentos.only('tipo', 'valor', 'acerto_diario_id'):
+            valor = mov.valor or Decimal('0.00')
+            if mov.tipo in ('AcertoFuncionario', 'Entrada'):
+                entradas += valor
+            elif mov.tipo == 'Saida':
+                saidas += valor
+            saida_real = mov.tipo == 'Saida' or (mov.tipo == 'AcertoFuncionario' and not mov.acerto_diario_id)
+            acumulado += -valor if saida_real else valor
+            mov.acumulado_caixa = acumulado
+            alterados.append(mov)
+        MovimentoCaixa.objects.bulk_update(alterados, ['acumulado_caixa'], batch_size=500)
+        PeriodoMovimentoCaixa.objects.filter(pk=periodo.pk).update(
+            total_entradas=entradas,
+            total_saidas=saidas,
+            acumulado_caixa=acumulado,
+            quantidade_movimentos=len(alterados),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0004_movimento_caixa_vinculos'),
+        ('notas', '0075_paginacao_cursor_indices'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimentocaixa',
+            name='acumulado_caixa',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, help_text='Entradas menos saídas do período até este movimento, inclusive (mantido pelo livro caixa)', max_digits=12, verbose_name='Acumulado no Caixa (R$)'),
+        ),
+        migrations.AddField(
+            model_name='periodomovimentocaixa',
+            name='acumulado_caixa',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, help_text='Entradas menos saídas de dinheiro real no período (regra do Caixa do Dia)', max_digits=12, verbose_name='Acumulado no Caixa (R$)'),
+        ),
+        migrations.AddField(
+            model_name='periodomovimentocaixa',
+            name='quantidade_movimentos',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Quantidade de Movimentos'),
+        ),
+        migrations.AddField(
+            model_name='periodomovimentocaixa',
+            name='total_entradas',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=12, verbose_name='Total de Entradas (R$)'),
+        ),
+        migrations.AddField(
+            model_name='periodomovimentocaixa',
+            name='total_saidas',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=12, verbose_name='Total de Saídas (R$)'),
+        ),
+        migrations.AddIndex(
+            model_name='movimentocaixa',
+            index=models.Index(fields=['periodo', 'data', 'criado_em', 'id'], name='movcaixa_livro_idx'),
+        ),
+        migrations.RunPython(preencher_livro_caixa, migrations.RunPython.noop),
+    ]
@@ -3,12 +3,13 @@ Modelos do app Financeiro (fluxo de caixa, receitas, movimentos bancários, etc.
 Depende de: notas (Usuario, Cliente, CobrancaCarregamento)
 """
 import re
+from decimal import Decimal
 
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
 
-from notas.models import UpperCaseMixin
+from notas.models import UpperCaseManager, UpperCaseMixin
 
 
 class FuncionarioFluxoCaixa(UpperCaseMixin, models.Model):
@@ -19,6 +20,8 @@ class FuncionarioFluxoCaixa(UpperCaseMixin, models.Model):
     criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
     atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Data de Atualização")
 
+    objects = UpperCaseManager()
+
     class Meta:
         verbose_name = "Funcionário (Fluxo de Caixa)"
         verbose_name_plural = "Funcionários (Fluxo de Caixa)"
@@ -48,6 +51,8 @@ class AcertoDiarioCarregamento(UpperCaseMixin, models.Model):
     criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
     atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Data de Atualização")
 
+    objects = UpperCaseManager()
+
     class Meta:
         verbose_name = "Acerto Diário de Carregamento"
         verbose_name_plural = "Acertos Diários de Carregamento"
@@ -133,6 +138,8 @@ class CarregamentoCliente(UpperCaseMixin, models.Model):
         help_text="Apenas para descargas. Se for depósito, não será contabilizado no movimento de caixa."
     )
 
+    objects = UpperCaseManager()
+
     class Meta:
         verbose_name = "Carregamento/Descarga"
         verbose_name_plural = "Carregamentos e Descargas"
@@ -170,6 +177,8 @@ class DistribuicaoFuncionario(UpperCaseMixin, models.Model):
     )
     valor = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Valor (R$)")
 
+    objects = UpperCaseManager()
+
     class Meta:
         verbose_name = "Distribuição para Funcionário"
         verbose_name_plural = "Distribuições para Funcionários"
@@ -213,6 +222,8 @@ class AcumuladoFuncionario(UpperCaseMixin, models.Model):
     criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
     atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Data de Atualização")
 
+    objects = UpperCaseManager()
+
     class Meta:
         verbose_name = "Acumulado de Funcionário"
         verbose_name_plural = "Acumulados de Funcionários"
@@ -293,6 +304,8 @@ class ReceitaEmpresa(UpperCaseMixin, models.Model):
     criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
     atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Data de Atualização")
 
+    objects = UpperCaseManager()
+
     class Meta:
         verbose_name = "Receita da Empresa"
         verbose_name_plural = "Receitas da Empresa"
@@ -394,6 +407,8 @@ class CaixaFuncionario(UpperCaseMixin, models.Model):
     criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
     atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Data de Atualização")
 
+    objects = UpperCaseManager()
+
     class Meta:
         verbose_name = "Caixa de Funcionário"
         verbose_name_plural = "Caixas de Funcionários"
@@ -445,6 +460,8 @@ class MovimentoCaixaFuncionario(UpperCaseMixin, models.Model):
     )
     criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
 
+    objects = UpperCaseManager()
+
     class Meta:
         verbose_name = "Movimento de Caixa do Funcionário"
         verbose_name_plural = "Movimentos de Caixa dos Funcionários"
@@ -505,6 +522,8 @@ class MovimentoBancario(UpperCaseMixin, models.Model):
     criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
     atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Data de Atualização")
 
+    objects = UpperCaseManager()
+
     class Meta:
         verbose_name = "Movimento Bancário"
         verbose_name_plural = "Movimentos Bancários"
@@ -607,6 +626,8 @@ class ControleSaldoSemanal(UpperCaseMixin, models.Model):
     criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
     atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Data de Atualização")
 
+    objects = UpperCaseManager()
+
     class Meta:
         verbose_name = "Controle de Saldo Semanal"
         verbose_name_plural = "Controles de Saldo Semanal"
@@ -614,54 +635,31 @@ class ControleSaldoSemanal(UpperCaseMixin, models.Model):
         unique_together = [['semana_inicio', 'semana_fim']]
 
     def calcular_totais(self):
-        from django.db.models import Sum
-        from decimal import Decimal
-        from notas.models import CobrancaCarregamento
+        from financeiro.services.conciliacao_semanal_service import ConciliacaoSemanalService
 
-        self.total_receitas_empresa = ReceitaEmpresa.objects.filter(
-            data__gte=self.semana_inicio,
-            data__lte=self.semana_fim
-        ).aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
+        self.aplicar_totais(ConciliacaoSemanalService.totais_semana(self.semana_inicio, self.semana_fim))
+        self.save()
 
-        caixas_semanal = CaixaFuncionario.objects.filter(
-            periodo_tipo='Semanal',
-            semana_inicio__lte=self.semana_fim,
-            semana_fim__gte=self.semana_inicio,
-            status='Em_Aberto'
-        ).select_related('funcionario')
-        caixas_diario = CaixaFuncionario.objects.filter(
-            periodo_tipo='Diario',
-            data__gte=self.semana_inicio,
-            data__lte=self.semana_fim,
-            status='Em_Aberto'
-        ).select_related('funcionario')
-        total_semanal = caixas_semanal.aggregate(total=Sum('valor_coletado'))['total'] or Decimal('0.00')
-        total_diario = caixas_diario.aggregate(total=Sum('valor_coletado'))['total'] or Decimal('0.00')
-        self.total_caixa_funcionarios = total_semanal + total_diario
-
-        movimentos_banco = MovimentoBancario.objects.filter(
-            data__gte=self.semana_inicio,
-            data__lte=self.semana_fim
-        )
-        self.total_entradas_banco = movimentos_banco.filter(tipo='Credito').aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
-        self.total_saidas_banco = movimentos_banco.filter(tipo='Debito').aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
+    def aplicar_totais(self, totais):
+        """Copia os totais da conciliação e recalcula saldo final e diferença (sem salvar)."""
+        for campo, valor in totais.items():
+            setattr(self, campo, valor)
 
-        self.total_pendentes_receber = CobrancaCarregamento.objects.filter(
-            status='Pendente',
-            data_vencimento__lte=self.semana_fim
-        ).aggregate(total=Sum('valor_total'))['total'] or Decimal('0.00')
+        def valor(campo):
+            # Instância recém-criada ainda tem os defaults em float
+            return self._meta.get_field(campo).to_python(getattr(self, campo)) or Decimal('0.00')
 
         self.saldo_final_calculado = (
-            self.saldo_inicial_caixa
-            + self.saldo_inicial_banco
-            + self.total_receitas_empresa
-            + self.total_caixa_funcionarios
-            + self.total_entradas_banco
-            - self.total_saidas_banco
+            valor('saldo_inicial_caixa')
+            + valor('saldo_inicial_banco')
+            + valor('total_receitas_empresa')
+            + valor('total_caixa_funcionarios')
+            + valor('total_entradas_banco')
+            - valor('total_saidas_banco')
         )
-        saldo_final_real = self.saldo_final_real_caixa + self.saldo_final_real_banco
+        saldo_final_real = valor('saldo_final_real_caixa') + valor('saldo_final_real_banco')
         self.diferenca = self.saldo_final_calculado - saldo_final_real
-        self.save()
+        self.atualizado_em = timezone.now()
 
     def validar(self, usuario):
         from django.core.exceptions import ValidationError
@@ -744,9 +742,37 @@ class MovimentoCaixa(UpperCaseMixin, models.Model):
         related_name='movimentos_caixa_criados',
         verbose_name="Usuário que Criou"
     )
+    cobranca_recebivel = models.ForeignKey(
+        'notas.CobrancaCarregamento',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='movimentos_caixa_origem',
+        verbose_name="Cobrança a Receber Gerada",
+        help_text="Cobrança pendente gerada por uma saída de caixa com cliente"
+    )
+    descarga_recebida = models.ForeignKey(
+        CarregamentoCliente,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='recebimentos_descarga',
+        verbose_name="Descarga (Depósito) Recebida",
+        help_text="Descarga por depósito baixada por esta entrada"
+    )
+    acumulado_caixa = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        verbose_name="Acumulado no Caixa (R$)",
+        help_text="Entradas menos saídas do período até este movimento, inclusive (mantido pelo livro caixa)"
+    )
     criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
     atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Data de Atualização")
 
+    objects = UpperCaseManager()
+
     class Meta:
         verbose_name = "Movimento de Caixa"
         verbose_name_plural = "Movimentos de Caixa"
@@ -755,6 +781,8 @@ class MovimentoCaixa(UpperCaseMixin, models.Model):
             models.Index(fields=['data', 'tipo']),
             models.Index(fields=['tipo', 'categoria']),
             models.Index(fields=['funcionario', 'data']),
+            # Ordem do livro caixa dentro do período
+            models.Index(fields=['periodo', 'data', 'criado_em', 'id'], name='movcaixa_livro_idx'),
         ]
 
     def get_categoria_display(self):
@@ -841,9 +869,30 @@ class PeriodoMovimentoCaixa(UpperCaseMixin, models.Model):
         related_name='periodos_movimento_caixa_criados',
         verbose_name="Usuário que Criou"
     )
+    # Totais do livro caixa, mantidos por LivroCaixaService a cada movimento
+    total_entradas = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'), editable=False,
+        verbose_name="Total de Entradas (R$)"
+    )
+    total_saidas = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'), editable=False,
+        verbose_name="Total de Saídas (R$)"
+    )
+    acumulado_caixa = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal('0.00'), editable=False,
+        verbose_name="Acumulado no Caixa (R$)",
+        help_text="Entradas menos saídas de dinheiro real no período (regra do Caixa do Dia)"
+    )
+    quantidade_movimentos = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Quantidade de Movimentos"
+    )
     criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
     atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Data de Atualização")
 
+    CAMPOS_LIVRO = ('total_entradas', 'total_saidas', 'acumulado_caixa', 'quantidade_movimentos')
+
+    objects = UpperCaseManager()
+
     class Meta:
         verbose_name = "Período de Movimento de Caixa"
         verbose_name_plural = "Períodos de Movimento de Caixa"
@@ -857,28 +906,28 @@ class PeriodoMovimentoCaixa(UpperCaseMixin, models.Model):
             return f"{self.nome} - {self.data_inicio.strftime('%d/%m/%Y')}"
         return f"Período de {self.data_inicio.strftime('%d/%m/%Y')}"
 
-    @property
-    def total_entradas(self):
-        from django.db.models import Sum
-        from decimal import Decimal
-        return MovimentoCaixa.objects.filter(
-            periodo=self,
-            tipo__in=['AcertoFuncionario', 'Entrada']
-        ).aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
-
-    @property
-    def total_saidas(self):
-        from django.db.models import Sum
-        from decimal import Decimal
-        return MovimentoCaixa.objects.filter(periodo=self, tipo='Saida').aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
+    def save(self, *args, **kwargs):
+        # Os totais do livro são atualizados com F() pelos movimentos; um save()
+        # completo de uma instância antiga não pode sobrescrevê-los.
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.CAMPOS_LIVRO
+            ]
+        super().save(*args, **kwargs)
 
     @property
     def saldo_atual(self):
         return self.valor_inicial_caixa + self.total_entradas - self.total_saidas
 
+    @property
+    def saldo_caixa(self):
+        """Saldo em dinheiro no caixa (regra do Caixa do Dia)."""
+        return self.valor_inicial_caixa + self.acumulado_caixa
+
     @property
     def movimentos_count(self):
-        return self.movimentos.count()
+        return self.quantidade_movimentos
 
     def fechar_periodo(self):
         if self.status == 'Aberto':
@@ -6,9 +6,13 @@ Contém a lógica de negócio extraída das views para ser testável e reutiliz
 from .acerto_diario_service import AcertoDiarioService
 from .periodo_caixa_service import PeriodoCaixaService
 from .movimento_caixa_service import MovimentoCaixaService
+from .livro_caixa_service import LivroCaixaService
+from .conciliacao_semanal_service import ConciliacaoSemanalService
 
 __all__ = [
     'AcertoDiarioService',
     'PeriodoCaixaService',
     'MovimentoCaixaService',
+    'LivroCaixaService',
+    'ConciliacaoSemanalService',
 ]
@@ -1,10 +1,13 @@
 """
 Serviço de acerto diário: regras para salvar acerto e criar movimentos de caixa.
 """
+from collections import defaultdict
 from datetime import timedelta
 from decimal import Decimal
 
+from django.db import transaction
 from django.db.models import Sum
+from django.utils import timezone
 
 from financeiro.models import (
     AcertoDiarioCarregamento,
@@ -14,6 +17,7 @@ from financeiro.models import (
     MovimentoCaixa,
     PeriodoMovimentoCaixa,
 )
+from financeiro.services.livro_caixa_service import LivroCaixaService
 
 
 class AcertoDiarioService:
@@ -82,7 +86,7 @@ class AcertoDiarioService:
     @classmethod
     def salvar_acerto_e_criar_movimentos(cls, data, observacoes, usuario, acerto_id=None):
         """
-        Salva ou atualiza o acerto diário e cria os movimentos de caixa correspondentes.
+        Salva ou atualiza o acerto diário e sincroniza os movimentos de caixa correspondentes.
 
         Se acerto_id for informado, usa esse acerto (garante que estamos atualizando o mesmo
         acerto que o usuário está editando). Caso contrário, usa get_or_create por data.
@@ -94,62 +98,82 @@ class AcertoDiarioService:
         - Valor Estelar: Entrada (RecebimentoCarregamento)
         - Distribuições para funcionários: AcertoFuncionario (entrada)
 
+        Os movimentos existentes do acerto são comparados com os desejados e só
+        as diferenças são gravadas (bulk_create/bulk_update/delete), tudo em uma
+        única transação.
+
         Returns:
             tuple: (acerto, None) em sucesso ou (None, mensagem_erro) em falha.
         """
-        if acerto_id:
-            try:
-                acerto = AcertoDiarioCarregamento.objects.get(pk=acerto_id)
-                acerto.observacoes = observacoes
-                acerto.save()
-            except (ValueError, AcertoDiarioCarregamento.DoesNotExist):
-                acerto = None
-            if not acerto:
-                return None, 'Acerto não encontrado.'
-        else:
-            if not data:
-                return None, 'Informe a data do acerto.'
-            acerto, created = AcertoDiarioCarregamento.objects.get_or_create(
-                data=data,
-                defaults={
-                    'valor_estelar': Decimal('0.00'),
-                    'observacoes': observacoes,
-                    'usuario_criacao': usuario,
-                },
+        with transaction.atomic():
+            if acerto_id:
+                try:
+                    acerto = AcertoDiarioCarregamento.objects.get(pk=acerto_id)
+                    acerto.observacoes = observacoes
+                    acerto.save()
+                except (ValueError, AcertoDiarioCarregamento.DoesNotExist):
+                    acerto = None
+                if not acerto:
+                    return None, 'Acerto não encontrado.'
+            else:
+                if not data:
+                    return None, 'Informe a data do acerto.'
+                acerto, created = AcertoDiarioCarregamento.objects.get_or_create(
+                    data=data,
+                    defaults={
+                        'valor_estelar': Decimal('0.00'),
+                        'observacoes': observacoes,
+                        'usuario_criacao': usuario,
+                    },
+                )
+                if not created:
+                    acerto.observacoes = observacoes
+                    acerto.save()
+            # get_or_create mantém a data como recebida (pode ser str)
+            acerto.data = AcertoDiarioCarregamento._meta.get_field('data').to_python(acerto.data)
+
+            periodo_ativo = PeriodoMovimentoCaixa.objects.filter(
+                status='Aberto'
+            ).order_by('-criado_em').first()
+            if not periodo_ativo:
+                return None, cls.MSG_SEM_PERIODO
+
+            cls._sincronizar_movimentos(
+                acerto, cls._movimentos_desejados(acerto, periodo_ativo, usuario)
             )
-            if not created:
-                acerto.observacoes = observacoes
-                acerto.save()
-
-        periodo_ativo = PeriodoMovimentoCaixa.objects.filter(
-            status='Aberto'
-        ).order_by('-criado_em').first()
-        if not periodo_ativo:
-            return None, cls.MSG_SEM_PERIODO
-
-        MovimentoCaixa.objects.filter(acerto_diario=acerto).delete()
-
-        for carregamento in CarregamentoCliente.objects.filter(
-            acerto_diario=acerto,
-            cliente__isnull=False,
-        ):
-            MovimentoCaixa.objects.create(
+
+            # Gera/atualiza "contas a pagar" (valores derivados do acerto diário)
+            cls._recalcular_acumulado_funcionarios_semana(acerto.data)
+
+        return acerto, None
+
+    @classmethod
+    def _movimentos_desejados(cls, acerto, periodo, usuario):
+        """Movimentos de caixa (não salvos) que o acerto deve ter."""
+        def movimento(**campos):
+            # Já em maiúsculas para comparar com os movimentos gravados
+            campos['descricao'] = campos['descricao'].upper()
+            return MovimentoCaixa(
                 data=acerto.data,
-                tipo='Saida',
-                valor=carregamento.valor,
-                descricao=f"Carregamento: {carregamento.cliente.razao_social}",
-                categoria='Outros',
-                cliente=carregamento.cliente,
                 acerto_diario=acerto,
-                periodo=periodo_ativo,
+                periodo=periodo,
                 usuario_criacao=usuario,
+                **campos,
             )
 
-        for descarga in CarregamentoCliente.objects.filter(
-            acerto_diario=acerto,
-            cliente__isnull=True,
-        ):
-            tipo_pagamento = (descarga.tipo_pagamento or 'Dinheiro').upper()
+        desejados = []
+        for carregamento in CarregamentoCliente.objects.filter(acerto_diario=acerto).select_related('cliente'):
+            if carregamento.cliente_id:
+                desejados.append(movimento(
+                    tipo='Saida',
+                    valor=carregamento.valor,
+                    descricao=f"Carregamento: {carregamento.cliente.razao_social}",
+                    categoria='Outros',
+                    cliente=carregamento.cliente,
+                ))
+                continue
+
+            tipo_pagamento = (carregamento.tipo_pagamento or 'Dinheiro').upper()
             if tipo_pagamento in ('DINHEIRO',):
                 # Regra do seu modelo: descarga em dinheiro já entra na divisão
                 # (Empresa/Funcionários) via valor_estelar + DistribuicaoFuncionario.
@@ -157,43 +181,90 @@ class AcertoDiarioService:
                 # como RecebimentoDescarga.
                 continue
             elif tipo_pagamento in ('DEPOSITO', 'DEPÓSITO'):
-                MovimentoCaixa.objects.create(
-                    data=acerto.data,
+                desejados.append(movimento(
                     tipo='Saida',
-                    valor=descarga.valor,
-                    descricao=f"Descarga (Depósito): {descarga.descricao or 'Descarga'}",
+                    valor=carregamento.valor,
+                    descricao=f"Descarga (Depósito): {carregamento.descricao or 'Descarga'}",
                     categoria='Outros',
-                    acerto_diario=acerto,
-                    periodo=periodo_ativo,
-                    usuario_criacao=usuario,
-                )
+                ))
 
         if acerto.valor_estelar and acerto.valor_estelar > 0:
-            MovimentoCaixa.objects.create(
-                data=acerto.data,
+            desejados.append(movimento(
                 tipo='Entrada',
                 valor=acerto.valor_estelar,
                 descricao="Valor Estelar",
                 categoria='RecebimentoCarregamento',
-                acerto_diario=acerto,
-                periodo=periodo_ativo,
-                usuario_criacao=usuario,
-            )
+            ))
 
-        for distribuicao in DistribuicaoFuncionario.objects.filter(acerto_diario=acerto):
-            MovimentoCaixa.objects.create(
-                data=acerto.data,
+        for distribuicao in DistribuicaoFuncionario.objects.filter(acerto_diario=acerto).select_related('funcionario'):
+            desejados.append(movimento(
                 tipo='AcertoFuncionario',
                 valor=distribuicao.valor,
                 descricao=f"Acerto Funcionário: {distribuicao.funcionario.nome}",
                 categoria=None,
                 funcionario=distribuicao.funcionario,
-                acerto_diario=acerto,
-                periodo=periodo_ativo,
-                usuario_criacao=usuario,
+            ))
+        return desejados
+
+    @classmethod
+    def _sincronizar_movimentos(cls, acerto, desejados):
+        """
+        Aplica em `acerto` apenas a diferença entre os movimentos existentes e
+        `desejados`. Retorna (criados, atualizados, excluidos).
+
+        Movimentos são pareados pela origem (tipo, categoria, cliente,
+        funcionário); idênticos ficam intactos, os demais pares são atualizados
+        e as sobras são criadas ou excluídas. Movimentos mantidos preservam o
+        id e os vínculos (ex.: cobranca_recebivel).
+        """
+        def origem(mov):
+            return (mov.tipo, mov.categoria, mov.cliente_id, mov.funcionario_id)
+
+        def conteudo(mov):
+            return (mov.data, mov.valor, mov.descricao, mov.periodo_id)
+
+        existentes = defaultdict(list)
+        for mov in MovimentoCaixa.objects.filter(acerto_diario=acerto).order_by('pk'):
+            existentes[origem(mov)].append(mov)
+
+        pendentes = []
+        for desejado in desejados:
+            candidatos = existentes[origem(desejado)]
+            igual = next((m for m in candidatos if conteudo(m) == conteudo(desejado)), None)
+            if igual is not None:
+                candidatos.remove(igual)
+            else:
+                pendentes.append(desejado)
+
+        criar, atualizar = [], []
+        periodos = {desejado.periodo_id for desejado in desejados}
+        for desejado in pendentes:
+            candidatos = existentes[origem(desejado)]
+            if not candidatos:
+                criar.append(desejado)
+                continue
+            mov = candidatos.pop(0)
+            periodos.add(mov.periodo_id)
+            mov.data, mov.valor, mov.descricao, mov.periodo = (
+                desejado.data, desejado.valor, desejado.descricao, desejado.periodo
             )
+            atualizar.append(mov)
 
-        # Gera/atualiza "contas a pagar" (valores derivados do acerto diário)
-        cls._recalcular_acumulado_funcionarios_semana(acerto.data)
+        excluir = [mov.pk for sobras in existentes.values() for mov in sobras]
 
-        return acerto, None
+        if excluir:
+            MovimentoCaixa.objects.filter(pk__in=excluir).delete()
+        if atualizar:
+            agora = timezone.now()
+            for mov in atualizar:
+                mov.atualizado_em = agora
+            MovimentoCaixa.objects.bulk_update(
+                atualizar, ['data', 'valor', 'descricao', 'periodo', 'atualizado_em']
+            )
+        if criar:
+            MovimentoCaixa.objects.bulk_create(criar)
+        if criar or atualizar:
+            # bulk_create/bulk_update não disparam os sinais do livro caixa
+            for periodo_id in periodos - {None}:
+                LivroCaixaService.recalcular(periodo_id, a_partir_de=acerto.data)
+        return len(criar), len(atualizar), len(excluir)
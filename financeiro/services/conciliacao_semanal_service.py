@@ -0,0 +1,260 @@
+"""
+Conciliação semanal (ControleSaldoSemanal): totais de receitas, caixa dos
+funcionários, banco e pendentes a receber.
+
+Todas as fontes são lidas em uma única consulta (UNION ALL de agregações
+condicionais, uma por tabela). No modo anual as agregações são agrupadas por
+semana (TruncWeek), de modo que um ano inteiro de semanas sai da mesma
+consulta; os pendentes a receber são acumulados em Python (cada semana soma
+as cobranças pendentes com vencimento até o seu fim).
+
+Os totais ficam em cache por semana; o cache é invalidado pelos sinais
+(financeiro/signals.py) quando qualquer linha das tabelas de origem muda.
+"""
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import CharField, DateField, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncWeek
+
+from financeiro.models import CaixaFuncionario, ControleSaldoSemanal, MovimentoBancario, ReceitaEmpresa
+from notas.models import CobrancaCarregamento
+
+CHAVE_VERSAO_CACHE = 'conciliacao_semanal:versao'
+ZERO = Decimal('0.00')
+CAMPOS_TOTAIS = (
+    'total_receitas_empresa',
+    'total_caixa_funcionarios',
+    'total_entradas_banco',
+    'total_saidas_banco',
+    'total_pendentes_receber',
+)
+_DECIMAL = DecimalField(max_digits=14, decimal_places=2)
+
+
+def _soma(expressao, **filtros):
+    filtro = Q(**filtros) if filtros else None
+    return Coalesce(Sum(expressao, filter=filtro), ZERO, output_field=_DECIMAL)
+
+
+def _data(valor):
+    """Datas vindas do UNION podem chegar como texto (SQLite)."""
+    if valor is None or isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor)[:10])
+
+
+class ConciliacaoSemanalService:
+    """Motor de conciliação do controle de saldo semanal."""
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _versao_cache() -> int:
+        versao = cache.get(CHAVE_VERSAO_CACHE)
+        if versao is None:
+            versao = time.time_ns()
+            cache.set(CHAVE_VERSAO_CACHE, versao, None)
+        return versao
+
+    @staticmethod
+    def invalidar_cache() -> None:
+        """Descarta todas as semanas em cache (nova versão de chave)."""
+        cache.set(CHAVE_VERSAO_CACHE, time.time_ns(), None)
+
+    @classmethod
+    def _chave(cls, versao: int, semana_inicio: date, semana_fim: date) -> str:
+        return f'conciliacao_semanal:{versao}:{semana_inicio.isoformat()}:{semana_fim.isoformat()}'
+
+    @staticmethod
+    def _timeout() -> int:
+        return getattr(settings, 'CONCILIACAO_SEMANAL_CACHE_TIMEOUT', 3600)
+
+    # ------------------------------------------------------------------
+    # Consulta única
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _linhas(inicio: date, fim: date, por_semana: bool) -> List[Tuple]:
+        """
+        Linhas (fonte, inicio, fim, valor_a, valor_b) de todas as tabelas em
+        uma consulta. Com por_semana, cada fonte vem agrupada pela segunda-feira
+        da semana; sem, em uma linha só para o intervalo.
+        """
+        def balde(campo):
+            if por_semana:
+                return TruncWeek(campo, output_field=DateField())
+            return Value(inicio, output_field=DateField())
+
+        def fonte(queryset, nome, campo_inicio, campo_fim, valor_a, valor_b=None):
+            return (
+                queryset.order_by()
+                .annotate(fonte=Value(nome, output_field=CharField()), b_inicio=campo_inicio, b_fim=campo_fim)
+                .values('fonte', 'b_inicio', 'b_fim')
+                .annotate(
+                    valor_a=valor_a,
+                    valor_b=valor_b if valor_b is not None else Value(ZERO, output_field=_DECIMAL),
+                )
+                .values_list('fonte', 'b_inicio', 'b_fim', 'valor_a', 'valor_b')
+            )
+
+        # periodo_tipo é gravado em maiúsculas pelo UpperCaseMixin
+        pendentes = CobrancaCarregamento.objects.filter(status='Pendente')
+        valor_cobranca = Coalesce('valor_carregamento', ZERO) + Coalesce('valor_cte_manifesto', ZERO)
+        consultas = [
+            fonte(
+                ReceitaEmpresa.objects.filter(data__range=(inicio, fim)),
+                'receitas', balde('data'), balde('data'), _soma('valor'),
+            ),
+            fonte(
+                CaixaFuncionario.objects.filter(
+                    status='Em_Aberto', periodo_tipo__iexact='Diario', data__range=(inicio, fim)
+                ),
+                'caixa_diario', balde('data'), balde('data'), _soma('valor_coletado'),
+            ),
+            # Caixa semanal conta nas semanas com que o seu intervalo se sobrepõe:
+            # agrupado pelo próprio intervalo e distribuído em Python.
+            fonte(
+                CaixaFuncionario.objects.filter(
+                    status='Em_Aberto', periodo_tipo__iexact='Semanal',
+                    semana_inicio__lte=fim, semana_fim__gte=inicio,
+                ),
+                'caixa_semanal', F('semana_inicio'), F('semana_fim'), _soma('valor_coletado'),
+            ),
+            fonte(
+                MovimentoBancario.objects.filter(data__range=(inicio, fim)),
+                'banco', balde('data'), balde('data'),
+                _soma('valor', tipo='Credito'), _soma('valor', tipo='Debito'),
+            ),
+            # Pendentes vencidos até o fim (modo semanal) ou antes do início (modo anual)
+            fonte(
+                pendentes.filter(data_vencimento__lte=fim) if not por_semana
+                else pendentes.filter(data_vencimento__lt=inicio),
+                'pendentes_anteriores',
+                Value(inicio, output_field=DateField()), Value(inicio, output_field=DateField()),
+                _soma(valor_cobranca),
+            ),
+        ]
+        if por_semana:
+            consultas.append(fonte(
+                pendentes.filter(data_vencimento__range=(inicio, fim)),
+                'pendentes', balde('data_vencimento'), balde('data_vencimento'), _soma(valor_cobranca),
+            ))
+
+        primeira, *demais = consultas
+        return list(primeira.union(*demais, all=True))
+
+    @staticmethod
+    def _semanas(inicio: date, fim: date) -> List[Tuple[date, date]]:
+        segunda = inicio - timedelta(days=inicio.weekday())
+        semanas = []
+        while segunda <= fim:
+            semanas.append((segunda, segunda + timedelta(days=6)))
+            segunda += timedelta(days=7)
+        return semanas
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def totais_semana(cls, semana_inicio: date, semana_fim: date) -> Dict[str, Decimal]:
+        """Totais do intervalo (uma consulta; resultado em cache)."""
+        chave = cls._chave(cls._versao_cache(), semana_inicio, semana_fim)
+        totais = cache.get(chave)
+        if totais is not None:
+            return totais
+
+        totais = dict.fromkeys(CAMPOS_TOTAIS, ZERO)
+        for fonte, _inicio, _fim, valor_a, valor_b in cls._linhas(semana_inicio, semana_fim, por_semana=False):
+            valor_a, valor_b = valor_a or ZERO, valor_b or ZERO
+            if fonte == 'receitas':
+                totais['total_receitas_empresa'] += valor_a
+            elif fonte in ('caixa_diario', 'caixa_semanal'):
+                totais['total_caixa_funcionarios'] += valor_a
+            elif fonte == 'banco':
+                totais['total_entradas_banco'] += valor_a
+                totais['total_saidas_banco'] += valor_b
+            elif fonte == 'pendentes_anteriores':
+                totais['total_pendentes_receber'] += valor_a
+        cache.set(chave, totais, cls._timeout())
+        return totais
+
+    @classmethod
+    def totais_por_semana(cls, inicio: date, fim: date) -> Dict[date, Dict[str, Decimal]]:
+        """
+        Totais de todas as semanas (segunda a domingo) que tocam o intervalo,
+        em uma consulta. Cada semana também fica em cache para totais_semana().
+        """
+        semanas = cls._semanas(inicio, fim)
+        if not semanas:
+            return {}
+        inicio, fim = semanas[0][0], semanas[-1][1]
+        totais = {segunda: dict.fromkeys(CAMPOS_TOTAIS, ZERO) for segunda, _ in semanas}
+        pendentes_por_semana = defaultdict(lambda: ZERO)
+        pendentes = ZERO
+
+        for fonte, b_inicio, b_fim, valor_a, valor_b in cls._linhas(inicio, fim, por_semana=True):
+            b_inicio, b_fim = _data(b_inicio), _data(b_fim)
+            valor_a, valor_b = valor_a or ZERO, valor_b or ZERO
+            if fonte == 'caixa_semanal':
+                for segunda, domingo in semanas:
+                    if b_inicio <= domingo and b_fim >= segunda:
+                        totais[segunda]['total_caixa_funcionarios'] += valor_a
+                continue
+            if fonte == 'pendentes_anteriores':
+                pendentes += valor_a
+                continue
+            if fonte == 'pendentes':
+                pendentes_por_semana[b_inicio] += valor_a
+                continue
+            semana = totais[b_inicio]
+            if fonte == 'receitas':
+                semana['total_receitas_empresa'] += valor_a
+            elif fonte == 'caixa_diario':
+                semana['total_caixa_funcionarios'] += valor_a
+            elif fonte == 'banco':
+                semana['total_entradas_banco'] += valor_a
+                semana['total_saidas_banco'] += valor_b
+
+        versao = cls._versao_cache()
+        for segunda, domingo in semanas:
+            pendentes += pendentes_por_semana[segunda]
+            totais[segunda]['total_pendentes_receber'] = pendentes
+            cache.set(cls._chave(versao, segunda, domingo), totais[segunda], cls._timeout())
+        return totais
+
+    @classmethod
+    def recalcular_ano(cls, ano: int) -> int:
+        """
+        Fechamento: recalcula todos os ControleSaldoSemanal de semanas que
+        começam em `ano` a partir de uma única consulta. Controles já
+        validados não são alterados. Retorna a quantidade atualizada.
+        """
+        controles = list(
+            ControleSaldoSemanal.objects.filter(semana_inicio__year=ano, validado=False)
+        )
+        if not controles:
+            return 0
+        totais = cls.totais_por_semana(date(ano, 1, 1), date(ano, 12, 31))
+
+        for controle in controles:
+            semana = totais.get(controle.semana_inicio)
+            if semana is None or controle.semana_fim != controle.semana_inicio + timedelta(days=6):
+                # Intervalo fora do padrão segunda a domingo
+                semana = cls.totais_semana(controle.semana_inicio, controle.semana_fim)
+            controle.aplicar_totais(semana)
+
+        with transaction.atomic():
+            ControleSaldoSemanal.objects.bulk_update(
+                controles, [*CAMPOS_TOTAIS, 'saldo_final_calculado', 'diferenca', 'atualizado_em'], batch_size=200
+            )
+        return len(controles)
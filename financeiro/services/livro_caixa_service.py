@@ -0,0 +1,197 @@
+"""
+Livro caixa: saldo acumulado por movimento e totais por período, mantidos
+de forma incremental.
+
+Cada MovimentoCaixa guarda em `acumulado_caixa` a soma (entradas − saídas
+de dinheiro real) do período até ele, na ordem (data, criado_em, id); o
+saldo exibido é valor_inicial_caixa + acumulado_caixa. O período guarda
+total_entradas/total_saidas (regra de is_entrada/is_saida), o acumulado
+final e a quantidade de movimentos.
+
+Criar, editar ou excluir um movimento custa poucos UPDATEs com F(): o
+próprio movimento, os posteriores do período (deslocados pelo valor) e o
+período. Operações em lote (bulk_create/bulk_update) chamam recalcular()
+a partir da menor data afetada. O comando verificar_livro_caixa recalcula
+tudo do zero e compara com o gravado.
+
+Escritas no livro de um período são serializadas por select_for_update na
+linha do período (registrar, remover e recalcular), e o acumulado do
+movimento novo é lido do anterior dentro do próprio UPDATE: dois movimentos
+gravados ao mesmo tempo não deixam um saldo que ignora o outro.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Subquery, Sum, When
+from django.db.models.functions import Coalesce
+
+from financeiro.models import MovimentoCaixa, PeriodoMovimentoCaixa
+
+ZERO = Decimal('0.00')
+TIPOS_ENTRADA = ('AcertoFuncionario', 'Entrada')
+TIPO_SAIDA = 'Saida'
+ORDEM_LIVRO = ('data', 'criado_em', 'pk')
+# Campos do movimento que mudam o livro; saves que não os tocam são ignorados
+CAMPOS_LIVRO = frozenset({'periodo', 'data', 'tipo', 'valor', 'acerto_diario'})
+_VALORES_ESTADO = ('pk', 'periodo_id', 'data', 'criado_em', 'tipo', 'valor', 'acerto_diario_id')
+
+# Saída de dinheiro real (Caixa do Dia): Saida, ou AcertoFuncionario avulso
+# (sem acerto diário, veio do botão "Acertar Funcionário").
+Q_SAIDA_CAIXA_REAL = Q(tipo=TIPO_SAIDA) | Q(tipo='AcertoFuncionario', acerto_diario__isnull=True)
+
+
+class LivroCaixaService:
+    """Manutenção e verificação do livro caixa."""
+
+    @staticmethod
+    def eh_saida_caixa_real(tipo, acerto_diario_id) -> bool:
+        """
+        Regra para saldo do Caixa do Dia (dinheiro real).
+
+        - Saida: sempre saída.
+        - AcertoFuncionario sem acerto_diario (pagamento avulso): saída (compatível com telas existentes).
+        - Demais: entrada.
+        """
+        if tipo == TIPO_SAIDA:
+            return True
+        return tipo == 'AcertoFuncionario' and not acerto_diario_id
+
+    @classmethod
+    def valor_no_caixa(cls, estado) -> Decimal:
+        """Valor com sinal do movimento no caixa real."""
+        valor = estado['valor'] or ZERO
+        return -valor if cls.eh_saida_caixa_real(estado['tipo'], estado['acerto_diario_id']) else valor
+
+    @staticmethod
+    def estado(pk):
+        """Campos do movimento que importam para o livro, lidos do banco."""
+        return MovimentoCaixa.objects.filter(pk=pk).values(*_VALORES_ESTADO).first()
+
+    @staticmethod
+    def _posteriores(estado):
+        data, criado_em, pk = estado['data'], estado['criado_em'], estado['pk']
+        return MovimentoCaixa.objects.filter(
+            Q(data__gt=data)
+            | Q(data=data, criado_em__gt=criado_em)
+            | Q(data=data, criado_em=criado_em, pk__gt=pk),
+            periodo_id=estado['periodo_id'],
+        )
+
+    @staticmethod
+    def _anterior(estado):
+        """Acumulado do movimento anterior, como consulta (avaliada dentro do UPDATE)."""
+        data, criado_em, pk = estado['data'], estado['criado_em'], estado['pk']
+        return (
+            MovimentoCaixa.objects.filter(
+                Q(data__lt=data)
+                | Q(data=data, criado_em__lt=criado_em)
+                | Q(data=data, criado_em=criado_em, pk__lt=pk),
+                periodo_id=estado['periodo_id'],
+            )
+            .order_by('-data', '-criado_em', '-pk')
+            .values('acumulado_caixa')[:1]
+        )
+
+    @staticmethod
+    def _travar_periodo(periodo_id):
+        """Bloqueia a linha do período até o fim da transação (uma escrita no livro por vez)."""
+        list(PeriodoMovimentoCaixa.objects.select_for_update().filter(pk=periodo_id).values_list('pk'))
+
+    @classmethod
+    def _ajustar_periodo(cls, estado, sinal):
+        valor = estado['valor'] or ZERO
+        campos = {
+            'acumulado_caixa': F('acumulado_caixa') + sinal * cls.valor_no_caixa(estado),
+            'quantidade_movimentos': F('quantidade_movimentos') + sinal,
+        }
+        if estado['tipo'] in TIPOS_ENTRADA:
+            campos['total_entradas'] = F('total_entradas') + sinal * valor
+        elif estado['tipo'] == TIPO_SAIDA:
+            campos['total_saidas'] = F('total_saidas') + sinal * valor
+        PeriodoMovimentoCaixa.objects.filter(pk=estado['periodo_id']).update(**campos)
+
+    @classmethod
+    def registrar(cls, estado):
+        """Inclui no livro um movimento já gravado (estado lido com `estado()`)."""
+        if not estado or not estado['periodo_id']:
+            return
+        delta = cls.valor_no_caixa(estado)
+        with transaction.atomic():
+            cls._travar_periodo(estado['periodo_id'])
+            cls._posteriores(estado).update(acumulado_caixa=F('acumulado_caixa') + delta)
+            MovimentoCaixa.objects.filter(pk=estado['pk']).update(
+                acumulado_caixa=Coalesce(Subquery(cls._anterior(estado)), ZERO) + delta
+            )
+            cls._ajustar_periodo(estado, 1)
+
+    @classmethod
+    def remover(cls, estado):
+        """Retira do livro um movimento (excluído, ou antes de ser alterado)."""
+        if not estado or not estado['periodo_id']:
+            return
+        with transaction.atomic():
+            cls._travar_periodo(estado['periodo_id'])
+            cls._posteriores(estado).update(
+                acumulado_caixa=F('acumulado_caixa') - cls.valor_no_caixa(estado)
+            )
+            cls._ajustar_periodo(estado, -1)
+
+    @classmethod
+    def totais_esperados(cls, periodo_id):
+        """Totais do período calculados a partir dos movimentos (uma consulta)."""
+        decimal = DecimalField(max_digits=12, decimal_places=2)
+        return MovimentoCaixa.objects.filter(periodo_id=periodo_id).aggregate(
+            total_entradas=Coalesce(Sum('valor', filter=Q(tipo__in=TIPOS_ENTRADA)), ZERO, output_field=decimal),
+            total_saidas=Coalesce(Sum('valor', filter=Q(tipo=TIPO_SAIDA)), ZERO, output_field=decimal),
+            acumulado_caixa=Coalesce(
+                Sum(Case(When(Q_SAIDA_CAIXA_REAL, then=-F('valor')), default=F('valor'), output_field=decimal)),
+                ZERO,
+                output_field=decimal,
+            ),
+            quantidade_movimentos=Count('pk'),
+        )
+
+    @classmethod
+    def recalcular(cls, periodo_id, a_partir_de=None, gravar=True):
+        """
+        Recalcula o acumulado dos movimentos do período (todos, ou a partir da
+        data `a_partir_de`) e os totais do período.
+
+        Com gravar=False só compara. Retorna (movimentos, totais): a lista de
+        (pk, gravado, esperado) dos movimentos divergentes e o dict
+        {campo: (gravado, esperado)} dos totais divergentes.
+        """
+        with transaction.atomic():
+            if gravar:
+                cls._travar_periodo(periodo_id)
+            movimentos = MovimentoCaixa.objects.filter(periodo_id=periodo_id)
+            acumulado = ZERO
+            if a_partir_de is not None:
+                acumulado = (
+                    movimentos.filter(data__lt=a_partir_de)
+                    .order_by('-data', '-criado_em', '-pk')
+                    .values_list('acumulado_caixa', flat=True)
+                    .first()
+                ) or ZERO
+                movimentos = movimentos.filter(data__gte=a_partir_de)
+
+            divergentes, corrigir = [], []
+            for estado in movimentos.order_by(*ORDEM_LIVRO).values(*_VALORES_ESTADO, 'acumulado_caixa').iterator():
+                acumulado += cls.valor_no_caixa(estado)
+                if estado['acumulado_caixa'] != acumulado:
+                    divergentes.append((estado['pk'], estado['acumulado_caixa'], acumulado))
+                    corrigir.append(MovimentoCaixa(pk=estado['pk'], acumulado_caixa=acumulado))
+
+            esperados = cls.totais_esperados(periodo_id)
+            gravados = PeriodoMovimentoCaixa.objects.filter(pk=periodo_id).values(*esperados).first() or {}
+            totais = {
+                campo: (gravados.get(campo), valor)
+                for campo, valor in esperados.items()
+                if gravados.get(campo) != valor
+            }
+
+            if gravar:
+                MovimentoCaixa.objects.bulk_update(corrigir, ['acumulado_caixa'], batch_size=500)
+                if totais:
+                    PeriodoMovimentoCaixa.objects.filter(pk=periodo_id).update(**esperados)
+        return divergentes, totais
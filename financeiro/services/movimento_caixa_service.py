@@ -18,9 +18,6 @@ class MovimentoCaixaService:
     CATEGORIAS_ENTRADA = [c[0] for c in MovimentoCaixa.CATEGORIA_ENTRADA_CHOICES]
     CATEGORIAS_SAIDA = [c[0] for c in MovimentoCaixa.CATEGORIA_SAIDA_CHOICES]
 
-    # Marcador em CobrancaCarregamento.observacoes para saída com destino cliente.
-    MARCADOR_SAIDA_CAIXA_CLIENTE = '[SAIDA_CAIXA_CLIENTE:{id}]'
-
     MSG_SEM_PERIODO = (
         'É necessário iniciar um período antes de criar movimentos. Clique em "Iniciar Período".'
     )
@@ -80,23 +77,17 @@ class MovimentoCaixaService:
             return False, 'Categoria inválida para saída'
         return True, None
 
-    @classmethod
-    def _marcador_saida_caixa_cliente(cls, movimento_id):
-        return cls.MARCADOR_SAIDA_CAIXA_CLIENTE.format(id=movimento_id)
-
     @classmethod
     def _sincronizar_recebivel_saida_cliente(cls, movimento):
         """
-        Saída com cliente gera/atualiza uma CobrancaCarregamento pendente (A Receber).
+        Saída com cliente gera/atualiza uma CobrancaCarregamento pendente (A Receber),
+        vinculada em movimento.cobranca_recebivel.
         Se o movimento deixar de ser saída ou perder o cliente, remove a pendente vinculada.
         """
-        marker = cls._marcador_saida_caixa_cliente(movimento.pk)
-        qs = CobrancaCarregamento.objects.filter(observacoes__contains=marker)
+        cob = movimento.cobranca_recebivel if movimento.cobranca_recebivel_id else None
 
         if movimento.tipo == 'Saida' and movimento.cliente_id:
-            tail = (movimento.descricao or '').strip()[:500]
-            base_obs = f'{marker} {tail}'.strip()
-            cob = qs.first()
+            observacoes = (movimento.descricao or '').strip()[:500]
             if cob:
                 if cob.status != 'Pendente':
                     logger.warning(
@@ -106,26 +97,28 @@ class MovimentoCaixaService:
                     return
                 cob.cliente_id = movimento.cliente_id
                 cob.valor_carregamento = movimento.valor
-                cob.observacoes = base_obs
+                cob.observacoes = observacoes
                 cob.save()
             else:
-                CobrancaCarregamento.objects.create(
+                movimento.cobranca_recebivel = CobrancaCarregamento.objects.create(
                     cliente_id=movimento.cliente_id,
                     valor_carregamento=movimento.valor,
                     valor_cte_manifesto=Decimal('0.00'),
                     status='Pendente',
-                    observacoes=base_obs,
+                    observacoes=observacoes,
                 )
-        else:
-            qs.filter(status='Pendente').delete()
+                movimento.save(update_fields=['cobranca_recebivel'])
+        elif cob and cob.status == 'Pendente':
+            cob.delete()
+            movimento.cobranca_recebivel = None
 
     @classmethod
     def _remover_cobrancas_pendentes_saida_cliente(cls, movimento):
-        marker = cls._marcador_saida_caixa_cliente(movimento.pk)
-        CobrancaCarregamento.objects.filter(
-            observacoes__contains=marker,
-            status='Pendente',
-        ).delete()
+        if movimento.cobranca_recebivel_id:
+            CobrancaCarregamento.objects.filter(
+                pk=movimento.cobranca_recebivel_id,
+                status='Pendente',
+            ).delete()
 
     @classmethod
     def criar_movimento(
@@ -139,10 +132,12 @@ class MovimentoCaixaService:
         cliente_id,
         acerto_diario_id,
         usuario,
+        descarga_recebida_id=None,
     ):
         """
         Cria um movimento de caixa no período ativo.
         Se for AcertoFuncionario, atualiza o acumulado do funcionário.
+        descarga_recebida_id vincula a entrada à descarga (Depósito) que ela baixa.
 
         Returns:
             tuple: (movimento, None) em sucesso ou (None, mensagem_erro) em falha.
@@ -167,6 +162,7 @@ class MovimentoCaixaService:
                 funcionario_id=funcionario_id,
                 cliente_id=cliente_id,
                 acerto_diario_id=acerto_diario_id,
+                descarga_recebida_id=descarga_recebida_id,
                 periodo=periodo_ativo,
                 usuario_criacao=usuario,
             )
@@ -0,0 +1,70 @@
+"""
+Sinais do app financeiro.
+
+Mantém o livro caixa (LivroCaixaService): saldo acumulado de cada
+MovimentoCaixa e totais do período, ajustados a cada criação, alteração ou
+exclusão de movimento.
+
+Também invalida o cache da conciliação semanal (ConciliacaoSemanalService)
+quando receitas, caixas dos funcionários, movimentos bancários ou cobranças
+mudam.
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from notas.models import CobrancaCarregamento
+
+from .models import CaixaFuncionario, MovimentoBancario, MovimentoCaixa, ReceitaEmpresa
+from .services.conciliacao_semanal_service import ConciliacaoSemanalService
+from .services.livro_caixa_service import CAMPOS_LIVRO, LivroCaixaService
+
+
+def _afeta_livro(update_fields):
+    return update_fields is None or not set(update_fields).isdisjoint(CAMPOS_LIVRO)
+
+
+@receiver(pre_save, sender=MovimentoCaixa)
+def guardar_estado_anterior_movimento(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._estado_livro_anterior = None
+    if raw or not instance.pk or not _afeta_livro(update_fields):
+        return
+    instance._estado_livro_anterior = LivroCaixaService.estado(instance.pk)
+
+
+@receiver(post_save, sender=MovimentoCaixa)
+def atualizar_livro_caixa(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or not _afeta_livro(update_fields):
+        return
+    anterior = getattr(instance, '_estado_livro_anterior', None)
+    atual = LivroCaixaService.estado(instance.pk)
+    if anterior == atual and not created:
+        return
+    LivroCaixaService.remover(anterior)
+    LivroCaixaService.registrar(atual)
+
+
+@receiver(post_delete, sender=MovimentoCaixa)
+def retirar_do_livro_caixa(sender, instance, **kwargs):
+    LivroCaixaService.remover({
+        'pk': instance.pk,
+        'periodo_id': instance.periodo_id,
+        'data': instance.data,
+        'criado_em': instance.criado_em,
+        'tipo': instance.tipo,
+        'valor': instance.valor,
+        'acerto_diario_id': instance.acerto_diario_id,
+    })
+
+
+@receiver(post_save, sender=ReceitaEmpresa)
+@receiver(post_delete, sender=ReceitaEmpresa)
+@receiver(post_save, sender=CaixaFuncionario)
+@receiver(post_delete, sender=CaixaFuncionario)
+@receiver(post_save, sender=MovimentoBancario)
+@receiver(post_delete, sender=MovimentoBancario)
+@receiver(post_save, sender=CobrancaCarregamento)
+@receiver(post_delete, sender=CobrancaCarregamento)
+def invalidar_cache_conciliacao(sender, raw=False, **kwargs):
+    if raw:
+        return
+    ConciliacaoSemanalService.invalidar_cache()
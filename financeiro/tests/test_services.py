@@ -1,23 +1,36 @@
 """
-Testes unitários dos serviços do financeiro (acerto diário, período, movimento de caixa).
+Testes unitários dos serviços do financeiro (acerto diário, período, movimento de caixa, livro caixa, conciliação semanal).
 """
-from datetime import date
+from datetime import date, timedelta
 from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
 
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from django.contrib.auth import get_user_model
 
-from notas.models import Cliente
+from notas.models import Cliente, CobrancaCarregamento
 from financeiro.models import (
     AcertoDiarioCarregamento,
+    CaixaFuncionario,
     CarregamentoCliente,
+    ControleSaldoSemanal,
     DistribuicaoFuncionario,
     FuncionarioFluxoCaixa,
+    MovimentoBancario,
     MovimentoCaixa,
     PeriodoMovimentoCaixa,
+    ReceitaEmpresa,
 )
 from financeiro.services import (
     AcertoDiarioService,
+    ConciliacaoSemanalService,
+    LivroCaixaService,
     PeriodoCaixaService,
     MovimentoCaixaService,
 )
@@ -177,6 +190,51 @@ class MovimentoCaixaServiceTest(TestCase):
         self.assertEqual(movimento.valor, Decimal('50.00'))
         self.assertEqual(movimento.periodo_id, self.periodo.pk)
 
+    def _criar_saida_cliente(self, cliente, valor=Decimal('80.00')):
+        movimento, erro = MovimentoCaixaService.criar_movimento(
+            data='2025-01-01',
+            tipo='Saida',
+            valor=valor,
+            descricao='Adiantamento frete',
+            categoria='Outros',
+            funcionario_id=None,
+            cliente_id=cliente.pk,
+            acerto_diario_id=None,
+            usuario=self.user,
+        )
+        self.assertIsNone(erro)
+        return movimento
+
+    def test_saida_com_cliente_vincula_cobranca_pendente(self):
+        cliente = Cliente.objects.create(razao_social='Cliente Saida LTDA')
+        movimento = self._criar_saida_cliente(cliente)
+
+        movimento.refresh_from_db()
+        cobranca = movimento.cobranca_recebivel
+        self.assertIsNotNone(cobranca)
+        self.assertEqual(cobranca.status, 'Pendente')
+        self.assertEqual(cobranca.valor_carregamento, Decimal('80.00'))
+        self.assertEqual(cobranca.observacoes, 'ADIANTAMENTO FRETE')
+
+        MovimentoCaixaService.editar_movimento(
+            movimento, '2025-01-01', 'Saida', Decimal('90.00'),
+            'Adiantamento frete', 'Outros', None, cliente.pk,
+        )
+        cobranca.refresh_from_db()
+        self.assertEqual(cobranca.valor_carregamento, Decimal('90.00'))
+        self.assertEqual(CobrancaCarregamento.objects.count(), 1)
+
+    def test_excluir_saida_com_cliente_remove_cobranca_pendente(self):
+        cliente = Cliente.objects.create(razao_social='Cliente Saida LTDA')
+        movimento = self._criar_saida_cliente(cliente)
+        outra = CobrancaCarregamento.objects.create(
+            cliente=cliente, valor_carregamento=Decimal('10.00'), status='Pendente'
+        )
+
+        MovimentoCaixaService.excluir_movimento(movimento)
+
+        self.assertEqual(list(CobrancaCarregamento.objects.values_list('pk', flat=True)), [outra.pk])
+
     def test_obter_acumulado_funcionario_sem_registro_retorna_zero(self):
         func = FuncionarioFluxoCaixa.objects.create(nome='Func Teste', ativo=True)
         valor = MovimentoCaixaService.obter_acumulado_funcionario(func.pk)
@@ -217,3 +275,338 @@ class AcertoDiarioServiceTest(TestCase):
         self.assertIsNotNone(acerto)
         self.assertEqual(acerto.data, date(2025, 1, 1))
         self.assertEqual(MovimentoCaixa.objects.filter(acerto_diario=acerto).count(), 0)
+
+    def _acerto_com_lancamentos(self):
+        acerto = AcertoDiarioCarregamento.objects.create(
+            data=date(2025, 1, 2),
+            valor_estelar=Decimal('50.00'),
+            usuario_criacao=self.user,
+        )
+        cliente = Cliente.objects.create(razao_social='Cliente Acerto LTDA')
+        funcionario = FuncionarioFluxoCaixa.objects.create(nome='Func Acerto', ativo=True)
+        CarregamentoCliente.objects.create(acerto_diario=acerto, cliente=cliente, valor=Decimal('100.00'))
+        CarregamentoCliente.objects.create(
+            acerto_diario=acerto, descricao='Galpão', valor=Decimal('30.00'), tipo_pagamento='Deposito'
+        )
+        CarregamentoCliente.objects.create(acerto_diario=acerto, descricao='Avulsa', valor=Decimal('20.00'))
+        distribuicao = DistribuicaoFuncionario.objects.create(
+            acerto_diario=acerto, funcionario=funcionario, valor=Decimal('25.00')
+        )
+        return acerto, distribuicao
+
+    def _salvar(self, acerto):
+        return AcertoDiarioService.salvar_acerto_e_criar_movimentos(
+            data=None, observacoes='', usuario=self.user, acerto_id=acerto.pk
+        )
+
+    def test_salvar_acerto_cria_movimentos_de_cada_origem(self):
+        acerto, _ = self._acerto_com_lancamentos()
+        self._salvar(acerto)
+
+        movimentos = {
+            m.descricao: (m.tipo, m.valor)
+            for m in MovimentoCaixa.objects.filter(acerto_diario=acerto)
+        }
+        self.assertEqual(movimentos, {
+            'CARREGAMENTO: CLIENTE ACERTO LTDA': ('Saida', Decimal('100.00')),
+            'DESCARGA (DEPÓSITO): GALPÃO': ('Saida', Decimal('30.00')),
+            'VALOR ESTELAR': ('Entrada', Decimal('50.00')),
+            'ACERTO FUNCIONÁRIO: FUNC ACERTO': ('AcertoFuncionario', Decimal('25.00')),
+        })
+
+    def test_salvar_novamente_grava_so_as_diferencas(self):
+        acerto, distribuicao = self._acerto_com_lancamentos()
+        self._salvar(acerto)
+        ids_antes = dict(MovimentoCaixa.objects.filter(acerto_diario=acerto).values_list('descricao', 'pk'))
+
+        CarregamentoCliente.objects.filter(acerto_diario=acerto, cliente__isnull=False).update(
+            valor=Decimal('120.00')
+        )
+        distribuicao.delete()
+        acerto, erro = self._salvar(acerto)
+
+        self.assertIsNone(erro)
+        movimentos = MovimentoCaixa.objects.filter(acerto_diario=acerto)
+        self.assertEqual(movimentos.count(), 3)
+        self.assertFalse(movimentos.filter(tipo='AcertoFuncionario').exists())
+        carregamento = movimentos.get(cliente__isnull=False)
+        self.assertEqual(carregamento.valor, Decimal('120.00'))
+        self.assertEqual(carregamento.pk, ids_antes['CARREGAMENTO: CLIENTE ACERTO LTDA'])
+        self.assertEqual(movimentos.get(tipo='Entrada').pk, ids_antes['VALOR ESTELAR'])
+
+    def test_salvar_sem_mudancas_nao_grava_movimentos(self):
+        acerto, _ = self._acerto_com_lancamentos()
+        self._salvar(acerto)
+
+        with CaptureQueriesContext(connection) as contexto:
+            self._salvar(acerto)
+
+        tabela = MovimentoCaixa._meta.db_table
+        escritas = [
+            q['sql'] for q in contexto.captured_queries
+            if tabela in q['sql'] and not q['sql'].startswith('SELECT')
+        ]
+        self.assertEqual(escritas, [])
+
+
+class LivroCaixaServiceTest(TestCase):
+    """Testes do LivroCaixaService (acumulado por movimento e totais do período)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testelivro', email='livro@test.com', password='teste123'
+        )
+        self.periodo = PeriodoMovimentoCaixa.objects.create(
+            data_inicio=date(2025, 1, 1),
+            valor_inicial_caixa=Decimal('100.00'),
+            status='Aberto',
+            usuario_criacao=self.user,
+        )
+
+    def _criar(self, data, tipo, valor):
+        movimento, erro = MovimentoCaixaService.criar_movimento(
+            data=data, tipo=tipo, valor=Decimal(valor), descricao='Teste',
+            categoria='Outros' if tipo != 'AcertoFuncionario' else None,
+            funcionario_id=None, cliente_id=None, acerto_diario_id=None, usuario=self.user,
+        )
+        self.assertIsNone(erro)
+        return movimento
+
+    def _acumulados(self):
+        return list(
+            MovimentoCaixa.objects.filter(periodo=self.periodo)
+            .order_by('data', 'criado_em', 'pk')
+            .values_list('valor', 'acumulado_caixa')
+        )
+
+    def assertLivroConfere(self):
+        self.assertEqual(LivroCaixaService.recalcular(self.periodo.pk, gravar=False), ([], {}))
+
+    def test_registros_intercalados_no_mesmo_periodo(self):
+        # bulk_create não passa pelos sinais: o livro é montado só pelos registrar abaixo
+        anterior, posterior = MovimentoCaixa.objects.bulk_create([
+            MovimentoCaixa(data=date(2025, 1, 2), tipo='Entrada', valor=Decimal('30.00'), descricao='A',
+                           categoria='Outros', periodo=self.periodo, usuario_criacao=self.user),
+            MovimentoCaixa(data=date(2025, 1, 3), tipo='Entrada', valor=Decimal('20.00'), descricao='B',
+                           categoria='Outros', periodo=self.periodo, usuario_criacao=self.user),
+        ])
+        original = LivroCaixaService._anterior
+        intercalado = []
+
+        def anterior_com_concorrente(estado):
+            consulta = original(estado)
+            if not intercalado:
+                # Outro registrar termina entre a leitura do anterior e a gravação deste
+                intercalado.append(True)
+                LivroCaixaService.registrar(LivroCaixaService.estado(anterior.pk))
+            return consulta
+
+        with patch.object(LivroCaixaService, '_anterior', staticmethod(anterior_com_concorrente)):
+            LivroCaixaService.registrar(LivroCaixaService.estado(posterior.pk))
+
+        self.assertEqual(self._acumulados(), [
+            (Decimal('30.00'), Decimal('30.00')),
+            (Decimal('20.00'), Decimal('50.00')),
+        ])
+        self.assertLivroConfere()
+
+    def test_movimento_retroativo_desloca_os_posteriores(self):
+        self._criar('2025-01-03', 'Entrada', '50.00')
+        self._criar('2025-01-05', 'Saida', '20.00')
+        self._criar('2025-01-02', 'Saida', '10.00')
+
+        self.assertEqual(self._acumulados(), [
+            (Decimal('10.00'), Decimal('-10.00')),
+            (Decimal('50.00'), Decimal('40.00')),
+            (Decimal('20.00'), Decimal('20.00')),
+        ])
+        self.periodo.refresh_from_db()
+        self.assertEqual(self.periodo.total_entradas, Decimal('50.00'))
+        self.assertEqual(self.periodo.total_saidas, Decimal('30.00'))
+        self.assertEqual(self.periodo.saldo_caixa, Decimal('120.00'))
+        self.assertEqual(self.periodo.movimentos_count, 3)
+        self.assertLivroConfere()
+
+    def test_editar_e_excluir_mantem_o_livro(self):
+        primeiro = self._criar('2025-01-02', 'Entrada', '30.00')
+        segundo = self._criar('2025-01-03', 'Saida', '10.00')
+        self._criar('2025-01-04', 'AcertoFuncionario', '5.00')  # avulso: saída no caixa
+
+        MovimentoCaixaService.editar_movimento(
+            primeiro, '2025-01-05', 'Saida', Decimal('40.00'), 'Teste', 'Outros', None, None
+        )
+        self.assertLivroConfere()
+        MovimentoCaixaService.excluir_movimento(segundo)
+        self.assertLivroConfere()
+
+        self.periodo.refresh_from_db()
+        self.assertEqual(self.periodo.acumulado_caixa, Decimal('-45.00'))
+        self.assertEqual(self.periodo.total_entradas, Decimal('5.00'))
+        self.assertEqual(self.periodo.total_saidas, Decimal('40.00'))
+        self.assertEqual(self.periodo.quantidade_movimentos, 2)
+
+    def test_save_de_periodo_desatualizado_nao_sobrescreve_totais(self):
+        periodo = PeriodoMovimentoCaixa.objects.get(pk=self.periodo.pk)
+        self._criar('2025-01-02', 'Entrada', '30.00')
+
+        periodo.observacoes = 'Alterado'
+        periodo.save()
+
+        periodo.refresh_from_db()
+        self.assertEqual(periodo.total_entradas, Decimal('30.00'))
+        self.assertEqual(periodo.observacoes, 'ALTERADO')
+
+    def test_acerto_diario_em_lote_atualiza_o_livro(self):
+        self._criar('2025-01-05', 'Saida', '10.00')
+        acerto = AcertoDiarioCarregamento.objects.create(
+            data=date(2025, 1, 2), valor_estelar=Decimal('70.00'), usuario_criacao=self.user
+        )
+        AcertoDiarioService.salvar_acerto_e_criar_movimentos(
+            data=None, observacoes='', usuario=self.user, acerto_id=acerto.pk
+        )
+
+        self.assertEqual(self._acumulados(), [
+            (Decimal('70.00'), Decimal('70.00')),
+            (Decimal('10.00'), Decimal('60.00')),
+        ])
+        self.assertLivroConfere()
+
+    def test_comando_verificar_livro_caixa_corrige_divergencias(self):
+        self._criar('2025-01-02', 'Entrada', '30.00')
+        self._criar('2025-01-03', 'Entrada', '20.00')
+        MovimentoCaixa.objects.filter(periodo=self.periodo).update(valor=Decimal('25.00'))  # sem sinais
+
+        saida = StringIO()
+        call_command('verificar_livro_caixa', stdout=saida)
+        self.assertIn('1 período(s) com divergência', saida.getvalue())
+
+        call_command('verificar_livro_caixa', '--corrigir', stdout=StringIO())
+        self.assertLivroConfere()
+        self.periodo.refresh_from_db()
+        self.assertEqual(self.periodo.total_entradas, Decimal('50.00'))
+
+    def test_caixa_do_dia_pagina_com_saldos_gravados(self):
+        self.user.tipo_usuario = 'admin'
+        self.user.save()
+        self.client.force_login(self.user)
+        for dia in range(2, 5):
+            self._criar(f'2025-01-0{dia}', 'Entrada', '10.00')
+        # A paginação conta os movimentos, não depende do contador do livro
+        PeriodoMovimentoCaixa.objects.filter(pk=self.periodo.pk).update(quantidade_movimentos=0)
+
+        with patch('financeiro.views.caixa_unico.MOVIMENTOS_POR_PAGINA', 2):
+            ultima = self.client.get(reverse('financeiro:caixa_do_dia'))
+            primeira = self.client.get(reverse('financeiro:caixa_do_dia'), {'page': 1})
+
+        self.assertEqual(ultima.context['saldo_atual'], Decimal('130.00'))
+        self.assertEqual([i['saldo'] for i in ultima.context['movimentos_com_saldo']], [Decimal('130.00')])
+        self.assertEqual(
+            [i['saldo'] for i in primeira.context['movimentos_com_saldo']],
+            [Decimal('110.00'), Decimal('120.00')],
+        )
+
+
+class ConciliacaoSemanalServiceTest(TestCase):
+    """Testes do ConciliacaoSemanalService (ControleSaldoSemanal)."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testeconc', email='conc@test.com', password='teste123'
+        )
+        self.cliente = Cliente.objects.create(razao_social='Cliente Conciliacao LTDA')
+        self.funcionario = FuncionarioFluxoCaixa.objects.create(nome='Func Conc', ativo=True)
+        # Semana de 06/01/2025 (segunda) a 12/01/2025
+        ReceitaEmpresa.objects.create(
+            data=date(2025, 1, 7), tipo_receita='Estelar', valor=Decimal('100.00'), usuario_criacao=self.user
+        )
+        ReceitaEmpresa.objects.create(
+            data=date(2025, 1, 14), tipo_receita='CTE', valor=Decimal('40.00'), usuario_criacao=self.user
+        )
+        CaixaFuncionario.objects.create(
+            funcionario=self.funcionario, periodo_tipo='Diario', data=date(2025, 1, 8),
+            valor_coletado=Decimal('30.00'), status='Em_Aberto',
+        )
+        CaixaFuncionario.objects.create(
+            funcionario=self.funcionario, periodo_tipo='Semanal',
+            semana_inicio=date(2025, 1, 9), semana_fim=date(2025, 1, 15),
+            valor_coletado=Decimal('20.00'), status='Em_Aberto',
+        )
+        MovimentoBancario.objects.create(
+            data=date(2025, 1, 10), tipo='Credito', valor=Decimal('500.00'), descricao='TED',
+            usuario_criacao=self.user,
+        )
+        MovimentoBancario.objects.create(
+            data=date(2025, 1, 11), tipo='Debito', valor=Decimal('150.00'), descricao='Tarifa',
+            usuario_criacao=self.user,
+        )
+        CobrancaCarregamento.objects.create(
+            cliente=self.cliente, valor_carregamento=Decimal('80.00'), valor_cte_manifesto=Decimal('20.00'),
+            status='Pendente', data_vencimento=date(2025, 1, 3),
+        )
+        CobrancaCarregamento.objects.create(
+            cliente=self.cliente, valor_carregamento=Decimal('60.00'),
+            status='Pendente', data_vencimento=date(2025, 1, 13),
+        )
+
+    def test_calcular_totais_em_uma_consulta(self):
+        controle = ControleSaldoSemanal.objects.create(
+            semana_inicio=date(2025, 1, 6), semana_fim=date(2025, 1, 12),
+            saldo_inicial_caixa=Decimal('10.00'),
+        )
+
+        with CaptureQueriesContext(connection) as contexto:
+            totais = ConciliacaoSemanalService.totais_semana(controle.semana_inicio, controle.semana_fim)
+        self.assertEqual(len(contexto.captured_queries), 1)
+
+        self.assertEqual(totais, {
+            'total_receitas_empresa': Decimal('100.00'),
+            'total_caixa_funcionarios': Decimal('50.00'),
+            'total_entradas_banco': Decimal('500.00'),
+            'total_saidas_banco': Decimal('150.00'),
+            'total_pendentes_receber': Decimal('100.00'),
+        })
+        controle.calcular_totais()
+        controle.refresh_from_db()
+        self.assertEqual(controle.saldo_final_calculado, Decimal('510.00'))
+        self.assertEqual(controle.total_pendentes_receber, Decimal('100.00'))
+
+    def test_cache_invalidado_quando_origem_muda(self):
+        inicio, fim = date(2025, 1, 6), date(2025, 1, 12)
+        ConciliacaoSemanalService.totais_semana(inicio, fim)
+        with self.assertNumQueries(0):
+            ConciliacaoSemanalService.totais_semana(inicio, fim)
+
+        ReceitaEmpresa.objects.create(
+            data=date(2025, 1, 6), tipo_receita='Outro', valor=Decimal('5.00'), usuario_criacao=self.user
+        )
+        totais = ConciliacaoSemanalService.totais_semana(inicio, fim)
+        self.assertEqual(totais['total_receitas_empresa'], Decimal('105.00'))
+
+    def test_ano_inteiro_confere_com_semana_a_semana(self):
+        por_semana = ConciliacaoSemanalService.totais_por_semana(date(2025, 1, 1), date(2025, 1, 31))
+        cache.clear()
+
+        self.assertEqual(min(por_semana), date(2024, 12, 30))
+        for segunda in por_semana:
+            self.assertEqual(
+                por_semana[segunda],
+                ConciliacaoSemanalService.totais_semana(segunda, segunda + timedelta(days=6)),
+                segunda,
+            )
+
+    def test_comando_recalcula_controles_do_ano(self):
+        aberto = ControleSaldoSemanal.objects.create(semana_inicio=date(2025, 1, 13), semana_fim=date(2025, 1, 19))
+        validado = ControleSaldoSemanal.objects.create(
+            semana_inicio=date(2025, 1, 6), semana_fim=date(2025, 1, 12), validado=True
+        )
+
+        call_command('conciliar_saldo_semanal', '--ano', '2025', stdout=StringIO())
+
+        aberto.refresh_from_db()
+        validado.refresh_from_db()
+        self.assertEqual(aberto.total_receitas_empresa, Decimal('40.00'))
+        self.assertEqual(aberto.total_caixa_funcionarios, Decimal('20.00'))
+        self.assertEqual(aberto.total_pendentes_receber, Decimal('160.00'))
+        self.assertEqual(aberto.saldo_final_calculado, Decimal('60.00'))
+        self.assertEqual(validado.total_receitas_empresa, Decimal('0.00'))
@@ -15,6 +15,7 @@ from django.utils.safestring import mark_safe
 from django.utils import timezone
 
 from notas.decorators import admin_required
+from notas.utils.paginacao_cursor import CursorInvalido, ler_limite, paginar_por_cursor
 from notas.models import Cliente, CobrancaCarregamento
 from financeiro.models import (
     AcertoDiarioCarregamento,
@@ -363,25 +364,35 @@ def salvar_valor_estelar_ajax(request):
 @login_required
 @admin_required
 def listar_cobrancas_pendentes_ajax(request):
-    """Lista cobranças pendentes para adicionar ao acerto diário (GET)."""
+    """
+    Lista cobranças pendentes para adicionar ao acerto diário (GET).
+    Paginada por cursor: parâmetros opcionais cursor e limit (padrão 50).
+    """
     try:
         cobrancas = CobrancaCarregamento.objects.filter(
             status='Pendente'
-        ).select_related('cliente').order_by('-criado_em')[:50]
+        ).select_related('cliente')
         data_acerto = request.GET.get('data_acerto', '')
         if data_acerto:
             try:
                 data_obj = datetime.strptime(data_acerto, '%Y-%m-%d').date()
-                acerto = AcertoDiarioCarregamento.objects.filter(data=data_obj).first()
-                if acerto:
-                    ja_no_acerto = set(
-                        CarregamentoCliente.objects.filter(
-                            acerto_diario=acerto
-                        ).exclude(cobranca_carregamento__isnull=True).values_list('cobranca_carregamento_id', flat=True)
-                    )
-                    cobrancas = [c for c in cobrancas if c.pk not in ja_no_acerto]
+                cobrancas = cobrancas.exclude(
+                    pk__in=CarregamentoCliente.objects.filter(
+                        acerto_diario__data=data_obj,
+                        cobranca_carregamento__isnull=False,
+                    ).values('cobranca_carregamento_id')
+                )
             except ValueError:
                 pass
+        try:
+            cobrancas, proximo_cursor = paginar_por_cursor(
+                cobrancas,
+                ('-criado_em', '-id'),
+                cursor=request.GET.get('cursor'),
+                limite=ler_limite(request.GET.get('limit'), 50),
+            )
+        except CursorInvalido as e:
+            return json_error(str(e), code='CURSOR_INVALIDO', status=400)
         lista = [
             {
                 'id': c.pk,
@@ -392,7 +403,7 @@ def listar_cobrancas_pendentes_ajax(request):
             }
             for c in cobrancas
         ]
-        return json_success(cobrancas=lista)
+        return json_success(cobrancas=lista, cursor=proximo_cursor)
     except Exception as e:
         return json_error(f'Erro ao listar cobranças: {str(e)}')
 
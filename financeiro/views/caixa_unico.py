@@ -10,6 +10,8 @@ from decimal import Decimal, InvalidOperation
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.db.models import Exists, OuterRef
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
 
@@ -17,33 +19,14 @@ from notas.decorators import admin_required
 from notas.models import CobrancaCarregamento, CobrancaCTEAvulsa, Cliente
 
 from financeiro.models import AcumuladoFuncionario, CarregamentoCliente, MovimentoCaixa, PeriodoMovimentoCaixa
-from financeiro.services import MovimentoCaixaService, PeriodoCaixaService
+from financeiro.services import LivroCaixaService, MovimentoCaixaService, PeriodoCaixaService
 
-
-def _eh_saida_caixa_real(mov: MovimentoCaixa) -> bool:
-    """
-    Regra para saldo do Caixa do Dia (dinheiro real).
-
-    - Saida: sempre saída.
-    - AcertoFuncionario sem acerto_diario (pagamento avulso): saída (compatível com telas existentes).
-    - Demais: entrada.
-    """
-    if mov.tipo == 'Saida':
-        return True
-    if mov.tipo == 'AcertoFuncionario' and not mov.acerto_diario_id:
-        return True
-    return False
+MOVIMENTOS_POR_PAGINA = 50
 
 
-def _marker_descarga_deposito(descarga_id: int) -> str:
-    """
-    Marcador único para identificar a baixa da "descarga (Depósito)".
-
-    Como CarregamentoCliente não tem campo de status/baixa,
-    a gente considera baixado quando existe um MovimentoCaixa de entrada
-    com categoria RecebimentoDescarga contendo esse marcador.
-    """
-    return f"[DESCARGA_DEPOSITO:{descarga_id}]"
+def _eh_saida_caixa_real(mov: MovimentoCaixa) -> bool:
+    """Regra para saldo do Caixa do Dia (dinheiro real); ver LivroCaixaService."""
+    return LivroCaixaService.eh_saida_caixa_real(mov.tipo, mov.acerto_diario_id)
 
 
 @login_required
@@ -75,35 +58,34 @@ def caixa_do_dia(request):
         messages.success(request, 'Caixa do dia iniciado com sucesso.')
         return redirect('financeiro:caixa_do_dia')
 
-    movimentos = MovimentoCaixa.objects.none()
+    page_obj = None
     saldo_inicial = Decimal('0.00')
     saldo_atual = Decimal('0.00')
     movimentos_com_saldo = []
 
     if periodo_ativo:
+        # Saldos vêm do livro caixa (acumulado gravado em cada movimento):
+        # cada página lê só os seus movimentos.
         saldo_inicial = periodo_ativo.valor_inicial_caixa or Decimal('0.00')
+        saldo_atual = saldo_inicial + periodo_ativo.acumulado_caixa
         movimentos = (
             MovimentoCaixa.objects.filter(periodo=periodo_ativo)
             .select_related('funcionario', 'cliente', 'acerto_diario', 'usuario_criacao')
-            .order_by('data', 'criado_em')
+            .order_by('data', 'criado_em', 'pk')
         )
-        saldo = saldo_inicial
-        for mov in movimentos:
-            if _eh_saida_caixa_real(mov):
-                saldo -= mov.valor
-                sinal = '-'
-            else:
-                saldo += mov.valor
-                sinal = '+'
+        paginator = Paginator(movimentos, MOVIMENTOS_POR_PAGINA)
+        # Sem página informada, abre na última (movimentos mais recentes)
+        page_obj = paginator.get_page(request.GET.get('page') or paginator.num_pages)
+        for mov in page_obj:
+            exibir_como_saida = _eh_saida_caixa_real(mov)
             movimentos_com_saldo.append(
                 {
                     'movimento': mov,
-                    'saldo': saldo,
-                    'sinal': sinal,
-                    'exibir_como_saida': _eh_saida_caixa_real(mov),
+                    'saldo': saldo_inicial + mov.acumulado_caixa,
+                    'sinal': '-' if exibir_como_saida else '+',
+                    'exibir_como_saida': exibir_como_saida,
                 }
             )
-        saldo_atual = saldo
 
     return render(
         request,
@@ -113,6 +95,7 @@ def caixa_do_dia(request):
             'saldo_inicial': saldo_inicial,
             'saldo_atual': saldo_atual,
             'movimentos_com_saldo': movimentos_com_saldo,
+            'page_obj': page_obj,
         },
     )
 
@@ -156,7 +139,16 @@ def a_receber(request):
     data_inicio = request.GET.get('data_inicio') or ''
     data_fim = request.GET.get('data_fim') or ''
 
-    qs = CobrancaCarregamento.objects.all().select_related('cliente').prefetch_related('romaneios')
+    qs = (
+        CobrancaCarregamento.objects.all()
+        .select_related('cliente')
+        .prefetch_related('romaneios')
+        .annotate(
+            origem_saida_caixa=Exists(
+                MovimentoCaixa.objects.filter(cobranca_recebivel_id=OuterRef('pk'))
+            )
+        )
+    )
     if status in ('Pendente', 'Baixado'):
         qs = qs.filter(status=status)
     if cliente_id:
@@ -175,7 +167,7 @@ def a_receber(request):
             pass
 
     qs = qs.order_by('-criado_em')
-    cobrancas_lista = list(qs)
+    cobrancas_lista = CobrancaCarregamento.resolver_observacoes_exibicao(qs)
     avulsas_qs = CobrancaCTEAvulsa.objects.all().order_by('-criado_em')
     if status in ('Pendente', 'Baixado'):
         avulsas_qs = avulsas_qs.filter(status=status)
@@ -212,13 +204,21 @@ def a_receber(request):
             pass
     descargas_deposito = descargas_deposito.order_by('-acerto_diario__data', '-id')
     descargas_lista = list(descargas_deposito)
+    # Descarga via depósito é "baixada" quando existe MovimentoCaixa
+    # (Entrada/RecebimentoDescarga) vinculado a ela.
+    descargas_baixadas = set(
+        MovimentoCaixa.objects.filter(
+            tipo='Entrada',
+            categoria='RecebimentoDescarga',
+            descarga_recebida_id__in=[d.id for d in descargas_lista],
+        ).values_list('descarga_recebida_id', flat=True)
+    )
 
     recebiveis = []
     for c in cobrancas_lista:
-        cob_obs = (c.observacoes or '').upper()
         origem_cob = (
             'Saída de caixa (cliente)'
-            if '[SAIDA_CAIXA_CLIENTE:' in cob_obs
+            if c.origem_saida_caixa
             else 'Cobrança de Carregamento'
         )
         recebiveis.append(
@@ -250,17 +250,8 @@ def a_receber(request):
             }
         )
 
-    # Descarga via depósito: considera "baixado" quando houver MovimentoCaixa
-    # (Entrada/RecebimentoDescarga) contendo o marcador.
     for d in descargas_lista:
-        marker = _marker_descarga_deposito(d.id)
-        ja_baixado = MovimentoCaixa.objects.filter(
-            tipo='Entrada',
-            categoria='RecebimentoDescarga',
-            descricao__icontains=marker,
-        ).exists()
-
-        item_status = 'Baixado' if ja_baixado else 'Pendente'
+        item_status = 'Baixado' if d.id in descargas_baixadas else 'Pendente'
         if status in ('Pendente', 'Baixado') and item_status != status:
             continue
 
@@ -348,7 +339,7 @@ def receber_descarga_deposito(request, carregamento_id: int):
     """
     Dá baixa na descarga registrada como Depósito (CarregamentoCliente):
     - cria um MovimentoCaixa (Entrada/RecebimentoDescarga)
-    - marca como baixado para a tela consultando o marcador no descricao
+    - vincula o movimento à descarga (MovimentoCaixa.descarga_recebida)
     """
     if request.method != 'POST':
         return redirect('financeiro:a_receber')
@@ -360,11 +351,10 @@ def receber_descarga_deposito(request, carregamento_id: int):
         tipo_pagamento='Deposito',
     )
 
-    marker = _marker_descarga_deposito(descarga.id)
     ja_baixado = MovimentoCaixa.objects.filter(
         tipo='Entrada',
         categoria='RecebimentoDescarga',
-        descricao__icontains=marker,
+        descarga_recebida=descarga,
     ).exists()
     if ja_baixado:
         messages.info(request, 'Descarga (Depósito) já está baixada.')
@@ -380,9 +370,7 @@ def receber_descarga_deposito(request, carregamento_id: int):
 
     valor = descarga.valor or Decimal('0.00')
     texto_descarga = (descarga.descricao or '').strip() or (descarga.nome_display or 'Descarga')
-    # Mantemos o marcador no descricao para identificar baixa,
-    # mas o texto exibido será limpo em MovimentoCaixa.descricao_exibicao.
-    descricao = f"Recebimento de Descarga: {texto_descarga} {marker}"
+    descricao = f"Recebimento de Descarga: {texto_descarga}"
     movimento, erro = MovimentoCaixaService.criar_movimento(
         data=timezone.now().date().isoformat(),
         tipo='Entrada',
@@ -393,6 +381,7 @@ def receber_descarga_deposito(request, carregamento_id: int):
         cliente_id=None,
         acerto_diario_id=descarga.acerto_diario_id,
         usuario=request.user,
+        descarga_recebida_id=descarga.id,
     )
     if erro:
         messages.error(request, erro)
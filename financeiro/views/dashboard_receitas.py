@@ -71,12 +71,12 @@ def dashboard_fluxo_caixa(request):
     receitas = ReceitaEmpresa.objects.filter(
         data__gte=semana_inicio_obj,
         data__lte=semana_fim_obj
-    ).order_by('-data')
+    ).select_related('cliente').order_by('-data')
 
     caixas_funcionarios = CaixaFuncionario.objects.filter(
         Q(
-            Q(periodo_tipo='Semanal', semana_inicio__lte=semana_fim_obj, semana_fim__gte=semana_inicio_obj) |
-            Q(periodo_tipo='Diario', data__gte=semana_inicio_obj, data__lte=semana_fim_obj)
+            Q(periodo_tipo__iexact='Semanal', semana_inicio__lte=semana_fim_obj, semana_fim__gte=semana_inicio_obj) |
+            Q(periodo_tipo__iexact='Diario', data__gte=semana_inicio_obj, data__lte=semana_fim_obj)
         ),
         status='Em_Aberto'
     ).select_related('funcionario').order_by('funcionario__nome', '-semana_inicio', '-data')
@@ -89,7 +89,7 @@ def dashboard_fluxo_caixa(request):
     pendentes_receber = CobrancaCarregamento.objects.filter(
         status='Pendente',
         data_vencimento__lte=semana_fim_obj
-    ).order_by('data_vencimento')
+    ).select_related('cliente').order_by('data_vencimento')
 
     receitas_por_tipo = receitas.values('tipo_receita').annotate(total=Sum('valor')).order_by('-total')
 
@@ -205,10 +205,10 @@ def pesquisar_periodo_movimento_caixa(request):
     for periodo in periodos:
         periodos_com_totais.append({
             'periodo': periodo,
-            'movimentos_count': periodo.movimentos.count(),
-            'total_entradas': getattr(periodo, 'total_entradas', Decimal('0')),
-            'total_saidas': getattr(periodo, 'total_saidas', Decimal('0')),
-            'saldo_atual': getattr(periodo, 'saldo_atual', Decimal('0')),
+            'movimentos_count': periodo.quantidade_movimentos,
+            'total_entradas': periodo.total_entradas,
+            'total_saidas': periodo.total_saidas,
+            'saldo_atual': periodo.saldo_atual,
         })
     return render(request, 'financeiro/fluxo_caixa/pesquisar_periodos.html', {
         'periodos': periodos_com_totais,
@@ -2,7 +2,8 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import Cliente, NotaFiscal, Motorista, Veiculo, RomaneioViagem, HistoricoConsulta, Usuario, TabelaSeguro, TipoVeiculo, PlacaVeiculo, AuditoriaLog, CobrancaCarregamento, FechamentoFrete, ItemFechamentoFrete, DetalheItemFechamento, OcorrenciaNotaFiscal, FotoOcorrencia
+from .models import Cliente, NotaFiscal, Motorista, Veiculo, RomaneioViagem, VinculoNotaRomaneio, HistoricoConsulta, Usuario, TabelaSeguro, TipoVeiculo, PlacaVeiculo, AuditoriaLog, CobrancaCarregamento, FechamentoFrete, ItemFechamentoFrete, DetalheItemFechamento, OcorrenciaNotaFiscal, FotoOcorrencia
+from .services.romaneio_service import RomaneioService
 
 @admin.register(Cliente)
 class ClienteAdmin(admin.ModelAdmin):
@@ -94,13 +95,22 @@ class VeiculoAdmin(admin.ModelAdmin):
         }),
     )
 
+class VinculoNotaRomaneioInline(admin.TabularInline):
+    model = VinculoNotaRomaneio
+    fields = ['nota_fiscal', 'status_romaneio']
+    readonly_fields = ['status_romaneio']
+    raw_id_fields = ['nota_fiscal']
+    extra = 0
+    verbose_name = 'Nota Fiscal'
+    verbose_name_plural = 'Notas Fiscais'
+
 @admin.register(RomaneioViagem)
 class RomaneioViagemAdmin(admin.ModelAdmin):
     list_display = ['codigo', 'cliente', 'motorista', 'get_composicao_veicular', 'data_emissao', 'status']
     list_filter = ['status', 'data_emissao', 'cliente', 'destino_estado']
     search_fields = ['codigo', 'cliente__razao_social', 'motorista__nome', 'origem_cidade', 'destino_cidade']
     date_hierarchy = 'data_emissao'
-    filter_horizontal = ['notas_fiscais']
+    inlines = [VinculoNotaRomaneioInline]
     readonly_fields = ['data_ultima_edicao', 'usuario_criacao', 'usuario_ultima_edicao']
     
     fieldsets = (
@@ -120,7 +130,7 @@ class RomaneioViagemAdmin(admin.ModelAdmin):
             'fields': ('data_saida', 'data_chegada_prevista', 'data_chegada_real')
         }),
         ('Carga', {
-            'fields': ('notas_fiscais', 'peso_total', 'valor_total', 'quantidade_total')
+            'fields': ('peso_total', 'valor_total', 'quantidade_total')
         }),
         ('Seguro', {
             'fields': ('seguro_obrigatorio', 'percentual_seguro', 'valor_seguro')
@@ -144,6 +154,17 @@ class RomaneioViagemAdmin(admin.ModelAdmin):
         obj.usuario_ultima_edicao = request.user
         super().save_model(request, obj, form, change)
 
+    def save_related(self, request, form, formsets, change):
+        # O inline grava os vínculos um a um (sem m2m_changed): acerta status
+        # replicado, totais do romaneio e status das notas ao final
+        romaneio = form.instance
+        notas_antes = set(romaneio.vinculos_notas.values_list('nota_fiscal_id', flat=True))
+        super().save_related(request, form, formsets, change)
+        notas_depois = set(romaneio.vinculos_notas.values_list('nota_fiscal_id', flat=True))
+        RomaneioService.sincronizar_status_vinculos([romaneio.pk])
+        romaneio.calcular_totais()
+        RomaneioService.recalcular_status_notas(notas_antes | notas_depois)
+
 @admin.register(HistoricoConsulta)
 class HistoricoConsultaAdmin(admin.ModelAdmin):
     list_display = ['motorista', 'numero_consulta', 'data_consulta', 'gerenciadora', 'status_consulta']
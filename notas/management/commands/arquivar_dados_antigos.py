@@ -1,13 +1,30 @@
+"""
+Arquiva dados antigos em arquivos NDJSON comprimidos em blocos, com índice
+por id, chave, cliente e data (ver notas/utils/arquivo_historico.py).
+
+Os registros são lidos do banco e gravados em lotes, e só são excluídos do
+banco depois que o arquivo foi gravado por completo; a memória usada não
+depende do volume arquivado.
+"""
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.utils import timezone
 from datetime import datetime, timedelta
-import json
-import gzip
-import os
 from pathlib import Path
 
-from notas.models import NotaFiscal, Cliente, Motorista, Veiculo, RomaneioViagem
+from notas.models import NotaFiscal, Cliente, Motorista, Veiculo, RomaneioViagem, VinculoNotaRomaneio
+from notas.utils.arquivo_historico import EXTENSAO, TAMANHO_BLOCO, EscritorArquivo, LeitorArquivo
+
+
+def _em_lotes(iteravel, tamanho):
+    lote = []
+    for item in iteravel:
+        lote.append(item)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
 
 
 class Command(BaseCommand):
@@ -85,38 +102,38 @@ class Command(BaseCommand):
         self.stdout.write(f'   - Veículos: {Veiculo.objects.count()}')
 
     def criar_backup_completo(self):
-        """Cria backup completo antes do arquivamento"""
+        """Cria backup completo antes do arquivamento (um arquivo indexado por modelo)"""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_file = f'dados_arquivados/backups/backup_completo_{timestamp}.json.gz'
-        
-        self.stdout.write(f'💾 Criando backup completo: {backup_file}')
-        
-        dados_backup = {
-            'notas_fiscais': list(NotaFiscal.objects.values()),
-            'romaneios': list(RomaneioViagem.objects.values()),
-            'clientes': list(Cliente.objects.values()),
-            'motoristas': list(Motorista.objects.values()),
-            'veiculos': list(Veiculo.objects.values()),
-            'metadata': {
-                'data_backup': timestamp,
-                'total_registros': {
-                    'notas_fiscais': NotaFiscal.objects.count(),
-                    'romaneios': RomaneioViagem.objects.count(),
-                    'clientes': Cliente.objects.count(),
-                    'motoristas': Motorista.objects.count(),
-                    'veiculos': Veiculo.objects.count(),
-                }
-            }
-        }
+        backup_dir = Path(f'dados_arquivados/backups/backup_completo_{timestamp}')
+        backup_dir.mkdir(parents=True, exist_ok=True)
         
-        # Comprimir e salvar backup
-        with gzip.open(backup_file, 'wt', encoding='utf-8') as f:
-            json.dump(dados_backup, f, indent=2, default=str)
+        self.stdout.write(f'💾 Criando backup completo: {backup_dir}')
+        
+        modelos = {
+            'notas_fiscais': NotaFiscal,
+            'romaneios': RomaneioViagem,
+            'clientes': Cliente,
+            'motoristas': Motorista,
+            'veiculos': Veiculo,
+        }
+        for nome, modelo in modelos.items():
+            metadados = {'data_backup': timestamp, 'modelo': modelo._meta.label}
+            with EscritorArquivo(backup_dir / f'{nome}{EXTENSAO}', metadados=metadados) as escritor:
+                for registro in modelo.objects.order_by('pk').values().iterator(chunk_size=TAMANHO_BLOCO):
+                    escritor.adicionar(registro)
+            self.stdout.write(f'   - {nome}: {escritor.total}')
         
         self.stdout.write(
-            self.style.SUCCESS(f'✅ Backup criado: {backup_file}')
+            self.style.SUCCESS(f'✅ Backup criado: {backup_dir}')
         )
 
+    def excluir_arquivados(self, modelo, arquivo):
+        """Exclui do banco, em lotes, os registros de um arquivo já gravado"""
+        with LeitorArquivo(arquivo) as leitor:
+            for ids in _em_lotes(leitor.ids(), TAMANHO_BLOCO):
+                with transaction.atomic():
+                    modelo.objects.filter(pk__in=ids).delete()
+
     def arquivar_dados(self, data_limite):
         """Executa o arquivamento real dos dados"""
         self.stdout.write('\n🗂️  INICIANDO ARQUIVAMENTO...')
@@ -161,38 +178,32 @@ class Command(BaseCommand):
     def arquivar_romaneios_por_ano(self, romaneios, ano):
         """Arquiva romaneios de um ano específico"""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        arquivo = f'dados_arquivados/romaneios/romaneios_{ano}_{timestamp}.json.gz'
-        
-        dados_romaneios = []
-        for romaneio in romaneios:
-            dados_romaneios.append({
-                'id': romaneio.id,
-                'codigo': romaneio.codigo,
-                'data_emissao': romaneio.data_emissao.isoformat(),
-                'status': romaneio.status,
-                'cliente_id': romaneio.cliente_id,
-                'motorista_id': romaneio.motorista_id,
-                'veiculo_principal_id': romaneio.veiculo_principal_id,
-                'reboque_1_id': romaneio.reboque_1_id,
-                'reboque_2_id': romaneio.reboque_2_id,
-                'observacoes': romaneio.observacoes,
-                'notas_fiscais_ids': list(romaneio.notas_fiscais.values_list('id', flat=True)),
-                'metadata': {
-                    'ano': ano,
-                    'data_arquivamento': timestamp,
-                    'total_notas': romaneio.notas_fiscais.count()
-                }
-            })
-        
-        # Comprimir e salvar
-        with gzip.open(arquivo, 'wt', encoding='utf-8') as f:
-            json.dump(dados_romaneios, f, indent=2, default=str)
-        
-        # Excluir do banco principal
-        with transaction.atomic():
-            romaneios.delete()
-        
-        self.stdout.write(f'      ✅ {len(dados_romaneios)} romaneios de {ano} arquivados em {arquivo}')
+        arquivo = f'dados_arquivados/romaneios/romaneios_{ano}_{timestamp}{EXTENSAO}'
+        
+        # Vínculos com notas buscados por lote de romaneios (uma consulta por lote)
+        metadados = {'tipo': 'romaneios', 'ano': ano, 'data_arquivamento': timestamp}
+        with EscritorArquivo(arquivo, metadados=metadados) as escritor:
+            registros = romaneios.order_by('pk').values().iterator(chunk_size=TAMANHO_BLOCO)
+            for lote in _em_lotes(registros, TAMANHO_BLOCO):
+                notas_por_romaneio = {}
+                for romaneio_id, nota_id in VinculoNotaRomaneio.objects.filter(
+                    romaneio_id__in=[r['id'] for r in lote]
+                ).values_list('romaneio_id', 'nota_fiscal_id'):
+                    notas_por_romaneio.setdefault(romaneio_id, []).append(nota_id)
+                for romaneio in lote:
+                    romaneio['notas_fiscais_ids'] = notas_por_romaneio.get(romaneio['id'], [])
+                    romaneio['total_notas'] = len(romaneio['notas_fiscais_ids'])
+                    escritor.adicionar(
+                        romaneio,
+                        chave=romaneio['codigo'],
+                        cliente_id=romaneio['cliente_id'],
+                        data=romaneio['data_emissao'],
+                    )
+        
+        # Excluir do banco principal (só depois do arquivo completo)
+        self.excluir_arquivados(RomaneioViagem, arquivo)
+        
+        self.stdout.write(f'      ✅ {escritor.total} romaneios de {ano} arquivados em {arquivo}')
 
     def arquivar_notas_fiscais(self, data_limite):
         """Arquiva notas fiscais antigas"""
@@ -214,35 +225,17 @@ class Command(BaseCommand):
     def arquivar_notas_por_ano(self, notas, ano):
         """Arquiva notas fiscais de um ano específico"""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        arquivo = f'dados_arquivados/notas_fiscais/notas_{ano}_{timestamp}.json.gz'
-        
-        dados_notas = []
-        for nota in notas:
-            dados_notas.append({
-                'id': nota.id,
-                'nota': nota.nota,
-                'data': nota.data.isoformat(),
-                'fornecedor': nota.fornecedor,
-                'mercadoria': nota.mercadoria,
-                'quantidade': str(nota.quantidade),
-                'peso': str(nota.peso),
-                'valor': str(nota.valor),
-                'cliente_id': nota.cliente_id,
-                'metadata': {
-                    'ano': ano,
-                    'data_arquivamento': timestamp
-                }
-            })
-        
-        # Comprimir e salvar
-        with gzip.open(arquivo, 'wt', encoding='utf-8') as f:
-            json.dump(dados_notas, f, indent=2, default=str)
+        arquivo = f'dados_arquivados/notas_fiscais/notas_{ano}_{timestamp}{EXTENSAO}'
         
-        # Excluir do banco principal
-        with transaction.atomic():
-            notas.delete()
+        metadados = {'tipo': 'notas_fiscais', 'ano': ano, 'data_arquivamento': timestamp}
+        with EscritorArquivo(arquivo, metadados=metadados) as escritor:
+            for nota in notas.order_by('pk').values().iterator(chunk_size=TAMANHO_BLOCO):
+                escritor.adicionar(nota, chave=nota['nota'], cliente_id=nota['cliente_id'], data=nota['data'])
         
-        self.stdout.write(f'      ✅ {len(dados_notas)} notas de {ano} arquivadas em {arquivo}')
+        # Excluir do banco principal (só depois do arquivo completo)
+        self.excluir_arquivados(NotaFiscal, arquivo)
+        
+        self.stdout.write(f'      ✅ {escritor.total} notas de {ano} arquivadas em {arquivo}')
 
     def arquivar_dados_relacionados(self):
         """Arquiva dados relacionados que não são mais referenciados"""
@@ -250,7 +243,7 @@ class Command(BaseCommand):
         
         # Verificar clientes sem romaneios recentes
         clientes_sem_romaneios = Cliente.objects.filter(
-            romaneioviagem__isnull=True
+            romaneios_cliente__isnull=True, notas_fiscais__isnull=True
         ).distinct()
         
         if clientes_sem_romaneios.exists():
@@ -258,7 +251,7 @@ class Command(BaseCommand):
         
         # Verificar motoristas sem romaneios recentes
         motoristas_sem_romaneios = Motorista.objects.filter(
-            romaneioviagem__isnull=True
+            romaneios_motorista__isnull=True
         ).distinct()
         
         if motoristas_sem_romaneios.exists():
@@ -267,61 +260,32 @@ class Command(BaseCommand):
     def arquivar_clientes_isolados(self, clientes):
         """Arquiva clientes que não têm romaneios"""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        arquivo = f'dados_arquivados/clientes/clientes_isolados_{timestamp}.json.gz'
-        
-        dados_clientes = []
-        for cliente in clientes:
-            dados_clientes.append({
-                'id': cliente.id,
-                'razao_social': cliente.razao_social,
-                'cnpj': cliente.cnpj,
-                'endereco': cliente.endereco,
-                'cidade': cliente.cidade,
-                'estado': cliente.estado,
-                'status': cliente.status,
-                'metadata': {
-                    'data_arquivamento': timestamp,
-                    'motivo': 'Cliente sem romaneios'
-                }
-            })
-        
-        # Comprimir e salvar
-        with gzip.open(arquivo, 'wt', encoding='utf-8') as f:
-            json.dump(dados_clientes, f, indent=2, default=str)
+        arquivo = f'dados_arquivados/clientes/clientes_isolados_{timestamp}{EXTENSAO}'
+        
+        metadados = {'tipo': 'clientes', 'data_arquivamento': timestamp, 'motivo': 'Cliente sem romaneios'}
+        with EscritorArquivo(arquivo, metadados=metadados) as escritor:
+            for cliente in clientes.order_by('pk').values().iterator(chunk_size=TAMANHO_BLOCO):
+                escritor.adicionar(cliente, chave=cliente['razao_social'], cliente_id=cliente['id'])
         
         # Excluir do banco principal
-        with transaction.atomic():
-            clientes.delete()
+        self.excluir_arquivados(Cliente, arquivo)
         
-        self.stdout.write(f'      ✅ {len(dados_clientes)} clientes isolados arquivados')
+        self.stdout.write(f'      ✅ {escritor.total} clientes isolados arquivados')
 
     def arquivar_motoristas_isolados(self, motoristas):
         """Arquiva motoristas que não têm romaneios"""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        arquivo = f'dados_arquivados/motoristas/motoristas_isolados_{timestamp}.json.gz'
-        
-        dados_motoristas = []
-        for motorista in motoristas:
-            dados_motoristas.append({
-                'id': motorista.id,
-                'nome': motorista.nome,
-                'cpf': motorista.cpf,
-                'cnh': motorista.cnh,
-                'metadata': {
-                    'data_arquivamento': timestamp,
-                    'motivo': 'Motorista sem romaneios'
-                }
-            })
-        
-        # Comprimir e salvar
-        with gzip.open(arquivo, 'wt', encoding='utf-8') as f:
-            json.dump(dados_motoristas, f, indent=2, default=str)
+        arquivo = f'dados_arquivados/motoristas/motoristas_isolados_{timestamp}{EXTENSAO}'
+        
+        metadados = {'tipo': 'motoristas', 'data_arquivamento': timestamp, 'motivo': 'Motorista sem romaneios'}
+        with EscritorArquivo(arquivo, metadados=metadados) as escritor:
+            for motorista in motoristas.order_by('pk').values().iterator(chunk_size=TAMANHO_BLOCO):
+                escritor.adicionar(motorista, chave=motorista['nome'])
         
         # Excluir do banco principal
-        with transaction.atomic():
-            motoristas.delete()
+        self.excluir_arquivados(Motorista, arquivo)
         
-        self.stdout.write(f'      ✅ {len(dados_motoristas)} motoristas isolados arquivados')
+        self.stdout.write(f'      ✅ {escritor.total} motoristas isolados arquivados')
 
     def mostrar_estatisticas_depois(self):
         """Mostra estatísticas após o arquivamento"""
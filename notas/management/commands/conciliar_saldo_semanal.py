@@ -0,0 +1,31 @@
+"""
+Comando de fechamento: recalcula os controles de saldo semanal de um ano
+inteiro a partir de uma única consulta às tabelas de origem.
+
+Controles já validados não são alterados.
+Exemplo (fechamento do mês):
+    python manage.py conciliar_saldo_semanal --ano 2025
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from financeiro.services import ConciliacaoSemanalService
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os totais de todos os controles de saldo semanal de um ano'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ano',
+            type=int,
+            help='Ano a recalcular (padrão: ano atual)',
+        )
+
+    def handle(self, *args, **options):
+        ano = options['ano'] or timezone.localdate().year
+        self.stdout.write(f'Recalculando controles de saldo semanal de {ano}...')
+
+        atualizados = ConciliacaoSemanalService.recalcular_ano(ano)
+
+        self.stdout.write(self.style.SUCCESS(f'{atualizados} controle(s) semanal(is) recalculado(s).'))
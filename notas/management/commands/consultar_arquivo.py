@@ -1,11 +1,31 @@
+"""
+Consulta e restaura dados arquivados por arquivar_dados_antigos.
+
+Arquivos no formato indexado (.ndjson.gz + .idx) são consultados pelo
+índice, lendo só os blocos que contêm os registros procurados; arquivos
+antigos (.json.gz) ainda são aceitos, mas são lidos por inteiro.
+"""
 from django.core.management.base import BaseCommand
-from django.utils import timezone
+from django.db import transaction
 from datetime import datetime
 import json
 import gzip
 import os
 from pathlib import Path
-import glob
+
+from notas.models import Cliente, Motorista, NotaFiscal, RomaneioViagem
+from notas.utils.arquivo_historico import EXTENSAO, LeitorArquivo, eh_arquivo_indexado
+
+MODELOS_POR_PASTA = {
+    'romaneios': RomaneioViagem,
+    'notas_fiscais': NotaFiscal,
+    'clientes': Cliente,
+    'motoristas': Motorista,
+}
+# Totais do romaneio são recalculados pelos sinais ao religar as notas
+CAMPOS_RECALCULADOS = {
+    RomaneioViagem: {'peso_total', 'valor_total', 'quantidade_total', 'percentual_seguro', 'valor_seguro'},
+}
 
 
 class Command(BaseCommand):
@@ -28,6 +48,26 @@ class Command(BaseCommand):
             type=str,
             help='Termo de busca (código, nome, etc.)',
         )
+        parser.add_argument(
+            '--id',
+            type=int,
+            help='ID do registro (consulta ou restauração de um único registro)',
+        )
+        parser.add_argument(
+            '--cliente',
+            type=int,
+            help='ID do cliente',
+        )
+        parser.add_argument(
+            '--data-inicio',
+            type=str,
+            help='Data inicial (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--data-fim',
+            type=str,
+            help='Data final (YYYY-MM-DD)',
+        )
         parser.add_argument(
             '--listar',
             action='store_true',
@@ -36,7 +76,7 @@ class Command(BaseCommand):
         parser.add_argument(
             '--restaurar',
             type=str,
-            help='Restaura dados de um arquivo específico',
+            help='Restaura dados de um arquivo específico (todos ou só --id)',
         )
 
     def handle(self, *args, **options):
@@ -45,6 +85,10 @@ class Command(BaseCommand):
         self.buscar = options['buscar']
         self.listar = options['listar']
         self.restaurar = options['restaurar']
+        self.id = options['id']
+        self.cliente_id = options['cliente']
+        self.data_inicio = options['data_inicio']
+        self.data_fim = options['data_fim']
         
         if self.listar:
             self.listar_arquivos_disponiveis()
@@ -65,7 +109,7 @@ class Command(BaseCommand):
         for subdir in ['romaneios', 'notas_fiscais', 'clientes', 'motoristas', 'veiculos']:
             dir_path = base_dir / subdir
             if dir_path.exists():
-                arquivos = list(dir_path.glob('*.json.gz'))
+                arquivos = list(dir_path.glob('*.json.gz')) + list(dir_path.glob(f'*{EXTENSAO}'))
                 if arquivos:
                     self.stdout.write(f'\n📦 {subdir.upper()}:')
                     for arquivo in sorted(arquivos):
@@ -100,17 +144,12 @@ class Command(BaseCommand):
                 continue
             
             try:
-                with gzip.open(arquivo, 'rt', encoding='utf-8') as f:
-                    dados = json.load(f)
-                
-                for romaneio in dados:
-                    if self.buscar and self.buscar.lower() not in romaneio['codigo'].lower():
-                        continue
+                for romaneio in self.iterar_registros(arquivo, 'codigo'):
                     
                     total_encontrados += 1
                     self.stdout.write(f'   📦 {romaneio["codigo"]} - {romaneio["data_emissao"][:10]} - Status: {romaneio["status"]}')
                     
-                    if self.buscar:
+                    if self.buscar or self.id:
                         self.mostrar_detalhes_romaneio(romaneio)
                 
             except Exception as e:
@@ -130,17 +169,12 @@ class Command(BaseCommand):
                 continue
             
             try:
-                with gzip.open(arquivo, 'rt', encoding='utf-8') as f:
-                    dados = json.load(f)
-                
-                for nota in dados:
-                    if self.buscar and self.buscar.lower() not in nota['nota'].lower():
-                        continue
+                for nota in self.iterar_registros(arquivo, 'nota'):
                     
                     total_encontradas += 1
                     self.stdout.write(f'   📄 NF {nota["nota"]} - {nota["data"][:10]} - {nota["fornecedor"]}')
                     
-                    if self.buscar:
+                    if self.buscar or self.id:
                         self.mostrar_detalhes_nota(nota)
                 
             except Exception as e:
@@ -157,17 +191,12 @@ class Command(BaseCommand):
         
         for arquivo in arquivos:
             try:
-                with gzip.open(arquivo, 'rt', encoding='utf-8') as f:
-                    dados = json.load(f)
-                
-                for cliente in dados:
-                    if self.buscar and self.buscar.lower() not in cliente['razao_social'].lower():
-                        continue
+                for cliente in self.iterar_registros(arquivo, 'razao_social'):
                     
                     total_encontrados += 1
                     self.stdout.write(f'   🏢 {cliente["razao_social"]} - {cliente["cidade"]}/{cliente["estado"]}')
                     
-                    if self.buscar:
+                    if self.buscar or self.id:
                         self.mostrar_detalhes_cliente(cliente)
                 
             except Exception as e:
@@ -184,17 +213,12 @@ class Command(BaseCommand):
         
         for arquivo in arquivos:
             try:
-                with gzip.open(arquivo, 'rt', encoding='utf-8') as f:
-                    dados = json.load(f)
-                
-                for motorista in dados:
-                    if self.buscar and self.buscar.lower() not in motorista['nome'].lower():
-                        continue
+                for motorista in self.iterar_registros(arquivo, 'nome'):
                     
                     total_encontrados += 1
                     self.stdout.write(f'   👤 {motorista["nome"]} - CNH: {motorista["cnh"]}')
                     
-                    if self.buscar:
+                    if self.buscar or self.id:
                         self.mostrar_detalhes_motorista(motorista)
                 
             except Exception as e:
@@ -203,12 +227,40 @@ class Command(BaseCommand):
         self.stdout.write(f'   📊 Total encontrado: {total_encontrados} motoristas')
 
     def get_arquivos_por_tipo(self, tipo):
-        """Retorna lista de arquivos por tipo"""
+        """Retorna lista de arquivos por tipo (indexados e legados)"""
         base_dir = Path('dados_arquivados') / tipo
         if not base_dir.exists():
             return []
         
-        return sorted(base_dir.glob('*.json.gz'))
+        return sorted(list(base_dir.glob('*.json.gz')) + list(base_dir.glob(f'*{EXTENSAO}')))
+
+    def iterar_registros(self, arquivo, campo_chave):
+        """Registros do arquivo que atendem aos filtros da linha de comando"""
+        if eh_arquivo_indexado(arquivo):
+            with LeitorArquivo(arquivo) as leitor:
+                yield from leitor.buscar(
+                    id=self.id,
+                    chave=self.buscar,
+                    cliente_id=self.cliente_id,
+                    data_inicio=self.data_inicio,
+                    data_fim=self.data_fim,
+                )
+            return
+        
+        # Formato antigo: lista JSON única, lida por inteiro
+        with gzip.open(arquivo, 'rt', encoding='utf-8') as f:
+            dados = json.load(f)
+        for registro in dados:
+            if self.buscar and self.buscar.lower() not in str(registro.get(campo_chave, '')).lower():
+                continue
+            if self.id is not None and registro.get('id') != self.id:
+                continue
+            if self.cliente_id is not None and registro.get('cliente_id', registro.get('id')) != self.cliente_id:
+                continue
+            data = str(registro.get('data_emissao') or registro.get('data') or '')[:10]
+            if (self.data_inicio and data < self.data_inicio) or (self.data_fim and data > self.data_fim):
+                continue
+            yield registro
 
     def mostrar_detalhes_romaneio(self, romaneio):
         """Mostra detalhes de um romaneio"""
@@ -238,28 +290,59 @@ class Command(BaseCommand):
         self.stdout.write(f'      🚗 CNH: {motorista["cnh"]}')
 
     def restaurar_dados(self, arquivo_path):
-        """Restaura dados de um arquivo específico"""
+        """Restaura dados de um arquivo específico (todos ou só o registro --id)"""
         self.stdout.write(f'🔄 RESTAURANDO DADOS DE: {arquivo_path}')
         
         if not os.path.exists(arquivo_path):
             self.stdout.write(self.style.ERROR(f'❌ Arquivo não encontrado: {arquivo_path}'))
             return
         
+        if not eh_arquivo_indexado(arquivo_path):
+            self.stdout.write(self.style.ERROR('❌ Restauração disponível apenas para arquivos indexados (.ndjson.gz)'))
+            return
+        
+        modelo = MODELOS_POR_PASTA.get(Path(arquivo_path).parent.name)
+        if modelo is None:
+            self.stdout.write(self.style.ERROR('❌ Tipo de arquivo não reconhecido pela pasta'))
+            return
+        
+        restaurados = ignorados = 0
         try:
-            with gzip.open(arquivo_path, 'rt', encoding='utf-8') as f:
-                dados = json.load(f)
-            
-            self.stdout.write(f'📊 Dados encontrados: {len(dados)} registros')
-            
-            # Aqui você pode implementar a lógica de restauração
-            # Por enquanto, apenas mostra os dados
-            for i, registro in enumerate(dados[:5]):  # Mostra apenas os primeiros 5
-                self.stdout.write(f'   {i+1}. {registro}')
-            
-            if len(dados) > 5:
-                self.stdout.write(f'   ... e mais {len(dados) - 5} registros')
-            
-            self.stdout.write(self.style.WARNING('⚠️  Funcionalidade de restauração em desenvolvimento'))
-            
+            with LeitorArquivo(arquivo_path) as leitor:
+                registros = leitor.buscar(id=self.id) if self.id is not None else leitor.registros()
+                for registro in registros:
+                    if self.restaurar_registro(modelo, registro):
+                        restaurados += 1
+                    else:
+                        ignorados += 1
+                blocos_lidos = leitor.blocos_lidos
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f'❌ Erro ao restaurar dados: {e}')) 
\ No newline at end of file
+            self.stdout.write(self.style.ERROR(f'❌ Erro ao restaurar dados: {e}'))
+            return
+        
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ {restaurados} registro(s) restaurado(s), {ignorados} já existente(s) '
+                f'({blocos_lidos} bloco(s) lido(s))'
+            )
+        )
+
+    def restaurar_registro(self, modelo, registro):
+        """Recria um registro arquivado; retorna False se ele já existe no banco"""
+        if modelo.objects.filter(pk=registro['id']).exists():
+            return False
+        
+        ignorar = CAMPOS_RECALCULADOS.get(modelo, set())
+        valores = {
+            campo.attname: campo.to_python(registro[campo.attname])
+            for campo in modelo._meta.concrete_fields
+            if campo.attname in registro and campo.name not in ignorar
+        }
+        with transaction.atomic():
+            instancia = modelo(**valores)
+            instancia.save(force_insert=True)
+            if modelo is RomaneioViagem and registro.get('notas_fiscais_ids'):
+                instancia.notas_fiscais.set(
+                    NotaFiscal.objects.filter(pk__in=registro['notas_fiscais_ids'])
+                )
+        return True
@@ -0,0 +1,83 @@
+"""
+Benchmarks dos fluxos principais (romaneio, dashboard, totalizadores,
+depósito, auditoria e caixa) sobre uma massa sintética.
+
+A massa é gerada e os cenários rodam dentro de uma transação desfeita no
+fim: o banco não é alterado. Cada cenário informa tempo (mediana), consultas
+SQL e pico de memória, comparados com a linha de base; havendo regressão o
+comando termina com erro, para uso antes do deploy.
+
+Exemplos:
+    python manage.py executar_benchmarks
+    python manage.py executar_benchmarks --cenario dashboard --cenario caixa
+    python manage.py executar_benchmarks --salvar-linha-base
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from notas.management.commands.gerar_dados_sinteticos import adicionar_argumentos_massa, parametros_massa
+from notas.models import Usuario
+from notas.services import DadosSinteticosService, TotalizadorService
+from notas.utils import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Executa os benchmarks dos fluxos principais e compara com a linha de base'
+
+    def add_arguments(self, parser):
+        adicionar_argumentos_massa(parser)
+        parser.add_argument('--repeticoes', type=int, default=5, help='Execuções medidas por cenário (padrão: 5)')
+        parser.add_argument(
+            '--cenario',
+            action='append',
+            dest='cenarios',
+            choices=sorted(benchmark.CENARIOS),
+            help='Cenário a executar (pode repetir; padrão: todos)',
+        )
+        parser.add_argument('--linha-base', help='Arquivo JSON da linha de base (padrão: BENCHMARK_LINHA_BASE)')
+        parser.add_argument(
+            '--salvar-linha-base',
+            action='store_true',
+            help='Grava os resultados como nova linha de base em vez de comparar',
+        )
+        parser.add_argument('--tolerancia-tempo', type=float, help='Tolerância relativa de tempo (padrão: BENCHMARK_TOLERANCIA_TEMPO ou 1.0 = +100%%)')
+
+    def handle(self, *args, **options):
+        parametros = parametros_massa(options)
+        with transaction.atomic():
+            massa = DadosSinteticosService.gerar(prefixo='BENCH', **parametros)
+            contexto = benchmark.criar_contexto(massa, Usuario.objects.get(pk=massa['usuario_id']))
+            try:
+                resultados = benchmark.executar(contexto, options['repeticoes'], options['cenarios'])
+            finally:
+                transaction.set_rollback(True)
+        # O cache não participa da transação desfeita
+        TotalizadorService.invalidar_cache()
+
+        self.stdout.write(f"{'Cenário':<26}{'Tempo (ms)':>12}{'Consultas':>11}{'Memória (KB)':>14}")
+        for nome, medido in resultados.items():
+            self.stdout.write(
+                f"{nome:<26}{medido['tempo_ms']:>12.2f}{medido['consultas']:>11}{medido['memoria_kb']:>14.1f}"
+            )
+
+        if options['salvar_linha_base']:
+            linha_base = benchmark.carregar_linha_base(options['linha_base'])
+            cenarios = linha_base.get('cenarios', {}) if linha_base.get('parametros') == parametros else {}
+            caminho = benchmark.salvar_linha_base({**cenarios, **resultados}, parametros, options['linha_base'])
+            self.stdout.write(self.style.SUCCESS(f'Linha de base gravada em {caminho}.'))
+            return
+
+        linha_base = benchmark.carregar_linha_base(options['linha_base'])
+        if not linha_base:
+            self.stdout.write(self.style.WARNING('Sem linha de base: use --salvar-linha-base para criar uma.'))
+            return
+        if linha_base.get('parametros') != parametros:
+            self.stdout.write(self.style.WARNING(
+                f"Linha de base gerada com outra massa ({linha_base.get('parametros')}); comparação ignorada."
+            ))
+            return
+
+        regressoes = benchmark.comparar(resultados, linha_base['cenarios'], options['tolerancia_tempo'])
+        if regressoes:
+            raise CommandError('Regressão em relação à linha de base:\n  ' + '\n  '.join(regressoes))
+        self.stdout.write(self.style.SUCCESS('Sem regressões em relação à linha de base.'))
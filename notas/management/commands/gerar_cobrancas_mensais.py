@@ -0,0 +1,68 @@
+"""
+Comando de fechamento mensal: gera as cobranças dos clientes Mensalistas com
+os romaneios emitidos no mês que ainda não foram cobrados.
+
+Exemplos:
+    python manage.py gerar_cobrancas_mensais --competencia 2025-09 --dry-run
+    python manage.py gerar_cobrancas_mensais --competencia 2025-09
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from notas.services import CobrancaMensalService
+
+
+class Command(BaseCommand):
+    help = 'Gera as cobranças mensais dos clientes Mensalistas de uma competência'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--competencia',
+            help='Competência no formato AAAA-MM (padrão: mês anterior)',
+        )
+        parser.add_argument(
+            '--cliente',
+            type=int,
+            action='append',
+            dest='clientes',
+            help='ID do cliente (pode repetir; padrão: todos)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas mostra a prévia, sem criar cobranças',
+        )
+
+    def _competencia(self, valor):
+        if not valor:
+            hoje = timezone.localdate()
+            return (hoje.year - 1, 12) if hoje.month == 1 else (hoje.year, hoje.month - 1)
+        try:
+            ano, mes = (int(parte) for parte in valor.split('-'))
+        except ValueError:
+            raise CommandError(f'Competência inválida: {valor} (use AAAA-MM)')
+        if not 1 <= mes <= 12:
+            raise CommandError(f'Competência inválida: {valor} (use AAAA-MM)')
+        return ano, mes
+
+    def handle(self, *args, **options):
+        ano, mes = self._competencia(options['competencia'])
+        clientes = options['clientes']
+
+        previa = CobrancaMensalService.previa(ano, mes, clientes)
+        for linha in previa:
+            self.stdout.write(
+                f"  {linha['razao_social']}: {linha['quantidade_romaneios']} romaneio(s), "
+                f"R$ {linha['valor_carregamento']}"
+            )
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                f'[DRY-RUN] {len(previa)} cobrança(s) seriam geradas para {mes:02d}/{ano}.'
+            ))
+            return
+
+        cobrancas = CobrancaMensalService.gerar(ano, mes, clientes)
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(cobrancas)} cobrança(s) mensal(is) gerada(s) para {mes:02d}/{ano}.'
+        ))
@@ -0,0 +1,50 @@
+"""
+Gera uma massa de dados sintética (clientes, notas, romaneios, auditoria e
+caixa) com inserções em lote, para testes de carga no ambiente local.
+
+Exemplos:
+    python manage.py gerar_dados_sinteticos
+    python manage.py gerar_dados_sinteticos --clientes 200 --notas 100000 --romaneios 10000
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from notas.services import DadosSinteticosService
+
+
+def adicionar_argumentos_massa(parser, clientes=50, notas=5000, romaneios=500, movimentos=1000, logs_auditoria=1000):
+    """Parâmetros da massa, compartilhados com executar_benchmarks."""
+    parser.add_argument('--clientes', type=int, default=clientes, help=f'Clientes (padrão: {clientes})')
+    parser.add_argument('--notas', type=int, default=notas, help=f'Notas fiscais (padrão: {notas})')
+    parser.add_argument('--romaneios', type=int, default=romaneios, help=f'Romaneios (padrão: {romaneios})')
+    parser.add_argument('--movimentos', type=int, default=movimentos, help=f'Movimentos de caixa (padrão: {movimentos})')
+    parser.add_argument(
+        '--logs-auditoria', type=int, default=logs_auditoria, help=f'Logs de auditoria (padrão: {logs_auditoria})'
+    )
+    parser.add_argument('--dias', type=int, default=180, help='Período coberto, em dias até hoje (padrão: 180)')
+    parser.add_argument('--semente', type=int, default=42, help='Semente do gerador aleatório (padrão: 42)')
+
+
+def parametros_massa(options):
+    return {
+        campo: options[campo]
+        for campo in ('clientes', 'notas', 'romaneios', 'movimentos', 'logs_auditoria', 'dias', 'semente')
+    }
+
+
+class Command(BaseCommand):
+    help = 'Gera massa de dados sintética com inserções em lote'
+
+    def add_arguments(self, parser):
+        adicionar_argumentos_massa(parser)
+        parser.add_argument('--prefixo', default='SINT', help='Prefixo dos nomes e códigos gerados (padrão: SINT)')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        massa = DadosSinteticosService.gerar(prefixo=options['prefixo'], **parametros_massa(options))
+        self.stdout.write(self.style.SUCCESS(
+            f"Rodada {massa['rodada']}: {massa['clientes']} cliente(s), {massa['notas']} nota(s), "
+            f"{massa['romaneios']} romaneio(s), {massa['movimentos']} movimento(s), "
+            f"{massa['logs_auditoria']} log(s) de auditoria em {time.perf_counter() - inicio:.1f}s."
+        ))
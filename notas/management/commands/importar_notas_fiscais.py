@@ -0,0 +1,106 @@
+"""
+Importa notas fiscais em lote de planilhas (CSV/XLSX) e XML de NF-e.
+
+Aceita arquivos e diretórios (todos os .csv, .xlsx e .xml dentro deles).
+Os erros saem por linha; com --relatorio-erros também são gravados em CSV.
+
+Exemplos:
+    python manage.py importar_notas_fiscais fornecedor.xlsx --cliente 12
+    python manage.py importar_notas_fiscais lote_nfe/ --dry-run
+    python manage.py importar_notas_fiscais notas.csv --relatorio-erros erros.csv
+"""
+import csv
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from notas.models import Cliente
+from notas.services import ImportacaoNotasService
+from notas.services.importacao_notas_service import FORMATOS, ErroImportacao
+
+
+class Command(BaseCommand):
+    help = 'Importa notas fiscais em lote (CSV, XLSX ou XML de NF-e)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('caminhos', nargs='+', help='Arquivos ou diretórios a importar')
+        parser.add_argument(
+            '--cliente',
+            type=int,
+            help='ID do cliente para registros sem cliente (planilhas do fornecedor)',
+        )
+        parser.add_argument(
+            '--encoding',
+            default='utf-8-sig',
+            help='Codificação dos arquivos CSV (padrão: utf-8-sig; ex.: latin-1)',
+        )
+        parser.add_argument(
+            '--tamanho-lote',
+            type=int,
+            help='Notas por bulk_create (padrão: IMPORTACAO_NOTAS_TAMANHO_LOTE ou 1000)',
+        )
+        parser.add_argument(
+            '--relatorio-erros',
+            help='Grava os erros (arquivo, linha, mensagem) neste CSV',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas valida, sem gravar notas',
+        )
+
+    def _arquivos(self, caminhos):
+        for caminho in map(Path, caminhos):
+            if caminho.is_dir():
+                yield from sorted(
+                    arquivo for arquivo in caminho.rglob('*')
+                    if arquivo.suffix.lower().lstrip('.') in FORMATOS
+                )
+            elif caminho.is_file():
+                yield caminho
+            else:
+                raise CommandError(f'Caminho não encontrado: {caminho}')
+
+    def handle(self, *args, **options):
+        cliente = None
+        if options['cliente']:
+            cliente = Cliente.objects.filter(pk=options['cliente']).first()
+            if cliente is None:
+                raise CommandError(f'Cliente {options["cliente"]} não encontrado')
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Modo dry-run: nenhuma nota será gravada.'))
+
+        total_lidas = total_importadas = 0
+        todos_erros = []
+        for arquivo in self._arquivos(options['caminhos']):
+            try:
+                formato = ImportacaoNotasService.formato_do_arquivo(arquivo.name)
+            except ErroImportacao as e:
+                raise CommandError(str(e))
+            with arquivo.open('rb') as conteudo:
+                resultado = ImportacaoNotasService.importar(
+                    ImportacaoNotasService.ler(conteudo, formato, encoding=options['encoding']),
+                    cliente=cliente,
+                    dry_run=options['dry_run'],
+                    tamanho_lote=options['tamanho_lote'],
+                )
+            total_lidas += resultado['lidas']
+            total_importadas += resultado['importadas']
+            todos_erros.extend((arquivo.name, linha, mensagem) for linha, mensagem in resultado['erros'])
+            self.stdout.write(
+                f'{arquivo.name}: {resultado["lidas"]} lida(s), {resultado["importadas"]} '
+                f'{"válida(s)" if options["dry_run"] else "importada(s)"}, {len(resultado["erros"])} erro(s)'
+            )
+            for linha, mensagem in resultado['erros']:
+                self.stdout.write(self.style.ERROR(f'  linha {linha}: {mensagem}'))
+
+        if options['relatorio_erros']:
+            with open(options['relatorio_erros'], 'w', newline='', encoding='utf-8') as saida:
+                escritor = csv.writer(saida, delimiter=';')
+                escritor.writerow(['arquivo', 'linha', 'erro'])
+                escritor.writerows(todos_erros)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Total: {total_lidas} lida(s), {total_importadas} '
+            f'{"válida(s)" if options["dry_run"] else "importada(s)"}, {len(todos_erros)} erro(s).'
+        ))
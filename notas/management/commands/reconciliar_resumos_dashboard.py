@@ -0,0 +1,69 @@
+"""
+Comando para reconstruir os resumos diários do dashboard a partir das
+tabelas de notas fiscais e romaneios.
+
+Os sinais mantêm os resumos atualizados; este comando corrige qualquer
+divergência (cargas feitas com QuerySet.update, restaurações, etc.).
+Exemplo de agendamento (cron, madrugada):
+    python manage.py reconciliar_resumos_dashboard --dias 7
+"""
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from notas.services import ResumoDashboardService
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os resumos diários (rollup) usados pelo dashboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data-inicio',
+            type=str,
+            help='Data inicial (YYYY-MM-DD). Sem datas, reconstrói tudo.',
+        )
+        parser.add_argument(
+            '--data-fim',
+            type=str,
+            help='Data final (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--dias',
+            type=int,
+            help='Reconstrói apenas os últimos N dias (ignora --data-inicio/--data-fim)',
+        )
+
+    def _parse_data(self, valor, nome):
+        if not valor:
+            return None
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'{nome} inválida: {valor}. Use o formato YYYY-MM-DD.')
+
+    def handle(self, *args, **options):
+        if options['dias']:
+            data_fim = timezone.localdate()
+            data_inicio = data_fim - timedelta(days=options['dias'])
+        else:
+            data_inicio = self._parse_data(options['data_inicio'], '--data-inicio')
+            data_fim = self._parse_data(options['data_fim'], '--data-fim')
+
+        if data_inicio and data_fim and data_inicio > data_fim:
+            raise CommandError('--data-inicio não pode ser posterior a --data-fim.')
+
+        intervalo = 'todo o histórico'
+        if data_inicio or data_fim:
+            intervalo = f'{data_inicio or "início"} a {data_fim or "hoje"}'
+        self.stdout.write(f'Reconstruindo resumos do dashboard ({intervalo})...')
+
+        resultado = ResumoDashboardService.reconciliar(data_inicio=data_inicio, data_fim=data_fim)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Resumos reconstruídos: {resultado["notas"]} linha(s) de notas, '
+                f'{resultado["romaneios"]} linha(s) de romaneios.'
+            )
+        )
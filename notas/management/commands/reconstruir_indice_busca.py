@@ -0,0 +1,33 @@
+"""
+Comando para reconstruir o índice de busca textual de notas, clientes e
+romaneios (BuscaService).
+
+Os sinais mantêm o índice atualizado; use este comando após cargas feitas
+com QuerySet.update/bulk_create ou restaurações de banco:
+    python manage.py reconstruir_indice_busca
+    python manage.py reconstruir_indice_busca --tipo nota
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from notas.services import BuscaService
+from notas.services.busca_service import INDICES
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice de busca textual (FTS5/pg_trgm)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tipo',
+            choices=sorted(INDICES),
+            help='Reconstrói só um índice. Sem ele, reconstrói todos.',
+        )
+
+    def handle(self, *args, **options):
+        if not BuscaService.disponivel():
+            raise CommandError('O banco de dados configurado não suporta o índice de busca.')
+
+        resultado = BuscaService.reconstruir(options['tipo'])
+
+        for tipo, total in resultado.items():
+            self.stdout.write(self.style.SUCCESS(f'Índice {tipo}: {total} registro(s).'))
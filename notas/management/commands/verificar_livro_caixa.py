@@ -0,0 +1,61 @@
+"""
+Comando para conferir o livro caixa: recalcula do zero o acumulado de cada
+movimento e os totais de cada período e compara com o que está gravado.
+
+Os sinais mantêm o livro atualizado; divergências só aparecem após cargas
+feitas com QuerySet.update, restaurações, etc. Com --corrigir, grava os
+valores recalculados.
+Exemplo de agendamento (cron, madrugada):
+    python manage.py verificar_livro_caixa --corrigir
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from financeiro.models import PeriodoMovimentoCaixa
+from financeiro.services import LivroCaixaService
+
+
+class Command(BaseCommand):
+    help = 'Confere (e opcionalmente corrige) saldos acumulados e totais do livro caixa'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--periodo',
+            type=int,
+            help='ID do período (padrão: todos)',
+        )
+        parser.add_argument(
+            '--corrigir',
+            action='store_true',
+            help='Grava os valores recalculados quando houver divergência',
+        )
+
+    def handle(self, *args, **options):
+        periodos = PeriodoMovimentoCaixa.objects.order_by('data_inicio', 'pk')
+        if options['periodo']:
+            periodos = periodos.filter(pk=options['periodo'])
+            if not periodos.exists():
+                raise CommandError(f'Período não encontrado: {options["periodo"]}')
+
+        corrigir = options['corrigir']
+        com_divergencia = 0
+        for periodo in periodos:
+            movimentos, totais = LivroCaixaService.recalcular(periodo.pk, gravar=corrigir)
+            if not movimentos and not totais:
+                continue
+            com_divergencia += 1
+            self.stdout.write(self.style.WARNING(f'{periodo}: {len(movimentos)} movimento(s) divergente(s)'))
+            for pk, gravado, esperado in movimentos[:10]:
+                self.stdout.write(f'   movimento {pk}: acumulado {gravado} (esperado {esperado})')
+            if len(movimentos) > 10:
+                self.stdout.write(f'   ... e mais {len(movimentos) - 10}')
+            for campo, (gravado, esperado) in totais.items():
+                self.stdout.write(f'   {campo}: {gravado} (esperado {esperado})')
+
+        if not com_divergencia:
+            self.stdout.write(self.style.SUCCESS('Livro caixa conferido: nenhuma divergência.'))
+        elif corrigir:
+            self.stdout.write(self.style.SUCCESS(f'{com_divergencia} período(s) corrigido(s).'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'{com_divergencia} período(s) com divergência. Use --corrigir para gravar os valores recalculados.'
+            ))
@@ -1,6 +1,8 @@
 from django.conf import settings
 from django.shortcuts import redirect
 
+from .utils.monitor_consultas import RegistroConsultas, avaliar_requisicao, monitor_ativo
+
 class AuthenticationMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -22,4 +24,25 @@ class AuthenticationMiddleware:
             return redirect('notas:login')
         
         response = self.get_response(request)
-        return response 
\ No newline at end of file
+        return response
+
+class MonitorConsultasMiddleware:
+    """
+    Conta as consultas SQL de cada requisição e avalia contra o orçamento da
+    view (notas/utils/monitor_consultas.py). Ativo com
+    MONITOR_CONSULTAS_ATIVO (padrão: DEBUG).
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not monitor_ativo():
+            return self.get_response(request)
+
+        with RegistroConsultas() as registro:
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.view_name:
+            avaliar_requisicao(match.view_name, registro)
+        return response
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def popular_resumos(apps, schema_editor):
+    """Carga inicial dos resumos a partir das notas e romaneios existentes."""
+    NotaFiscal = apps.get_model('notas', 'NotaFiscal')
+    RomaneioViagem = apps.get_model('notas', 'RomaneioViagem')
+    ResumoDiarioNotaFiscal = apps.get_model('notas', 'ResumoDiarioNotaFiscal')
+    ResumoDiarioRomaneio = apps.get_model('notas', 'ResumoDiarioRomaneio')
+
+    linhas_notas = NotaFiscal.objects.order_by().values(
+        'data', 'cliente_id', 'status', 'cliente__estado'
+    ).annotate(quantidade=Count('id'), valor=Sum('valor'))
+    ResumoDiarioNotaFiscal.objects.bulk_create([
+        ResumoDiarioNotaFiscal(
+            data=linha['data'],
+            cliente_id=linha['cliente_id'],
+            status=linha['status'],
+            uf=(linha['cliente__estado'] or '').strip().upper()[:2],
+            quantidade=linha['quantidade'],
+            valor_total=linha['valor'] or 0,
+        )
+        for linha in linhas_notas
+    ], batch_size=1000)
+
+    acumulado = {}
+    linhas_romaneios = RomaneioViagem.objects.order_by().annotate(
+        dia=TruncDate('data_emissao')
+    ).values('dia', 'cliente_id', 'status', 'destino_estado').annotate(
+        quantidade=Count('id'), valor=Sum('valor_total')
+    )
+    for linha in linhas_romaneios:
+        uf = (linha['destino_estado'] or '').strip().upper()[:2]
+        chave = (linha['dia'], linha['cliente_id'], linha['status'], uf)
+        item = acumulado.setdefault(chave, [0, 0])
+        item[0] += linha['quantidade']
+        item[1] += linha['valor'] or 0
+    ResumoDiarioRomaneio.objects.bulk_create([
+        ResumoDiarioRomaneio(
+            data=data, cliente_id=cliente_id, status=status, uf=uf,
+            quantidade=quantidade, valor_total=valor,
+        )
+        for (data, cliente_id, status, uf), (quantidade, valor) in acumulado.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0070_aumentar_codigo_seguranca_cnh'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDiarioNotaFiscal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data da Nota')),
+                ('status', models.CharField(max_length=20, verbose_name='Status da NF')),
+                ('uf', models.CharField(blank=True, default='', max_length=2, verbose_name='UF do Cliente')),
+                ('quantidade', models.PositiveIntegerField(default=0, verbose_name='Quantidade de Notas')),
+                ('valor_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Valor Total (R$)')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_diarios_notas', to='notas.cliente', verbose_name='Cliente')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Notas Fiscais',
+                'verbose_name_plural': 'Resumos Diários de Notas Fiscais',
+                'ordering': ['-data'],
+                'indexes': [models.Index(fields=['status', 'data'], name='resumo_nota_status_data_idx'), models.Index(fields=['cliente', 'status'], name='resumo_nota_cliente_status_idx'), models.Index(fields=['uf'], name='resumo_nota_uf_idx')],
+                'constraints': [models.UniqueConstraint(fields=('data', 'cliente', 'status'), name='unique_resumo_nota_dia_cliente_status')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumoDiarioRomaneio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data de Emissão')),
+                ('status', models.CharField(max_length=15, verbose_name='Status do Romaneio')),
+                ('uf', models.CharField(blank=True, default='', max_length=2, verbose_name='UF de Destino')),
+                ('quantidade', models.PositiveIntegerField(default=0, verbose_name='Quantidade de Romaneios')),
+                ('valor_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Valor Total (R$)')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_diarios_romaneios', to='notas.cliente', verbose_name='Cliente')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Romaneios',
+                'verbose_name_plural': 'Resumos Diários de Romaneios',
+                'ordering': ['-data'],
+                'indexes': [models.Index(fields=['status', 'data'], name='resumo_rom_status_data_idx'), models.Index(fields=['cliente', 'data'], name='resumo_rom_cliente_data_idx')],
+                'constraints': [models.UniqueConstraint(fields=('data', 'cliente', 'status', 'uf'), name='unique_resumo_romaneio_dia_cliente_status_uf')],
+            },
+        ),
+        migrations.RunPython(popular_resumos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:43
+
+import re
+
+from django.db import migrations, models
+
+SEQUENCIAS = {
+    'romaneio': r'^ROM-([0-9]+)$',
+    'romaneio_generico': r'^ROM-100-([0-9]+)$',
+}
+
+
+def popular_sequencias(apps, schema_editor):
+    """Inicializa as sequências de romaneio com o maior número já usado."""
+    RomaneioViagem = apps.get_model('notas', 'RomaneioViagem')
+    SequenciaCodigo = apps.get_model('notas', 'SequenciaCodigo')
+    codigos = list(RomaneioViagem.objects.values_list('codigo', flat=True))
+    for nome, padrao in SEQUENCIAS.items():
+        regex = re.compile(padrao)
+        numeros = [int(m.group(1)) for m in map(regex.match, codigos) if m]
+        SequenciaCodigo.objects.update_or_create(
+            nome=nome, defaults={'ultimo_valor': max(numeros, default=0)}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0071_resumos_diarios_dashboard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenciaCodigo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=50, unique=True, verbose_name='Nome da Sequência')),
+                ('ultimo_valor', models.PositiveBigIntegerField(default=0, verbose_name='Último Valor Reservado')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Sequência de Código',
+                'verbose_name_plural': 'Sequências de Código',
+                'ordering': ['nome'],
+            },
+        ),
+        migrations.RunPython(popular_sequencias, migrations.RunPython.noop),
+    ]
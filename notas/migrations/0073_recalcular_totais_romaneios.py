@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def recalcular_totais(apps, schema_editor):
+    """
+    Acerta peso/valor/quantidade (e seguro) de todos os romaneios antes de os
+    totais passarem a ser mantidos por deltas, e reconstrói o resumo diário
+    de romaneios, que depende de valor_total.
+    """
+    RomaneioViagem = apps.get_model('notas', 'RomaneioViagem')
+    TabelaSeguro = apps.get_model('notas', 'TabelaSeguro')
+    ResumoDiarioRomaneio = apps.get_model('notas', 'ResumoDiarioRomaneio')
+    Vinculo = RomaneioViagem.notas_fiscais.through
+
+    zero = Decimal('0.00')
+    totais = {
+        linha['romaneioviagem_id']: linha
+        for linha in Vinculo.objects.order_by().values('romaneioviagem_id').annotate(
+            peso=Sum('notafiscal__peso'),
+            valor=Sum('notafiscal__valor'),
+            quantidade=Sum('notafiscal__quantidade'),
+        )
+    }
+    percentuais = dict(TabelaSeguro.objects.values_list('estado', 'percentual_seguro'))
+
+    alterados = []
+    for romaneio in RomaneioViagem.objects.all().iterator():
+        linha = totais.get(romaneio.pk, {})
+        novos = (
+            linha.get('peso') or zero,
+            linha.get('valor') or zero,
+            linha.get('quantidade') or zero,
+        )
+        if (romaneio.peso_total, romaneio.valor_total, romaneio.quantidade_total) == novos:
+            continue
+        romaneio.peso_total, romaneio.valor_total, romaneio.quantidade_total = novos
+        percentual = percentuais.get(romaneio.destino_estado)
+        if romaneio.valor_total and percentual is not None:
+            romaneio.percentual_seguro = percentual
+            romaneio.valor_seguro = (romaneio.valor_total * percentual) / 100
+        alterados.append(romaneio)
+    RomaneioViagem.objects.bulk_update(
+        alterados,
+        ['peso_total', 'valor_total', 'quantidade_total', 'percentual_seguro', 'valor_seguro'],
+        batch_size=500,
+    )
+
+    ResumoDiarioRomaneio.objects.all().delete()
+    acumulado = {}
+    linhas_romaneios = RomaneioViagem.objects.order_by().annotate(
+        dia=TruncDate('data_emissao')
+    ).values('dia', 'cliente_id', 'status', 'destino_estado').annotate(
+        quantidade=Count('id'), valor=Sum('valor_total')
+    )
+    for linha in linhas_romaneios:
+        uf = (linha['destino_estado'] or '').strip().upper()[:2]
+        chave = (linha['dia'], linha['cliente_id'], linha['status'], uf)
+        item = acumulado.setdefault(chave, [0, 0])
+        item[0] += linha['quantidade']
+        item[1] += linha['valor'] or 0
+    ResumoDiarioRomaneio.objects.bulk_create([
+        ResumoDiarioRomaneio(
+            data=data, cliente_id=cliente_id, status=status, uf=uf,
+            quantidade=quantidade, valor_total=valor,
+        )
+        for (data, cliente_id, status, uf), (quantidade, valor) in acumulado.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0072_sequencia_codigo'),
+    ]
+
+    operations = [
+        migrations.RunPython(recalcular_totais, migrations.RunPython.noop),
+    ]
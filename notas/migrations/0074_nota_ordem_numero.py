@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:55
+
+from django.db import migrations, models
+
+from notas.utils.nota_ordering import chave_ordenacao_persistida
+
+
+def preencher_ordem_nota(apps, schema_editor):
+    NotaFiscal = apps.get_model('notas', 'NotaFiscal')
+    lote = []
+    for nota in NotaFiscal.objects.only('id', 'nota').iterator(chunk_size=2000):
+        nota.ordem_nota = chave_ordenacao_persistida(nota.nota)
+        lote.append(nota)
+        if len(lote) >= 2000:
+            NotaFiscal.objects.bulk_update(lote, ['ordem_nota'])
+            lote = []
+    if lote:
+        NotaFiscal.objects.bulk_update(lote, ['ordem_nota'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0073_recalcular_totais_romaneios'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notafiscal',
+            name='ordem_nota',
+            field=models.CharField(default='', editable=False, max_length=101, verbose_name='Chave de Ordenação da Nota'),
+        ),
+        migrations.RunPython(preencher_ordem_nota, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='notafiscal',
+            index=models.Index(fields=['ordem_nota'], name='nota_fiscal_ordem_nota_idx'),
+        ),
+    ]
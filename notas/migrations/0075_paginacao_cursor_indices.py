@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0074_nota_ordem_numero'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cobrancacarregamento',
+            index=models.Index(fields=['status', '-criado_em', '-id'], name='cobranca_status_criado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='romaneioviagem',
+            index=models.Index(fields=['-data_emissao', '-id'], name='romaneio_emissao_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='romaneioviagem',
+            index=models.Index(fields=['status', '-data_emissao', '-id'], name='romaneio_status_emissao_idx'),
+        ),
+    ]
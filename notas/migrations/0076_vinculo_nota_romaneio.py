@@ -0,0 +1,133 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:49
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Sum
+
+
+def unificar_vinculos(apps, schema_editor):
+    """
+    Junta as duas tabelas M2M antigas (RomaneioViagem.notas_fiscais e
+    NotaFiscal.romaneios) em VinculoNotaRomaneio, sem duplicar pares, com o
+    status atual do romaneio.
+
+    Pares que só existiam no lado da nota nunca entraram nos totais nem no
+    status das notas: esses romaneios e notas são recalculados. Se houver
+    algum, rode depois `python manage.py reconciliar_resumos_dashboard`.
+    """
+    RomaneioViagem = apps.get_model('notas', 'RomaneioViagem')
+    NotaFiscal = apps.get_model('notas', 'NotaFiscal')
+    TabelaSeguro = apps.get_model('notas', 'TabelaSeguro')
+    VinculoNotaRomaneio = apps.get_model('notas', 'VinculoNotaRomaneio')
+    LadoRomaneio = RomaneioViagem.notas_fiscais.through
+    LadoNota = NotaFiscal.romaneios.through
+
+    pares = set(LadoRomaneio.objects.values_list('romaneioviagem_id', 'notafiscal_id').iterator())
+    somente_nota = set(
+        LadoNota.objects.values_list('romaneioviagem_id', 'notafiscal_id').iterator()
+    ) - pares
+    pares |= somente_nota
+    if not pares:
+        return
+
+    status = dict(RomaneioViagem.objects.values_list('pk', 'status').iterator())
+    VinculoNotaRomaneio.objects.bulk_create(
+        (
+            VinculoNotaRomaneio(romaneio_id=romaneio_id, nota_fiscal_id=nota_id, status_romaneio=status[romaneio_id])
+            for romaneio_id, nota_id in sorted(pares)
+        ),
+        batch_size=1000,
+    )
+    if not somente_nota:
+        return
+
+    zero = Decimal('0.00')
+    romaneio_ids = {romaneio_id for romaneio_id, _nota_id in somente_nota}
+    totais = {
+        linha['romaneio_id']: linha
+        for linha in VinculoNotaRomaneio.objects.filter(romaneio_id__in=romaneio_ids)
+        .order_by().values('romaneio_id').annotate(
+            peso=Sum('nota_fiscal__peso'),
+            valor=Sum('nota_fiscal__valor'),
+            quantidade=Sum('nota_fiscal__quantidade'),
+        )
+    }
+    percentuais = dict(TabelaSeguro.objects.values_list('estado', 'percentual_seguro'))
+    romaneios = list(RomaneioViagem.objects.filter(pk__in=romaneio_ids))
+    for romaneio in romaneios:
+        linha = totais[romaneio.pk]
+        romaneio.peso_total = linha['peso'] or zero
+        romaneio.valor_total = linha['valor'] or zero
+        romaneio.quantidade_total = linha['quantidade'] or zero
+        percentual = percentuais.get(romaneio.destino_estado)
+        if romaneio.valor_total and percentual is not None:
+            romaneio.percentual_seguro = percentual
+            romaneio.valor_seguro = (romaneio.valor_total * percentual) / 100
+    RomaneioViagem.objects.bulk_update(
+        romaneios,
+        ['peso_total', 'valor_total', 'quantidade_total', 'percentual_seguro', 'valor_seguro'],
+        batch_size=500,
+    )
+
+    notas = NotaFiscal.objects.filter(pk__in={nota_id for _romaneio_id, nota_id in somente_nota})
+    emitidos = VinculoNotaRomaneio.objects.filter(nota_fiscal_id=OuterRef('pk'), status_romaneio='Emitido')
+    notas.filter(Exists(emitidos)).exclude(status='Enviada').update(status='Enviada')
+
+
+def separar_vinculos(apps, schema_editor):
+    RomaneioViagem = apps.get_model('notas', 'RomaneioViagem')
+    VinculoNotaRomaneio = apps.get_model('notas', 'VinculoNotaRomaneio')
+    LadoRomaneio = RomaneioViagem.notas_fiscais.through
+
+    LadoRomaneio.objects.bulk_create(
+        (
+            LadoRomaneio(romaneioviagem_id=romaneio_id, notafiscal_id=nota_id)
+            for romaneio_id, nota_id in VinculoNotaRomaneio.objects.values_list(
+                'romaneio_id', 'nota_fiscal_id'
+            ).iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0075_paginacao_cursor_indices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VinculoNotaRomaneio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status_romaneio', models.CharField(choices=[('Salvo', 'Salvo'), ('Emitido', 'Emitido')], default='Salvo', max_length=15, verbose_name='Status do Romaneio')),
+                ('nota_fiscal', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='vinculos_romaneios', to='notas.notafiscal', verbose_name='Nota Fiscal')),
+                ('romaneio', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='vinculos_notas', to='notas.romaneioviagem', verbose_name='Romaneio')),
+            ],
+            options={
+                'verbose_name': 'Vínculo Nota/Romaneio',
+                'verbose_name_plural': 'Vínculos Nota/Romaneio',
+                'indexes': [models.Index(fields=['nota_fiscal', 'romaneio'], name='vinculo_nota_romaneio_idx')],
+                'constraints': [models.UniqueConstraint(fields=('romaneio', 'nota_fiscal'), name='vinculo_romaneio_nota_uniq')],
+            },
+        ),
+        migrations.RunPython(unificar_vinculos, separar_vinculos),
+        migrations.RemoveField(
+            model_name='notafiscal',
+            name='romaneios',
+        ),
+        # Um M2M não pode ganhar tabela intermediária via AlterField: o campo
+        # é recriado apontando para VinculoNotaRomaneio (que já tem os dados)
+        migrations.RemoveField(
+            model_name='romaneioviagem',
+            name='notas_fiscais',
+        ),
+        migrations.AddField(
+            model_name='romaneioviagem',
+            name='notas_fiscais',
+            field=models.ManyToManyField(blank=True, related_name='romaneios_vinculados', through='notas.VinculoNotaRomaneio', to='notas.notafiscal', verbose_name='Notas Fiscais'),
+        ),
+    ]
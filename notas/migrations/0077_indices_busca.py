@@ -0,0 +1,79 @@
+from django.db import migrations
+
+from notas.services.busca_service import normalizar_texto
+
+try:
+    from django.contrib.postgres.operations import TrigramExtension
+except ImportError:  # sem psycopg: instalação só com SQLite
+    TrigramExtension = None
+
+# Tabela -> (modelo, campos indexados), congelado nesta migração
+TABELAS = {
+    'notas_busca_nota': ('NotaFiscal', ('nota', 'mercadoria', 'fornecedor')),
+    'notas_busca_cliente': ('Cliente', ('razao_social', 'nome_fantasia', 'cnpj', 'cidade')),
+    'notas_busca_romaneio': ('RomaneioViagem', ('codigo',)),
+}
+
+# Coluna com o pk do objeto indexado, por banco
+CHAVE = {'sqlite': 'rowid', 'postgresql': 'objeto_id'}
+
+
+def _ddl(vendor, tabela, campos):
+    if vendor == 'sqlite':
+        return [f"CREATE VIRTUAL TABLE {tabela} USING fts5({', '.join(campos)}, tokenize='trigram')"]
+    colunas = ', '.join(f"{campo} text NOT NULL DEFAULT ''" for campo in campos)
+    return [f'CREATE TABLE {tabela} (objeto_id bigint PRIMARY KEY, {colunas})'] + [
+        f'CREATE INDEX {tabela}_{campo}_trgm ON {tabela} USING gin ({campo} gin_trgm_ops)'
+        for campo in campos
+    ]
+
+
+def criar_indices_busca(apps, schema_editor):
+    """
+    Cria as tabelas do índice de busca (BuscaService) e as preenche com os
+    registros já existentes. Bancos sem FTS5/pg_trgm ficam sem índice e a
+    busca usa icontains.
+
+    Tabelas que já existem (criadas pelo antigo post_migrate e mantidas
+    pelos sinais) são preservadas.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor not in CHAVE:
+        return
+    existentes = set(schema_editor.connection.introspection.table_names())
+    for tabela, (nome_modelo, campos) in TABELAS.items():
+        if tabela in existentes:
+            continue
+        for sql in _ddl(vendor, tabela, campos):
+            schema_editor.execute(sql)
+
+        marcadores = ', '.join(['%s'] * (len(campos) + 1))
+        inserir = f"INSERT INTO {tabela} ({CHAVE[vendor]}, {', '.join(campos)}) VALUES ({marcadores})"
+        valores = apps.get_model('notas', nome_modelo).objects.values_list('pk', *campos)
+        with schema_editor.connection.cursor() as cursor:
+            lote = []
+            for pk, *textos in valores.iterator(chunk_size=2000):
+                lote.append((pk, *(normalizar_texto(texto) for texto in textos)))
+                if len(lote) >= 2000:
+                    cursor.executemany(inserir, lote)
+                    lote = []
+            if lote:
+                cursor.executemany(inserir, lote)
+
+
+def remover_indices_busca(apps, schema_editor):
+    if schema_editor.connection.vendor not in CHAVE:
+        return
+    for tabela in TABELAS:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {tabela}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0076_vinculo_nota_romaneio'),
+    ]
+
+    operations = ([TrigramExtension()] if TrigramExtension else []) + [
+        migrations.RunPython(criar_indices_busca, remover_indices_busca),
+    ]
@@ -4,14 +4,14 @@ Pacote de modelos do Sistema Estelar.
 Mantém compatibilidade com imports existentes:
     from notas.models import Cliente, NotaFiscal, Usuario, ...
 """
-from .mixins import UpperCaseMixin, UsuarioManager
+from .mixins import UpperCaseMixin, UpperCaseManager, UpperCaseQuerySet, UsuarioManager
 from .cliente import Cliente
 from .usuario import Usuario
 from .nota_fiscal import NotaFiscal, OcorrenciaNotaFiscal, FotoOcorrencia
 from .veiculo import TipoVeiculo, PlacaVeiculo, Veiculo
 from .motorista import Motorista
 from .tabela_seguro import TabelaSeguro
-from .romaneio import RomaneioViagem
+from .romaneio import RomaneioViagem, VinculoNotaRomaneio
 from .auxiliares import (
     HistoricoConsulta,
     AuditoriaLog,
@@ -21,9 +21,13 @@ from .auxiliares import (
     ItemFechamentoFrete,
     DetalheItemFechamento,
 )
+from .resumo import ResumoDiarioNotaFiscal, ResumoDiarioRomaneio
+from .sequencia import SequenciaCodigo
 
 __all__ = [
     'UpperCaseMixin',
+    'UpperCaseManager',
+    'UpperCaseQuerySet',
     'UsuarioManager',
     'Cliente',
     'Usuario',
@@ -36,6 +40,7 @@ __all__ = [
     'Motorista',
     'TabelaSeguro',
     'RomaneioViagem',
+    'VinculoNotaRomaneio',
     'HistoricoConsulta',
     'AuditoriaLog',
     'CobrancaCarregamento',
@@ -43,4 +48,7 @@ __all__ = [
     'FechamentoFrete',
     'ItemFechamentoFrete',
     'DetalheItemFechamento',
+    'ResumoDiarioNotaFiscal',
+    'ResumoDiarioRomaneio',
+    'SequenciaCodigo',
 ]
@@ -8,7 +8,7 @@ from django.db import models
 from django.db.models import Sum
 from django.utils import timezone
 
-from .mixins import UpperCaseMixin
+from .mixins import UpperCaseManager, UpperCaseMixin
 from .cliente import Cliente
 from .motorista import Motorista
 from .usuario import Usuario
@@ -34,6 +34,8 @@ class HistoricoConsulta(UpperCaseMixin, models.Model):
     )
     observacoes = models.TextField(blank=True, null=True, verbose_name="Observações da Consulta")
 
+    objects = UpperCaseManager()
+
     class Meta:
         verbose_name = "Histórico de Consulta"
         verbose_name_plural = "Históricos de Consultas"
@@ -84,6 +86,37 @@ class AuditoriaLog(models.Model):
         return f"{self.get_acao_display()} de {self.modelo} #{self.objeto_id} em {self.data_hora.strftime('%d/%m/%Y %H:%M')}"
 
 
+_MARCADOR_SAIDA_CAIXA = re.compile(r'\[SAIDA_CAIXA_CLIENTE:(\d+)\]', flags=re.IGNORECASE)
+
+
+def _texto_observacoes_cobranca(obs, descricao_movimento=None):
+    """
+    Texto exibível das observações de uma cobrança, dada a descrição do
+    MovimentoCaixa referenciado pelo marcador [SAIDA_CAIXA_CLIENTE:<id>].
+    """
+    if descricao_movimento:
+        texto_mov = descricao_movimento.strip()
+        if texto_mov:
+            return texto_mov
+
+    rest = re.sub(
+        r'^\[SAIDA_CAIXA_CLIENTE:\d+\]\s*',
+        '',
+        obs,
+        flags=re.IGNORECASE,
+    ).strip()
+    if not rest:
+        return ''
+    legado = re.match(
+        r'^.*?#\d+\s*[—\-]\s*\d{4}-\d{2}-\d{2}\s*:\s*(.+)$',
+        rest,
+        flags=re.DOTALL,
+    )
+    if legado:
+        return legado.group(1).strip()
+    return rest
+
+
 class CobrancaCarregamento(UpperCaseMixin, models.Model):
     """Cobranças de carregamento e CTE/Manifesto."""
     ORIGEM_COBRANCA_CHOICES = [
@@ -179,6 +212,8 @@ class CobrancaCarregamento(UpperCaseMixin, models.Model):
     criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
     atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Data de Atualização")
 
+    objects = UpperCaseManager()
+
     class Meta:
         verbose_name = "Cobrança de Carregamento"
         verbose_name_plural = "Cobranças de Carregamento"
@@ -188,6 +223,7 @@ class CobrancaCarregamento(UpperCaseMixin, models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['origem_cobranca']),
             models.Index(fields=['data_vencimento']),
+            models.Index(fields=['status', '-criado_em', '-id'], name='cobranca_status_criado_idx'),
         ]
 
     def __str__(self):
@@ -196,35 +232,51 @@ class CobrancaCarregamento(UpperCaseMixin, models.Model):
     @property
     def observacoes_para_exibicao(self):
         """Texto de observações sem metadados internos da saída de caixa (apenas a descrição)."""
+        if hasattr(self, '_observacoes_exibicao'):
+            return self._observacoes_exibicao
         obs = (self.observacoes or '').strip()
         if not obs:
             return ''
 
-        m_id = re.search(r'\[SAIDA_CAIXA_CLIENTE:(\d+)\]', obs, flags=re.IGNORECASE)
+        descricao_movimento = None
+        m_id = _MARCADOR_SAIDA_CAIXA.search(obs)
         if m_id:
             MovimentoCaixa = apps.get_model('financeiro', 'MovimentoCaixa')
-            mov = MovimentoCaixa.objects.filter(pk=int(m_id.group(1))).first()
-            if mov:
-                texto_mov = (mov.descricao or '').strip()
-                if texto_mov:
-                    return texto_mov
-
-        rest = re.sub(
-            r'^\[SAIDA_CAIXA_CLIENTE:\d+\]\s*',
-            '',
-            obs,
-            flags=re.IGNORECASE,
-        ).strip()
-        if not rest:
-            return ''
-        legado = re.match(
-            r'^.*?#\d+\s*[—\-]\s*\d{4}-\d{2}-\d{2}\s*:\s*(.+)$',
-            rest,
-            flags=re.DOTALL,
-        )
-        if legado:
-            return legado.group(1).strip()
-        return rest
+            descricao_movimento = (
+                MovimentoCaixa.objects.filter(pk=int(m_id.group(1))).values_list('descricao', flat=True).first()
+            )
+        return _texto_observacoes_cobranca(obs, descricao_movimento)
+
+    @classmethod
+    def resolver_observacoes_exibicao(cls, cobrancas):
+        """
+        Calcula observacoes_para_exibicao de uma lista de cobranças de uma
+        vez: os movimentos referenciados pelos marcadores vêm numa única
+        consulta (pk__in) e o texto fica guardado em cada instância.
+
+        Chamado pelas listagens sobre as cobranças a exibir (a página, quando
+        há paginação); retorna a lista.
+        """
+        cobrancas = list(cobrancas)
+        marcadores = {}
+        for cobranca in cobrancas:
+            m_id = _MARCADOR_SAIDA_CAIXA.search(cobranca.observacoes or '')
+            if m_id:
+                marcadores[cobranca.pk] = int(m_id.group(1))
+
+        descricoes = {}
+        if marcadores:
+            MovimentoCaixa = apps.get_model('financeiro', 'MovimentoCaixa')
+            descricoes = dict(
+                MovimentoCaixa.objects.filter(pk__in=set(marcadores.values())).values_list('pk', 'descricao')
+            )
+
+        for cobranca in cobrancas:
+            obs = (cobranca.observacoes or '').strip()
+            cobranca._observacoes_exibicao = (
+                _texto_observacoes_cobranca(obs, descricoes.get(marcadores.get(cobranca.pk))) if obs else ''
+            )
+        return cobrancas
 
     @property
     def valor_armazenamento(self):
@@ -302,6 +354,8 @@ class CobrancaCTEAvulsa(UpperCaseMixin, models.Model):
     criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
     atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Data de Atualização")
 
+    objects = UpperCaseManager()
+
     class Meta:
         verbose_name = "Cobrança CTE Avulsa"
         verbose_name_plural = "Cobranças CTE Avulsas"
@@ -367,6 +421,8 @@ class FechamentoFrete(UpperCaseMixin, models.Model):
     data_criacao = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
     origem_romaneio = models.BooleanField(default=False, verbose_name="Criado a partir de Romaneios")
 
+    objects = UpperCaseManager()
+
     def calcular_cubagem_total(self):
         total = 0
         if self.cubagem_bau_a:
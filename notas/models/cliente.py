@@ -3,7 +3,7 @@ Modelo Cliente - empresas clientes do sistema.
 """
 from django.db import models
 
-from .mixins import UpperCaseMixin
+from .mixins import UpperCaseManager, UpperCaseMixin
 
 
 class Cliente(UpperCaseMixin, models.Model):
@@ -35,6 +35,8 @@ class Cliente(UpperCaseMixin, models.Model):
     ]
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Ativo', verbose_name="Status")
 
+    objects = UpperCaseManager()
+
     def __str__(self):
         return self.razao_social
 
@@ -2,45 +2,110 @@
 Mixins e utilitários compartilhados pelos modelos.
 """
 from django.contrib.auth.models import BaseUserManager
+from django.db import models
+from django.db.models.signals import class_prepared
+from django.dispatch import receiver
+
+# Campos de texto que mantêm a caixa original (emails, senhas, documentos,
+# valores de choices usados em comparações, chaves de ordenação, etc.).
+CAMPOS_SEM_MAIUSCULAS = frozenset([
+    'email', 'password', 'username', 'cpf', 'cnpj',
+    'cnh', 'chassi', 'renavam', 'placa', 'cep',
+    'telefone', 'rntrc', 'numero_consulta', 'tipo_usuario',
+    'status', 'rg', 'tipo', 'categoria', 'tipo_pagamento', 'tipo_cliente',
+    'tipo_receita',
+    'rotulo_personalizado', 'ordem_nota',
+])
+
+
+def normalizar_maiusculas(instancia, campos=None):
+    """
+    Converte para maiúsculas os campos de texto da instância (ou apenas os
+    de `campos` que participam da conversão).
+    """
+    alvos = instancia._campos_maiusculas
+    if campos is not None:
+        alvos = [nome for nome in alvos if nome in campos]
+    valores = instancia.__dict__  # campos adiados (only/defer) ficam de fora, sem consulta
+    for nome in alvos:
+        valor = valores.get(nome)
+        if valor and isinstance(valor, str):
+            valores[nome] = valor.upper()
 
 
 class UpperCaseMixin:
     """
     Mixin que converte automaticamente campos de texto para maiúsculas.
 
-    Aplica-se a todos os campos CharField do modelo, exceto aqueles
-    especificados na lista de exclusão (emails, senhas, CPF/CNPJ, etc.).
+    Aplica-se a todos os campos CharField/TextField do modelo, exceto
+    aqueles em CAMPOS_SEM_MAIUSCULAS (emails, senhas, CPF/CNPJ, etc.). A
+    lista de campos convertidos é calculada uma vez por modelo, quando a
+    classe é preparada (_campos_maiusculas).
 
     Uso:
         class MeuModelo(UpperCaseMixin, models.Model):
             nome = models.CharField(max_length=100)
             # 'nome' será automaticamente convertido para maiúsculas
 
+            objects = UpperCaseManager()
+            # bulk_create/bulk_update/update também convertem
+
     Campos Excluídos da Conversão:
         - email, password, username
         - cpf, cnpj, cnh, chassi, renavam, placa, cep
         - telefone, rntrc, numero_consulta
         - tipo_usuario, status, rg
+        - ordem_nota (chave de ordenação, sempre em minúsculas)
     """
+    _campos_maiusculas = ()
+
     def save(self, *args, **kwargs):
-        for field in self._meta.fields:
-            if hasattr(field, 'max_length') and hasattr(self, field.name):
-                value = getattr(self, field.name)
-                if value and isinstance(value, str):
-                    exclude_fields = [
-                        'email', 'password', 'username', 'cpf', 'cnpj',
-                        'cnh', 'chassi', 'renavam', 'placa', 'cep',
-                        'telefone', 'rntrc', 'numero_consulta', 'tipo_usuario',
-                        'status', 'rg', 'tipo', 'categoria', 'tipo_pagamento', 'tipo_cliente',
-                        'tipo_receita',
-                        'rotulo_personalizado',
-                    ]
-                    if field.name not in exclude_fields:
-                        setattr(self, field.name, value.upper())
+        normalizar_maiusculas(self)
         super().save(*args, **kwargs)
 
 
-class UsuarioManager(BaseUserManager):
+@receiver(class_prepared)
+def _preparar_campos_maiusculas(sender, **kwargs):
+    if issubclass(sender, UpperCaseMixin):
+        sender._campos_maiusculas = tuple(
+            field.name
+            for field in sender._meta.concrete_fields
+            if isinstance(field, (models.CharField, models.TextField))
+            and field.name not in CAMPOS_SEM_MAIUSCULAS
+        )
+
+
+class UpperCaseQuerySet(models.QuerySet):
+    """
+    QuerySet que aplica a conversão do UpperCaseMixin às operações em lote,
+    que não passam por save(): bulk_create, bulk_update e update.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            normalizar_maiusculas(obj)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            normalizar_maiusculas(obj, fields)
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update(self, **kwargs):
+        campos = getattr(self.model, '_campos_maiusculas', ())
+        for nome, valor in kwargs.items():
+            if nome in campos and valor and isinstance(valor, str):
+                kwargs[nome] = valor.upper()
+        return super().update(**kwargs)
+
+
+class UpperCaseManager(models.Manager.from_queryset(UpperCaseQuerySet)):
+    """Manager padrão dos modelos com UpperCaseMixin."""
+
+
+class UsuarioManager(BaseUserManager.from_queryset(UpperCaseQuerySet)):
     """
     Gerenciador customizado para o modelo Usuario.
 
@@ -3,7 +3,7 @@ Modelo Motorista.
 """
 from django.db import models
 
-from .mixins import UpperCaseMixin
+from .mixins import UpperCaseManager, UpperCaseMixin
 
 
 class Motorista(UpperCaseMixin, models.Model):
@@ -67,6 +67,8 @@ class Motorista(UpperCaseMixin, models.Model):
         verbose_name="Reboque 2 (Placa 3)"
     )
 
+    objects = UpperCaseManager()
+
     def __str__(self):
         return self.nome
 
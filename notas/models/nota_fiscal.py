@@ -4,7 +4,8 @@ Modelos de Nota Fiscal e ocorrências.
 from django.db import models
 from django.db.models import UniqueConstraint
 
-from .mixins import UpperCaseMixin
+from ..utils.nota_ordering import chave_ordenacao_persistida
+from .mixins import UpperCaseManager, UpperCaseMixin
 from .cliente import Cliente
 
 
@@ -14,6 +15,9 @@ class NotaFiscal(UpperCaseMixin, models.Model):
         Cliente, on_delete=models.PROTECT, related_name='notas_fiscais', verbose_name="Cliente"
     )
     nota = models.CharField(max_length=50, verbose_name="Número da Nota")
+    ordem_nota = models.CharField(
+        max_length=101, default='', editable=False, verbose_name="Chave de Ordenação da Nota"
+    )
     data = models.DateField(verbose_name="Data de Emissão")
     fornecedor = models.CharField(max_length=200, verbose_name="Fornecedor")
     mercadoria = models.CharField(max_length=200, verbose_name="Mercadoria")
@@ -40,16 +44,18 @@ class NotaFiscal(UpperCaseMixin, models.Model):
         max_length=10, choices=LOCAL_CHOICES, blank=True, null=True, verbose_name="Local"
     )
 
-    romaneios = models.ManyToManyField(
-        'RomaneioViagem',
-        related_name='notas_vinculadas',
-        blank=True,
-        verbose_name="Romaneios Vinculados"
-    )
+    objects = UpperCaseManager()
 
     def __str__(self):
         return f"Nota {self.nota} - Cliente: {self.cliente.razao_social}"
 
+    def save(self, *args, **kwargs):
+        self.ordem_nota = chave_ordenacao_persistida(self.nota)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'nota' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'ordem_nota'}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Nota Fiscal"
         verbose_name_plural = "Notas Fiscais"
@@ -59,6 +65,7 @@ class NotaFiscal(UpperCaseMixin, models.Model):
             models.Index(fields=['status'], name='nota_fiscal_status_idx'),
             models.Index(fields=['status', 'data'], name='nota_fiscal_status_data_idx'),
             models.Index(fields=['cliente', 'status'], name='nota_fiscal_cliente_status_idx'),
+            models.Index(fields=['ordem_nota'], name='nota_fiscal_ordem_nota_idx'),
         ]
         constraints = [
             UniqueConstraint(
@@ -0,0 +1,82 @@
+"""
+Tabelas de resumo (rollup) diário usadas pelo dashboard.
+
+São mantidas pelos sinais em notas/signals.py e reconstruídas pelo comando
+`reconciliar_resumos_dashboard`. Nunca devem ser editadas manualmente.
+"""
+from django.db import models
+
+from .cliente import Cliente
+
+
+class ResumoDiarioNotaFiscal(models.Model):
+    """Quantidade e valor de notas fiscais por dia, cliente e status."""
+    data = models.DateField(verbose_name="Data da Nota")
+    cliente = models.ForeignKey(
+        Cliente,
+        on_delete=models.CASCADE,
+        related_name='resumos_diarios_notas',
+        verbose_name="Cliente"
+    )
+    status = models.CharField(max_length=20, verbose_name="Status da NF")
+    uf = models.CharField(max_length=2, blank=True, default='', verbose_name="UF do Cliente")
+    quantidade = models.PositiveIntegerField(default=0, verbose_name="Quantidade de Notas")
+    valor_total = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Valor Total (R$)"
+    )
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    def __str__(self):
+        return f"{self.data} - {self.cliente_id} - {self.status}: {self.quantidade}"
+
+    class Meta:
+        verbose_name = "Resumo Diário de Notas Fiscais"
+        verbose_name_plural = "Resumos Diários de Notas Fiscais"
+        ordering = ['-data']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['data', 'cliente', 'status'],
+                name='unique_resumo_nota_dia_cliente_status'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['status', 'data'], name='resumo_nota_status_data_idx'),
+            models.Index(fields=['cliente', 'status'], name='resumo_nota_cliente_status_idx'),
+            models.Index(fields=['uf'], name='resumo_nota_uf_idx'),
+        ]
+
+
+class ResumoDiarioRomaneio(models.Model):
+    """Quantidade e valor de romaneios por dia de emissão, cliente, status e UF de destino."""
+    data = models.DateField(verbose_name="Data de Emissão")
+    cliente = models.ForeignKey(
+        Cliente,
+        on_delete=models.CASCADE,
+        related_name='resumos_diarios_romaneios',
+        verbose_name="Cliente"
+    )
+    status = models.CharField(max_length=15, verbose_name="Status do Romaneio")
+    uf = models.CharField(max_length=2, blank=True, default='', verbose_name="UF de Destino")
+    quantidade = models.PositiveIntegerField(default=0, verbose_name="Quantidade de Romaneios")
+    valor_total = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Valor Total (R$)"
+    )
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    def __str__(self):
+        return f"{self.data} - {self.cliente_id} - {self.status}/{self.uf}: {self.quantidade}"
+
+    class Meta:
+        verbose_name = "Resumo Diário de Romaneios"
+        verbose_name_plural = "Resumos Diários de Romaneios"
+        ordering = ['-data']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['data', 'cliente', 'status', 'uf'],
+                name='unique_resumo_romaneio_dia_cliente_status_uf'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['status', 'data'], name='resumo_rom_status_data_idx'),
+            models.Index(fields=['cliente', 'data'], name='resumo_rom_cliente_data_idx'),
+        ]
@@ -1,10 +1,13 @@
 """
 Modelo Romaneio de Viagem.
 """
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import Sum
 from django.utils import timezone
 
-from .mixins import UpperCaseMixin
+from .mixins import UpperCaseManager, UpperCaseMixin
 from .cliente import Cliente
 from .motorista import Motorista
 from .veiculo import Veiculo
@@ -71,6 +74,7 @@ class RomaneioViagem(UpperCaseMixin, models.Model):
 
     notas_fiscais = models.ManyToManyField(
         NotaFiscal,
+        through='VinculoNotaRomaneio',
         related_name='romaneios_vinculados',
         blank=True,
         verbose_name="Notas Fiscais"
@@ -124,6 +128,8 @@ class RomaneioViagem(UpperCaseMixin, models.Model):
     )
     data_ultima_edicao = models.DateTimeField(auto_now=True, verbose_name="Data da Última Edição")
 
+    objects = UpperCaseManager()
+
     def __str__(self):
         return f"Romaneio {self.codigo} - {self.cliente.razao_social}"
 
@@ -143,36 +149,45 @@ class RomaneioViagem(UpperCaseMixin, models.Model):
         return "Simples"
 
     def calcular_totais(self):
-        if not self.notas_fiscais.exists():
-            self.peso_total = 0
-            self.valor_total = 0
-            self.quantidade_total = 0
-            self.save(update_fields=['peso_total', 'valor_total', 'quantidade_total'])
-            return
+        """
+        Recalcula peso/valor/quantidade a partir das notas com um único aggregate.
 
-        peso_total = sum(nf.peso or 0 for nf in self.notas_fiscais.all())
-        valor_total = sum(nf.valor or 0 for nf in self.notas_fiscais.all())
-        quantidade_total = sum(nf.quantidade or 0 for nf in self.notas_fiscais.all())
+        No dia a dia os totais são mantidos por deltas (m2m_changed em
+        notas/signals.py); este método serve para reconciliar um romaneio.
+        """
+        totais = self.notas_fiscais.aggregate(
+            peso=Sum('peso'), valor=Sum('valor'), quantidade=Sum('quantidade')
+        )
+        peso_total = totais['peso'] or Decimal('0.00')
+        valor_total = totais['valor'] or Decimal('0.00')
+        quantidade_total = totais['quantidade'] or Decimal('0.00')
 
         if (self.peso_total != peso_total or self.valor_total != valor_total or
                 self.quantidade_total != quantidade_total):
             self.peso_total = peso_total
             self.valor_total = valor_total
             self.quantidade_total = quantidade_total
-            self.save(update_fields=['peso_total', 'valor_total', 'quantidade_total'])
-            if self.destino_estado and self.valor_total:
-                self.calcular_seguro()
+            campos = ['peso_total', 'valor_total', 'quantidade_total']
+            if self._aplicar_seguro():
+                campos += ['percentual_seguro', 'valor_seguro']
+            self.save(update_fields=campos)
 
-    def calcular_seguro(self):
+    def _aplicar_seguro(self):
+        """Preenche percentual/valor do seguro em memória. Retorna True se aplicou."""
         if not self.destino_estado or not self.valor_total:
-            return
-        try:
-            tabela_seguro = TabelaSeguro.objects.get(estado=self.destino_estado)
-            self.percentual_seguro = tabela_seguro.percentual_seguro
-            self.valor_seguro = (self.valor_total * self.percentual_seguro) / 100
+            return False
+        percentual = TabelaSeguro.objects.filter(
+            estado=self.destino_estado
+        ).values_list('percentual_seguro', flat=True).first()
+        if percentual is None:
+            return False
+        self.percentual_seguro = percentual
+        self.valor_seguro = (self.valor_total * percentual) / 100
+        return True
+
+    def calcular_seguro(self):
+        if self._aplicar_seguro():
             self.save(update_fields=['percentual_seguro', 'valor_seguro'])
-        except TabelaSeguro.DoesNotExist:
-            pass
 
     def validar_capacidade_veiculo(self):
         if not self.peso_total or not self.veiculo_principal:
@@ -219,32 +234,29 @@ class RomaneioViagem(UpperCaseMixin, models.Model):
         }
 
     def gerar_codigo_automatico(self):
+        """Reserva o próximo código ROM-YYYY-MM-NNNN na sequência do mês."""
         if self.codigo:
             return
-        ano_atual = timezone.now().year
-        mes_atual = timezone.now().month
-        ultimo_romaneio = RomaneioViagem.objects.filter(
-            codigo__startswith=f"ROM-{ano_atual}-{mes_atual:02d}"
-        ).order_by('-codigo').first()
-        if ultimo_romaneio:
-            try:
-                numero_atual = int(ultimo_romaneio.codigo.split('-')[-1])
-                novo_numero = numero_atual + 1
-            except (ValueError, IndexError):
-                novo_numero = 1
-        else:
-            novo_numero = 1
-        self.codigo = f"ROM-{ano_atual}-{mes_atual:02d}-{novo_numero:04d}"
+        from ..services.sequencia_service import SequenciaService, maior_sufixo_codigo
+
+        agora = timezone.now()
+        prefixo = f"ROM-{agora.year}-{agora.month:02d}"
+        numero = SequenciaService.proximo_valor(
+            f"romaneio_{agora.year}_{agora.month:02d}",
+            lambda: maior_sufixo_codigo(
+                RomaneioViagem.objects.all(), 'codigo', rf'^{prefixo}-([0-9]+)$'
+            ),
+        )
+        self.codigo = f"{prefixo}-{numero:04d}"
 
     def save(self, *args, **kwargs):
         if not self.codigo:
             self.gerar_codigo_automatico()
-        update_fields = kwargs.get('update_fields')
+        # Os totais das notas são mantidos pelos sinais m2m_changed; aqui só o
+        # seguro, calculado antes da gravação para não gerar um segundo UPDATE.
+        if not kwargs.get('update_fields'):
+            self._aplicar_seguro()
         super().save(*args, **kwargs)
-        if not update_fields and self.notas_fiscais.exists():
-            self.calcular_totais()
-        if not update_fields and self.destino_estado and self.valor_total:
-            self.calcular_seguro()
 
     class Meta:
         verbose_name = "Romaneio de Viagem"
@@ -256,4 +268,53 @@ class RomaneioViagem(UpperCaseMixin, models.Model):
             models.Index(fields=['cliente']),
             models.Index(fields=['motorista']),
             models.Index(fields=['data_emissao']),
+            # Paginação por cursor em (-data_emissao, -id), com e sem filtro de status
+            models.Index(fields=['-data_emissao', '-id'], name='romaneio_emissao_id_idx'),
+            models.Index(fields=['status', '-data_emissao', '-id'], name='romaneio_status_emissao_idx'),
+        ]
+
+
+class VinculoNotaRomaneio(models.Model):
+    """
+    Vínculo nota fiscal ↔ romaneio: tabela única dos dois lados da relação
+    (romaneio.notas_fiscais e nota.romaneios_vinculados).
+
+    status_romaneio replica RomaneioViagem.status para que "a nota está em
+    algum romaneio emitido?" seja respondido só por esta tabela, sem JOIN
+    com romaneios. É mantido pelos sinais (notas/signals.py).
+    """
+    romaneio = models.ForeignKey(
+        RomaneioViagem,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='vinculos_notas',
+        verbose_name="Romaneio"
+    )
+    nota_fiscal = models.ForeignKey(
+        NotaFiscal,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='vinculos_romaneios',
+        verbose_name="Nota Fiscal"
+    )
+    status_romaneio = models.CharField(
+        max_length=15,
+        choices=RomaneioViagem.STATUS_ROMANEIO_CHOICES,
+        default='Salvo',
+        verbose_name="Status do Romaneio"
+    )
+
+    def __str__(self):
+        return f"Romaneio {self.romaneio_id} - Nota {self.nota_fiscal_id}"
+
+    class Meta:
+        verbose_name = "Vínculo Nota/Romaneio"
+        verbose_name_plural = "Vínculos Nota/Romaneio"
+        # Os dois índices compostos cobrem as buscas por romaneio e por nota
+        # (os índices simples das FKs seriam redundantes)
+        constraints = [
+            models.UniqueConstraint(fields=['romaneio', 'nota_fiscal'], name='vinculo_romaneio_nota_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['nota_fiscal', 'romaneio'], name='vinculo_nota_romaneio_idx'),
         ]
@@ -0,0 +1,22 @@
+"""
+Contadores de sequência usados na geração de códigos (ex.: romaneios).
+
+Cada linha é um contador nomeado. A alocação é feita pelo SequenciaService,
+que trava a linha (SELECT ... FOR UPDATE) e reserva um bloco de valores.
+"""
+from django.db import models
+
+
+class SequenciaCodigo(models.Model):
+    """Último valor reservado de uma sequência nomeada."""
+    nome = models.CharField(max_length=50, unique=True, verbose_name="Nome da Sequência")
+    ultimo_valor = models.PositiveBigIntegerField(default=0, verbose_name="Último Valor Reservado")
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    def __str__(self):
+        return f"{self.nome}: {self.ultimo_valor}"
+
+    class Meta:
+        verbose_name = "Sequência de Código"
+        verbose_name_plural = "Sequências de Código"
+        ordering = ['nome']
@@ -3,7 +3,7 @@ Modelos de tipos, placas e veículos.
 """
 from django.db import models
 
-from .mixins import UpperCaseMixin
+from .mixins import UpperCaseManager, UpperCaseMixin
 
 
 class TipoVeiculo(models.Model):
@@ -84,6 +84,8 @@ class Veiculo(UpperCaseMixin, models.Model):
     proprietario_estado = models.CharField(max_length=2, blank=True, null=True, verbose_name="Estado do Proprietário (UF)")
     proprietario_cep = models.CharField(max_length=9, blank=True, null=True, verbose_name="CEP do Proprietário")
 
+    objects = UpperCaseManager()
+
     def __str__(self):
         return f"{self.placa} ({self.get_tipo_unidade_display()})"
 
@@ -5,12 +5,28 @@ from .romaneio_service import RomaneioService
 from .nota_fiscal_service import NotaFiscalService
 from .calculo_service import CalculoService
 from .validacao_service import ValidacaoService
+from .resumo_dashboard_service import ResumoDashboardService
+from .totalizador_service import TotalizadorService
+from .sequencia_service import SequenciaService
+from .romaneio_pdf_service import RomaneioPdfService
+from .busca_service import BuscaService
+from .cobranca_mensal_service import CobrancaMensalService
+from .importacao_notas_service import ImportacaoNotasService
+from .dados_sinteticos_service import DadosSinteticosService
 
 __all__ = [
     'RomaneioService',
     'NotaFiscalService',
     'CalculoService',
     'ValidacaoService',
+    'ResumoDashboardService',
+    'TotalizadorService',
+    'SequenciaService',
+    'RomaneioPdfService',
+    'BuscaService',
+    'CobrancaMensalService',
+    'ImportacaoNotasService',
+    'DadosSinteticosService',
 ]
 
 
@@ -0,0 +1,282 @@
+"""
+Índice de busca textual de notas, clientes e romaneios.
+
+As buscas por trecho (nota, mercadoria, fornecedor, razão social, CNPJ,
+código) usavam icontains, que vira LIKE '%...%' sem índice. Aqui cada modelo
+tem uma tabela de busca com os campos já normalizados (sem acento, maiúsculos,
+sem pontuação) e um índice de trigramas:
+
+- SQLite: tabela virtual FTS5 com tokenize='trigram' (rowid = pk);
+- PostgreSQL: tabela comum com índices GIN gin_trgm_ops (pg_trgm), que
+  atendem LIKE '%...%'.
+
+As tabelas (e a extensão pg_trgm) são criadas e preenchidas pela migração
+0077_indices_busca e mantidas pelos sinais de save/delete. Cargas que não disparam sinais (QuerySet.update,
+bulk_create) devem chamar indexar_lote ou o comando reconstruir_indice_busca.
+
+Em bancos sem suporte, ou para termos curtos demais para trigramas
+(< 3 caracteres), a busca volta para icontains.
+
+Settings:
+- BUSCA_TEXTO_ATIVA (bool, padrão True).
+"""
+import logging
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Q, QuerySet
+from django.db.models.expressions import RawSQL
+
+from ..models import Cliente, NotaFiscal, RomaneioViagem
+
+logger = logging.getLogger(__name__)
+
+# Tipo -> (modelo, campos indexados)
+INDICES = {
+    'nota': (NotaFiscal, ('nota', 'mercadoria', 'fornecedor')),
+    'cliente': (Cliente, ('razao_social', 'nome_fantasia', 'cnpj', 'cidade')),
+    'romaneio': (RomaneioViagem, ('codigo',)),
+}
+
+TAMANHO_MINIMO_TRIGRAMA = 3
+TAMANHO_LOTE = 2000
+
+# Pontuação de documentos (CNPJ, código) é colada: "62.531.215/0001-96" e
+# "62531215" passam a casar.
+_PONTUACAO_COLADA = str.maketrans('', '', './-')
+_NAO_ALFANUMERICO = re.compile(r'[^0-9A-Z]+')
+
+
+def normalizar_texto(valor) -> str:
+    """Texto sem acentos, em maiúsculas e sem pontuação, para índice e consulta."""
+    if valor is None:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(valor))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    texto = texto.upper().translate(_PONTUACAO_COLADA)
+    return ' '.join(_NAO_ALFANUMERICO.sub(' ', texto).split())
+
+
+class _BackendSqlite:
+    """FTS5 com tokenizador de trigramas."""
+
+    @staticmethod
+    def remover(cursor, tabela, ids):
+        cursor.executemany(f'DELETE FROM {tabela} WHERE rowid = %s', [(pk,) for pk in ids])
+
+    @staticmethod
+    def inserir(cursor, tabela, campos, linhas):
+        marcadores = ', '.join(['%s'] * (len(campos) + 1))
+        cursor.executemany(
+            f"INSERT INTO {tabela} (rowid, {', '.join(campos)}) VALUES ({marcadores})",
+            linhas,
+        )
+
+    @staticmethod
+    def consulta(tabela, campos, termos) -> Tuple[str, list]:
+        expressao = '{%s} : (%s)' % (' '.join(campos), ' AND '.join(f'"{t}"' for t in termos))
+        return (
+            f'SELECT rowid FROM {tabela} WHERE {tabela} MATCH %s ORDER BY bm25({tabela})',
+            [expressao],
+        )
+
+
+class _BackendPostgres:
+    """Tabela comum com índices GIN de trigramas (pg_trgm)."""
+
+    @staticmethod
+    def remover(cursor, tabela, ids):
+        cursor.execute(f'DELETE FROM {tabela} WHERE objeto_id = ANY(%s)', [list(ids)])
+
+    @staticmethod
+    def inserir(cursor, tabela, campos, linhas):
+        marcadores = ', '.join(['%s'] * (len(campos) + 1))
+        atualizacao = ', '.join(f'{campo} = EXCLUDED.{campo}' for campo in campos)
+        cursor.executemany(
+            f"INSERT INTO {tabela} (objeto_id, {', '.join(campos)}) VALUES ({marcadores}) "
+            f"ON CONFLICT (objeto_id) DO UPDATE SET {atualizacao}",
+            linhas,
+        )
+
+    @staticmethod
+    def consulta(tabela, campos, termos) -> Tuple[str, list]:
+        condicoes, params = [], []
+        for termo in termos:
+            condicoes.append('(%s)' % ' OR '.join(f'{campo} LIKE %s' for campo in campos))
+            params.extend([f'%{termo}%'] * len(campos))
+        texto = " || ' ' || ".join(campos)
+        return (
+            f"SELECT objeto_id FROM {tabela} WHERE {' AND '.join(condicoes)} "
+            f"ORDER BY similarity({texto}, %s) DESC",
+            params + [' '.join(termos)],
+        )
+
+
+BACKENDS = {
+    'sqlite': _BackendSqlite,
+    'postgresql': _BackendPostgres,
+}
+
+
+class BuscaService:
+    """Busca por trecho com índice de trigramas, normalizando acentos e caixa."""
+
+    @staticmethod
+    def tabela(tipo: str) -> str:
+        return f'notas_busca_{tipo}'
+
+    @staticmethod
+    def tipo_do_modelo(modelo) -> Optional[str]:
+        for tipo, (modelo_indice, _campos) in INDICES.items():
+            if modelo is modelo_indice:
+                return tipo
+        return None
+
+    @staticmethod
+    def _backend(using: str):
+        if not getattr(settings, 'BUSCA_TEXTO_ATIVA', True):
+            return None
+        return BACKENDS.get(connections[using].vendor)
+
+    @classmethod
+    def disponivel(cls, using: str = 'default') -> bool:
+        return cls._backend(using) is not None
+
+    # ------------------------------------------------------------------
+    # Manutenção do índice
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _linha(instancia, campos) -> tuple:
+        return (instancia.pk, *(normalizar_texto(getattr(instancia, campo)) for campo in campos))
+
+    @classmethod
+    def indexar_lote(cls, modelo, instancias: Iterable, using: Optional[str] = None):
+        """(Re)indexa as instâncias informadas de um modelo indexado."""
+        tipo = cls.tipo_do_modelo(modelo)
+        using = using or router.db_for_write(modelo)
+        backend = cls._backend(using)
+        if tipo is None or backend is None:
+            return
+        campos = INDICES[tipo][1]
+        linhas = [cls._linha(instancia, campos) for instancia in instancias]
+        if not linhas:
+            return
+        with connections[using].cursor() as cursor:
+            backend.remover(cursor, cls.tabela(tipo), [linha[0] for linha in linhas])
+            backend.inserir(cursor, cls.tabela(tipo), campos, linhas)
+
+    @classmethod
+    def indexar(cls, instancia, update_fields=None, using: Optional[str] = None):
+        tipo = cls.tipo_do_modelo(type(instancia))
+        if tipo is None:
+            return
+        if update_fields is not None and set(update_fields).isdisjoint(INDICES[tipo][1]):
+            return
+        cls.indexar_lote(type(instancia), [instancia], using=using)
+
+    @classmethod
+    def remover(cls, instancia, using: Optional[str] = None):
+        tipo = cls.tipo_do_modelo(type(instancia))
+        using = using or router.db_for_write(type(instancia))
+        backend = cls._backend(using)
+        if tipo is None or backend is None:
+            return
+        with connections[using].cursor() as cursor:
+            backend.remover(cursor, cls.tabela(tipo), [instancia.pk])
+
+    @classmethod
+    def reconstruir(cls, tipo: Optional[str] = None, using: str = 'default') -> Dict[str, int]:
+        """Apaga e refaz o índice (de um tipo ou de todos). Retorna linhas por tipo."""
+        backend = cls._backend(using)
+        if backend is None:
+            return {}
+        resultado = {}
+        for tipo_atual in ([tipo] if tipo else list(INDICES)):
+            modelo, campos = INDICES[tipo_atual]
+            tabela = cls.tabela(tipo_atual)
+            with connections[using].cursor() as cursor:
+                cursor.execute(f'DELETE FROM {tabela}')
+                lote, total = [], 0
+                valores = modelo._base_manager.using(using).values_list('pk', *campos)
+                for pk, *textos in valores.iterator(chunk_size=TAMANHO_LOTE):
+                    lote.append((pk, *(normalizar_texto(texto) for texto in textos)))
+                    if len(lote) >= TAMANHO_LOTE:
+                        backend.inserir(cursor, tabela, campos, lote)
+                        total += len(lote)
+                        lote = []
+                if lote:
+                    backend.inserir(cursor, tabela, campos, lote)
+                    total += len(lote)
+            resultado[tipo_atual] = total
+            logger.info('Índice de busca %s reconstruído: %s registro(s)', tipo_atual, total)
+        return resultado
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _filtro_icontains(campos: Sequence[str], palavras: Iterable[str]) -> Q:
+        filtro = Q()
+        for palavra in palavras:
+            qualquer_campo = Q()
+            for campo in campos:
+                qualquer_campo |= Q(**{f'{campo}__icontains': palavra})
+            filtro &= qualquer_campo
+        return filtro
+
+    @classmethod
+    def _consulta(cls, tipo: Optional[str], termo: str, campos: Sequence[str], using: str):
+        """
+        (sql, params, curtos) da consulta no índice, ou None se a busca deve
+        usar icontains (modelo não indexado, banco sem suporte ou só termos curtos).
+        """
+        backend = cls._backend(using)
+        if tipo is None or backend is None or not set(campos) <= set(INDICES[tipo][1]):
+            return None
+        termos = normalizar_texto(termo).split()
+        longos = [t for t in termos if len(t) >= TAMANHO_MINIMO_TRIGRAMA]
+        if not longos:
+            return None
+        sql, params = backend.consulta(cls.tabela(tipo), campos, longos)
+        curtos = [t for t in termos if len(t) < TAMANHO_MINIMO_TRIGRAMA]
+        return sql, params, curtos
+
+    @classmethod
+    def filtrar(cls, queryset: QuerySet, termo: str, campos: Optional[Sequence[str]] = None) -> QuerySet:
+        """
+        Restringe o queryset aos registros em que cada palavra de `termo` aparece
+        (como trecho) em algum dos `campos` (padrão: todos os indexados).
+        Mantém a ordenação do queryset.
+        """
+        palavras = (termo or '').split()
+        if not palavras:
+            return queryset
+        tipo = cls.tipo_do_modelo(queryset.model)
+        campos = tuple(campos or (INDICES[tipo][1] if tipo else ()))
+        consulta = cls._consulta(tipo, termo, campos, queryset.db)
+        if consulta is None:
+            return queryset.filter(cls._filtro_icontains(campos, palavras))
+        sql, params, curtos = consulta
+        # Trechos de 1-2 letras não passam pelo índice; são conferidos sobre o resultado
+        return queryset.filter(pk__in=RawSQL(sql, params)).filter(cls._filtro_icontains(campos, curtos))
+
+    @classmethod
+    def buscar(cls, tipo: str, termo: str, campos: Optional[Sequence[str]] = None, limite: int = 50) -> List:
+        """Instâncias de `tipo` que casam com `termo`, das mais relevantes para as menos."""
+        modelo, campos_indexados = INDICES[tipo]
+        campos = tuple(campos or campos_indexados)
+        queryset = modelo._default_manager.all()
+        consulta = cls._consulta(tipo, termo, campos, queryset.db)
+        if consulta is None:
+            return list(cls.filtrar(queryset, termo, campos)[:limite])
+        sql, params, curtos = consulta
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(f'{sql} LIMIT %s', params + [limite * 4 if curtos else limite])
+            ids = [linha[0] for linha in cursor.fetchall()]
+        encontrados = queryset.filter(pk__in=ids).filter(cls._filtro_icontains(campos, curtos)).in_bulk()
+        return [encontrados[pk] for pk in ids if pk in encontrados][:limite]
@@ -0,0 +1,174 @@
+"""
+Fechamento mensal de cobranças (clientes Mensalistas).
+
+Para uma competência (ano/mês), cada cliente Mensalista recebe uma única
+CobrancaCarregamento com todos os seus romaneios emitidos no mês que ainda
+não estão em nenhuma cobrança. A prévia sai de uma consulta agrupada por
+cliente; a geração cria as cobranças e os vínculos com bulk_create numa
+única transação.
+
+Cliente não tem tipo de cobrança próprio: vale o tipo_cliente da sua última
+cobrança de romaneio. Cliente sem histórico não entra no fechamento (seus
+romaneios seguem para a cobrança manual) até ter uma cobrança Mensalista
+lançada à mão. O valor do carregamento é a mensalidade dessa última
+cobrança e pode ser ajustado depois na edição da cobrança.
+"""
+import calendar
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import CobrancaCarregamento, RomaneioViagem
+
+ZERO = Decimal('0.00')
+TIPO_MENSALISTA = 'Mensalista'
+
+
+def _vinculos_cobranca():
+    return CobrancaCarregamento.romaneios.through.objects
+
+
+def _periodo(ano: int, mes: int) -> Tuple[datetime, datetime]:
+    """Início (inclusive) e fim (exclusivo) do mês no fuso do projeto."""
+    if not 1 <= mes <= 12:
+        raise ValueError(f'Mês inválido: {mes}')
+    inicio = timezone.make_aware(datetime(ano, mes, 1))
+    proximo = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+    return inicio, timezone.make_aware(datetime(*proximo, 1))
+
+
+def _ultima_cobranca_romaneio():
+    """Cobranças de romaneio do cliente da linha externa, da mais recente para a mais antiga."""
+    vinculadas = _vinculos_cobranca().filter(cobrancacarregamento_id=OuterRef('pk'))
+    return (
+        CobrancaCarregamento.objects
+        .filter(cliente_id=OuterRef('cliente_id'), origem_cobranca='ROMANEIO')
+        .filter(Exists(vinculadas))
+        .order_by('-criado_em', '-pk')
+    )
+
+
+class CobrancaMensalService:
+    """Prévia e geração das cobranças mensais."""
+
+    @staticmethod
+    def data_vencimento(ano: int, mes: int) -> date:
+        """Dia COBRANCA_MENSAL_DIA_VENCIMENTO (padrão 10) do mês seguinte à competência."""
+        dia = getattr(settings, 'COBRANCA_MENSAL_DIA_VENCIMENTO', 10)
+        ano_venc, mes_venc = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+        return date(ano_venc, mes_venc, min(dia, calendar.monthrange(ano_venc, mes_venc)[1]))
+
+    @staticmethod
+    def romaneios_a_cobrar(ano: int, mes: int, cliente_ids: Optional[Iterable[int]] = None):
+        """Romaneios emitidos na competência que ainda não estão em nenhuma cobrança."""
+        inicio, fim = _periodo(ano, mes)
+        cobrados = _vinculos_cobranca().filter(romaneioviagem_id=OuterRef('pk'))
+        romaneios = RomaneioViagem.objects.filter(
+            status='Emitido',
+            data_emissao__gte=inicio,
+            data_emissao__lt=fim,
+        ).exclude(Exists(cobrados))
+        if cliente_ids is not None:
+            romaneios = romaneios.filter(cliente_id__in=list(cliente_ids))
+        return romaneios
+
+    @classmethod
+    def previa(cls, ano: int, mes: int, cliente_ids: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Uma linha por cliente cuja última cobrança de romaneio é Mensalista,
+        com romaneios a cobrar (consulta
+        agrupada): quantidade, peso e valor das mercadorias e a mensalidade
+        que será lançada em valor_carregamento.
+        """
+        ultima = _ultima_cobranca_romaneio()
+        grupos = (
+            cls.romaneios_a_cobrar(ano, mes, cliente_ids)
+            .order_by()
+            .values('cliente_id', 'cliente__razao_social')
+            .annotate(
+                quantidade_romaneios=Count('pk'),
+                peso_total=Coalesce(Sum('peso_total'), ZERO),
+                valor_mercadorias=Coalesce(Sum('valor_total'), ZERO),
+                # Sem Coalesce: sem cobrança anterior o tipo é NULL e o cliente fica de fora
+                tipo_cliente=Subquery(ultima.values('tipo_cliente')[:1]),
+                valor_carregamento=Coalesce(Subquery(ultima.values('valor_carregamento')[:1]), ZERO),
+            )
+            .filter(tipo_cliente=TIPO_MENSALISTA)
+            .order_by('cliente__razao_social')
+        )
+        return [
+            {
+                'cliente_id': linha['cliente_id'],
+                'razao_social': linha['cliente__razao_social'],
+                'quantidade_romaneios': linha['quantidade_romaneios'],
+                'peso_total': linha['peso_total'],
+                'valor_mercadorias': linha['valor_mercadorias'],
+                'valor_carregamento': linha['valor_carregamento'],
+            }
+            for linha in grupos
+        ]
+
+    @classmethod
+    def gerar(cls, ano: int, mes: int, cliente_ids: Optional[Iterable[int]] = None) -> List[CobrancaCarregamento]:
+        """
+        Cria as cobranças da competência (status Pendente) e os vínculos com
+        os romaneios em uma transação. Romaneios já cobrados (inclusive por
+        uma execução anterior) ficam de fora, então repetir é seguro.
+        """
+        with transaction.atomic():
+            previa = cls.previa(ano, mes, cliente_ids)
+            if not previa:
+                return []
+
+            romaneios_por_cliente = defaultdict(list)
+            romaneios = (
+                cls.romaneios_a_cobrar(ano, mes, [linha['cliente_id'] for linha in previa])
+                .select_for_update()
+                .order_by('pk')
+                .values_list('pk', 'cliente_id')
+            )
+            for romaneio_id, cliente_id in romaneios:
+                romaneios_por_cliente[cliente_id].append(romaneio_id)
+
+            vencimento = cls.data_vencimento(ano, mes)
+            cobrancas = [
+                CobrancaCarregamento(
+                    cliente_id=linha['cliente_id'],
+                    origem_cobranca='ROMANEIO',
+                    tipo_cliente=TIPO_MENSALISTA,
+                    valor_carregamento=linha['valor_carregamento'],
+                    valor_cte_manifesto=ZERO,
+                    status='Pendente',
+                    data_vencimento=vencimento,
+                    observacoes=(
+                        f'Cobrança mensal {mes:02d}/{ano} - '
+                        f'{len(romaneios_por_cliente[linha["cliente_id"]])} romaneio(s)'
+                    ),
+                )
+                for linha in previa
+                if romaneios_por_cliente[linha['cliente_id']]
+            ]
+            CobrancaCarregamento.objects.bulk_create(cobrancas, batch_size=500)
+
+            Vinculo = CobrancaCarregamento.romaneios.through
+            Vinculo.objects.bulk_create(
+                (
+                    Vinculo(cobrancacarregamento_id=cobranca.pk, romaneioviagem_id=romaneio_id)
+                    for cobranca in cobrancas
+                    for romaneio_id in romaneios_por_cliente[cobranca.cliente_id]
+                ),
+                batch_size=1000,
+            )
+
+            # bulk_create não dispara post_save: invalida a conciliação semanal
+            # (pendentes a receber) como o sinal de CobrancaCarregamento faria
+            from financeiro.services import ConciliacaoSemanalService
+            transaction.on_commit(ConciliacaoSemanalService.invalidar_cache)
+        return cobrancas
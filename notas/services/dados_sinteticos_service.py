@@ -0,0 +1,288 @@
+"""
+Massa de dados sintética para benchmarks e testes de carga.
+
+Gera clientes, motoristas, veículos, notas fiscais, romaneios (com vínculos),
+logs de auditoria e um período de caixa com movimentos, tudo com
+bulk_create em lotes. O que os sinais fariam num save() comum é refeito em
+massa no fim: status das notas e totais/seguro dos romaneios já saem
+calculados, o índice de busca é atualizado (BuscaService.indexar_lote), o
+livro caixa é recalculado e os resumos do dashboard do período gerado são
+reconstruídos.
+
+Os dados são determinísticos para a mesma semente. Cada chamada reserva uma
+"rodada" na sequência dados_sinteticos (SequenciaService), que entra nos
+campos únicos (razão social, CNPJ, CPF, placa, código), então é possível
+gerar mais de uma massa no mesmo banco.
+
+Uso:
+    massa = DadosSinteticosService.gerar(clientes=50, notas=10000, romaneios=1000)
+"""
+import logging
+import random
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import (
+    AuditoriaLog,
+    Cliente,
+    Motorista,
+    NotaFiscal,
+    RomaneioViagem,
+    TabelaSeguro,
+    Usuario,
+    Veiculo,
+    VinculoNotaRomaneio,
+)
+from ..utils.constants import ESTADOS_BRASIL
+from ..utils.nota_ordering import chave_ordenacao_persistida
+from .busca_service import BuscaService
+from .resumo_dashboard_service import ResumoDashboardService
+from .sequencia_service import SequenciaService
+from .totalizador_service import TotalizadorService
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_LOTE = 1000
+CENTAVOS = Decimal('0.01')
+SEQUENCIA = 'dados_sinteticos'
+UFS = [uf for uf, _nome in ESTADOS_BRASIL]
+MERCADORIAS = (
+    'CIMENTO', 'ARGAMASSA', 'TIJOLO', 'TELHA', 'AREIA', 'BRITA', 'CAL', 'FERRO',
+    'MADEIRA', 'PISO', 'AZULEJO', 'TINTA', 'TUBO PVC', 'FIO ELETRICO', 'GESSO',
+)
+FORNECEDORES = tuple(f'FORNECEDOR SINTETICO {i:02d}' for i in range(1, 31))
+LETRAS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def _placa(rodada: int, indice: int) -> str:
+    """Placa única por (rodada, índice): três letras da rodada e quatro dígitos."""
+    letras = ''
+    for _ in range(3):
+        rodada, resto = divmod(rodada, len(LETRAS))
+        letras = LETRAS[resto] + letras
+    return f'{letras}{indice:04d}'
+
+
+def _decimal(rnd: random.Random, minimo: float, maximo: float) -> Decimal:
+    return Decimal(str(rnd.uniform(minimo, maximo))).quantize(CENTAVOS)
+
+
+class DadosSinteticosService:
+    """Geração de massa de dados sintética com inserções em lote."""
+
+    @staticmethod
+    def _usuario(usuario: Optional[Usuario], prefixo: str) -> Usuario:
+        if usuario is not None:
+            return usuario
+        existente = Usuario.objects.filter(tipo_usuario='admin', is_active=True).order_by('pk').first()
+        if existente is not None:
+            return existente
+        return Usuario.objects.create_user(
+            username=f'{prefixo.lower()}_admin', password=None, tipo_usuario='admin', is_staff=True
+        )
+
+    @classmethod
+    @transaction.atomic
+    def gerar(
+        cls,
+        clientes: int = 50,
+        notas: int = 5000,
+        romaneios: int = 500,
+        movimentos: int = 1000,
+        logs_auditoria: int = 1000,
+        dias: int = 180,
+        semente: int = 42,
+        prefixo: str = 'SINT',
+        usuario: Optional[Usuario] = None,
+    ) -> Dict[str, Any]:
+        """
+        Gera a massa e retorna as quantidades criadas, a rodada, o intervalo
+        de datas (data_inicio, data_fim), o periodo_id do caixa e o
+        usuario_id usado.
+
+        Args:
+            notas: total de notas, distribuídas entre os clientes
+            romaneios: romaneios com 1 a 8 notas cada (70% emitidos); limitado
+                pelas notas disponíveis
+            dias: as datas caem nos últimos `dias` dias
+            usuario: dono do período de caixa e dos logs (padrão: primeiro admin)
+        """
+        clientes = max(1, clientes)
+        rnd = random.Random(semente)
+        rodada = SequenciaService.proximo_valor(SEQUENCIA, 0)
+        usuario = cls._usuario(usuario, prefixo)
+        data_fim = timezone.localdate()
+        data_inicio = data_fim - timedelta(days=max(1, dias) - 1)
+
+        def data_aleatoria() -> date:
+            return data_inicio + timedelta(days=rnd.randrange((data_fim - data_inicio).days + 1))
+
+        # Clientes, motoristas e veículos
+        objs_clientes = Cliente.objects.bulk_create([
+            Cliente(
+                razao_social=f'{prefixo} {rodada:03d} CLIENTE {i:05d} LTDA',
+                nome_fantasia=f'{prefixo} {rnd.choice(MERCADORIAS)} {i:05d}',
+                cnpj=f'9{rodada:05d}{i:08d}',
+                cidade=f'CIDADE {rnd.randrange(1, 100):02d}',
+                estado=rnd.choice(UFS),
+                status='Ativo',
+            )
+            for i in range(clientes)
+        ], batch_size=TAMANHO_LOTE)
+        BuscaService.indexar_lote(Cliente, objs_clientes)
+
+        frota = min(9999, max(1, romaneios // 10))
+        objs_motoristas = Motorista.objects.bulk_create([
+            Motorista(nome=f'{prefixo} MOTORISTA {i:04d}', cpf=f'{rodada:05d}{i:06d}', cnh=f'{rodada:05d}{i:06d}')
+            for i in range(frota)
+        ], batch_size=TAMANHO_LOTE)
+        objs_veiculos = Veiculo.objects.bulk_create([
+            Veiculo(placa=_placa(rodada, i), tipo_unidade='Caminhão', marca='SINTETICA', ano_fabricacao=2020)
+            for i in range(frota)
+        ], batch_size=TAMANHO_LOTE)
+
+        # Notas (ainda sem pk), agrupadas por cliente para montar os romaneios
+        objs_notas = []
+        notas_por_cliente = {cliente.pk: [] for cliente in objs_clientes}
+        for i in range(notas):
+            cliente = objs_clientes[i % clientes]
+            numero = str(len(notas_por_cliente[cliente.pk]) + 1)
+            nota = NotaFiscal(
+                cliente_id=cliente.pk,
+                nota=numero,
+                ordem_nota=chave_ordenacao_persistida(numero),
+                data=data_aleatoria(),
+                fornecedor=rnd.choice(FORNECEDORES),
+                mercadoria=f'{rnd.choice(MERCADORIAS)} {rnd.randrange(1, 50):02d}',
+                quantidade=Decimal(rnd.randrange(1, 200)).quantize(CENTAVOS),
+                peso=Decimal(rnd.randrange(10, 5000)).quantize(CENTAVOS),
+                valor=_decimal(rnd, 100, 50000),
+                status='Depósito',
+                local=rnd.choice((None, '1', '2', '3', '4', '5')),
+            )
+            objs_notas.append(nota)
+            notas_por_cliente[cliente.pk].append(nota)
+
+        # Romaneios: cada um leva as próximas notas livres de um cliente
+        percentuais = dict(TabelaSeguro.objects.values_list('estado', 'percentual_seguro'))
+        livres = {pk: list(reversed(lista)) for pk, lista in notas_por_cliente.items()}
+        objs_romaneios, notas_do_romaneio = [], []
+        for i in range(romaneios):
+            cliente = objs_clientes[rnd.randrange(clientes)]
+            if not livres[cliente.pk]:
+                cliente = next((c for c in objs_clientes if livres[c.pk]), None)
+                if cliente is None:
+                    break
+            pilha = livres[cliente.pk]
+            selecionadas = [pilha.pop() for _ in range(min(len(pilha), rnd.randint(1, 8)))]
+            status = 'Emitido' if rnd.random() < 0.7 else 'Salvo'
+            if status == 'Emitido':
+                for nota in selecionadas:
+                    nota.status = 'Enviada'
+            emissao = timezone.make_aware(datetime.combine(data_aleatoria(), time(rnd.randrange(6, 19))))
+            valor_total = sum(nota.valor for nota in selecionadas)
+            percentual = percentuais.get(cliente.estado)
+            motorista = objs_motoristas[i % frota]
+            objs_romaneios.append(RomaneioViagem(
+                codigo=f'{prefixo}-{rodada:03d}-{i:06d}',
+                status=status,
+                cliente_id=cliente.pk,
+                motorista_id=motorista.pk,
+                veiculo_principal_id=objs_veiculos[i % frota].pk,
+                data_emissao=emissao,
+                data_saida=emissao,
+                destino_estado=cliente.estado,
+                peso_total=sum(nota.peso for nota in selecionadas),
+                valor_total=valor_total,
+                quantidade_total=sum(nota.quantidade for nota in selecionadas),
+                percentual_seguro=percentual if percentual is not None else Decimal('0.00'),
+                valor_seguro=(valor_total * percentual / 100) if percentual is not None else Decimal('0.00'),
+                usuario_criacao=usuario,
+            ))
+            notas_do_romaneio.append(selecionadas)
+
+        NotaFiscal.objects.bulk_create(objs_notas, batch_size=TAMANHO_LOTE)
+        BuscaService.indexar_lote(NotaFiscal, objs_notas)
+        RomaneioViagem.objects.bulk_create(objs_romaneios, batch_size=TAMANHO_LOTE)
+        BuscaService.indexar_lote(RomaneioViagem, objs_romaneios)
+        VinculoNotaRomaneio.objects.bulk_create([
+            VinculoNotaRomaneio(romaneio_id=romaneio.pk, nota_fiscal_id=nota.pk, status_romaneio=romaneio.status)
+            for romaneio, selecionadas in zip(objs_romaneios, notas_do_romaneio)
+            for nota in selecionadas
+        ], batch_size=TAMANHO_LOTE)
+
+        # Auditoria: criação de notas
+        AuditoriaLog.objects.bulk_create([
+            AuditoriaLog(
+                modelo='NotaFiscal',
+                objeto_id=nota.pk,
+                acao='CREATE',
+                dados_novos={'nota': nota.nota, 'cliente_id': nota.cliente_id, 'valor': str(nota.valor)},
+                usuario=usuario,
+                observacoes=f'{prefixo} rodada {rodada}',
+            )
+            for nota in (objs_notas[i % len(objs_notas)] for i in range(logs_auditoria if objs_notas else 0))
+        ], batch_size=TAMANHO_LOTE)
+
+        periodo_id = cls._gerar_caixa(rnd, movimentos, data_inicio, data_fim, usuario, prefixo, rodada)
+
+        ResumoDashboardService.reconciliar(data_inicio, data_fim)
+        TotalizadorService.invalidar_cache()
+
+        massa = {
+            'rodada': rodada,
+            'clientes': len(objs_clientes),
+            'motoristas': len(objs_motoristas),
+            'veiculos': len(objs_veiculos),
+            'notas': len(objs_notas),
+            'romaneios': len(objs_romaneios),
+            'movimentos': movimentos if periodo_id else 0,
+            'logs_auditoria': logs_auditoria if objs_notas else 0,
+            'periodo_id': periodo_id,
+            'usuario_id': usuario.pk,
+            'data_inicio': data_inicio,
+            'data_fim': data_fim,
+        }
+        logger.info('Massa sintética gerada: %s', massa)
+        return massa
+
+    @staticmethod
+    def _gerar_caixa(rnd, movimentos, data_inicio, data_fim, usuario, prefixo, rodada) -> Optional[int]:
+        """Período de caixa fechado com entradas e saídas; o livro caixa é recalculado no fim."""
+        if movimentos <= 0:
+            return None
+        from financeiro.models import MovimentoCaixa, PeriodoMovimentoCaixa
+        from financeiro.services import ConciliacaoSemanalService, LivroCaixaService
+
+        periodo = PeriodoMovimentoCaixa.objects.create(
+            nome=f'{prefixo} {rodada:03d}',
+            data_inicio=data_inicio,
+            data_fim=data_fim,
+            valor_inicial_caixa=Decimal('1000.00'),
+            status='Fechado',
+            usuario_criacao=usuario,
+        )
+        categorias = {
+            'Entrada': [codigo for codigo, _nome in MovimentoCaixa.CATEGORIA_ENTRADA_CHOICES],
+            'Saida': [codigo for codigo, _nome in MovimentoCaixa.CATEGORIA_SAIDA_CHOICES],
+        }
+        objs = []
+        for i in range(movimentos):
+            tipo = 'Entrada' if rnd.random() < 0.6 else 'Saida'
+            objs.append(MovimentoCaixa(
+                data=data_inicio + timedelta(days=rnd.randrange((data_fim - data_inicio).days + 1)),
+                tipo=tipo,
+                valor=_decimal(rnd, 10, 5000),
+                descricao=f'{prefixo} MOVIMENTO {i:06d}',
+                categoria=rnd.choice(categorias[tipo]),
+                periodo=periodo,
+                usuario_criacao=usuario,
+            ))
+        MovimentoCaixa.objects.bulk_create(objs, batch_size=TAMANHO_LOTE)
+        LivroCaixaService.recalcular(periodo.pk)
+        ConciliacaoSemanalService.invalidar_cache()
+        return periodo.pk
@@ -0,0 +1,462 @@
+"""
+Importação em lote de notas fiscais (planilhas CSV/XLSX e XML de NF-e).
+
+Os arquivos são lidos em fluxo, registro a registro (csv.reader, openpyxl em
+modo read_only, ElementTree.iterparse), e as notas válidas são gravadas com
+bulk_create em lotes de IMPORTACAO_NOTAS_TAMANHO_LOTE (padrão 1000), cada
+lote em sua própria transação.
+
+Cada registro passa pelas mesmas regras do NotaFiscalForm (número só com
+dígitos, peso inteiro, galpão válido) e pela chave de
+unique_nota_fiscal_por_campos_chave: as chaves já gravadas são buscadas uma
+vez por lote e acumuladas num único conjunto junto com as do próprio
+arquivo, então duplicatas viram erro da linha em vez de IntegrityError.
+
+Como bulk_create não dispara os sinais de NotaFiscal, ao fim de cada lote o
+índice de busca é atualizado (BuscaService.indexar_lote) e, ao fim da
+importação, os resumos do dashboard do período importado são reconstruídos
+e o cache dos totalizadores é invalidado.
+
+Colunas aceitas nas planilhas (cabeçalho na primeira linha, sem acentos e
+caixa indiferentes): nota, cliente (CNPJ ou razão social), data, fornecedor,
+mercadoria, quantidade, peso, valor e local. No XML de NF-e o cliente é o
+destinatário (CNPJ/CPF), o fornecedor é o emitente, a mercadoria é o
+primeiro produto e quantidade/peso vêm dos volumes do transporte.
+
+CSV fora da codificação pedida (o comum é a exportação do Excel em
+Windows-1252) é detectado pelo início do arquivo e lido em cp1252. Arquivos
+ilegíveis (codificação, CSV malformado, XLSX corrompido ou renomeado) viram
+ErroImportacao, como XML inválido.
+"""
+import codecs
+import csv
+import io
+import logging
+import os
+import re
+import unicodedata
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from ..models import Cliente, NotaFiscal
+from ..utils.nota_ordering import chave_ordenacao_persistida
+from .busca_service import BuscaService
+from .resumo_dashboard_service import ResumoDashboardService
+from .totalizador_service import TotalizadorService
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ('csv', 'xlsx', 'xml')
+CAMPOS_CHAVE = ('nota', 'cliente_id', 'mercadoria', 'quantidade', 'peso')
+CENTAVOS = Decimal('0.01')
+VALOR_MAXIMO = Decimal('99999999.99')  # max_digits=10, decimal_places=2
+FORMATOS_DATA = ('%Y-%m-%d', '%d/%m/%Y', '%d/%m/%y')
+ENCODING_ALTERNATIVO = 'cp1252'
+TAMANHO_AMOSTRA = 64 * 1024
+
+# Nome normalizado da coluna -> campo da nota
+COLUNAS = {
+    'nota': 'nota', 'numero': 'nota', 'numero_nota': 'nota', 'nf': 'nota', 'nfe': 'nota',
+    'cliente': 'cliente', 'cnpj': 'cliente', 'cnpj_cliente': 'cliente', 'razao_social': 'cliente',
+    'data': 'data', 'data_emissao': 'data', 'emissao': 'data',
+    'fornecedor': 'fornecedor', 'emitente': 'fornecedor',
+    'mercadoria': 'mercadoria', 'produto': 'mercadoria',
+    'quantidade': 'quantidade', 'qtd': 'quantidade', 'volumes': 'quantidade',
+    'peso': 'peso', 'peso_kg': 'peso',
+    'valor': 'valor', 'valor_nota': 'valor', 'valor_total': 'valor',
+    'local': 'local', 'galpao': 'local',
+}
+OBRIGATORIOS = ('nota', 'data', 'fornecedor', 'mercadoria', 'quantidade', 'peso', 'valor')
+
+
+class ErroImportacao(ValueError):
+    """Arquivo que não pode ser importado (formato, cabeçalho ou cliente inválidos)."""
+
+
+# ============================================================================
+# LEITURA DOS ARQUIVOS (um dicionário por registro)
+# ============================================================================
+
+def _normalizar_coluna(nome) -> str:
+    texto = unicodedata.normalize('NFKD', str(nome or '')).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '_', texto.strip().lower()).strip('_')
+
+
+def _mapear_cabecalho(cabecalho) -> List[Optional[str]]:
+    campos = [COLUNAS.get(_normalizar_coluna(nome)) for nome in cabecalho]
+    faltando = [campo for campo in OBRIGATORIOS if campo not in campos]
+    if faltando:
+        raise ErroImportacao(f'Colunas obrigatórias ausentes: {", ".join(faltando)}')
+    return campos
+
+
+def _registros(linhas: Iterator, inicio: int) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """(número da linha, valores) a partir de um iterador de linhas cujo primeiro item é o cabeçalho."""
+    try:
+        campos = _mapear_cabecalho(next(linhas))
+    except StopIteration:
+        raise ErroImportacao('Arquivo vazio.')
+    for numero, linha in enumerate(linhas, start=inicio):
+        if not any(valor not in (None, '') for valor in linha):
+            continue
+        yield numero, {campo: valor for campo, valor in zip(campos, linha) if campo}
+
+
+def _detectar_encoding(arquivo, encoding: str) -> str:
+    """`encoding` se decodifica o início do arquivo, senão cp1252."""
+    try:
+        decodificador = codecs.getincrementaldecoder(encoding)()
+    except LookupError:
+        raise ErroImportacao(f'Codificação desconhecida: {encoding}')
+    amostra = arquivo.read(TAMANHO_AMOSTRA)
+    arquivo.seek(0)
+    try:
+        decodificador.decode(amostra, final=False)
+    except UnicodeDecodeError:
+        logger.info('CSV não está em %s; lendo como %s', encoding, ENCODING_ALTERNATIVO)
+        return ENCODING_ALTERNATIVO
+    return encoding
+
+
+def ler_csv(arquivo, encoding: str = 'utf-8-sig') -> Iterator[Tuple[int, Dict[str, Any]]]:
+    encoding = _detectar_encoding(arquivo, encoding)
+    texto = io.TextIOWrapper(arquivo, encoding=encoding, newline='')
+    linhas = None
+    try:
+        primeira = texto.readline()
+        delimitador = ';' if primeira.count(';') > primeira.count(',') else ','
+        linhas = csv.reader(_encadear([primeira], texto), delimiter=delimitador)
+        yield from _registros(linhas, inicio=2)
+    except UnicodeDecodeError as e:
+        linha = linhas.line_num if linhas else 1
+        raise ErroImportacao(f'Codificação inválida ({encoding}) após a linha {linha}: {e.reason}')
+    except csv.Error as e:
+        linha = linhas.line_num if linhas else 1
+        raise ErroImportacao(f'CSV inválido na linha {linha}: {e}')
+    finally:
+        texto.detach()
+
+
+def _encadear(primeiras, resto):
+    yield from primeiras
+    # Sem "yield from": fechar o gerador não deve fechar o arquivo (resto.close())
+    for linha in resto:
+        yield linha
+
+
+def ler_xlsx(arquivo) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        wb = load_workbook(arquivo, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as e:
+        raise ErroImportacao(f'Planilha XLSX inválida ou corrompida: {e}')
+    try:
+        yield from _registros(wb.active.iter_rows(values_only=True), inicio=2)
+    finally:
+        wb.close()
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _texto(elemento, caminho: str, ns: str) -> Optional[str]:
+    encontrado = elemento.find('/'.join(f'{ns}{parte}' for parte in caminho.split('/')))
+    return encontrado.text.strip() if encontrado is not None and encontrado.text else None
+
+
+def _soma(elementos, ns: str, *tags: str):
+    """Soma a primeira tag presente de cada elemento (ex.: pesoB, senão pesoL)."""
+    total, achou = Decimal('0'), False
+    for elemento in elementos:
+        for tag in tags:
+            valor = _texto(elemento, tag, ns)
+            if valor:
+                try:
+                    total += Decimal(valor)
+                except InvalidOperation:
+                    return valor  # vira erro de validação do registro
+                achou = True
+                break
+    return total if achou else None
+
+
+def _registro_nfe(inf, ns: str) -> Dict[str, Any]:
+    produtos = inf.findall(f'{ns}det/{ns}prod')
+    volumes = inf.findall(f'{ns}transp/{ns}vol')
+    emissao = _texto(inf, 'ide/dhEmi', ns) or _texto(inf, 'ide/dEmi', ns)
+    quantidade = _soma(volumes, ns, 'qVol')
+    if quantidade is None:
+        quantidade = _soma(produtos, ns, 'qCom')
+    return {
+        'nota': _texto(inf, 'ide/nNF', ns),
+        'cliente': _texto(inf, 'dest/CNPJ', ns) or _texto(inf, 'dest/CPF', ns),
+        'data': emissao[:10] if emissao else None,
+        'fornecedor': _texto(inf, 'emit/xNome', ns),
+        'mercadoria': _texto(produtos[0], 'xProd', ns) if produtos else None,
+        'quantidade': quantidade,
+        'peso': _soma(volumes, ns, 'pesoB', 'pesoL'),
+        'valor': _texto(inf, 'total/ICMSTot/vNF', ns),
+    }
+
+
+def ler_xml(arquivo) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Uma entrada por infNFe, em qualquer nível do arquivo (NF-e avulsa,
+    nfeProc ou lote com várias). Elementos já lidos são descartados.
+    """
+    raiz = None
+    numero = 0
+    try:
+        for evento, elemento in ElementTree.iterparse(arquivo, events=('start', 'end')):
+            if raiz is None:
+                raiz = elemento
+            if evento != 'end' or _local(elemento.tag) != 'infNFe':
+                continue
+            numero += 1
+            ns = elemento.tag[:elemento.tag.index('}') + 1] if elemento.tag.startswith('{') else ''
+            yield numero, _registro_nfe(elemento, ns)
+            raiz.clear()
+    except ElementTree.ParseError as e:
+        raise ErroImportacao(f'XML inválido após a NF-e {numero}: {e}')
+
+
+# ============================================================================
+# CONVERSÃO E VALIDAÇÃO DE UM REGISTRO
+# ============================================================================
+
+def _decimal(valor) -> Decimal:
+    if isinstance(valor, Decimal):
+        return valor
+    if isinstance(valor, (int, float)):
+        return Decimal(str(valor))
+    texto = str(valor).strip().replace('R$', '').replace(' ', '')
+    if ',' in texto:
+        texto = texto.replace('.', '').replace(',', '.')
+    return Decimal(texto)
+
+
+def _data(valor) -> date:
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = str(valor).strip()
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    raise ValueError(texto)
+
+
+def _texto_celula(valor) -> str:
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip() if valor is not None else ''
+
+
+def _digitos(valor) -> str:
+    return re.sub(r'\D', '', valor or '')
+
+
+class ImportacaoNotasService:
+    """Importação em lote de notas fiscais."""
+
+    @staticmethod
+    def formato_do_arquivo(nome: str) -> str:
+        extensao = os.path.splitext(nome or '')[1].lower().lstrip('.')
+        if extensao not in FORMATOS:
+            raise ErroImportacao(f'Formato não suportado: "{extensao or nome}" (use CSV, XLSX ou XML).')
+        return extensao
+
+    @staticmethod
+    def ler(arquivo, formato: str, encoding: str = 'utf-8-sig') -> Iterator[Tuple[int, Dict[str, Any]]]:
+        if formato == 'csv':
+            return ler_csv(arquivo, encoding=encoding)
+        if formato == 'xlsx':
+            return ler_xlsx(arquivo)
+        if formato == 'xml':
+            return ler_xml(arquivo)
+        raise ErroImportacao(f'Formato não suportado: {formato}')
+
+    @staticmethod
+    def _mapa_clientes() -> Dict[str, int]:
+        """CNPJ (só dígitos) e razão social (maiúsculas) -> id, em uma consulta."""
+        mapa = {}
+        for pk, cnpj, razao_social in Cliente.objects.values_list('pk', 'cnpj', 'razao_social'):
+            if cnpj:
+                mapa[_digitos(cnpj)] = pk
+            mapa[razao_social.upper()] = pk
+        return mapa
+
+    @staticmethod
+    def _montar_nota(valores: Dict[str, Any], clientes: Dict[str, int], cliente_padrao: Optional[int]):
+        """(NotaFiscal não salva, None) ou (None, mensagem de erro)."""
+        faltando = [campo for campo in OBRIGATORIOS if _texto_celula(valores.get(campo)) == '']
+        if faltando:
+            return None, f'Campos obrigatórios vazios: {", ".join(faltando)}'
+
+        nota = _texto_celula(valores['nota'])
+        if not nota.isdigit():
+            return None, f'Número da Nota deve conter apenas números: "{nota}"'
+
+        cliente_id = cliente_padrao
+        identificacao = _texto_celula(valores.get('cliente'))
+        if identificacao:
+            cliente_id = clientes.get(_digitos(identificacao)) or clientes.get(identificacao.upper())
+            if cliente_id is None:
+                return None, f'Cliente não encontrado: "{identificacao}"'
+        if cliente_id is None:
+            return None, 'Cliente não informado'
+
+        try:
+            data = _data(valores['data'])
+        except ValueError:
+            return None, f'Data inválida: "{_texto_celula(valores["data"])}"'
+
+        numeros = {}
+        for campo in ('quantidade', 'peso', 'valor'):
+            try:
+                numero = _decimal(valores[campo])
+            except (InvalidOperation, ValueError):
+                return None, f'{campo.capitalize()} inválido: "{_texto_celula(valores[campo])}"'
+            if not numero.is_finite() or numero < 0 or numero > VALOR_MAXIMO:
+                return None, f'{campo.capitalize()} fora do intervalo: {numero}'
+            numeros[campo] = numero.quantize(CENTAVOS)
+        # Mesma regra do NotaFiscalForm.clean_peso: peso inteiro
+        numeros['peso'] = Decimal(int(numeros['peso'])).quantize(CENTAVOS)
+
+        local = _texto_celula(valores.get('local')) or None
+        if local is not None and local not in dict(NotaFiscal.LOCAL_CHOICES):
+            return None, f'Local inválido: "{local}"'
+
+        fornecedor = _texto_celula(valores['fornecedor'])
+        mercadoria = _texto_celula(valores['mercadoria'])
+        for campo, texto in (('nota', nota), ('fornecedor', fornecedor), ('mercadoria', mercadoria)):
+            limite = NotaFiscal._meta.get_field(campo).max_length
+            if len(texto) > limite:
+                return None, f'{campo.capitalize()} excede {limite} caracteres'
+
+        return NotaFiscal(
+            cliente_id=cliente_id,
+            nota=nota,
+            ordem_nota=chave_ordenacao_persistida(nota),
+            data=data,
+            fornecedor=fornecedor.upper(),
+            mercadoria=mercadoria.upper(),
+            status='Depósito',
+            local=local,
+            **numeros,
+        ), None
+
+    @staticmethod
+    def _chave(nota: NotaFiscal) -> tuple:
+        return tuple(getattr(nota, campo) for campo in CAMPOS_CHAVE)
+
+    @classmethod
+    def _gravar_lote(cls, lote, chaves: set, erros: list, dry_run: bool) -> List[NotaFiscal]:
+        """
+        Descarta as duplicadas (no banco ou no próprio arquivo) e grava o
+        restante com bulk_create. Se outro processo gravar a mesma chave no
+        meio tempo, o lote é refeito nota a nota para apontar a linha.
+        """
+        chaves.update(
+            NotaFiscal.objects.filter(
+                cliente_id__in={nota.cliente_id for _linha, nota in lote},
+                nota__in={nota.nota for _linha, nota in lote},
+            ).values_list(*CAMPOS_CHAVE)
+        )
+        novas = []
+        for linha, nota in lote:
+            chave = cls._chave(nota)
+            if chave in chaves:
+                erros.append((linha, f'Nota {nota.nota} duplicada (mesmo cliente, mercadoria, quantidade e peso)'))
+                continue
+            chaves.add(chave)
+            novas.append((linha, nota))
+        if dry_run or not novas:
+            return [nota for _linha, nota in novas]
+
+        try:
+            with transaction.atomic():
+                return NotaFiscal.objects.bulk_create([nota for _linha, nota in novas])
+        except IntegrityError:
+            gravadas = []
+            for linha, nota in novas:
+                try:
+                    with transaction.atomic():
+                        gravadas.extend(NotaFiscal.objects.bulk_create([nota]))
+                except IntegrityError as e:
+                    erros.append((linha, f'Nota {nota.nota} não gravada: {e}'))
+            return gravadas
+
+    @classmethod
+    def importar(
+        cls,
+        registros: Iterable[Tuple[int, Dict[str, Any]]],
+        cliente: Optional[Cliente] = None,
+        dry_run: bool = False,
+        tamanho_lote: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Importa os registros lidos por ler()/ler_csv/ler_xlsx/ler_xml.
+
+        Args:
+            cliente: cliente usado quando o registro não traz o seu
+            dry_run: só valida (inclusive duplicidade), sem gravar
+
+        Returns:
+            dict: {'lidas', 'importadas', 'erros': [(linha, mensagem), ...]}
+        """
+        tamanho_lote = tamanho_lote or getattr(settings, 'IMPORTACAO_NOTAS_TAMANHO_LOTE', 1000)
+        clientes = cls._mapa_clientes()
+        cliente_padrao = cliente.pk if cliente else None
+        chaves: set = set()
+        erros: List[Tuple[int, str]] = []
+        lidas = importadas = 0
+        datas: set = set()
+        lote = []
+
+        def gravar():
+            nonlocal importadas
+            gravadas = cls._gravar_lote(lote, chaves, erros, dry_run)
+            importadas += len(gravadas)
+            if gravadas and not dry_run:
+                datas.update(nota.data for nota in gravadas)
+                BuscaService.indexar_lote(NotaFiscal, gravadas)
+            lote.clear()
+
+        try:
+            for linha, valores in registros:
+                lidas += 1
+                nota, erro = cls._montar_nota(valores, clientes, cliente_padrao)
+                if erro:
+                    erros.append((linha, erro))
+                    continue
+                lote.append((linha, nota))
+                if len(lote) >= tamanho_lote:
+                    gravar()
+        except ErroImportacao as e:
+            # Arquivo ilegível a partir deste ponto: o que já foi lido é gravado
+            erros.append((0, str(e)))
+        if lote:
+            gravar()
+
+        if datas:
+            ResumoDashboardService.reconciliar(min(datas), max(datas))
+            TotalizadorService.invalidar_cache()
+        logger.info(
+            'Importação de notas: %d lida(s), %d importada(s), %d erro(s)%s',
+            lidas, importadas, len(erros), ' [dry-run]' if dry_run else '',
+        )
+        erros.sort()
+        return {'lidas': lidas, 'importadas': importadas, 'erros': erros}
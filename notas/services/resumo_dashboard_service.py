@@ -0,0 +1,285 @@
+"""
+Serviço de resumos (rollup) diários do dashboard.
+
+As tabelas ResumoDiarioNotaFiscal e ResumoDiarioRomaneio guardam contagens
+e somas já agregadas por dia/cliente/status(/UF). Os sinais recalculam apenas
+os "baldes" afetados a cada gravação; o comando `reconciliar_resumos_dashboard`
+reconstrói tudo (ou um intervalo) a partir das tabelas de origem.
+"""
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from ..models import (
+    Cliente,
+    NotaFiscal,
+    ResumoDiarioNotaFiscal,
+    ResumoDiarioRomaneio,
+    RomaneioViagem,
+)
+
+
+# Chave de um balde: (data, cliente_id, status) para notas e
+# (data, cliente_id, status, uf) para romaneios.
+BaldeNota = Tuple[date, int, str]
+BaldeRomaneio = Tuple[date, int, str, str]
+
+
+def _normalizar_uf(uf: Optional[str]) -> str:
+    return (uf or '').strip().upper()[:2]
+
+
+def data_local(valor) -> Optional[date]:
+    """Converte DateTimeField (aware) para a data local usada nos resumos."""
+    if valor is None:
+        return None
+    if hasattr(valor, 'date'):
+        if timezone.is_aware(valor):
+            return timezone.localtime(valor).date()
+        return valor.date()
+    return valor
+
+
+class ResumoDashboardService:
+    """Mantém e consulta os resumos diários usados pelo dashboard."""
+
+    # ------------------------------------------------------------------
+    # Manutenção incremental
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def balde_nota(nota_fiscal) -> Optional[BaldeNota]:
+        if not nota_fiscal.data or not nota_fiscal.cliente_id:
+            return None
+        return (nota_fiscal.data, nota_fiscal.cliente_id, nota_fiscal.status)
+
+    @staticmethod
+    def balde_romaneio(romaneio) -> Optional[BaldeRomaneio]:
+        if not romaneio.data_emissao or not romaneio.cliente_id:
+            return None
+        return (
+            data_local(romaneio.data_emissao),
+            romaneio.cliente_id,
+            romaneio.status,
+            _normalizar_uf(romaneio.destino_estado),
+        )
+
+    @staticmethod
+    def recalcular_baldes_notas(baldes: Iterable[Optional[BaldeNota]]) -> None:
+        """Recalcula os baldes de notas informados a partir de NotaFiscal."""
+        for balde in {b for b in baldes if b}:
+            data, cliente_id, status = balde
+            totais = NotaFiscal.objects.filter(
+                data=data, cliente_id=cliente_id, status=status
+            ).aggregate(quantidade=Count('id'), valor=Sum('valor'))
+            filtro = {'data': data, 'cliente_id': cliente_id, 'status': status}
+            if not totais['quantidade']:
+                ResumoDiarioNotaFiscal.objects.filter(**filtro).delete()
+                continue
+            uf = Cliente.objects.filter(pk=cliente_id).values_list('estado', flat=True).first()
+            ResumoDiarioNotaFiscal.objects.update_or_create(
+                **filtro,
+                defaults={
+                    'uf': _normalizar_uf(uf),
+                    'quantidade': totais['quantidade'],
+                    'valor_total': totais['valor'] or Decimal('0.00'),
+                },
+            )
+
+    @staticmethod
+    def recalcular_baldes_romaneios(baldes: Iterable[Optional[BaldeRomaneio]]) -> None:
+        """Recalcula os baldes de romaneios informados a partir de RomaneioViagem."""
+        for balde in {b for b in baldes if b}:
+            data, cliente_id, status, uf = balde
+            romaneios = RomaneioViagem.objects.filter(
+                data_emissao__date=data, cliente_id=cliente_id, status=status
+            )
+            if uf:
+                romaneios = romaneios.filter(destino_estado__iexact=uf)
+            else:
+                romaneios = romaneios.filter(Q(destino_estado__isnull=True) | Q(destino_estado=''))
+            totais = romaneios.aggregate(quantidade=Count('id'), valor=Sum('valor_total'))
+            filtro = {'data': data, 'cliente_id': cliente_id, 'status': status, 'uf': uf}
+            if not totais['quantidade']:
+                ResumoDiarioRomaneio.objects.filter(**filtro).delete()
+                continue
+            ResumoDiarioRomaneio.objects.update_or_create(
+                **filtro,
+                defaults={
+                    'quantidade': totais['quantidade'],
+                    'valor_total': totais['valor'] or Decimal('0.00'),
+                },
+            )
+
+    @staticmethod
+    def recalcular_notas_por_ids(nota_ids: Iterable[int]) -> None:
+        """Recalcula os baldes das notas informadas (usado após UPDATE em massa)."""
+        ids = list(nota_ids)
+        if not ids:
+            return
+        baldes = NotaFiscal.objects.filter(pk__in=ids).order_by().values_list(
+            'data', 'cliente_id', 'status'
+        ).distinct()
+        # O status anterior pode ter sido qualquer um: recalcula todos os status do balde.
+        todos = set()
+        for data, cliente_id, _status in baldes:
+            for status, _label in NotaFiscal.STATUS_NF_CHOICES:
+                todos.add((data, cliente_id, status))
+        ResumoDashboardService.recalcular_baldes_notas(todos)
+
+    @staticmethod
+    def recalcular_romaneios_por_ids(romaneio_ids: Iterable[int]) -> None:
+        """Recalcula os baldes dos romaneios informados (usado após UPDATE em massa)."""
+        ids = list(romaneio_ids)
+        if not ids:
+            return
+        romaneios = RomaneioViagem.objects.filter(pk__in=ids).only(
+            'data_emissao', 'cliente_id', 'status', 'destino_estado'
+        )
+        ResumoDashboardService.recalcular_baldes_romaneios(
+            ResumoDashboardService.balde_romaneio(romaneio) for romaneio in romaneios
+        )
+
+    @staticmethod
+    def atualizar_uf_cliente(cliente) -> None:
+        """Propaga a UF do cliente para os resumos de notas dele."""
+        uf = _normalizar_uf(cliente.estado)
+        ResumoDiarioNotaFiscal.objects.filter(cliente_id=cliente.pk).exclude(uf=uf).update(uf=uf)
+
+    # ------------------------------------------------------------------
+    # Reconciliação completa
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    @transaction.atomic
+    def reconciliar(data_inicio: Optional[date] = None, data_fim: Optional[date] = None) -> Dict[str, int]:
+        """
+        Reconstrói os resumos a partir das tabelas de origem.
+
+        Usa uma consulta agrupada por tabela e grava com bulk_create.
+        Sem datas, reconstrói tudo.
+
+        Returns:
+            dict: {'notas': linhas gravadas, 'romaneios': linhas gravadas}
+        """
+        notas = NotaFiscal.objects.all()
+        romaneios = RomaneioViagem.objects.all()
+        resumos_notas = ResumoDiarioNotaFiscal.objects.all()
+        resumos_romaneios = ResumoDiarioRomaneio.objects.all()
+        if data_inicio:
+            notas = notas.filter(data__gte=data_inicio)
+            romaneios = romaneios.filter(data_emissao__date__gte=data_inicio)
+            resumos_notas = resumos_notas.filter(data__gte=data_inicio)
+            resumos_romaneios = resumos_romaneios.filter(data__gte=data_inicio)
+        if data_fim:
+            notas = notas.filter(data__lte=data_fim)
+            romaneios = romaneios.filter(data_emissao__date__lte=data_fim)
+            resumos_notas = resumos_notas.filter(data__lte=data_fim)
+            resumos_romaneios = resumos_romaneios.filter(data__lte=data_fim)
+
+        linhas_notas = notas.order_by().values(
+            'data', 'cliente_id', 'status', 'cliente__estado'
+        ).annotate(quantidade=Count('id'), valor=Sum('valor'))
+
+        linhas_romaneios = romaneios.order_by().annotate(
+            dia=TruncDate('data_emissao')
+        ).values(
+            'dia', 'cliente_id', 'status', 'destino_estado'
+        ).annotate(quantidade=Count('id'), valor=Sum('valor_total'))
+
+        resumos_notas.delete()
+        resumos_romaneios.delete()
+
+        novos_notas = [
+            ResumoDiarioNotaFiscal(
+                data=linha['data'],
+                cliente_id=linha['cliente_id'],
+                status=linha['status'],
+                uf=_normalizar_uf(linha['cliente__estado']),
+                quantidade=linha['quantidade'],
+                valor_total=linha['valor'] or Decimal('0.00'),
+            )
+            for linha in linhas_notas
+        ]
+
+        # destino_estado NULL, '' e caixa diferente caem no mesmo balde normalizado.
+        acumulado: Dict[BaldeRomaneio, list] = {}
+        for linha in linhas_romaneios:
+            chave = (linha['dia'], linha['cliente_id'], linha['status'], _normalizar_uf(linha['destino_estado']))
+            item = acumulado.setdefault(chave, [0, Decimal('0.00')])
+            item[0] += linha['quantidade']
+            item[1] += linha['valor'] or Decimal('0.00')
+        novos_romaneios = [
+            ResumoDiarioRomaneio(
+                data=data, cliente_id=cliente_id, status=status, uf=uf,
+                quantidade=quantidade, valor_total=valor,
+            )
+            for (data, cliente_id, status, uf), (quantidade, valor) in acumulado.items()
+        ]
+
+        ResumoDiarioNotaFiscal.objects.bulk_create(novos_notas, batch_size=1000)
+        ResumoDiarioRomaneio.objects.bulk_create(novos_romaneios, batch_size=1000)
+        return {'notas': len(novos_notas), 'romaneios': len(novos_romaneios)}
+
+    # ------------------------------------------------------------------
+    # Consultas do dashboard
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def obter_totais_notas(cliente_id: Optional[int] = None) -> Dict[str, Any]:
+        """Contagens e valores de notas por status em uma única consulta."""
+        resumos = ResumoDiarioNotaFiscal.objects.all()
+        if cliente_id:
+            resumos = resumos.filter(cliente_id=cliente_id)
+        zero = Decimal('0.00')
+        totais = resumos.aggregate(
+            total_notas=Coalesce(Sum('quantidade'), 0),
+            notas_deposito=Coalesce(Sum('quantidade', filter=Q(status='Depósito')), 0),
+            notas_enviadas=Coalesce(Sum('quantidade', filter=Q(status='Enviada')), 0),
+            valor_total_notas=Sum('valor_total'),
+            valor_total_deposito=Sum('valor_total', filter=Q(status='Depósito')),
+            valor_total_enviadas=Sum('valor_total', filter=Q(status='Enviada')),
+        )
+        for chave in ('valor_total_notas', 'valor_total_deposito', 'valor_total_enviadas'):
+            totais[chave] = totais[chave] or zero
+        return totais
+
+    @staticmethod
+    def obter_totais_romaneios(cliente_id: Optional[int] = None,
+                               data_inicio: Optional[date] = None) -> Dict[str, Any]:
+        """Quantidade e valor total de romaneios em uma única consulta."""
+        resumos = ResumoDiarioRomaneio.objects.all()
+        if cliente_id:
+            resumos = resumos.filter(cliente_id=cliente_id)
+        if data_inicio:
+            resumos = resumos.filter(data__gte=data_inicio)
+        totais = resumos.aggregate(
+            total_romaneios=Coalesce(Sum('quantidade'), 0),
+            valor_total_romaneios=Sum('valor_total'),
+        )
+        totais['valor_total_romaneios'] = totais['valor_total_romaneios'] or Decimal('0.00')
+        return totais
+
+    @staticmethod
+    def top_clientes_deposito(limite: int = 5):
+        """Clientes com maior valor em depósito (atributo `valor_deposito` anexado)."""
+        linhas = list(
+            ResumoDiarioNotaFiscal.objects.filter(status='Depósito')
+            .values('cliente_id')
+            .annotate(valor_deposito=Sum('valor_total'))
+            .filter(valor_deposito__gt=0)
+            .order_by('-valor_deposito')[:limite]
+        )
+        clientes = Cliente.objects.in_bulk([linha['cliente_id'] for linha in linhas])
+        resultado = []
+        for linha in linhas:
+            cliente = clientes.get(linha['cliente_id'])
+            if cliente is not None:
+                cliente.valor_deposito = linha['valor_deposito']
+                resultado.append(cliente)
+        return resultado
@@ -0,0 +1,266 @@
+"""
+Geração de PDF de romaneios com cache em disco e pool de processos.
+
+O PDF fica em ROMANEIO_PDF_CACHE_DIR/<romaneio_id>/<sha256 do HTML>.pdf:
+a chave cobre o romaneio (data_ultima_edicao entra no HTML) e também as
+notas vinculadas, então qualquer mudança gera um arquivo novo e as versões
+antigas são removidas. A renderização (WeasyPrint) roda num
+ProcessPoolExecutor, fora do worker web; romaneios emitidos são
+pré-renderizados após o commit.
+
+Configuração (settings):
+- ROMANEIO_PDF_CACHE_DIR (padrão MEDIA_ROOT/cache/romaneios_pdf)
+- ROMANEIO_PDF_WORKERS (int, padrão 1): processos do pool.
+- ROMANEIO_PDF_ESPERA (float, padrão 20): segundos que a view espera a renderização.
+- ROMANEIO_PDF_PRE_RENDERIZAR (bool, padrão True).
+- ROMANEIO_PDF_LOTE_HORAS (int, padrão 24): validade dos PDFs de impressão em lote.
+"""
+import hashlib
+import importlib.util
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import get_template
+
+from ..models import RomaneioViagem
+from ..utils.pdf_render import renderizar_pdf, renderizar_pdf_lote
+from ..utils.romaneio_impressao import (
+    carregar_romaneios_para_impressao,
+    montar_item_impressao_romaneio,
+    montar_itens_impressao_lote,
+)
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_IMPRESSAO = 'notas/visualizar_romaneio_para_impressao.html'
+
+CSS_ROMANEIO_PDF = '''
+    @page {
+        size: A4;
+        margin: 0.8cm;
+    }
+    body {
+        font-family: Arial, sans-serif;
+        font-size: 11px;
+        line-height: 1.2;
+        margin: 0;
+        padding: 0;
+    }
+    .header {
+        text-align: center;
+        margin-bottom: 8px;
+        padding-bottom: 5px;
+        border-bottom: 2px solid #000;
+    }
+    .header h1 {
+        font-size: 17px;
+        margin: 0;
+    }
+    .info-container {
+        display: flex;
+        justify-content: space-between;
+        margin-bottom: 8px;
+        gap: 8px;
+    }
+    .romaneio-info, .motorista-info, .cliente-info {
+        flex: 1;
+        padding: 5px;
+        background-color: #f9f9f9;
+        border: 1px solid #ddd;
+    }
+    .report-title {
+        text-align: center;
+        margin: 8px 0 5px 0;
+        font-size: 13px;
+        font-weight: bold;
+        border-bottom: 1px solid #000;
+        padding-bottom: 3px;
+    }
+    .table {
+        width: 100%;
+        border-collapse: collapse;
+        margin: 5px 0 8px 0;
+    }
+    .table th, .table td {
+        border: 1px solid #ddd;
+        padding: 3px 4px;
+        font-size: 9px;
+    }
+    .table th {
+        background-color: #f2f2f2;
+        font-weight: bold;
+    }
+    .table tbody tr:nth-child(even) {
+        background-color: #f9f9f9;
+    }
+    .no-print {
+        display: none !important;
+    }
+    .print-button {
+        display: none !important;
+    }
+'''
+
+
+class RomaneioPdfService:
+    """Cache de PDFs de romaneio e pool de renderização."""
+
+    _executor = None
+    _em_andamento = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def disponivel() -> bool:
+        return importlib.util.find_spec('weasyprint') is not None
+
+    @staticmethod
+    def pasta_cache() -> Path:
+        padrao = Path(settings.MEDIA_ROOT) / 'cache' / 'romaneios_pdf'
+        return Path(getattr(settings, 'ROMANEIO_PDF_CACHE_DIR', padrao))
+
+    @staticmethod
+    def renderizar_html(romaneio: RomaneioViagem, item=None) -> str:
+        """
+        HTML de impressão do romaneio; determinístico para o mesmo conteúdo.
+        item é o contexto já montado (impressão em lote), se houver.
+        """
+        context = dict(item) if item is not None else montar_item_impressao_romaneio(romaneio)
+        edicao = romaneio.data_ultima_edicao
+        context['version'] = int(edicao.timestamp()) if edicao else 0
+        return get_template(TEMPLATE_IMPRESSAO).render(context)
+
+    @classmethod
+    def caminho_cache(cls, romaneio_id: int, html: str) -> Path:
+        digest = hashlib.sha256(html.encode('utf-8')).hexdigest()
+        return cls.pasta_cache() / str(romaneio_id) / f'{digest}.pdf'
+
+    @classmethod
+    def caminho_cache_lote(cls, htmls) -> Path:
+        digest = hashlib.sha256()
+        for html in htmls:
+            digest.update(hashlib.sha256(html.encode('utf-8')).digest())
+        return cls.pasta_cache() / 'lotes' / f'{digest.hexdigest()}.pdf'
+
+    @classmethod
+    def _pool(cls):
+        if cls._executor is None:
+            cls._executor = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'ROMANEIO_PDF_WORKERS', 1),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return cls._executor
+
+    @staticmethod
+    def _remover_versoes_antigas(caminho: Path):
+        for antigo in caminho.parent.glob('*.pdf'):
+            if antigo != caminho:
+                antigo.unlink(missing_ok=True)
+
+    @staticmethod
+    def _remover_lotes_expirados(pasta: Path):
+        limite = time.time() - getattr(settings, 'ROMANEIO_PDF_LOTE_HORAS', 24) * 3600
+        for antigo in pasta.glob('*.pdf'):
+            if antigo.stat().st_mtime < limite:
+                antigo.unlink(missing_ok=True)
+
+    @classmethod
+    def _concluido(cls, future, chave, limpar, descricao):
+        with cls._lock:
+            cls._em_andamento.pop(chave, None)
+        if future.exception() is None:
+            limpar()
+        else:
+            logger.error('Erro ao renderizar PDF de %s: %s', descricao, future.exception())
+
+    @classmethod
+    def _submeter(cls, caminho: Path, renderizar, conteudo, limpar, descricao):
+        """
+        Agenda renderizar(conteudo, caminho, css) no pool. Retorna o future, ou
+        None se o PDF já está em cache; pedidos simultâneos do mesmo conteúdo
+        compartilham a mesma renderização.
+        """
+        if caminho.exists():
+            return None
+
+        chave = str(caminho)
+        with cls._lock:
+            future = cls._em_andamento.get(chave)
+            nova = future is None
+            if nova:
+                future = cls._pool().submit(renderizar, conteudo, chave, CSS_ROMANEIO_PDF)
+                cls._em_andamento[chave] = future
+        if nova:
+            future.add_done_callback(lambda f: cls._concluido(f, chave, limpar, descricao))
+        return future
+
+    @classmethod
+    def _submeter_romaneio(cls, romaneio_id: int, html: str):
+        caminho = cls.caminho_cache(romaneio_id, html)
+        future = cls._submeter(
+            caminho, renderizar_pdf, html,
+            lambda: cls._remover_versoes_antigas(caminho),
+            f'romaneio {romaneio_id}',
+        )
+        return caminho, future
+
+    @staticmethod
+    def _aguardar(caminho, future, espera):
+        if future is None:
+            return caminho
+        if espera is None:
+            espera = getattr(settings, 'ROMANEIO_PDF_ESPERA', 20)
+        try:
+            future.result(timeout=espera)
+        except FuturesTimeoutError:
+            return None
+        return caminho
+
+    @classmethod
+    def obter_pdf(cls, romaneio: RomaneioViagem, espera=None):
+        """
+        Caminho do PDF do romaneio. Se não estiver em cache, renderiza no pool
+        e espera até `espera` segundos; retorna None se ainda não ficou pronto
+        (a renderização continua e o próximo pedido pega o arquivo pronto).
+        Erros de renderização são propagados.
+        """
+        caminho, future = cls._submeter_romaneio(romaneio.pk, cls.renderizar_html(romaneio))
+        return cls._aguardar(caminho, future, espera)
+
+    @classmethod
+    def obter_pdf_lote(cls, itens, espera=None):
+        """
+        PDF único com vários romaneios (itens de montar_itens_impressao_lote),
+        com o mesmo cache e espera de obter_pdf.
+        """
+        htmls = [cls.renderizar_html(item['romaneio'], item) for item in itens]
+        caminho = cls.caminho_cache_lote(htmls)
+        future = cls._submeter(
+            caminho, renderizar_pdf_lote, htmls,
+            lambda: cls._remover_lotes_expirados(caminho.parent),
+            f'lote de {len(htmls)} romaneios',
+        )
+        return cls._aguardar(caminho, future, espera)
+
+    @classmethod
+    def pre_renderizar(cls, romaneio_ids):
+        """Agenda no pool a renderização dos romaneios (sem esperar)."""
+        romaneios = carregar_romaneios_para_impressao().filter(pk__in=list(romaneio_ids))
+        for item in montar_itens_impressao_lote(romaneios):
+            romaneio = item['romaneio']
+            try:
+                cls._submeter_romaneio(romaneio.pk, cls.renderizar_html(romaneio, item))
+            except Exception:
+                logger.exception('Erro ao agendar PDF do romaneio %s', romaneio.pk)
+
+    @classmethod
+    def agendar_pre_renderizacao(cls, romaneio_id: int):
+        """Pré-renderiza o PDF após o commit da transação atual."""
+        if not getattr(settings, 'ROMANEIO_PDF_PRE_RENDERIZAR', True) or not cls.disponivel():
+            return
+        transaction.on_commit(lambda: cls.pre_renderizar([romaneio_id]))
@@ -21,25 +21,44 @@ Data: 2025
 Versão: 2.0
 =============================================================================
 """
+from decimal import Decimal
 from typing import Tuple, Optional, List, Dict, Any
 from django.db import IntegrityError, transaction
-from django.db.models import Q
+from django.db.models import Exists, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.contrib import messages
-from ..models import RomaneioViagem, NotaFiscal
+from ..models import RomaneioViagem, NotaFiscal, TabelaSeguro, VinculoNotaRomaneio
 from ..utils.nota_ordering import ordenar_queryset_notas_por_numero
+from .sequencia_service import SequenciaService, maior_sufixo_codigo
 
 
 # ============================================================================
 # FUNÇÕES AUXILIARES (PRIVADAS)
 # ============================================================================
 
+# Sequências de código (SequenciaCodigo) e o padrão dos códigos já gravados,
+# usado apenas para inicializar cada sequência.
+SEQUENCIA_ROMANEIO = 'romaneio'
+SEQUENCIA_ROMANEIO_GENERICO = 'romaneio_generico'
+PADRAO_CODIGO_ROMANEIO = r'^ROM-([0-9]+)$'
+PADRAO_CODIGO_ROMANEIO_GENERICO = r'^ROM-100-([0-9]+)$'
+
+
+def _maior_codigo_romaneio() -> int:
+    return maior_sufixo_codigo(RomaneioViagem.objects.all(), 'codigo', PADRAO_CODIGO_ROMANEIO)
+
+
+def _maior_codigo_romaneio_generico() -> int:
+    return maior_sufixo_codigo(RomaneioViagem.objects.all(), 'codigo', PADRAO_CODIGO_ROMANEIO_GENERICO)
+
+
 def _get_next_romaneio_codigo() -> str:
     """
-    Gera o próximo código sequencial de romaneio normal.
+    Reserva o próximo código sequencial de romaneio normal.
     
-    Formato: ROM-NNN (ex: ROM-001, ROM-002)
-    Busca o último romaneio com prefixo "ROM-" (excluindo genéricos ROM-100-)
-    e incrementa o número sequencial.
+    Formato: ROM-NNN (ex: ROM-001, ROM-002, ..., ROM-1000)
+    O número vem da sequência 'romaneio' (SequenciaService), com trava de
+    linha; na primeira chamada a sequência parte do maior ROM-NNN existente.
     
     Returns:
         str: Código do próximo romaneio (ex: "ROM-001")
@@ -48,32 +67,16 @@ def _get_next_romaneio_codigo() -> str:
         Função privada (_) - não deve ser chamada diretamente.
         Use RomaneioService.criar_romaneio() que chama esta função internamente.
     """
-    from ..models import RomaneioViagem
-    prefix = "ROM-"
-    last_romaneio = RomaneioViagem.objects.filter(
-        codigo__startswith=prefix
-    ).exclude(
-        codigo__startswith="ROM-100-"
-    ).order_by('-codigo').first()
-    
-    next_sequence = 1
-    if last_romaneio and last_romaneio.codigo:
-        try:
-            parts = last_romaneio.codigo.split('-')
-            if len(parts) == 2 and parts[0] == 'ROM':
-                next_sequence = int(parts[1]) + 1
-        except (ValueError, IndexError):
-            pass
-    
-    return f"ROM-{next_sequence:03d}"
+    numero = SequenciaService.proximo_valor(SEQUENCIA_ROMANEIO, _maior_codigo_romaneio)
+    return f"ROM-{numero:03d}"
 
 
 def _get_next_romaneio_generico_codigo():
     """
-    Gera o próximo código sequencial de romaneio genérico.
+    Reserva o próximo código sequencial de romaneio genérico.
     
     Formato: ROM-100-NNN (ex: ROM-100-001, ROM-100-002)
-    Busca o último romaneio genérico e incrementa o número sequencial.
+    O número vem da sequência 'romaneio_generico' (SequenciaService).
     
     Returns:
         str: Código do próximo romaneio genérico (ex: "ROM-100-001")
@@ -82,22 +85,17 @@ def _get_next_romaneio_generico_codigo():
         Função privada (_) - não deve ser chamada diretamente.
         Use RomaneioService.criar_romaneio(tipo='generico').
     """
-    from ..models import RomaneioViagem
-    prefix = "ROM-100-"
-    last_romaneio = RomaneioViagem.objects.filter(
-        codigo__startswith=prefix
-    ).order_by('-codigo').first()
-    
-    next_sequence = 1
-    if last_romaneio and last_romaneio.codigo:
-        try:
-            parts = last_romaneio.codigo.split('-')
-            if len(parts) == 3 and parts[0] == 'ROM' and parts[1] == '100':
-                next_sequence = int(parts[2]) + 1
-        except (ValueError, IndexError):
-            pass
-    
-    return f"ROM-100-{next_sequence:03d}"
+    numero = SequenciaService.proximo_valor(SEQUENCIA_ROMANEIO_GENERICO, _maior_codigo_romaneio_generico)
+    return f"ROM-100-{numero:03d}"
+
+
+def previsualizar_codigo_romaneio(tipo: str = 'normal') -> str:
+    """Código provável do próximo romaneio, sem reservar (preview do formulário)."""
+    if tipo == 'generico':
+        numero = SequenciaService.consultar_proximo(SEQUENCIA_ROMANEIO_GENERICO, _maior_codigo_romaneio_generico)
+        return f"ROM-100-{numero:03d}"
+    numero = SequenciaService.consultar_proximo(SEQUENCIA_ROMANEIO, _maior_codigo_romaneio)
+    return f"ROM-{numero:03d}"
 
 
 # ============================================================================
@@ -126,10 +124,7 @@ class RomaneioService:
         - excluir_romaneio(): Exclui romaneio e atualiza notas
         - calcular_totais_romaneio(): Calcula totais de peso e valor
         - obter_notas_disponiveis_para_cliente(): Busca notas disponíveis
-    
-    Métodos Privados:
-        - _atualizar_status_notas_fiscais(): Atualiza status das notas
-        - _atualizar_status_nota_removida(): Atualiza nota removida
+        - recalcular_status_notas(): Recalcula em massa o status das notas
     """
     
     @staticmethod
@@ -164,8 +159,10 @@ class RomaneioService:
                     romaneio.data_emissao = form_data.cleaned_data.get('data_romaneio')
                     romaneio.status = 'Emitido' if emitir else 'Salvo'
                     
-                    romaneio.save()
-                    form_data.save_m2m()  # Salva a relação ManyToMany
+                    # Savepoint: permite nova tentativa após IntegrityError no PostgreSQL
+                    with transaction.atomic():
+                        romaneio.save()
+                        form_data.save_m2m()  # Salva a relação ManyToMany
                     codigo_gerado = True
                     break
                     
@@ -179,8 +176,14 @@ class RomaneioService:
                 return None, False, "Não foi possível gerar código único para o romaneio após várias tentativas."
             
             # Atualizar status das notas fiscais associadas
-            RomaneioService._atualizar_status_notas_fiscais(romaneio)
+            RomaneioService.recalcular_status_notas(
+                romaneio.notas_fiscais.values_list('pk', flat=True)
+            )
             
+            if romaneio.status == 'Emitido':
+                from .romaneio_pdf_service import RomaneioPdfService
+                RomaneioPdfService.agendar_pre_renderizacao(romaneio.pk)
+
             tipo_str = "Genérico" if tipo == 'generico' else ""
             mensagem = f'Romaneio {tipo_str} {romaneio.codigo} ({romaneio.status}) salvo com sucesso!'
             
@@ -205,7 +208,7 @@ class RomaneioService:
             tuple: (romaneio, sucesso, mensagem_erro)
         """
         try:
-            notas_antes_salvar = set(romaneio.notas_fiscais.all())
+            notas_antes_salvar = set(romaneio.notas_fiscais.values_list('pk', flat=True))
             
             romaneio.data_emissao = form_data.cleaned_data.get('data_romaneio')
             
@@ -216,14 +219,14 @@ class RomaneioService:
             
             form_data.save()
             
-            notas_depois_salvar = set(romaneio.notas_fiscais.all())
-            
-            # Atualizar notas removidas
-            for nota_fiscal_removida in (notas_antes_salvar - notas_depois_salvar):
-                RomaneioService._atualizar_status_nota_removida(nota_fiscal_removida, romaneio)
+            notas_depois_salvar = set(romaneio.notas_fiscais.values_list('pk', flat=True))
             
-            # Atualizar notas adicionadas/modificadas
-            RomaneioService._atualizar_status_notas_fiscais(romaneio)
+            # Atualizar notas removidas, adicionadas e mantidas
+            RomaneioService.recalcular_status_notas(notas_antes_salvar | notas_depois_salvar)
+
+            if romaneio.status == 'Emitido':
+                from .romaneio_pdf_service import RomaneioPdfService
+                RomaneioPdfService.agendar_pre_renderizacao(romaneio.pk)
             
             mensagem = f'Romaneio {romaneio.codigo} ({romaneio.status}) atualizado com sucesso!'
             return romaneio, True, mensagem
@@ -329,81 +332,163 @@ class RomaneioService:
             codigo = romaneio.codigo
             pk = romaneio.pk
             
-            # Atualizar status das notas antes de excluir
-            for nota_fiscal in romaneio.notas_fiscais.all():
-                RomaneioService._atualizar_status_nota_removida(nota_fiscal, romaneio)
+            nota_ids = list(romaneio.notas_fiscais.values_list('pk', flat=True))
             
             romaneio.delete()
             
+            # Sem o vínculo, as notas voltam a 'Depósito' se não estiverem em outro romaneio emitido
+            RomaneioService.recalcular_status_notas(nota_ids)
+            
             return True, f'Romaneio {codigo} excluído com sucesso! Notas fiscais associadas foram atualizadas conforme necessário.'
             
         except Exception as e:
             return False, f"Erro ao excluir romaneio: {str(e)}"
     
     @staticmethod
-    def _atualizar_status_notas_fiscais(romaneio):
+    def recalcular_status_notas(nota_ids) -> int:
         """
-        Atualiza o status de todas as notas fiscais associadas a um romaneio.
+        Recalcula em massa o status das notas fiscais informadas.
+        
+        Regra: a nota fica 'Enviada' se estiver vinculada a algum romaneio
+        'Emitido'; caso contrário volta para 'Depósito'. Serve para emissão,
+        edição (notas adicionadas e removidas), exclusão e restauração.
         
-        Lógica de Atualização:
-        1. Se nota está em outro romaneio emitido → Status 'Enviada'
-        2. Se romaneio atual está 'Emitido' → Status 'Enviada'
-        3. Caso contrário → Status 'Depósito'
+        Usa um único SELECT com subconsulta EXISTS anotada (só na tabela de
+        vínculos, pelo status replicado do romaneio) e grava apenas as notas
+        que mudaram, com no máximo dois UPDATE ... WHERE id IN.
         
         Args:
-            romaneio (RomaneioViagem): Instância do romaneio
+            nota_ids: IDs das notas afetadas
         
-        Nota:
-            Método privado (_) - chamado internamente pelos métodos públicos.
-            Não deve ser chamado diretamente.
+        Returns:
+            int: Quantidade de notas cujo status mudou
         
         Exemplo:
-            # Chamado automaticamente por criar_romaneio() ou editar_romaneio()
-            RomaneioService._atualizar_status_notas_fiscais(romaneio)
+            ids = list(romaneio.notas_fiscais.values_list('pk', flat=True))
+            RomaneioService.recalcular_status_notas(ids)
         """
-        for nota_fiscal in romaneio.notas_fiscais.all():
-            outros_romaneios_emitidos = nota_fiscal.romaneios_vinculados.exclude(
-                pk=romaneio.pk
-            ).filter(status='Emitido')
-            
-            if outros_romaneios_emitidos.exists():
-                nota_fiscal.status = 'Enviada'
-            elif romaneio.status == 'Emitido':
-                nota_fiscal.status = 'Enviada'
-            else:
-                nota_fiscal.status = 'Depósito'
-            
-            nota_fiscal.save()
+        ids = set(nota_ids)
+        if not ids:
+            return 0
+        
+        vinculos_emitidos = VinculoNotaRomaneio.objects.filter(
+            nota_fiscal_id=OuterRef('pk'),
+            status_romaneio='Emitido',
+        )
+        notas = NotaFiscal.objects.filter(pk__in=ids).annotate(
+            em_romaneio_emitido=Exists(vinculos_emitidos)
+        ).values_list('pk', 'status', 'em_romaneio_emitido')
+        
+        para_enviada = []
+        para_deposito = []
+        for pk, status, em_romaneio_emitido in notas:
+            novo_status = 'Enviada' if em_romaneio_emitido else 'Depósito'
+            if status != novo_status:
+                (para_enviada if em_romaneio_emitido else para_deposito).append(pk)
+        
+        if para_enviada:
+            NotaFiscal.objects.filter(pk__in=para_enviada).update(status='Enviada')
+        if para_deposito:
+            NotaFiscal.objects.filter(pk__in=para_deposito).update(status='Depósito')
+        
+        alteradas = para_enviada + para_deposito
+        if alteradas:
+            # QuerySet.update não dispara sinais: atualiza os resumos do dashboard
+            from .resumo_dashboard_service import ResumoDashboardService
+            ResumoDashboardService.recalcular_notas_por_ids(alteradas)
+        return len(alteradas)
     
     @staticmethod
-    def _atualizar_status_nota_removida(nota_fiscal, romaneio_excluido):
+    def romaneios_com_notas_do_cliente(cliente):
         """
-        Atualiza o status de uma nota fiscal quando removida de um romaneio.
+        Romaneios com ao menos uma nota do cliente.
         
-        Lógica:
-        - Se nota NÃO está em outros romaneios emitidos → Status 'Depósito'
-        - Se nota está em outros romaneios emitidos → Mantém 'Enviada'
+        EXISTS na tabela de vínculos em vez de JOIN por notas_fiscais__cliente:
+        não multiplica linhas, então dispensa o distinct().
+        """
+        notas_do_cliente = VinculoNotaRomaneio.objects.filter(
+            romaneio_id=OuterRef('pk'), nota_fiscal__cliente=cliente
+        )
+        return RomaneioViagem.objects.filter(Exists(notas_do_cliente))
+    
+    @staticmethod
+    def sincronizar_status_vinculos(romaneio_ids, nota_ids=None) -> int:
+        """
+        Copia RomaneioViagem.status para o status_romaneio dos vínculos dos
+        romaneios informados (opcionalmente só das notas informadas).
         
-        Args:
-            nota_fiscal (NotaFiscal): Instância da nota fiscal
-            romaneio_excluido (RomaneioViagem): Romaneio que foi excluído ou
-                                                do qual a nota foi removida
+        Um único UPDATE com subconsulta; só grava vínculos divergentes.
+        Chamado pelos sinais após vincular notas e alterar romaneios.
+        
+        Returns:
+            int: Quantidade de vínculos atualizados
+        """
+        romaneio_ids = list(romaneio_ids)
+        if not romaneio_ids:
+            return 0
+        vinculos = VinculoNotaRomaneio.objects.filter(romaneio_id__in=romaneio_ids)
+        if nota_ids is not None:
+            vinculos = vinculos.filter(nota_fiscal_id__in=list(nota_ids))
+        status = RomaneioViagem.objects.filter(pk=OuterRef('romaneio_id')).values('status')[:1]
+        return vinculos.exclude(status_romaneio=Subquery(status)).update(status_romaneio=Subquery(status))
+    
+    @staticmethod
+    def aplicar_delta_totais(romaneio_ids, peso=0, valor=0, quantidade=0) -> None:
+        """
+        Soma um delta (positivo ou negativo) aos totais dos romaneios.
         
-        Nota:
-            Método privado (_) - chamado internamente durante edição/exclusão.
-            Não deve ser chamado diretamente.
+        Custo constante: um UPDATE com F() para os totais e outro para o
+        seguro, sem recontar as notas. Chamado pelos sinais de vínculo
+        nota↔romaneio e de alteração/exclusão de notas (notas/signals.py).
         
-        Exemplo:
-            # Chamado automaticamente por editar_romaneio() ou excluir_romaneio()
-            RomaneioService._atualizar_status_nota_removida(nota, romaneio)
+        Args:
+            romaneio_ids: IDs dos romaneios afetados
+            peso, valor, quantidade: Variação a aplicar em cada romaneio
         """
-        outros_romaneios_emitidos = nota_fiscal.romaneios_vinculados.exclude(
-            pk=romaneio_excluido.pk
-        ).filter(status='Emitido')
+        ids = list(romaneio_ids)
+        if not ids or not (peso or valor or quantidade):
+            return
         
-        if not outros_romaneios_emitidos.exists():
-            nota_fiscal.status = 'Depósito'
-            nota_fiscal.save()
+        zero = Value(Decimal('0.00'))
+        RomaneioViagem.objects.filter(pk__in=ids).update(
+            peso_total=Coalesce(F('peso_total'), zero) + Value(Decimal(peso)),
+            valor_total=Coalesce(F('valor_total'), zero) + Value(Decimal(valor)),
+            quantidade_total=Coalesce(F('quantidade_total'), zero) + Value(Decimal(quantidade)),
+        )
+        
+        if valor:
+            # Mesma regra de RomaneioViagem.calcular_seguro, em massa
+            tabela = TabelaSeguro.objects.filter(estado=OuterRef('destino_estado'))
+            percentual = Subquery(tabela.values('percentual_seguro')[:1])
+            RomaneioViagem.objects.filter(
+                Exists(tabela), pk__in=ids, valor_total__gt=0
+            ).update(
+                percentual_seguro=percentual,
+                valor_seguro=F('valor_total') * percentual / Value(Decimal('100')),
+            )
+            
+            # QuerySet.update não dispara sinais: atualiza os resumos do dashboard
+            from .resumo_dashboard_service import ResumoDashboardService
+            ResumoDashboardService.recalcular_romaneios_por_ids(ids)
+    
+    @staticmethod
+    def aplicar_vinculos_totais(romaneio_ids, nota_ids, sinal: int = 1) -> None:
+        """
+        Ajusta os totais dos romaneios ao vincular (sinal=1) ou desvincular
+        (sinal=-1) as notas informadas, com um único aggregate sobre as notas.
+        """
+        nota_ids = list(nota_ids)
+        if not nota_ids:
+            return
+        totais = NotaFiscal.objects.filter(pk__in=nota_ids).aggregate(
+            peso=Sum('peso'), valor=Sum('valor'), quantidade=Sum('quantidade')
+        )
+        RomaneioService.aplicar_delta_totais(
+            romaneio_ids,
+            peso=sinal * (totais['peso'] or 0),
+            valor=sinal * (totais['valor'] or 0),
+            quantidade=sinal * (totais['quantidade'] or 0),
+        )
     
     @staticmethod
     def calcular_totais_romaneio(romaneio):
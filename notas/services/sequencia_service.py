@@ -0,0 +1,121 @@
+"""
+Alocador de sequências para códigos (romaneios e afins).
+
+Substitui a busca `codigo__startswith` + `order_by('-codigo').first()`, que
+ordenava lexicograficamente (ROM-1000 < ROM-999) e gerava colisões quando
+vários workers emitiam ao mesmo tempo.
+
+Cada sequência é uma linha de SequenciaCodigo. A reserva trava a linha com
+SELECT ... FOR UPDATE e avança o contador em um bloco (hi/lo). Com blocos
+maiores que 1 (settings.SEQUENCIA_TAMANHO_BLOCO), o restante do bloco fica
+em memória no processo e só passa a ser usado depois do commit da reserva;
+se a transação for desfeita, o bloco é descartado junto com o contador.
+Blocos por processo deixam lacunas e intercalam códigos entre workers, por
+isso o padrão é 1 (sequência contínua).
+"""
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from ..models import SequenciaCodigo
+
+ValorInicial = Union[int, Callable[[], int], None]
+
+# Blocos já confirmados por processo: nome -> [próximo valor, último valor]
+_blocos: Dict[str, List[int]] = {}
+_trava = threading.Lock()
+
+
+def maior_sufixo_codigo(queryset, campo: str, padrao: str) -> int:
+    """
+    Maior número capturado pelo grupo 1 de `padrao` entre os códigos existentes.
+
+    Usado apenas para inicializar uma sequência a partir dos códigos já gravados.
+    """
+    regex = re.compile(padrao)
+    maior = 0
+    codigos = queryset.filter(**{f'{campo}__regex': padrao}).values_list(campo, flat=True)
+    for codigo in codigos.iterator():
+        correspondencia = regex.match(codigo or '')
+        if correspondencia:
+            maior = max(maior, int(correspondencia.group(1)))
+    return maior
+
+
+class SequenciaService:
+    """Reserva valores de sequências nomeadas de forma segura entre workers."""
+
+    @staticmethod
+    def _resolver_inicial(valor_inicial: ValorInicial) -> int:
+        if callable(valor_inicial):
+            return valor_inicial()
+        return valor_inicial or 0
+
+    @staticmethod
+    def _reservar_bloco(nome: str, tamanho: int, valor_inicial: ValorInicial) -> Tuple[int, int]:
+        with transaction.atomic():
+            sequencia = SequenciaCodigo.objects.select_for_update().filter(nome=nome).first()
+            if sequencia is None:
+                try:
+                    with transaction.atomic():
+                        SequenciaCodigo.objects.create(
+                            nome=nome, ultimo_valor=SequenciaService._resolver_inicial(valor_inicial)
+                        )
+                except IntegrityError:
+                    pass  # outro worker criou a sequência primeiro
+                sequencia = SequenciaCodigo.objects.select_for_update().get(nome=nome)
+            inicio = sequencia.ultimo_valor + 1
+            sequencia.ultimo_valor += tamanho
+            sequencia.save(update_fields=['ultimo_valor', 'atualizado_em'])
+        return inicio, inicio + tamanho - 1
+
+    @staticmethod
+    def _guardar_bloco(nome: str, inicio: int, fim: int) -> None:
+        with _trava:
+            _blocos[nome] = [inicio, fim]
+
+    @staticmethod
+    def proximo_valor(nome: str, valor_inicial: ValorInicial = None,
+                      tamanho_bloco: Optional[int] = None) -> int:
+        """
+        Reserva e retorna o próximo valor da sequência.
+
+        Args:
+            nome: Nome da sequência
+            valor_inicial: Valor (ou função que o calcula) usado quando a
+                sequência ainda não existe; o primeiro valor entregue é o seguinte.
+            tamanho_bloco: Quantidade de valores reservados por acesso ao banco.
+        """
+        with _trava:
+            bloco = _blocos.get(nome)
+            if bloco and bloco[0] <= bloco[1]:
+                valor = bloco[0]
+                bloco[0] += 1
+                return valor
+
+        tamanho = max(1, tamanho_bloco or getattr(settings, 'SEQUENCIA_TAMANHO_BLOCO', 1))
+        inicio, fim = SequenciaService._reservar_bloco(nome, tamanho, valor_inicial)
+        if fim > inicio:
+            transaction.on_commit(lambda: SequenciaService._guardar_bloco(nome, inicio + 1, fim))
+        return inicio
+
+    @staticmethod
+    def consultar_proximo(nome: str, valor_inicial: ValorInicial = None) -> int:
+        """Próximo valor provável, sem reservar (uso em pré-visualização)."""
+        with _trava:
+            bloco = _blocos.get(nome)
+            if bloco and bloco[0] <= bloco[1]:
+                return bloco[0]
+        ultimo = SequenciaCodigo.objects.filter(nome=nome).values_list('ultimo_valor', flat=True).first()
+        if ultimo is None:
+            ultimo = SequenciaService._resolver_inicial(valor_inicial)
+        return ultimo + 1
+
+    @staticmethod
+    def descartar_blocos() -> None:
+        """Esquece os blocos em memória (após fork ou em testes)."""
+        with _trava:
+            _blocos.clear()
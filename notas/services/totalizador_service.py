@@ -0,0 +1,192 @@
+"""
+Motor de agregação dos totalizadores por estado e por cliente.
+
+Cada relatório é resolvido com uma única consulta agrupada (romaneios emitidos
+no período unidos às notas pela tabela M2M, com Sum/Count distinct). Os
+percentuais da TabelaSeguro são aplicados sobre as linhas já agregadas.
+
+O resultado fica em cache por intervalo de datas, de modo que a tela, o PDF e
+o Excel do mesmo período reutilizam o mesmo cálculo. O cache é invalidado
+pelos sinais (notas/signals.py) quando romaneios, notas, clientes ou a tabela
+de seguros mudam.
+"""
+import time
+from datetime import date
+from decimal import Decimal
+from typing import Any, Callable, Dict, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+
+from ..models import Cliente, RomaneioViagem, TabelaSeguro
+
+CHAVE_VERSAO_CACHE = 'totalizador:versao'
+
+
+class TotalizadorService:
+    """Totalizadores de romaneios emitidos por estado e por cliente."""
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _versao_cache() -> int:
+        versao = cache.get(CHAVE_VERSAO_CACHE)
+        if versao is None:
+            versao = time.time_ns()
+            cache.set(CHAVE_VERSAO_CACHE, versao, None)
+        return versao
+
+    @staticmethod
+    def invalidar_cache() -> None:
+        """Descarta todos os totalizadores em cache (nova versão de chave)."""
+        cache.set(CHAVE_VERSAO_CACHE, time.time_ns(), None)
+
+    @staticmethod
+    def _em_cache(tipo: str, data_inicial: date, data_final: date, calcular: Callable[[], Any]):
+        chave = (
+            f'totalizador:{tipo}:{TotalizadorService._versao_cache()}:'
+            f'{data_inicial.isoformat()}:{data_final.isoformat()}'
+        )
+        resultado = cache.get(chave)
+        if resultado is None:
+            resultado = calcular()
+            timeout = getattr(settings, 'TOTALIZADOR_CACHE_TIMEOUT', 600)
+            cache.set(chave, resultado, timeout)
+        return resultado
+
+    @staticmethod
+    def _romaneios_emitidos(data_inicial: date, data_final: date):
+        return RomaneioViagem.objects.filter(
+            data_emissao__date__range=[data_inicial, data_final],
+            status='Emitido',
+        ).order_by()
+
+    @staticmethod
+    def _percentuais_seguro() -> Dict[str, Decimal]:
+        return dict(TabelaSeguro.objects.values_list('estado', 'percentual_seguro'))
+
+    # ------------------------------------------------------------------
+    # Totalizador por estado
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def totais_por_estado(data_inicial: date, data_final: date) -> Dict[str, Any]:
+        """
+        Totais por UF do cliente no período.
+
+        Returns:
+            dict: {'resultados': [...], 'total_geral': Decimal, 'total_seguro_geral': Decimal}
+        """
+        return TotalizadorService._em_cache(
+            'estado', data_inicial, data_final,
+            lambda: TotalizadorService._calcular_por_estado(data_inicial, data_final),
+        )
+
+    @staticmethod
+    def _calcular_por_estado(data_inicial: date, data_final: date) -> Dict[str, Any]:
+        linhas = (
+            TotalizadorService._romaneios_emitidos(data_inicial, data_final)
+            .exclude(cliente__estado__isnull=True)
+            .exclude(cliente__estado='')
+            .values('cliente__estado')
+            .annotate(
+                total_valor=Sum('notas_fiscais__valor'),
+                quantidade_romaneios=Count('id', distinct=True),
+            )
+        )
+        percentuais = TotalizadorService._percentuais_seguro()
+        nomes_estados = dict(TabelaSeguro.ESTADOS_BRASIL)
+
+        resultados: List[Dict[str, Any]] = []
+        total_geral = Decimal('0.0')
+        total_seguro_geral = Decimal('0.0')
+        for linha in linhas:
+            total_valor = linha['total_valor'] or Decimal('0.0')
+            if total_valor <= 0:
+                continue
+            estado = linha['cliente__estado']
+            percentual_seguro = percentuais.get(estado, Decimal('0.0'))
+            valor_seguro = total_valor * (percentual_seguro / Decimal('100.0'))
+            resultados.append({
+                'estado': estado,
+                'nome_estado': nomes_estados.get(estado, estado),
+                'total_valor': total_valor,
+                'percentual_seguro': percentual_seguro,
+                'valor_seguro': valor_seguro,
+                'quantidade_romaneios': linha['quantidade_romaneios'],
+            })
+            total_geral += total_valor
+            total_seguro_geral += valor_seguro
+
+        resultados.sort(key=lambda x: x['total_valor'], reverse=True)
+        return {
+            'resultados': resultados,
+            'total_geral': total_geral,
+            'total_seguro_geral': total_seguro_geral,
+        }
+
+    # ------------------------------------------------------------------
+    # Totalizador por cliente
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def totais_por_cliente(data_inicial: date, data_final: date) -> Dict[str, Any]:
+        """
+        Totais por cliente no período, com subtotais por UF.
+
+        Returns:
+            dict: {'resultados', 'totais_por_estado', 'total_geral', 'total_seguro_geral'}
+        """
+        return TotalizadorService._em_cache(
+            'cliente', data_inicial, data_final,
+            lambda: TotalizadorService._calcular_por_cliente(data_inicial, data_final),
+        )
+
+    @staticmethod
+    def _calcular_por_cliente(data_inicial: date, data_final: date) -> Dict[str, Any]:
+        linhas = list(
+            TotalizadorService._romaneios_emitidos(data_inicial, data_final)
+            .values('cliente_id')
+            .annotate(total_valor=Sum('notas_fiscais__valor'))
+            .filter(total_valor__gt=0)
+        )
+        clientes = Cliente.objects.in_bulk([linha['cliente_id'] for linha in linhas])
+        percentuais = TotalizadorService._percentuais_seguro()
+
+        resultados: List[Dict[str, Any]] = []
+        total_geral = Decimal('0.0')
+        total_seguro_geral = Decimal('0.0')
+        for linha in linhas:
+            cliente = clientes.get(linha['cliente_id'])
+            if cliente is None:
+                continue
+            total_valor = linha['total_valor']
+            percentual_seguro = percentuais.get(cliente.estado or '', Decimal('0.0'))
+            valor_seguro = total_valor * (percentual_seguro / Decimal('100.0'))
+            resultados.append({
+                'cliente': cliente,
+                'uf': cliente.estado or '—',
+                'valor_mercadoria': total_valor,
+                'valor_seguro': valor_seguro,
+            })
+            total_geral += total_valor
+            total_seguro_geral += valor_seguro
+
+        resultados.sort(key=lambda x: ((x['uf'] or '').upper(), (x['cliente'].razao_social or '').upper()))
+        totais_por_estado: Dict[str, Dict[str, Decimal]] = {}
+        for r in resultados:
+            totais = totais_por_estado.setdefault(
+                r['uf'], {'valor_mercadoria': Decimal('0.0'), 'valor_seguro': Decimal('0.0')}
+            )
+            totais['valor_mercadoria'] += r['valor_mercadoria']
+            totais['valor_seguro'] += r['valor_seguro']
+
+        return {
+            'resultados': resultados,
+            'totais_por_estado': totais_por_estado,
+            'total_geral': total_geral,
+            'total_seguro_geral': total_seguro_geral,
+        }
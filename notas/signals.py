@@ -0,0 +1,232 @@
+"""
+Sinais do app notas.
+
+Mantém os resumos diários do dashboard (ResumoDiarioNotaFiscal e
+ResumoDiarioRomaneio) atualizados a cada gravação/exclusão, recalculando
+apenas os baldes (dia/cliente/status) afetados.
+
+Mantém os totais de peso/valor/quantidade dos romaneios por deltas quando
+notas são vinculadas, desvinculadas, alteradas ou excluídas, e o status do
+romaneio replicado nos vínculos (VinculoNotaRomaneio.status_romaneio).
+
+Também invalida o cache dos totalizadores por estado/cliente quando os dados
+de origem (romaneios, notas, vínculos, clientes, tabela de seguros) mudam.
+
+E mantém o índice de busca textual (BuscaService) de notas, clientes e
+romaneios; as tabelas do índice são criadas na migração 0077_indices_busca.
+"""
+from decimal import Decimal
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Cliente, NotaFiscal, RomaneioViagem, TabelaSeguro, VinculoNotaRomaneio
+from .services.busca_service import BuscaService
+from .services.resumo_dashboard_service import ResumoDashboardService
+from .services.romaneio_service import RomaneioService
+from .services.totalizador_service import TotalizadorService
+
+# Campos que mudam o balde ou os totais do resumo
+CAMPOS_RESUMO_NOTA = {'data', 'cliente', 'cliente_id', 'status', 'valor'}
+CAMPOS_RESUMO_ROMANEIO = {
+    'data_emissao', 'cliente', 'cliente_id', 'status', 'destino_estado', 'valor_total',
+}
+# Campos da nota somados nos totais do romaneio (mesma ordem dos deltas)
+CAMPOS_TOTAIS_NOTA = ('peso', 'valor', 'quantidade')
+CAMPOS_TOTAIS_ROMANEIO = [
+    'peso_total', 'valor_total', 'quantidade_total', 'percentual_seguro', 'valor_seguro',
+]
+
+
+def _afeta_resumo(update_fields, campos):
+    return update_fields is None or not set(update_fields).isdisjoint(campos)
+
+
+@receiver(pre_save, sender=NotaFiscal)
+def guardar_estado_anterior_nota(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._balde_resumo_anterior = None
+    instance._totais_anteriores = None
+    afeta_resumo = _afeta_resumo(update_fields, CAMPOS_RESUMO_NOTA)
+    afeta_totais = _afeta_resumo(update_fields, CAMPOS_TOTAIS_NOTA)
+    if raw or not instance.pk or not (afeta_resumo or afeta_totais):
+        return
+    anterior = (
+        NotaFiscal.objects.filter(pk=instance.pk)
+        .values_list('data', 'cliente_id', 'status', *CAMPOS_TOTAIS_NOTA)
+        .first()
+    )
+    if anterior is None:
+        return
+    if afeta_resumo:
+        instance._balde_resumo_anterior = anterior[:3]
+    if afeta_totais:
+        instance._totais_anteriores = anterior[3:]
+
+
+@receiver(post_save, sender=NotaFiscal)
+def atualizar_resumo_nota(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _afeta_resumo(update_fields, CAMPOS_RESUMO_NOTA):
+        return
+    ResumoDashboardService.recalcular_baldes_notas([
+        getattr(instance, '_balde_resumo_anterior', None),
+        ResumoDashboardService.balde_nota(instance),
+    ])
+
+
+@receiver(post_save, sender=NotaFiscal)
+def atualizar_totais_romaneios_da_nota(sender, instance, raw=False, **kwargs):
+    anteriores = getattr(instance, '_totais_anteriores', None)
+    if raw or anteriores is None:
+        return
+    delta = [
+        Decimal(getattr(instance, campo) or 0) - (anterior or 0)
+        for campo, anterior in zip(CAMPOS_TOTAIS_NOTA, anteriores)
+    ]
+    if not any(delta):
+        return
+    romaneio_ids = VinculoNotaRomaneio.objects.filter(
+        nota_fiscal_id=instance.pk
+    ).values_list('romaneio_id', flat=True)
+    RomaneioService.aplicar_delta_totais(romaneio_ids, *delta)
+
+
+@receiver(pre_delete, sender=NotaFiscal)
+def guardar_romaneios_da_nota_excluida(sender, instance, **kwargs):
+    instance._romaneios_vinculados = list(
+        VinculoNotaRomaneio.objects.filter(
+            nota_fiscal_id=instance.pk
+        ).values_list('romaneio_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=NotaFiscal)
+def remover_resumo_nota(sender, instance, **kwargs):
+    ResumoDashboardService.recalcular_baldes_notas([ResumoDashboardService.balde_nota(instance)])
+    # A exclusão apaga os vínculos sem disparar m2m_changed
+    RomaneioService.aplicar_delta_totais(
+        getattr(instance, '_romaneios_vinculados', []),
+        peso=-(instance.peso or 0),
+        valor=-(instance.valor or 0),
+        quantidade=-(instance.quantidade or 0),
+    )
+
+
+@receiver(pre_save, sender=RomaneioViagem)
+def guardar_balde_anterior_romaneio(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._balde_resumo_anterior = None
+    if raw or not instance.pk or not _afeta_resumo(update_fields, CAMPOS_RESUMO_ROMANEIO):
+        return
+    anterior = RomaneioViagem.objects.filter(pk=instance.pk).only(
+        'data_emissao', 'cliente_id', 'status', 'destino_estado'
+    ).first()
+    if anterior is not None:
+        instance._balde_resumo_anterior = ResumoDashboardService.balde_romaneio(anterior)
+
+
+@receiver(post_save, sender=RomaneioViagem)
+def atualizar_resumo_romaneio(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _afeta_resumo(update_fields, CAMPOS_RESUMO_ROMANEIO):
+        return
+    ResumoDashboardService.recalcular_baldes_romaneios([
+        getattr(instance, '_balde_resumo_anterior', None),
+        ResumoDashboardService.balde_romaneio(instance),
+    ])
+
+
+@receiver(post_save, sender=RomaneioViagem)
+def replicar_status_romaneio_vinculos(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    if raw or created or not _afeta_resumo(update_fields, {'status'}):
+        return
+    VinculoNotaRomaneio.objects.filter(romaneio_id=instance.pk).exclude(
+        status_romaneio=instance.status
+    ).update(status_romaneio=instance.status)
+
+
+@receiver(post_delete, sender=RomaneioViagem)
+def remover_resumo_romaneio(sender, instance, **kwargs):
+    ResumoDashboardService.recalcular_baldes_romaneios([ResumoDashboardService.balde_romaneio(instance)])
+
+
+@receiver(post_save, sender=Cliente)
+def atualizar_uf_resumo_cliente(sender, instance, raw=False, created=False, **kwargs):
+    if raw or created:
+        return
+    ResumoDashboardService.atualizar_uf_cliente(instance)
+
+
+@receiver(post_save, sender=RomaneioViagem)
+@receiver(post_delete, sender=RomaneioViagem)
+@receiver(post_save, sender=NotaFiscal)
+@receiver(post_delete, sender=NotaFiscal)
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=TabelaSeguro)
+@receiver(post_delete, sender=TabelaSeguro)
+def invalidar_cache_totalizadores(sender, raw=False, **kwargs):
+    if raw:
+        return
+    TotalizadorService.invalidar_cache()
+
+
+@receiver(post_save, sender=NotaFiscal)
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=RomaneioViagem)
+def indexar_busca(sender, instance, update_fields=None, using=None, **kwargs):
+    BuscaService.indexar(instance, update_fields=update_fields, using=using)
+
+
+@receiver(post_delete, sender=NotaFiscal)
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=RomaneioViagem)
+def remover_da_busca(sender, instance, using=None, **kwargs):
+    BuscaService.remover(instance, using=using)
+
+
+@receiver(m2m_changed, sender=VinculoNotaRomaneio)
+def invalidar_cache_totalizadores_vinculos(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        TotalizadorService.invalidar_cache()
+
+
+@receiver(m2m_changed, sender=VinculoNotaRomaneio)
+def atualizar_totais_romaneio_vinculos(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Aplica aos totais do romaneio apenas a variação das notas vinculadas ou
+    desvinculadas. Funciona nos dois sentidos (romaneio.notas_fiscais e
+    nota.romaneios_vinculados).
+    """
+    lado = 'nota_fiscal_id' if reverse else 'romaneio_id'
+    outro_lado = 'romaneio_id' if reverse else 'nota_fiscal_id'
+
+    if action in ('pre_remove', 'pre_clear'):
+        # remove() envia os IDs pedidos, mesmo os que não estavam vinculados
+        vinculos = VinculoNotaRomaneio.objects.filter(**{lado: instance.pk})
+        if action == 'pre_remove':
+            vinculos = vinculos.filter(**{f'{outro_lado}__in': pk_set})
+        instance._vinculos_removidos = list(vinculos.values_list(outro_lado, flat=True))
+        return
+
+    if action == 'post_add':
+        ids, sinal = pk_set or [], 1
+    elif action in ('post_remove', 'post_clear'):
+        ids, sinal = getattr(instance, '_vinculos_removidos', []), -1
+    else:
+        return
+    if not ids:
+        return
+
+    if reverse:
+        RomaneioService.aplicar_vinculos_totais(ids, [instance.pk], sinal)
+    else:
+        RomaneioService.aplicar_vinculos_totais([instance.pk], ids, sinal)
+        instance.refresh_from_db(fields=CAMPOS_TOTAIS_ROMANEIO)
+
+
+@receiver(m2m_changed, sender=VinculoNotaRomaneio)
+def replicar_status_novos_vinculos(sender, instance, action, reverse, pk_set, **kwargs):
+    """add()/set() criam os vínculos com o status padrão; copia o do romaneio."""
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        RomaneioService.sincronizar_status_vinculos(pk_set, nota_ids=[instance.pk])
+    else:
+        RomaneioService.sincronizar_status_vinculos([instance.pk], nota_ids=pk_set)
@@ -1,6 +1,7 @@
 """
 Configuração global de testes e fixtures compartilhadas
 """
+import importlib
 import pytest
 import random
 import string
@@ -130,6 +131,20 @@ class RomaneioViagemFactory(DjangoModelFactory):
 # FIXTURES - Para uso em testes
 # ============================================================================
 
+@pytest.fixture(scope='session')
+def django_db_setup(django_db_setup, django_db_blocker):
+    """
+    Com --nomigrations o RunPython da 0077_indices_busca não roda: cria aqui
+    as tabelas do índice de busca (BuscaService) no banco de testes.
+    """
+    from django.apps import apps
+    from django.db import connection
+
+    migracao = importlib.import_module('notas.migrations.0077_indices_busca')
+    with django_db_blocker.unblock(), connection.schema_editor() as schema_editor:
+        migracao.criar_indices_busca(apps, schema_editor)
+
+
 @pytest.fixture
 def user_admin(db):
     """Cria um usuário administrador"""
@@ -215,6 +230,16 @@ def authenticated_client_cliente(client, user_cliente):
     return client
 
 
+@pytest.fixture(autouse=True)
+def monitor_consultas_estrito(settings):
+    """
+    Toda requisição feita nos testes respeita o orçamento de consultas da view
+    e não repete consultas (N+1); senão OrcamentoConsultasExcedido falha o teste.
+    """
+    settings.MONITOR_CONSULTAS_ATIVO = True
+    settings.MONITOR_CONSULTAS_ESTRITO = True
+
+
 # ============================================================================
 # HELPERS - Funções auxiliares para testes
 # ============================================================================
@@ -0,0 +1,96 @@
+"""
+Testes do formato indexado de dados arquivados
+"""
+import gzip
+import json
+from datetime import date, timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from notas.models import NotaFiscal, RomaneioViagem
+from notas.tests.conftest import NotaFiscalFactory, criar_romaneio_completo
+from notas.utils.arquivo_historico import EscritorArquivo, LeitorArquivo, caminho_indice
+
+
+def _gravar(caminho, quantidade, tamanho_bloco=10):
+    with EscritorArquivo(caminho, tamanho_bloco=tamanho_bloco, metadados={'tipo': 'teste'}) as escritor:
+        for i in range(1, quantidade + 1):
+            escritor.adicionar(
+                {'id': i, 'codigo': f'ROM-{i:04d}', 'valor': i},
+                chave=f'ROM-{i:04d}',
+                cliente_id=i % 3,
+                data=date(2019, 1, 1) + timedelta(days=i),
+            )
+    return caminho
+
+
+class TestArquivoIndexado:
+    """Blocos gzip independentes + índice SQLite"""
+
+    def test_busca_le_apenas_blocos_necessarios(self, tmp_path):
+        caminho = _gravar(tmp_path / 'romaneios.ndjson.gz', 95)
+
+        with LeitorArquivo(caminho) as leitor:
+            assert leitor.total == 95
+            assert leitor.metadados == {'tipo': 'teste'}
+            assert leitor.obter(42)['codigo'] == 'ROM-0042'
+            assert leitor.blocos_lidos == 1
+
+            encontrados = list(leitor.buscar(chave='rom-000'))
+            assert [r['id'] for r in encontrados] == list(range(1, 10))
+            assert leitor.blocos_lidos == 2
+
+            periodo = list(leitor.buscar(cliente_id=0, data_inicio='2019-01-04', data_fim='2019-01-10'))
+            assert [r['id'] for r in periodo] == [3, 6, 9]
+
+    def test_arquivo_continua_legivel_como_gzip(self, tmp_path):
+        caminho = _gravar(tmp_path / 'notas.ndjson.gz', 25)
+
+        with gzip.open(caminho, 'rt', encoding='utf-8') as arquivo:
+            ids = [json.loads(linha)['id'] for linha in arquivo]
+
+        assert ids == list(range(1, 26))
+
+    def test_erro_na_escrita_nao_deixa_arquivo(self, tmp_path):
+        caminho = tmp_path / 'falha.ndjson.gz'
+        with pytest.raises(RuntimeError):
+            with EscritorArquivo(caminho, tamanho_bloco=2) as escritor:
+                escritor.adicionar({'id': 1})
+                raise RuntimeError('falha')
+
+        assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.django_db
+class TestArquivarEConsultar:
+    """Comandos arquivar_dados_antigos e consultar_arquivo"""
+
+    def test_arquiva_e_restaura_um_romaneio(self, tmp_path, monkeypatch, cliente):
+        monkeypatch.chdir(tmp_path)
+        antigo = timezone.now() - timedelta(days=365 * 6)
+        romaneio = criar_romaneio_completo(cliente=cliente, status='Emitido')
+        nota = NotaFiscalFactory(cliente=cliente)
+        romaneio.notas_fiscais.add(nota)
+        RomaneioViagem.objects.filter(pk=romaneio.pk).update(data_emissao=antigo)
+        outro = criar_romaneio_completo(cliente=cliente)
+        RomaneioViagem.objects.filter(pk=outro.pk).update(data_emissao=antigo)
+        # Motorista continua em uso, então não é arquivado junto
+        criar_romaneio_completo(cliente=cliente, motorista=romaneio.motorista)
+
+        call_command('arquivar_dados_antigos', '--anos', '5', stdout=open(tmp_path / 'saida.txt', 'w'))
+
+        assert not RomaneioViagem.objects.filter(pk__in=[romaneio.pk, outro.pk]).exists()
+        arquivo = next((tmp_path / 'dados_arquivados' / 'romaneios').glob('*.ndjson.gz'))
+        assert caminho_indice(arquivo).exists()
+
+        call_command('consultar_arquivo', '--restaurar', str(arquivo), '--id', str(romaneio.pk),
+                     stdout=open(tmp_path / 'saida.txt', 'w'))
+
+        restaurado = RomaneioViagem.objects.get(pk=romaneio.pk)
+        assert restaurado.codigo == romaneio.codigo
+        assert list(restaurado.notas_fiscais.all()) == [nota]
+        assert restaurado.peso_total == nota.peso
+        assert not RomaneioViagem.objects.filter(pk=outro.pk).exists()
+        assert NotaFiscal.objects.filter(pk=nota.pk).exists()
@@ -0,0 +1,41 @@
+"""
+Testes do snapshot de auditoria (serializer_modelo_para_dict)
+"""
+import json
+from decimal import Decimal
+
+import pytest
+
+from notas.models import NotaFiscal, RomaneioViagem
+from notas.tests.conftest import NotaFiscalFactory, criar_romaneio_completo
+from notas.utils.auditoria import serializer_modelo_para_dict
+
+
+@pytest.mark.django_db
+class TestSerializerAuditoria:
+    """Snapshot com custo fixo de consultas"""
+
+    def test_romaneio_em_uma_consulta(self, django_assert_num_queries):
+        romaneio = criar_romaneio_completo()
+        notas = NotaFiscalFactory.create_batch(3, cliente=romaneio.cliente)
+        romaneio.notas_fiscais.add(*notas)
+        romaneio = RomaneioViagem.objects.get(pk=romaneio.pk)
+
+        with django_assert_num_queries(1):
+            dados = serializer_modelo_para_dict(romaneio)
+
+        assert dados['cliente'] == {'id': romaneio.cliente_id}
+        assert sorted(dados['notas_fiscais']) == sorted(n.pk for n in notas)
+        assert isinstance(dados['valor_total'], float)
+        json.dumps(dados)
+
+    def test_nota_sem_consultas_com_prefetch(self, django_assert_num_queries, cliente):
+        NotaFiscalFactory(cliente=cliente, valor=Decimal('10.50'))
+        nota = NotaFiscal.objects.select_related('cliente').get()
+
+        with django_assert_num_queries(0):
+            dados = serializer_modelo_para_dict(nota)
+
+        assert dados['cliente'] == {'id': cliente.pk, 'repr': str(cliente)}
+        assert dados['valor'] == 10.5
+        assert dados['data'] == nota.data.isoformat()
@@ -0,0 +1,90 @@
+"""
+Testes da fila de gravação em lote dos logs de auditoria
+"""
+import queue
+
+import pytest
+
+from notas.models import AuditoriaLog, Motorista
+from notas.tests.conftest import MotoristaFactory
+from notas.utils import auditoria
+from notas.utils.auditoria_fila import FilaAuditoria
+
+
+@pytest.fixture
+def fila(monkeypatch):
+    """Fila sem a thread de fundo: os lotes são gravados por descarregar()."""
+    fila = FilaAuditoria()
+
+    def iniciar_sem_thread():
+        if fila._fila is None:
+            fila._fila = queue.Queue(maxsize=2)
+
+    monkeypatch.setattr(fila, '_iniciar', iniciar_sem_thread)
+    return fila
+
+
+def _log(**kwargs):
+    dados = {'acao': 'CREATE', 'modelo': 'Cliente', 'objeto_id': 1, 'observacoes': 'Cliente criado'}
+    dados.update(kwargs)
+    return AuditoriaLog(**dados)
+
+
+@pytest.mark.django_db
+class TestFilaAuditoria:
+    """Gravação após commit, em lote, e resolução da impersonação"""
+
+    def test_grava_somente_apos_commit(self, fila, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            fila.enfileirar(_log(objeto_id=1))
+            fila.enfileirar(_log(objeto_id=2))
+            assert AuditoriaLog.objects.count() == 0
+
+        assert AuditoriaLog.objects.count() == 0
+        fila.descarregar()
+        assert sorted(AuditoriaLog.objects.values_list('objeto_id', flat=True)) == [1, 2]
+
+    def test_fila_cheia_grava_na_hora(self, fila, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            for objeto_id in range(3):
+                fila.enfileirar(_log(objeto_id=objeto_id))
+
+        assert AuditoriaLog.objects.count() == 1
+        fila.descarregar()
+        assert AuditoriaLog.objects.count() == 3
+
+    def test_delete_gravado_no_commit_sem_passar_pela_fila(self, fila, monkeypatch, user_admin,
+                                                              django_capture_on_commit_callbacks):
+        monkeypatch.setattr(auditoria, 'fila_auditoria', fila)
+        motorista = MotoristaFactory(nome='MOTORISTA RESTAURAR FILA')
+        pk = motorista.pk
+
+        with django_capture_on_commit_callbacks(execute=True):
+            auditoria.registrar_exclusao(user_admin, motorista)
+            motorista.delete()
+            assert not AuditoriaLog.objects.exists()
+
+        assert fila._fila is None
+        assert AuditoriaLog.objects.get().acao == 'DELETE'
+        auditoria.restaurar_registro('Motorista', pk, usuario=user_admin)
+        assert Motorista.objects.filter(nome='MOTORISTA RESTAURAR FILA').exists()
+
+    def test_modo_sincrono(self, fila, settings):
+        settings.AUDITORIA_ASSINCRONA = False
+        fila.enfileirar(_log())
+        assert AuditoriaLog.objects.count() == 1
+
+    def test_prefixo_de_impersonacao(self, fila, user_admin, user_cliente):
+        fila.gravar([(_log(usuario_id=user_cliente.pk), user_cliente.pk, user_admin.pk)])
+        log = AuditoriaLog.objects.get()
+        assert log.usuario == user_admin
+        assert log.observacoes == f"[IMPERSONANDO {user_cliente.username}] Cliente criado"
+
+    def test_admin_original_inexistente_usa_usuario_da_acao(self, fila, user_admin, user_cliente):
+        fila.gravar([
+            (_log(usuario_id=user_cliente.pk, objeto_id=1), None, 999999),
+            (_log(usuario_id=user_cliente.pk, objeto_id=2), None, user_admin.pk),
+        ])
+        assert dict(AuditoriaLog.objects.values_list('objeto_id', 'usuario_id')) == {
+            1: user_cliente.pk, 2: user_admin.pk,
+        }
@@ -0,0 +1,92 @@
+"""Testes da massa sintética (DadosSinteticosService) e do runner de benchmarks."""
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Sum
+
+from financeiro.services import LivroCaixaService
+from notas.models import Cliente, NotaFiscal, RomaneioViagem, VinculoNotaRomaneio
+from notas.services import DadosSinteticosService, RomaneioService
+from notas.utils import benchmark
+from notas.utils.monitor_consultas import verificar_consultas
+
+MASSA_PEQUENA = dict(clientes=4, notas=120, romaneios=15, movimentos=30, logs_auditoria=15, dias=30)
+
+
+@pytest.mark.django_db
+class TestDadosSinteticosService:
+    def test_massa_consistente(self, user_admin):
+        massa = DadosSinteticosService.gerar(usuario=user_admin, **MASSA_PEQUENA)
+
+        assert (massa['clientes'], massa['notas'], massa['romaneios']) == (4, 120, 15)
+        assert NotaFiscal.objects.count() == 120
+        # Status das notas já sai igual ao que os sinais calculariam
+        assert RomaneioService.recalcular_status_notas(NotaFiscal.objects.values_list('pk', flat=True)) == 0
+        for romaneio in RomaneioViagem.objects.all():
+            totais = VinculoNotaRomaneio.objects.filter(romaneio=romaneio).aggregate(
+                peso=Sum('nota_fiscal__peso'), valor=Sum('nota_fiscal__valor')
+            )
+            assert (romaneio.peso_total, romaneio.valor_total) == (totais['peso'], totais['valor'])
+            assert romaneio.cliente_id == romaneio.notas_fiscais.values_list('cliente_id', flat=True).distinct().get()
+        divergentes, _totais = LivroCaixaService.recalcular(massa['periodo_id'], gravar=False)
+        assert divergentes == []
+
+    def test_rodadas_nao_colidem_e_consultas_nao_crescem_com_a_massa(self, user_admin):
+        with verificar_consultas(maximo=60):
+            primeira = DadosSinteticosService.gerar(usuario=user_admin, semente=1, **MASSA_PEQUENA)
+        with verificar_consultas(maximo=60):
+            segunda = DadosSinteticosService.gerar(
+                usuario=user_admin, semente=1, **{**MASSA_PEQUENA, 'notas': 400, 'romaneios': 60}
+            )
+
+        assert segunda['rodada'] == primeira['rodada'] + 1
+        assert Cliente.objects.count() == 8
+        assert NotaFiscal.objects.count() == 520
+
+
+@pytest.mark.django_db
+class TestBenchmark:
+    def test_executa_todos_os_cenarios(self, user_admin):
+        massa = DadosSinteticosService.gerar(usuario=user_admin, **MASSA_PEQUENA)
+
+        resultados = benchmark.executar(benchmark.criar_contexto(massa, user_admin), repeticoes=1)
+
+        assert set(resultados) == set(benchmark.CENARIOS)
+        for medido in resultados.values():
+            assert medido['consultas'] > 0
+            assert medido['tempo_ms'] > 0
+        # Aquecimento, uma execução medida e outra com tracemalloc
+        assert RomaneioViagem.objects.count() == massa['romaneios'] + 3
+
+    def test_comparar_aponta_regressoes(self):
+        base = {'dashboard': {'tempo_ms': 100.0, 'consultas': 10, 'memoria_kb': 1000.0}}
+
+        assert benchmark.comparar({'dashboard': {'tempo_ms': 190.0, 'consultas': 10, 'memoria_kb': 1200.0}}, base) == []
+        regressoes = benchmark.comparar(
+            {'dashboard': {'tempo_ms': 210.0, 'consultas': 11, 'memoria_kb': 1300.0}, 'novo': {}}, base
+        )
+        assert len(regressoes) == 3
+        assert regressoes[0] == 'dashboard: 11 consultas (base 10)'
+        # Medições pequenas usam a folga absoluta
+        assert benchmark.comparar({'dashboard': {'tempo_ms': 9.0, 'consultas': 1, 'memoria_kb': 60.0}},
+                                  {'dashboard': {'tempo_ms': 1.0, 'consultas': 1, 'memoria_kb': 1.0}}) == []
+
+    def test_comando_salva_linha_base_compara_e_desfaz_massa(self, user_admin, tmp_path):
+        caminho = tmp_path / 'linha_base.json'
+        opcoes = dict(clientes=3, notas=40, romaneios=10, movimentos=10, logs_auditoria=5, repeticoes=1,
+                      cenarios=['dashboard', 'auditoria'], linha_base=str(caminho), stdout=io.StringIO())
+
+        call_command('executar_benchmarks', salvar_linha_base=True, **opcoes)
+
+        assert not NotaFiscal.objects.exists()
+        linha_base = json.loads(caminho.read_text(encoding='utf-8'))
+        assert set(linha_base['cenarios']) == {'dashboard', 'auditoria'}
+        assert linha_base['parametros']['notas'] == 40
+
+        linha_base['cenarios']['dashboard']['consultas'] = 0
+        caminho.write_text(json.dumps(linha_base), encoding='utf-8')
+        with pytest.raises(CommandError, match='dashboard: .* consultas'):
+            call_command('executar_benchmarks', **opcoes)
@@ -0,0 +1,109 @@
+"""
+Testes do índice de busca textual
+"""
+import importlib
+from types import SimpleNamespace
+
+import pytest
+from django.apps import apps
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from notas.models import NotaFiscal
+from notas.services import BuscaService
+from notas.services.busca_service import normalizar_texto
+from notas.tests.conftest import ClienteFactory, NotaFiscalFactory
+
+
+def test_normalizar_texto():
+    assert normalizar_texto('Agropecuária São João') == 'AGROPECUARIA SAO JOAO'
+    assert normalizar_texto('62.531.215/0001-96') == '62531215000196'
+    assert normalizar_texto(None) == ''
+
+
+@pytest.mark.django_db
+@pytest.mark.service
+class TestBuscaService:
+    """Índice mantido pelos sinais, com acentos e caixa normalizados"""
+
+    def test_busca_parcial_sem_acento(self, cliente):
+        NotaFiscalFactory(cliente=cliente, fornecedor='Madeireira São João', mercadoria='Tábuas')
+        NotaFiscalFactory(cliente=cliente, fornecedor='Outro Fornecedor', mercadoria='Telhas')
+
+        with CaptureQueriesContext(connection) as contexto:
+            encontradas = list(BuscaService.filtrar(NotaFiscal.objects.all(), 'sao joa', campos=('fornecedor',)))
+
+        assert [n.fornecedor for n in encontradas] == ['MADEIREIRA SÃO JOÃO']
+        sql = next(q['sql'] for q in contexto.captured_queries if NotaFiscal._meta.db_table in q['sql'])
+        assert 'MATCH' in sql and 'LIKE' not in sql
+
+    def test_alteracao_e_exclusao_atualizam_indice(self):
+        cliente = ClienteFactory(razao_social='Transportes Alfa', cnpj='12.345.678/0001-90')
+        assert BuscaService.buscar('cliente', '12345678') == [cliente]
+
+        cliente.razao_social = 'Logística Beta'
+        cliente.save()
+        assert BuscaService.buscar('cliente', 'alfa') == []
+        assert BuscaService.buscar('cliente', 'logistica') == [cliente]
+
+        cliente.delete()
+        assert BuscaService.buscar('cliente', 'logistica') == []
+
+    def test_combina_com_outros_filtros_e_termos_curtos(self, cliente):
+        # Fornecedor fixo: o aleatório da factory pode conter "ca"
+        NotaFiscalFactory(cliente=cliente, fornecedor='Fornecedor', mercadoria='Saco de Cimento', status='Depósito')
+        NotaFiscalFactory(cliente=cliente, fornecedor='Fornecedor', mercadoria='Saco de Cal', status='Depósito')
+        NotaFiscalFactory(cliente=cliente, fornecedor='Fornecedor', mercadoria='Saco de Cimento', status='Enviada')
+
+        deposito = NotaFiscal.objects.filter(status='Depósito')
+        assert BuscaService.filtrar(deposito, 'cimento saco').count() == 1
+        assert BuscaService.filtrar(deposito, 'saco ca').count() == 1
+        assert BuscaService.filtrar(deposito, 'ca').count() == 1
+
+    def test_reconstruir(self, cliente):
+        NotaFiscalFactory.create_batch(3, cliente=cliente, fornecedor='Fornecedor Gama')
+        NotaFiscal.objects.update(fornecedor='FORNECEDOR DELTA')  # sem sinais
+        assert BuscaService.filtrar(NotaFiscal.objects.all(), 'delta').count() == 0
+
+        assert BuscaService.reconstruir('nota') == {'nota': 3}
+        assert BuscaService.filtrar(NotaFiscal.objects.all(), 'delta').count() == 3
+
+    def test_migracao_cria_e_preenche_indice(self, cliente):
+        NotaFiscalFactory(cliente=cliente, fornecedor='Fornecedor Epsilon')
+        migracao = importlib.import_module('notas.migrations.0077_indices_busca')
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE {BuscaService.tabela('nota')}")
+            # Só execute/connection: o schema editor do SQLite não abre dentro da transação do teste
+            migracao.criar_indices_busca(apps, SimpleNamespace(connection=connection, execute=cursor.execute))
+            migracao.criar_indices_busca(apps, SimpleNamespace(connection=connection, execute=cursor.execute))
+
+        assert [n.fornecedor for n in BuscaService.buscar('nota', 'epsilon')] == ['FORNECEDOR EPSILON']
+
+
+@pytest.mark.django_db
+class TestBuscaViews:
+    """Telas e API usando o índice"""
+
+    def test_pesquisar_mercadorias_deposito_por_fornecedor(self, authenticated_client, cliente):
+        NotaFiscalFactory(cliente=cliente, fornecedor='Cerâmica Paulista', status='Depósito')
+        NotaFiscalFactory(cliente=cliente, fornecedor='Vidraçaria Norte', status='Depósito')
+
+        response = authenticated_client.get(
+            reverse('notas:pesquisar_mercadorias_deposito'), {'fornecedor': 'ceramica'}
+        )
+
+        assert response.status_code == 200
+        conteudo = response.content.decode()
+        assert 'CERÂMICA PAULISTA' in conteudo
+        assert 'VIDRAÇARIA NORTE' not in conteudo
+
+    def test_api_search(self, user_admin):
+        ClienteFactory(razao_social='Comércio Ômega')
+        api = APIClient()
+        api.force_authenticate(user_admin)
+
+        response = api.get(reverse('cliente-list'), {'search': 'omega'})
+
+        assert [c['razao_social'] for c in response.data['results']] == ['COMÉRCIO ÔMEGA']
@@ -0,0 +1,125 @@
+"""Testes do fechamento mensal de cobranças (CobrancaMensalService)."""
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from notas.models import CobrancaCarregamento
+from notas.services import CobrancaMensalService
+from notas.tests.conftest import ClienteFactory, RomaneioViagemFactory
+from notas.utils.monitor_consultas import verificar_consultas
+
+
+def _emissao(dia, mes=9):
+    return timezone.make_aware(datetime(2026, mes, dia, 10, 0))
+
+
+@pytest.mark.django_db
+class TestCobrancaMensalService:
+    def _romaneio(self, cliente, codigo, dia=15, mes=9, status='Emitido', **kwargs):
+        return RomaneioViagemFactory(
+            codigo=codigo,
+            cliente=cliente,
+            status=status,
+            data_emissao=_emissao(dia, mes),
+            **kwargs,
+        )
+
+    def _mensalista(self, razao_social, valor='500.00'):
+        """Cliente com uma cobrança Mensalista anterior (agosto)."""
+        cliente = ClienteFactory(razao_social=razao_social)
+        anterior = CobrancaCarregamento.objects.create(
+            cliente=cliente, valor_carregamento=Decimal(valor), tipo_cliente='Mensalista'
+        )
+        anterior.romaneios.add(self._romaneio(cliente, f'ROM-ANT-{cliente.pk}', mes=8))
+        return cliente
+
+    def test_previa_agrupa_romaneios_a_cobrar_por_mensalista(self):
+        mensalista = ClienteFactory(razao_social='CLIENTE MENSAL A')
+        cubagem = ClienteFactory(razao_social='CLIENTE CUBAGEM B')
+        self._romaneio(mensalista, 'ROM-M-1', peso_total=Decimal('100.00'))
+        self._romaneio(mensalista, 'ROM-M-2', dia=30, peso_total=Decimal('50.00'))
+        self._romaneio(mensalista, 'ROM-M-3', status='Salvo')
+        self._romaneio(mensalista, 'ROM-M-4', mes=10)
+        cobrado = self._romaneio(mensalista, 'ROM-M-5', mes=8)
+        anterior = CobrancaCarregamento.objects.create(
+            cliente=mensalista, valor_carregamento=Decimal('800.00'), tipo_cliente='Mensalista'
+        )
+        anterior.romaneios.add(cobrado)
+        romaneio_cubagem = self._romaneio(cubagem, 'ROM-C-1')
+        self._romaneio(cubagem, 'ROM-C-2')
+        CobrancaCarregamento.objects.create(cliente=cubagem, tipo_cliente='Por_Cubagem').romaneios.add(romaneio_cubagem)
+
+        sem_historico = ClienteFactory(razao_social='CLIENTE NOVO C')
+        self._romaneio(sem_historico, 'ROM-N-1')
+
+        previa = CobrancaMensalService.previa(2026, 9)
+
+        assert previa == [{
+            'cliente_id': mensalista.pk,
+            'razao_social': 'CLIENTE MENSAL A',
+            'quantidade_romaneios': 2,
+            'peso_total': Decimal('150.00'),
+            'valor_mercadorias': Decimal('0.00'),
+            'valor_carregamento': Decimal('800.00'),
+        }]
+
+    def test_gerar_cria_cobrancas_e_vinculos_em_consultas_constantes(self):
+        clientes = [self._mensalista(f'CLIENTE LOTE {i}') for i in range(12)]
+        for i, cliente in enumerate(clientes):
+            self._romaneio(cliente, f'ROM-L-{i}-A')
+            self._romaneio(cliente, f'ROM-L-{i}-B', dia=1)
+
+        with verificar_consultas(maximo=8):
+            cobrancas = CobrancaMensalService.gerar(2026, 9)
+
+        assert len(cobrancas) == 12
+        cobranca = CobrancaCarregamento.objects.get(pk=cobrancas[0].pk)
+        assert cobranca.cliente == clientes[0]
+        assert cobranca.status == 'Pendente'
+        assert cobranca.valor_carregamento == Decimal('500.00')
+        assert cobranca.data_vencimento == date(2026, 10, 10)
+        assert cobranca.observacoes == 'COBRANÇA MENSAL 09/2026 - 2 ROMANEIO(S)'
+        assert sorted(cobranca.romaneios.values_list('codigo', flat=True)) == ['ROM-L-0-A', 'ROM-L-0-B']
+        assert CobrancaMensalService.gerar(2026, 9) == []
+        assert CobrancaCarregamento.objects.count() == 24
+
+    def test_cliente_sem_historico_fica_na_cobranca_manual(self):
+        cliente = ClienteFactory(razao_social='CLIENTE SEM HISTORICO')
+        romaneio = self._romaneio(cliente, 'ROM-SH-1')
+        avulso = ClienteFactory(razao_social='CLIENTE AVULSO')
+        CobrancaCarregamento.objects.create(cliente=avulso, tipo_cliente='Avulso').romaneios.add(
+            self._romaneio(avulso, 'ROM-AV-0', mes=8)
+        )
+        self._romaneio(avulso, 'ROM-AV-1')
+
+        assert CobrancaMensalService.gerar(2026, 9) == []
+        assert not romaneio.cobrancas_vinculadas.exists()
+        assert CobrancaCarregamento.objects.count() == 1
+
+    def test_comando_dry_run_nao_grava(self):
+        cliente = self._mensalista('CLIENTE COMANDO')
+        self._romaneio(cliente, 'ROM-CMD-1')
+
+        call_command('gerar_cobrancas_mensais', competencia='2026-09', dry_run=True)
+        assert CobrancaCarregamento.objects.filter(cliente=cliente).count() == 1
+
+        call_command('gerar_cobrancas_mensais', competencia='2026-09')
+        assert CobrancaCarregamento.objects.filter(cliente=cliente).count() == 2
+
+    def test_view_previa_e_geracao(self, authenticated_client):
+        cliente = self._mensalista('CLIENTE TELA MENSAL')
+        self._romaneio(cliente, 'ROM-V-1')
+        url = reverse('notas:cobranca_mensal')
+
+        resposta = authenticated_client.get(url, {'competencia': '2026-09'})
+        assert resposta.status_code == 200
+        assert [linha['cliente_id'] for linha in resposta.context['previa']] == [cliente.pk]
+        assert CobrancaCarregamento.objects.filter(cliente=cliente).count() == 1
+
+        resposta = authenticated_client.post(url, {'competencia': '2026-09'})
+        assert resposta.status_code == 302
+        assert CobrancaCarregamento.objects.filter(cliente=cliente).count() == 2
@@ -0,0 +1,163 @@
+"""Testes da importação em lote de notas fiscais (ImportacaoNotasService)."""
+import io
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+
+from notas.models import NotaFiscal
+from notas.services import ImportacaoNotasService
+from notas.tests.conftest import ClienteFactory, NotaFiscalFactory
+from notas.utils.monitor_consultas import verificar_consultas
+
+NFE = """<?xml version="1.0" encoding="UTF-8"?>
+<nfeProc xmlns="http://www.portalfiscal.inf.br/nfe">
+  <NFe><infNFe Id="NFe1">
+    <ide><nNF>{numero}</nNF><dhEmi>2026-09-15T10:00:00-03:00</dhEmi></ide>
+    <emit><xNome>Fornecedor XML Ltda</xNome></emit>
+    <dest><CNPJ>{cnpj}</CNPJ></dest>
+    <det nItem="1"><prod><xProd>Cimento CP II</xProd><qCom>40</qCom></prod></det>
+    <total><ICMSTot><vNF>1250.50</vNF></ICMSTot></total>
+    <transp><vol><qVol>10</qVol><pesoB>500.700</pesoB></vol><vol><qVol>2</qVol><pesoB>99.3</pesoB></vol></transp>
+  </infNFe></NFe>
+</nfeProc>
+"""
+
+
+def _csv(*linhas):
+    return io.BytesIO('\n'.join(linhas).encode('utf-8'))
+
+
+@pytest.mark.django_db
+class TestImportacaoNotasService:
+    def test_csv_importa_validas_e_relata_erros_por_linha(self):
+        cliente = ClienteFactory(razao_social='CLIENTE IMPORTACAO CSV', cnpj='11222333000181')
+        NotaFiscalFactory(cliente=cliente, nota='900', mercadoria='AREIA', quantidade=Decimal('5.00'), peso=Decimal('100.00'))
+        arquivo = _csv(
+            'Número Nota;Cliente;Data;Fornecedor;Mercadoria;Quantidade;Peso (kg);Valor;Galpão',
+            '1001;11.222.333/0001-81;15/09/2026;Fornecedor A;Tijolo;10;1.250,9;2.500,00;',
+            '1002;CLIENTE IMPORTACAO CSV;2026-09-16;Fornecedor B;Telha;3;80;300;',
+            '1001;11222333000181;15/09/2026;Fornecedor A;Tijolo;10;1250;100;',
+            '900;11222333000181;15/09/2026;Fornecedor C;Areia;5;100;50;',
+            'ABC;11222333000181;15/09/2026;Fornecedor D;Brita;1;1;1;',
+            '1003;99999999000199;15/09/2026;Fornecedor E;Pedra;1;1;1;',
+            '1004;11222333000181;31/02/2026;Fornecedor F;Cal;1;1;1;',
+            '1005;11222333000181;15/09/2026;Fornecedor G;Cal;1;1;1;Galpão X',
+        )
+
+        resultado = ImportacaoNotasService.importar(ImportacaoNotasService.ler(arquivo, 'csv'), tamanho_lote=2)
+
+        assert resultado['lidas'] == 8
+        assert resultado['importadas'] == 2
+        assert [linha for linha, _erro in resultado['erros']] == [4, 5, 6, 7, 8, 9]
+        assert 'duplicada' in resultado['erros'][0][1]
+        nota = NotaFiscal.objects.get(nota='1001')
+        assert nota.cliente == cliente
+        assert nota.data == date(2026, 9, 15)
+        assert nota.fornecedor == 'FORNECEDOR A'
+        assert nota.peso == Decimal('1250.00')
+        assert nota.valor == Decimal('2500.00')
+        assert nota.status == 'Depósito'
+        assert nota.ordem_nota
+        assert NotaFiscal.objects.filter(cliente=cliente).count() == 3
+
+    def test_lotes_gravados_em_consultas_constantes(self):
+        cliente = ClienteFactory(razao_social='CLIENTE IMPORTACAO LOTE')
+        linhas = ['nota,data,fornecedor,mercadoria,quantidade,peso,valor']
+        linhas += [f'{2000 + i},2026-09-10,FORN,PRODUTO {i},1,10,100' for i in range(250)]
+
+        with verificar_consultas(maximo=30):
+            resultado = ImportacaoNotasService.importar(
+                ImportacaoNotasService.ler(_csv(*linhas), 'csv'), cliente=cliente, tamanho_lote=100
+            )
+
+        assert resultado == {'lidas': 250, 'importadas': 250, 'erros': []}
+        assert NotaFiscal.objects.filter(cliente=cliente).count() == 250
+
+    def test_xml_nfe_usa_destinatario_e_volumes(self):
+        cliente = ClienteFactory(razao_social='CLIENTE IMPORTACAO XML', cnpj='44555666000172')
+        xml = io.BytesIO(NFE.format(numero='5501', cnpj='44555666000172').encode('utf-8'))
+
+        resultado = ImportacaoNotasService.importar(ImportacaoNotasService.ler(xml, 'xml'))
+
+        assert resultado['importadas'] == 1
+        nota = NotaFiscal.objects.get(nota='5501')
+        assert nota.cliente == cliente
+        assert nota.fornecedor == 'FORNECEDOR XML LTDA'
+        assert nota.mercadoria == 'CIMENTO CP II'
+        assert nota.quantidade == Decimal('12.00')
+        assert nota.peso == Decimal('600.00')
+        assert nota.valor == Decimal('1250.50')
+
+    def test_xlsx_com_cliente_padrao(self):
+        from openpyxl import Workbook
+
+        cliente = ClienteFactory(razao_social='CLIENTE IMPORTACAO XLSX')
+        wb = Workbook()
+        wb.active.append(['Nota', 'Data', 'Fornecedor', 'Produto', 'Qtd', 'Peso', 'Valor'])
+        wb.active.append([7001, date(2026, 9, 20), 'Fornecedor Planilha', 'Argamassa', 4, 120.0, 480.25])
+        conteudo = io.BytesIO()
+        wb.save(conteudo)
+        conteudo.seek(0)
+
+        resultado = ImportacaoNotasService.importar(ImportacaoNotasService.ler(conteudo, 'xlsx'), cliente=cliente)
+
+        assert resultado['erros'] == []
+        nota = NotaFiscal.objects.get(nota='7001')
+        assert (nota.cliente, nota.data, nota.valor) == (cliente, date(2026, 9, 20), Decimal('480.25'))
+
+    def test_csv_latin1_usa_cp1252(self):
+        cliente = ClienteFactory(razao_social='CLIENTE IMPORTACAO LATIN1')
+        conteudo = 'Número;Data;Fornecedor;Mercadoria;Qtd;Peso;Valor\n7101;01/09/2026;Construção Ltda;Tijolo cerâmico;1;1;1\n'
+        arquivo = io.BytesIO(conteudo.encode('latin-1'))
+
+        resultado = ImportacaoNotasService.importar(ImportacaoNotasService.ler(arquivo, 'csv'), cliente=cliente)
+
+        assert resultado['erros'] == []
+        nota = NotaFiscal.objects.get(nota='7101')
+        assert (nota.fornecedor, nota.mercadoria) == ('CONSTRUÇÃO LTDA', 'TIJOLO CERÂMICO')
+
+    def test_arquivo_ilegivel_vira_erro(self, authenticated_client):
+        cliente = ClienteFactory(razao_social='CLIENTE IMPORTACAO CORROMPIDO')
+        resultado = ImportacaoNotasService.importar(
+            ImportacaoNotasService.ler(io.BytesIO(b'nao sou uma planilha'), 'xlsx'), cliente=cliente
+        )
+        assert resultado['importadas'] == 0
+        assert 'XLSX inválida' in resultado['erros'][0][1]
+
+        resposta = authenticated_client.post(reverse('notas:importar_notas_fiscais'), {
+            'arquivo': SimpleUploadedFile('notas.xlsx', b'PK\x03\x04corrompido'), 'cliente': cliente.pk,
+        })
+        assert resposta.status_code == 200
+        assert resposta.context['resultado']['erros'][0][0] == 0
+
+    def test_comando_dry_run_nao_grava(self, tmp_path):
+        cliente = ClienteFactory(razao_social='CLIENTE IMPORTACAO CMD')
+        arquivo = tmp_path / 'notas.csv'
+        arquivo.write_text('nota,data,fornecedor,mercadoria,quantidade,peso,valor\n8001,2026-09-01,F,M,1,1,1\nX,,F,M,1,1,1\n')
+        relatorio = tmp_path / 'erros.csv'
+
+        call_command('importar_notas_fiscais', str(tmp_path), cliente=cliente.pk, dry_run=True,
+                     relatorio_erros=str(relatorio), stdout=io.StringIO())
+        assert not NotaFiscal.objects.exists()
+        assert relatorio.read_text().splitlines()[1].startswith('notas.csv;3;')
+
+        call_command('importar_notas_fiscais', str(arquivo), cliente=cliente.pk, stdout=io.StringIO())
+        assert list(NotaFiscal.objects.values_list('nota', flat=True)) == ['8001']
+
+    def test_view_upload(self, authenticated_client):
+        cliente = ClienteFactory(razao_social='CLIENTE IMPORTACAO TELA')
+        url = reverse('notas:importar_notas_fiscais')
+        assert authenticated_client.get(url).status_code == 200
+
+        arquivo = SimpleUploadedFile(
+            'notas.csv', b'nota;data;fornecedor;mercadoria;quantidade;peso;valor\n9001;01/09/2026;F;M;1;1;1\n'
+        )
+        resposta = authenticated_client.post(url, {'arquivo': arquivo, 'cliente': cliente.pk})
+
+        assert resposta.status_code == 200
+        assert resposta.context['resultado']['importadas'] == 1
+        assert NotaFiscal.objects.filter(cliente=cliente, nota='9001').exists()
@@ -315,14 +315,8 @@ class TestNotaFiscal:
         assert romaneio.notas_fiscais.count() == 1
         assert nota in romaneio.notas_fiscais.all()
         
-        # Verificar relacionamento reverso
-        # NotaFiscal tem campo 'romaneios' com related_name='notas_vinculadas'
-        # Mas o relacionamento correto é através de romaneio.notas_fiscais
-        # O campo 'romaneios' em NotaFiscal é um relacionamento diferente
-        # Vamos verificar apenas o relacionamento direto que funciona
-        nota.refresh_from_db()
-        # O relacionamento reverso pode não estar funcionando devido à configuração
-        # Vamos testar apenas o relacionamento direto que sabemos que funciona
+        # Verificar relacionamento reverso (mesma tabela de vínculos)
+        assert list(nota.romaneios_vinculados.all()) == [romaneio]
     
     def test_nota_fiscal_unique_constraint(self, cliente):
         """Testa constraint única de nota fiscal"""
@@ -344,6 +338,18 @@ class TestNotaFiscal:
         )
         assert nota2.pk is not None
 
+    def test_nota_fiscal_ordem_numerica_no_banco(self, cliente):
+        """Testa que ordem_nota ordena o número da nota numericamente"""
+        for numero in ["10", "2", "ABC", "2a", "100", "", "9"]:
+            NotaFiscalFactory(cliente=cliente, nota=numero)
+
+        nota = NotaFiscal.objects.get(nota="100")
+        nota.nota = "1"
+        nota.save(update_fields=['nota'])
+
+        ordenadas = NotaFiscal.objects.order_by('ordem_nota').values_list('nota', flat=True)
+        assert list(ordenadas) == ["1", "2", "2A", "9", "10", "ABC", ""]
+
 
 # ============================================================================
 # TESTES DO MODELO ROMANEIO VIAGEM
@@ -511,7 +517,52 @@ class TestRomaneioViagem:
         
         assert romaneio.percentual_seguro == Decimal("2.50")
         assert romaneio.valor_seguro == Decimal("250.00")  # 2.5% de 10000
-    
+
+    def test_romaneio_totais_incrementais(self, cliente, motorista, veiculo):
+        """Testa totais mantidos por deltas ao vincular, alterar e excluir notas"""
+        TabelaSeguroFactory(estado="SP", percentual_seguro=Decimal("1.00"))
+        romaneio = RomaneioViagemFactory(
+            cliente=cliente, motorista=motorista, veiculo_principal=veiculo, destino_estado="SP"
+        )
+        nota1 = NotaFiscalFactory(cliente=cliente, peso=Decimal("100.00"), valor=Decimal("1000.00"))
+        nota2 = NotaFiscalFactory(cliente=cliente, peso=Decimal("50.00"), valor=Decimal("500.00"))
+
+        romaneio.notas_fiscais.add(nota1, nota2)
+        assert romaneio.peso_total == Decimal("150.00")
+        assert romaneio.valor_total == Decimal("1500.00")
+        assert romaneio.valor_seguro == Decimal("15.00")
+
+        romaneio.notas_fiscais.remove(nota2)
+        assert romaneio.valor_total == Decimal("1000.00")
+
+        nota1.valor = Decimal("1200.00")
+        nota1.save()
+        nota2.romaneios_vinculados.add(romaneio)
+        romaneio.refresh_from_db()
+        assert romaneio.valor_total == Decimal("1700.00")
+        assert romaneio.valor_seguro == Decimal("17.00")
+
+        nota2.delete()
+        romaneio.refresh_from_db()
+        assert romaneio.valor_total == Decimal("1200.00")
+
+        romaneio.notas_fiscais.clear()
+        assert romaneio.peso_total == Decimal("0.00")
+        assert romaneio.valor_total == Decimal("0.00")
+
+    def test_romaneio_totais_custo_constante(self, cliente, django_assert_max_num_queries):
+        """Vincular notas não reconta as notas já presentes no romaneio"""
+        romaneio = RomaneioViagemFactory(cliente=cliente)
+        romaneio.notas_fiscais.add(*[NotaFiscalFactory(cliente=cliente) for _ in range(30)])
+        nota = NotaFiscalFactory(cliente=cliente)
+
+        with django_assert_max_num_queries(20):
+            romaneio.notas_fiscais.add(nota)
+
+        romaneio.refresh_from_db()
+        valor_esperado = sum(n.valor for n in romaneio.notas_fiscais.all())
+        assert romaneio.valor_total == valor_esperado
+
     def test_romaneio_str(self, cliente, motorista, veiculo):
         """Testa método __str__"""
         romaneio = RomaneioViagemFactory(
@@ -697,3 +748,88 @@ class TestRelacionamentos:
         with pytest.raises(Exception):  # Pode ser ProtectedError ou IntegrityError
             cliente.delete()
 
+
+# ============================================================================
+# TESTES DO UPPERCASEMIXIN
+# ============================================================================
+
+@pytest.mark.django_db
+@pytest.mark.model
+class TestUpperCaseMixin:
+    """Conversão para maiúsculas em save() e nas operações em lote"""
+
+    def test_campos_calculados_por_modelo(self):
+        """A lista de campos é montada na preparação da classe, sem os excluídos"""
+        campos = Cliente._campos_maiusculas
+
+        assert 'razao_social' in campos
+        assert 'cidade' in campos
+        assert 'email' not in campos
+        assert 'status' not in campos
+        assert 'cnpj' not in campos
+        assert 'id' not in campos
+
+    def test_save(self):
+        """save() converte os campos de texto e preserva os excluídos"""
+        cliente = Cliente.objects.create(razao_social='empresa save', cidade='natal', email='contato@empresa.com')
+
+        cliente.refresh_from_db()
+        assert cliente.razao_social == 'EMPRESA SAVE'
+        assert cliente.cidade == 'NATAL'
+        assert cliente.email == 'contato@empresa.com'
+
+    def test_bulk_create_bulk_update_e_update(self):
+        """bulk_create, bulk_update e update aplicam a mesma conversão"""
+        Cliente.objects.bulk_create([
+            Cliente(razao_social='empresa lote 1', cidade='recife', status='Ativo'),
+            Cliente(razao_social='empresa lote 2', email='lote@empresa.com'),
+        ])
+        assert set(Cliente.objects.values_list('razao_social', flat=True)) == {'EMPRESA LOTE 1', 'EMPRESA LOTE 2'}
+        assert Cliente.objects.get(razao_social='EMPRESA LOTE 2').email == 'lote@empresa.com'
+
+        clientes = list(Cliente.objects.order_by('razao_social'))
+        for cliente in clientes:
+            cliente.bairro = 'centro'
+            cliente.cidade = 'olinda'
+        Cliente.objects.bulk_update(clientes, ['bairro'])
+        assert set(Cliente.objects.values_list('bairro', 'cidade')) == {('CENTRO', 'RECIFE'), ('CENTRO', None)}
+
+        Cliente.objects.filter(razao_social='EMPRESA LOTE 1').update(cidade='caruaru', status='Inativo')
+        assert Cliente.objects.filter(cidade='CARUARU', status='Inativo').count() == 1
+
+
+# ============================================================================
+# TESTES DO MODELO COBRANCA CARREGAMENTO
+# ============================================================================
+
+@pytest.mark.django_db
+@pytest.mark.model
+class TestCobrancaCarregamento:
+    """Testes para observacoes_para_exibicao de CobrancaCarregamento"""
+
+    def test_observacoes_resolvidas_em_lote(self, user_admin):
+        """Marcadores de saída de caixa de uma lista inteira resolvem numa única consulta"""
+        from financeiro.models import MovimentoCaixa
+        from notas.utils.monitor_consultas import verificar_consultas
+
+        cliente = ClienteFactory(razao_social='CLIENTE OBSERVACOES')
+        esperado = {}
+        for i in range(12):
+            movimento = MovimentoCaixa.objects.create(
+                data=date(2026, 9, 1), tipo='Saida', valor=Decimal('10.00'), descricao=f'Frete extra {i}',
+                usuario_criacao=user_admin,
+            )
+            cobranca = CobrancaCarregamento.objects.create(
+                cliente=cliente, observacoes=f'[SAIDA_CAIXA_CLIENTE:{movimento.pk}] Saída #{i}'
+            )
+            esperado[cobranca.pk] = movimento.descricao
+        legado = CobrancaCarregamento.objects.create(cliente=cliente, observacoes='Saída #7 — 2025-01-02: Diária')
+        esperado[legado.pk] = 'DIÁRIA'
+        esperado[CobrancaCarregamento.objects.create(cliente=cliente).pk] = ''
+
+        with verificar_consultas(maximo=2):
+            cobrancas = CobrancaCarregamento.resolver_observacoes_exibicao(CobrancaCarregamento.objects.filter(cliente=cliente))
+            resolvido = {c.pk: c.observacoes_para_exibicao for c in cobrancas}
+
+        assert resolvido == esperado
+        assert {c.pk: c.observacoes_para_exibicao for c in CobrancaCarregamento.objects.filter(cliente=cliente)} == esperado
@@ -0,0 +1,84 @@
+"""
+Testes do monitor de consultas (orçamento por view e detecção de N+1)
+"""
+import importlib
+from decimal import Decimal
+
+import pytest
+from django.urls import URLPattern, reverse
+
+from notas.models import Cliente
+from notas.tests.conftest import ClienteFactory, NotaFiscalFactory
+from notas.utils.monitor_consultas import (
+    OrcamentoConsultasExcedido,
+    estatisticas,
+    forma_consulta,
+    verificar_consultas,
+)
+from notas.utils.orcamento_consultas import ORCAMENTOS
+
+
+class TestFormaConsulta:
+    """Consultas que diferem só nos valores têm a mesma forma"""
+
+    def test_literais_e_listas_in(self):
+        a = forma_consulta("SELECT * FROM t WHERE id = 10 AND nome = 'A''B' AND x IN (%s, %s, %s)")
+        b = forma_consulta("SELECT *  FROM t WHERE id = 7 AND nome = 'C' AND x IN (%s)")
+
+        assert a == b == 'SELECT * FROM t WHERE id = ? AND nome = ? AND x IN (...)'
+
+    def test_todas_as_views_tem_orcamento(self):
+        faltando = []
+        for modulo, namespace in (('notas.urls', 'notas'), ('financeiro.urls', 'financeiro')):
+            for padrao in importlib.import_module(modulo).urlpatterns:
+                if isinstance(padrao, URLPattern) and padrao.name:
+                    if f'{namespace}:{padrao.name}' not in ORCAMENTOS:
+                        faltando.append(f'{namespace}:{padrao.name}')
+
+        assert faltando == []
+
+
+@pytest.mark.django_db
+class TestMonitorConsultas:
+    """verificar_consultas, middleware e endpoint JSON"""
+
+    def test_verificar_consultas_detecta_n_mais_1(self):
+        ids = [ClienteFactory(razao_social=f'CLIENTE N1 {i}').pk for i in range(12)]
+
+        with pytest.raises(OrcamentoConsultasExcedido, match='N\\+1'):
+            with verificar_consultas():
+                for pk in ids:
+                    Cliente.objects.get(pk=pk)
+
+        with verificar_consultas(maximo=1):
+            list(Cliente.objects.filter(pk__in=ids))
+
+    def test_middleware_falha_acima_do_orcamento(self, authenticated_client, settings):
+        settings.MONITOR_CONSULTAS_ORCAMENTOS = {'notas:listar_clientes': 1}
+
+        with pytest.raises(OrcamentoConsultasExcedido, match='notas:listar_clientes'):
+            authenticated_client.get(reverse('notas:listar_clientes'))
+
+    def test_simular_carregamento_sem_consulta_por_cliente(self, authenticated_client):
+        for i in range(15):
+            cliente = ClienteFactory(razao_social=f'CLIENTE DEPOSITO {i}')
+            NotaFiscalFactory(cliente=cliente, status='Depósito', peso=Decimal('10.00'))
+
+        with verificar_consultas(maximo=ORCAMENTOS['notas:simular_carregamento']):
+            resposta = authenticated_client.get(reverse('notas:simular_carregamento'))
+
+        assert resposta.status_code == 200
+        assert len(resposta.context['clientes_deposito']) == 15
+
+    def test_endpoint_json(self, authenticated_client):
+        estatisticas.zerar()
+        authenticated_client.get(reverse('notas:listar_clientes'))
+
+        resposta = authenticated_client.get(reverse('notas:monitor_consultas'))
+
+        dados = resposta.json()['data']
+        item = dados['views']['notas:listar_clientes']
+        assert item['requisicoes'] == 1
+        assert item['orcamento'] == ORCAMENTOS['notas:listar_clientes']
+        assert item['n_mais_1'] == 0
+        assert authenticated_client.post(reverse('notas:monitor_consultas')).json()['data']['views'] == {}
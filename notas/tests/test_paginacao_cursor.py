@@ -0,0 +1,95 @@
+"""
+Testes da paginação por cursor (keyset)
+"""
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from notas.models import RomaneioViagem
+from notas.tests.conftest import ClienteFactory, criar_romaneio_completo
+from notas.utils.paginacao_cursor import CursorInvalido, paginar_por_cursor
+
+ORDENACAO = ('-data_emissao', '-id')
+
+
+def _criar_emitidos(quantidade, mesma_data=False):
+    agora = timezone.now()
+    romaneios = []
+    for i in range(quantidade):
+        # Razão social única: a aleatória da factory repete entre vários clientes
+        cliente = ClienteFactory(razao_social=f'CLIENTE CURSOR {RomaneioViagem.objects.count() + i}')
+        romaneio = criar_romaneio_completo(cliente=cliente, status='Emitido')
+        data = agora if mesma_data else agora - timedelta(hours=i)
+        RomaneioViagem.objects.filter(pk=romaneio.pk).update(data_emissao=data)
+        romaneios.append(romaneio)
+    return romaneios
+
+
+@pytest.mark.django_db
+class TestPaginarPorCursor:
+    """Páginas estáveis e com custo fixo"""
+
+    def test_percorre_tudo_sem_repetir_com_empates(self):
+        _criar_emitidos(7, mesma_data=True)
+        esperado = list(RomaneioViagem.objects.order_by(*ORDENACAO).values_list('pk', flat=True))
+
+        vistos, cursor = [], None
+        while True:
+            itens, cursor = paginar_por_cursor(RomaneioViagem.objects.all(), ORDENACAO, cursor, limite=3)
+            vistos.extend(r.pk for r in itens)
+            if cursor is None:
+                break
+
+        assert vistos == esperado
+
+    def test_novos_registros_nao_deslocam_pagina_seguinte(self):
+        _criar_emitidos(4)
+        primeira, cursor = paginar_por_cursor(RomaneioViagem.objects.all(), ORDENACAO, limite=2)
+
+        _criar_emitidos(1)  # mais recente que todos
+        segunda, _ = paginar_por_cursor(RomaneioViagem.objects.all(), ORDENACAO, cursor, limite=2)
+
+        assert not {r.pk for r in primeira} & {r.pk for r in segunda}
+        assert len(segunda) == 2
+
+    def test_pagina_profunda_em_uma_consulta(self):
+        _criar_emitidos(5)
+        _, cursor = paginar_por_cursor(RomaneioViagem.objects.all(), ORDENACAO, limite=4)
+
+        with CaptureQueriesContext(connection) as contexto:
+            itens, proximo = paginar_por_cursor(RomaneioViagem.objects.all(), ORDENACAO, cursor, limite=4)
+
+        # Só as consultas do romaneio: a fila de auditoria pode gravar em paralelo
+        consultas = [q['sql'] for q in contexto.captured_queries if RomaneioViagem._meta.db_table in q['sql']]
+        assert len(consultas) == 1
+        assert 'OFFSET' not in consultas[0].upper()
+        assert len(itens) == 1 and proximo is None
+
+    def test_cursor_invalido(self):
+        with pytest.raises(CursorInvalido):
+            paginar_por_cursor(RomaneioViagem.objects.all(), ORDENACAO, 'nao-e-cursor', limite=2)
+
+
+@pytest.mark.django_db
+class TestCarregarMaisRomaneios:
+    """Scroll infinito dos romaneios emitidos"""
+
+    def test_segue_cursor_ate_o_fim(self, authenticated_client):
+        _criar_emitidos(3)
+        url = reverse('notas:carregar_mais_romaneios')
+
+        primeira = authenticated_client.get(url, {'limit': 2}).json()
+        segunda = authenticated_client.get(url, {'limit': 2, 'cursor': primeira['cursor']}).json()
+
+        assert primeira['has_more'] is True
+        assert segunda['has_more'] is False and segunda['cursor'] is None
+        ids = [r['id'] for r in primeira['romaneios'] + segunda['romaneios']]
+        assert ids == list(RomaneioViagem.objects.order_by(*ORDENACAO).values_list('pk', flat=True))
+
+    def test_cursor_invalido_retorna_400(self, authenticated_client):
+        response = authenticated_client.get(reverse('notas:carregar_mais_romaneios'), {'cursor': '!!'})
+        assert response.status_code == 400
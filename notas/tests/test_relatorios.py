@@ -0,0 +1,77 @@
+"""
+Testes das exportações Excel dos totalizadores
+"""
+import io
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.http import FileResponse
+from openpyxl import load_workbook
+
+from notas.utils.relatorios import (
+    gerar_relatorio_excel_totalizador_cliente,
+    gerar_relatorio_excel_totalizador_estado,
+    gerar_resposta_excel_streaming,
+)
+
+
+RESULTADOS_ESTADO = [
+    {
+        'estado': uf, 'nome_estado': nome, 'quantidade_romaneios': qtd,
+        'total_valor': Decimal('1000.00') * qtd, 'percentual_seguro': Decimal('0.50'),
+        'valor_seguro': Decimal('5.00') * qtd,
+    }
+    for uf, nome, qtd in [('GO', 'Goiás', 2), ('SP', 'São Paulo', 3)]
+]
+
+
+def _ler(conteudo):
+    return load_workbook(io.BytesIO(conteudo)).active
+
+
+class TestExcelTotalizador:
+    """Planilhas write-only com o mesmo layout e resposta em streaming"""
+
+    def test_totalizador_estado_layout(self):
+        ws = _ler(gerar_relatorio_excel_totalizador_estado(
+            RESULTADOS_ESTADO, date(2025, 1, 1), date(2025, 1, 31), Decimal('5000'), Decimal('25')
+        ))
+        assert ws['A1'].value == 'RELATÓRIO - TOTALIZADOR POR ESTADO'
+        assert 'A1:F1' in {str(r) for r in ws.merged_cells.ranges}
+        assert ws['B6'].value == 2
+        assert ws['A10'].value == 'ESTADO'
+        assert ws['A12'].value == 'São Paulo (SP)'
+        assert ws['A12'].fill.start_color.rgb.endswith('F2F2F2')
+        assert ws.column_dimensions['A'].width == 25
+
+    def test_totalizador_cliente_secoes_e_totais(self):
+        cliente = SimpleNamespace(cnpj='00.000.000/0001-00', razao_social='CLIENTE A')
+        resultados = [
+            {'uf': 'GO', 'cliente': cliente, 'valor_mercadoria': Decimal('10'), 'valor_seguro': Decimal('1')},
+            {'uf': 'SP', 'cliente': cliente, 'valor_mercadoria': Decimal('20'), 'valor_seguro': Decimal('2')},
+        ]
+        totais = {'GO': {'valor_mercadoria': Decimal('10'), 'valor_seguro': Decimal('1')},
+                  'SP': {'valor_mercadoria': Decimal('20'), 'valor_seguro': Decimal('2')}}
+        ws = _ler(gerar_relatorio_excel_totalizador_cliente(
+            resultados, totais, {'GO': 'Goiás'}, date(2025, 1, 1), date(2025, 1, 31),
+            Decimal('30'), Decimal('3'),
+        ))
+        assert ws['A10'].value == 'GO — Goiás'
+        assert ws['A12'].value == '00.000.000/0001-00 - CLIENTE A'
+        assert ws['A13'].value == 'Total GO'
+        assert ws['A15'].value == 'SP'
+        assert ws['A20'].value == 'TOTAL GERAL'
+        assert ws['C20'].value == 'R$ 30,00'
+        assert {'A13:B13', 'A15:D15', 'A20:B20'} <= {str(r) for r in ws.merged_cells.ranges}
+
+    def test_resposta_streaming(self):
+        response = gerar_resposta_excel_streaming(
+            gerar_relatorio_excel_totalizador_estado,
+            'totalizador.xlsx',
+            RESULTADOS_ESTADO, date(2025, 1, 1), date(2025, 1, 31), Decimal('5000'), Decimal('25'),
+        )
+        assert isinstance(response, FileResponse)
+        assert 'attachment; filename="totalizador.xlsx"' == response['Content-Disposition']
+        ws = _ler(b''.join(response.streaming_content))
+        assert ws['A11'].value == 'Goiás (GO)'
@@ -0,0 +1,86 @@
+"""
+Testes dos resumos diários (rollup) do dashboard
+"""
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.urls import reverse
+
+from notas.models import ResumoDiarioNotaFiscal, ResumoDiarioRomaneio
+from notas.services import ResumoDashboardService
+from notas.tests.conftest import NotaFiscalFactory, criar_romaneio_completo
+
+
+@pytest.mark.django_db
+@pytest.mark.service
+class TestResumoDashboardService:
+    """Manutenção incremental e reconciliação dos resumos"""
+
+    def test_criar_nota_atualiza_resumo(self, cliente):
+        NotaFiscalFactory(cliente=cliente, valor=Decimal('100.00'))
+        NotaFiscalFactory(cliente=cliente, valor=Decimal('50.00'))
+
+        resumo = ResumoDiarioNotaFiscal.objects.get(cliente=cliente, status='Depósito')
+        assert resumo.quantidade == 2
+        assert resumo.valor_total == Decimal('150.00')
+        assert resumo.uf == 'SP'
+
+    def test_mudanca_de_status_move_nota_de_balde(self, cliente):
+        nota = NotaFiscalFactory(cliente=cliente, valor=Decimal('100.00'))
+        nota.status = 'Enviada'
+        nota.save()
+
+        assert not ResumoDiarioNotaFiscal.objects.filter(cliente=cliente, status='Depósito').exists()
+        assert ResumoDiarioNotaFiscal.objects.get(cliente=cliente, status='Enviada').quantidade == 1
+
+    def test_excluir_nota_remove_balde_vazio(self, cliente):
+        nota = NotaFiscalFactory(cliente=cliente)
+        nota.delete()
+        assert not ResumoDiarioNotaFiscal.objects.filter(cliente=cliente).exists()
+
+    def test_romaneio_entra_no_resumo(self, cliente):
+        romaneio = criar_romaneio_completo(cliente=cliente, status='Emitido', destino_estado='sp')
+
+        resumo = ResumoDiarioRomaneio.objects.get(cliente=cliente)
+        assert resumo.status == 'Emitido'
+        assert resumo.uf == 'SP'
+        assert resumo.quantidade == 1
+
+        romaneio.delete()
+        assert not ResumoDiarioRomaneio.objects.filter(cliente=cliente).exists()
+
+    def test_reconciliar_corrige_divergencias(self, cliente):
+        NotaFiscalFactory(cliente=cliente, valor=Decimal('100.00'))
+        ResumoDiarioNotaFiscal.objects.update(quantidade=99)
+        ResumoDiarioNotaFiscal.objects.create(
+            data=date(2000, 1, 1), cliente=cliente, status='Enviada', quantidade=5
+        )
+
+        resultado = ResumoDashboardService.reconciliar()
+
+        assert resultado['notas'] == 1
+        totais = ResumoDashboardService.obter_totais_notas()
+        assert totais['total_notas'] == 1
+        assert totais['notas_deposito'] == 1
+        assert totais['valor_total_deposito'] == Decimal('100.00')
+
+    def test_top_clientes_deposito(self, cliente):
+        NotaFiscalFactory(cliente=cliente, valor=Decimal('300.00'))
+        top = ResumoDashboardService.top_clientes_deposito()
+        assert top == [cliente]
+        assert top[0].valor_deposito == Decimal('300.00')
+
+
+@pytest.mark.django_db
+@pytest.mark.view
+def test_dashboard_usa_resumos(authenticated_client, cliente):
+    NotaFiscalFactory(cliente=cliente, valor=Decimal('10.00'))
+    NotaFiscalFactory(cliente=cliente, valor=Decimal('20.00'), status='Enviada')
+
+    response = authenticated_client.get(reverse('notas:dashboard'))
+
+    assert response.status_code == 200
+    assert response.context['total_notas'] == 2
+    assert response.context['notas_deposito'] == 1
+    assert response.context['notas_enviadas'] == 1
+    assert response.context['valor_total_deposito'] == Decimal('10.00')
@@ -0,0 +1,166 @@
+"""
+Testes do cache de PDF de romaneios
+"""
+from concurrent.futures import Future
+from pathlib import Path
+
+import pytest
+from django.urls import reverse
+
+from notas.services import RomaneioPdfService
+from notas.services import romaneio_pdf_service
+from notas.tests.conftest import NotaFiscalFactory, criar_romaneio_completo
+from notas.utils.romaneio_impressao import carregar_romaneios_para_impressao, montar_itens_impressao_lote
+
+
+class ExecutorSincrono:
+    """Substitui o pool de processos: executa na hora e conta as submissões."""
+
+    def __init__(self):
+        self.submissoes = 0
+
+    def submit(self, fn, *args):
+        self.submissoes += 1
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+def _renderizar_falso(html, destino, css_texto):
+    Path(destino).parent.mkdir(parents=True, exist_ok=True)
+    with open(destino, 'wb') as arquivo:
+        arquivo.write(b'%PDF-' + html.encode('utf-8')[:20])
+    return destino
+
+
+def _renderizar_lote_falso(htmls, destino, css_texto):
+    return _renderizar_falso(''.join(htmls), destino, css_texto)
+
+
+@pytest.fixture
+def executor(monkeypatch, settings, tmp_path):
+    settings.ROMANEIO_PDF_CACHE_DIR = tmp_path
+    executor = ExecutorSincrono()
+    monkeypatch.setattr(RomaneioPdfService, '_pool', classmethod(lambda cls: executor))
+    monkeypatch.setattr(romaneio_pdf_service, 'renderizar_pdf', _renderizar_falso)
+    monkeypatch.setattr(romaneio_pdf_service, 'renderizar_pdf_lote', _renderizar_lote_falso)
+    monkeypatch.setattr(RomaneioPdfService, 'disponivel', staticmethod(lambda: True))
+    return executor
+
+
+@pytest.mark.django_db
+@pytest.mark.service
+class TestRomaneioPdfService:
+    """Renderiza uma vez por conteúdo e descarta versões antigas"""
+
+    def test_segundo_download_usa_cache(self, executor):
+        romaneio = criar_romaneio_completo()
+
+        primeiro = RomaneioPdfService.obter_pdf(romaneio)
+        segundo = RomaneioPdfService.obter_pdf(romaneio)
+
+        assert primeiro == segundo
+        assert primeiro.read_bytes().startswith(b'%PDF-')
+        assert executor.submissoes == 1
+
+    def test_mudanca_nas_notas_gera_nova_versao(self, executor):
+        romaneio = criar_romaneio_completo()
+        antigo = RomaneioPdfService.obter_pdf(romaneio)
+
+        romaneio.notas_fiscais.add(NotaFiscalFactory(cliente=romaneio.cliente))
+        novo = RomaneioPdfService.obter_pdf(romaneio)
+
+        assert novo != antigo
+        assert not antigo.exists()
+        assert list(novo.parent.glob('*.pdf')) == [novo]
+        assert executor.submissoes == 2
+
+    def test_pre_renderizacao_apos_commit(self, executor, django_capture_on_commit_callbacks):
+        romaneio = criar_romaneio_completo()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            RomaneioPdfService.agendar_pre_renderizacao(romaneio.pk)
+            assert executor.submissoes == 0
+
+        assert executor.submissoes == 1
+        RomaneioPdfService.obter_pdf(romaneio)
+        assert executor.submissoes == 1
+
+
+def _criar_romaneios_com_notas(quantidade, notas_por_romaneio=3):
+    romaneios = []
+    for _ in range(quantidade):
+        romaneio = criar_romaneio_completo()
+        romaneio.notas_fiscais.add(
+            *NotaFiscalFactory.create_batch(notas_por_romaneio, cliente=romaneio.cliente)
+        )
+        romaneios.append(romaneio)
+    return romaneios
+
+
+@pytest.mark.django_db
+class TestImpressaoLote:
+    """Impressão de vários romaneios num único documento"""
+
+    def test_itens_com_consultas_fixas(self, django_assert_num_queries):
+        romaneios = _criar_romaneios_com_notas(4)
+
+        with django_assert_num_queries(2):
+            itens = montar_itens_impressao_lote(
+                carregar_romaneios_para_impressao().filter(pk__in=[r.pk for r in romaneios])
+            )
+            str([item['romaneio'].motorista for item in itens])
+
+        assert len(itens) == 4
+        assert all(len(item['notas_romaneadas']) == 3 for item in itens)
+        primeiro = next(item for item in itens if item['romaneio'].pk == romaneios[0].pk)
+        notas = list(romaneios[0].notas_fiscais.all())
+        assert primeiro['total_peso'] == sum(n.peso for n in notas)
+
+    def test_view_html_por_ids(self, authenticated_client):
+        romaneios = _criar_romaneios_com_notas(2, notas_por_romaneio=1)
+
+        response = authenticated_client.get(
+            reverse('notas:imprimir_romaneios_lote'),
+            {'ids': ','.join(str(r.pk) for r in romaneios)},
+        )
+
+        assert response.status_code == 200
+        conteudo = response.content.decode()
+        assert conteudo.count('romaneio-lote-item"') == 2
+        assert all(r.codigo in conteudo for r in romaneios)
+
+    def test_view_cliente_so_imprime_romaneios_com_suas_notas(self, client, user_cliente):
+        proprio, alheio = _criar_romaneios_com_notas(2, notas_por_romaneio=1)
+        user_cliente.cliente = proprio.cliente
+        user_cliente.save()
+        client.force_login(user_cliente)
+        url = reverse('notas:imprimir_romaneios_lote')
+
+        response = client.get(url, {'ids': f'{proprio.pk},{alheio.pk}'})
+        conteudo = response.content.decode()
+        assert conteudo.count('romaneio-lote-item"') == 1
+        assert proprio.codigo in conteudo and alheio.codigo not in conteudo
+
+        response = client.get(url, {'ids': alheio.pk})
+        assert response.status_code == 302
+        assert response.url == reverse('notas:meus_romaneios')
+
+    def test_view_sem_filtro_redireciona(self, authenticated_client):
+        response = authenticated_client.get(reverse('notas:imprimir_romaneios_lote'))
+        assert response.status_code == 302
+
+    def test_pdf_lote_unico_e_em_cache(self, executor, authenticated_client):
+        romaneios = _criar_romaneios_com_notas(3, notas_por_romaneio=1)
+        ids = {'ids': ','.join(str(r.pk) for r in romaneios), 'formato': 'pdf'}
+
+        primeiro = authenticated_client.get(reverse('notas:imprimir_romaneios_lote'), ids)
+        segundo = authenticated_client.get(reverse('notas:imprimir_romaneios_lote'), ids)
+
+        assert primeiro['Content-Type'] == 'application/pdf'
+        assert b''.join(segundo.streaming_content).startswith(b'%PDF-')
+        assert executor.submissoes == 1
+
+        itens = montar_itens_impressao_lote(carregar_romaneios_para_impressao().filter(pk=romaneios[0].pk))
+        assert RomaneioPdfService.obter_pdf_lote(itens).parent.name == 'lotes'
+        assert executor.submissoes == 2
@@ -0,0 +1,63 @@
+"""
+Testes do alocador de sequências de código de romaneio
+"""
+import pytest
+
+from notas.models import SequenciaCodigo
+from notas.services import SequenciaService
+from notas.services.romaneio_service import (
+    _get_next_romaneio_codigo,
+    _get_next_romaneio_generico_codigo,
+    previsualizar_codigo_romaneio,
+)
+from notas.tests.conftest import criar_romaneio_completo
+
+
+@pytest.fixture(autouse=True)
+def _limpar_blocos():
+    SequenciaService.descartar_blocos()
+    yield
+    SequenciaService.descartar_blocos()
+
+
+@pytest.mark.django_db
+@pytest.mark.service
+class TestSequenciaService:
+    """Reserva de valores e inicialização a partir dos códigos existentes"""
+
+    def test_valores_consecutivos(self):
+        assert SequenciaService.proximo_valor('teste') == 1
+        assert SequenciaService.proximo_valor('teste') == 2
+        assert SequenciaCodigo.objects.get(nome='teste').ultimo_valor == 2
+
+    def test_valor_inicial_so_na_criacao(self):
+        assert SequenciaService.proximo_valor('teste', lambda: 41) == 42
+        assert SequenciaService.proximo_valor('teste', lambda: 0) == 43
+
+    def test_bloco_usado_apos_commit(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            assert SequenciaService.proximo_valor('teste', tamanho_bloco=10) == 1
+        assert SequenciaCodigo.objects.get(nome='teste').ultimo_valor == 10
+        assert [SequenciaService.proximo_valor('teste') for _ in range(9)] == list(range(2, 11))
+        assert SequenciaService.proximo_valor('teste') == 11
+
+    def test_bloco_descartado_sem_commit(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=False):
+            SequenciaService.proximo_valor('teste', tamanho_bloco=10)
+        assert SequenciaService.proximo_valor('teste') == 11
+
+    def test_codigo_romaneio_numerico_apos_999(self):
+        criar_romaneio_completo(codigo='ROM-999')
+        criar_romaneio_completo(codigo='ROM-1000')
+        criar_romaneio_completo(codigo='ROM-100-007')
+
+        assert previsualizar_codigo_romaneio() == 'ROM-1001'
+        assert _get_next_romaneio_codigo() == 'ROM-1001'
+        assert _get_next_romaneio_codigo() == 'ROM-1002'
+        assert _get_next_romaneio_generico_codigo() == 'ROM-100-008'
+
+    def test_codigo_automatico_do_modelo(self):
+        primeiro = criar_romaneio_completo()
+        segundo = criar_romaneio_completo()
+        prefixo, numero = primeiro.codigo.rsplit('-', 1)
+        assert segundo.codigo == f"{prefixo}-{int(numero) + 1:04d}"
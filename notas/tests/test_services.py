@@ -10,7 +10,7 @@ from django.forms import modelform_factory
 from notas.services import (
     RomaneioService, NotaFiscalService, CalculoService, ValidacaoService
 )
-from notas.models import RomaneioViagem, NotaFiscal, TabelaSeguro
+from notas.models import RomaneioViagem, NotaFiscal, TabelaSeguro, VinculoNotaRomaneio
 from notas.tests.conftest import (
     ClienteFactory, MotoristaFactory, VeiculoFactory,
     NotaFiscalFactory, RomaneioViagemFactory, TabelaSeguroFactory
@@ -199,6 +199,70 @@ class TestRomaneioService:
             nota.refresh_from_db()
             assert nota.status == 'Depósito'
     
+    def test_recalcular_status_notas_em_massa(self, cliente, django_assert_max_num_queries):
+        """Testa recálculo em massa: poucas consultas, independente do número de notas"""
+        notas = [NotaFiscalFactory(cliente=cliente, status='Depósito') for _ in range(20)]
+        romaneio = RomaneioViagemFactory(cliente=cliente, status='Emitido')
+        romaneio.notas_fiscais.add(*notas)
+        nota_fora = NotaFiscalFactory(cliente=cliente, status='Enviada')
+        ids = [n.pk for n in notas] + [nota_fora.pk]
+
+        # 1 SELECT + 2 UPDATE + resumos do único balde dia/cliente (não cresce com as notas)
+        with django_assert_max_num_queries(16):
+            alteradas = RomaneioService.recalcular_status_notas(ids)
+
+        assert alteradas == 21
+        assert NotaFiscal.objects.filter(pk__in=[n.pk for n in notas], status='Enviada').count() == 20
+        nota_fora.refresh_from_db()
+        assert nota_fora.status == 'Depósito'
+        assert RomaneioService.recalcular_status_notas(ids) == 0
+
+    def test_excluir_romaneio_mantem_nota_em_outro_emitido(self, cliente):
+        """Nota que continua em outro romaneio emitido permanece 'Enviada'"""
+        nota = NotaFiscalFactory(cliente=cliente, status='Enviada')
+        romaneio_a = RomaneioViagemFactory(cliente=cliente, status='Emitido')
+        romaneio_b = RomaneioViagemFactory(cliente=cliente, status='Emitido')
+        romaneio_a.notas_fiscais.add(nota)
+        romaneio_b.notas_fiscais.add(nota)
+
+        sucesso, _mensagem = RomaneioService.excluir_romaneio(romaneio_a)
+
+        assert sucesso
+        nota.refresh_from_db()
+        assert nota.status == 'Enviada'
+
+    def test_vinculo_replica_status_do_romaneio(self, cliente):
+        """status_romaneio acompanha o romaneio nos dois sentidos da relação"""
+        nota_a = NotaFiscalFactory(cliente=cliente)
+        nota_b = NotaFiscalFactory(cliente=cliente)
+        romaneio = RomaneioViagemFactory(cliente=cliente, status='Emitido')
+        romaneio.notas_fiscais.add(nota_a)
+        nota_b.romaneios_vinculados.add(romaneio)
+
+        vinculos = VinculoNotaRomaneio.objects.filter(romaneio=romaneio)
+        assert set(vinculos.values_list('status_romaneio', flat=True)) == {'Emitido'}
+        assert list(nota_b.romaneios_vinculados.all()) == [romaneio]
+
+        romaneio.status = 'Salvo'
+        romaneio.save()
+        assert set(vinculos.values_list('status_romaneio', flat=True)) == {'Salvo'}
+
+        RomaneioService.recalcular_status_notas([nota_a.pk, nota_b.pk])
+        assert set(NotaFiscal.objects.filter(pk__in=[nota_a.pk, nota_b.pk]).values_list('status', flat=True)) == {'Depósito'}
+
+    def test_romaneios_com_notas_do_cliente_sem_duplicar(self, cliente):
+        """Romaneio com várias notas do cliente aparece uma vez, sem distinct()"""
+        outro_cliente = ClienteFactory()
+        romaneio = RomaneioViagemFactory(cliente=cliente)
+        romaneio.notas_fiscais.add(*[NotaFiscalFactory(cliente=cliente) for _ in range(3)])
+        alheio = RomaneioViagemFactory(cliente=outro_cliente)
+        alheio.notas_fiscais.add(NotaFiscalFactory(cliente=outro_cliente))
+
+        romaneios = RomaneioService.romaneios_com_notas_do_cliente(cliente)
+
+        assert list(romaneios) == [romaneio]
+        assert 'DISTINCT' not in str(romaneios.query)
+
     def test_calcular_totais_romaneio(self, romaneio):
         """Testa cálculo de totais de um romaneio"""
         totais = RomaneioService.calcular_totais_romaneio(romaneio)
@@ -0,0 +1,97 @@
+"""
+Testes do motor de agregação dos totalizadores por estado e por cliente
+"""
+import pytest
+from decimal import Decimal
+from django.urls import reverse
+from django.utils import timezone
+
+from notas.services import TotalizadorService
+from notas.tests.conftest import (
+    ClienteFactory,
+    NotaFiscalFactory,
+    TabelaSeguroFactory,
+    criar_romaneio_completo,
+)
+
+
+def _romaneio_emitido(cliente, *valores):
+    romaneio = criar_romaneio_completo(cliente=cliente, status='Emitido')
+    for valor in valores:
+        romaneio.notas_fiscais.add(NotaFiscalFactory(cliente=cliente, valor=Decimal(valor)))
+    return romaneio
+
+
+@pytest.mark.django_db
+@pytest.mark.service
+class TestTotalizadorService:
+    """Agregação em uma consulta e cache por período"""
+
+    def test_totais_por_estado(self):
+        TabelaSeguroFactory(estado='SP', percentual_seguro=Decimal('2.00'))
+        cliente_sp = ClienteFactory(estado='SP')
+        cliente_rj = ClienteFactory(estado='RJ')
+        _romaneio_emitido(cliente_sp, '100.00', '50.00')
+        _romaneio_emitido(cliente_sp, '50.00')
+        _romaneio_emitido(cliente_rj, '10.00')
+        criar_romaneio_completo(cliente=cliente_rj, status='Salvo').notas_fiscais.add(
+            NotaFiscalFactory(cliente=cliente_rj, valor=Decimal('999.00'))
+        )
+        hoje = timezone.localdate()
+
+        dados = TotalizadorService.totais_por_estado(hoje, hoje)
+
+        assert [r['estado'] for r in dados['resultados']] == ['SP', 'RJ']
+        sp = dados['resultados'][0]
+        assert sp['total_valor'] == Decimal('200.00')
+        assert sp['quantidade_romaneios'] == 2
+        assert sp['valor_seguro'] == Decimal('4.00')
+        assert dados['resultados'][1]['percentual_seguro'] == Decimal('0.0')
+        assert dados['total_geral'] == Decimal('210.00')
+        assert dados['total_seguro_geral'] == Decimal('4.00')
+
+    def test_totais_por_cliente(self):
+        TabelaSeguroFactory(estado='SP', percentual_seguro=Decimal('1.00'))
+        cliente = ClienteFactory(estado='SP')
+        _romaneio_emitido(cliente, '300.00')
+        _romaneio_emitido(cliente, '200.00')
+        hoje = timezone.localdate()
+
+        dados = TotalizadorService.totais_por_cliente(hoje, hoje)
+
+        assert len(dados['resultados']) == 1
+        linha = dados['resultados'][0]
+        assert linha['cliente'] == cliente
+        assert linha['uf'] == 'SP'
+        assert linha['valor_mercadoria'] == Decimal('500.00')
+        assert linha['valor_seguro'] == Decimal('5.00')
+        assert dados['totais_por_estado']['SP']['valor_mercadoria'] == Decimal('500.00')
+
+    def test_cache_reutilizado_e_invalidado(self, django_assert_num_queries):
+        cliente = ClienteFactory(estado='SP')
+        romaneio = _romaneio_emitido(cliente, '100.00')
+        hoje = timezone.localdate()
+        TotalizadorService.totais_por_estado(hoje, hoje)
+
+        with django_assert_num_queries(0):
+            dados = TotalizadorService.totais_por_estado(hoje, hoje)
+        assert dados['total_geral'] == Decimal('100.00')
+
+        romaneio.notas_fiscais.add(NotaFiscalFactory(cliente=cliente, valor=Decimal('25.00')))
+        dados = TotalizadorService.totais_por_estado(hoje, hoje)
+        assert dados['total_geral'] == Decimal('125.00')
+
+
+@pytest.mark.django_db
+@pytest.mark.view
+def test_totalizador_por_cliente_view(authenticated_client):
+    cliente = ClienteFactory(estado='SP')
+    _romaneio_emitido(cliente, '40.00')
+    hoje = timezone.localdate().isoformat()
+
+    response = authenticated_client.get(
+        reverse('notas:totalizador_por_cliente'), {'data_inicial': hoje, 'data_final': hoje}
+    )
+
+    assert response.status_code == 200
+    assert response.context['total_geral'] == Decimal('40.00')
@@ -35,6 +35,7 @@ urlpatterns = [
 # URLs para Notas Fiscais
     path('notas/', nota_fiscal_views.listar_notas_fiscais, name='listar_notas_fiscais'),
     path('adicionar/', nota_fiscal_views.adicionar_nota_fiscal, name='adicionar_nota_fiscal'),
+    path('notas/importar/', nota_fiscal_views.importar_notas_fiscais, name='importar_notas_fiscais'),
     path('editar/<int:pk>/', nota_fiscal_views.editar_nota_fiscal, name='editar_nota_fiscal'),
     path('excluir/<int:pk>/', nota_fiscal_views.excluir_nota_fiscal, name='excluir_nota_fiscal'),
     path('notas/<int:pk>/detalhes/', nota_fiscal_views.detalhes_nota_fiscal, name='detalhes_nota_fiscal'),
@@ -71,6 +72,7 @@ urlpatterns = [
     path('romaneios/', romaneio_views.listar_romaneios, name='listar_romaneios'),
     path('romaneios/adicionar/', romaneio_views.adicionar_romaneio, name='adicionar_romaneio'),
     path('romaneios/generico/adicionar/', romaneio_views.adicionar_romaneio_generico, name='adicionar_romaneio_generico'),
+    path('romaneios/imprimir-lote/', romaneio_views.imprimir_romaneios_lote, name='imprimir_romaneios_lote'),
     path('romaneios/editar/<int:pk>/', romaneio_views.editar_romaneio, name='editar_romaneio'),
     path('romaneios/excluir/<int:pk>/', romaneio_views.excluir_romaneio, name='excluir_romaneio'),
     path('romaneios/<int:pk>/emitir/', romaneio_views.emitir_romaneio, name='emitir_romaneio'),
@@ -148,6 +150,7 @@ urlpatterns = [
     path('relatorios/cobranca-carregamento/', cobranca_carregamento, name='cobranca_carregamento'),
     path('relatorios/dados-bancarios-setores/', admin_views.listar_setores_bancarios, name='listar_setores_bancarios'),
     path('relatorios/dados-bancarios-setores/<int:pk>/editar/', admin_views.editar_setor_bancario, name='editar_setor_bancario'),
+    path('diagnostico/consultas/', admin_views.monitor_consultas, name='monitor_consultas'),
 
     # Cobrança de Carregamento
     path('cobranca-carregamento/criar/', criar_cobranca_carregamento, name='criar_cobranca_carregamento'),
@@ -0,0 +1,228 @@
+"""
+Formato dos dados arquivados (arquivar_dados_antigos / consultar_arquivo).
+
+Cada arquivo <nome>.ndjson.gz é uma sequência de blocos; cada bloco é um
+membro gzip independente com até TAMANHO_BLOCO registros em NDJSON (um JSON
+por linha). O arquivo inteiro continua legível por qualquer leitor gzip
+(zcat), e cada bloco pode ser descomprimido sozinho a partir do seu offset.
+
+Ao lado fica o índice <nome>.ndjson.gz.idx (SQLite) com o offset/tamanho
+de cada bloco e, por registro, id, chave (código, número da nota, nome),
+cliente_id e data. Buscas por essas chaves leem só os blocos necessários;
+escrita e leitura mantêm no máximo um bloco em memória.
+"""
+import gzip
+import json
+import os
+import sqlite3
+from itertools import groupby
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+TAMANHO_BLOCO = 1000
+EXTENSAO = '.ndjson.gz'
+EXTENSAO_INDICE = '.idx'
+
+_ESQUEMA_INDICE = '''
+    CREATE TABLE blocos (bloco INTEGER PRIMARY KEY, offset INTEGER NOT NULL, tamanho INTEGER NOT NULL,
+                         registros INTEGER NOT NULL);
+    CREATE TABLE registros (id INTEGER NOT NULL, chave TEXT, cliente_id INTEGER, data TEXT,
+                            bloco INTEGER NOT NULL);
+    CREATE TABLE metadados (nome TEXT PRIMARY KEY, valor TEXT);
+'''
+_INDICES_INDICE = '''
+    CREATE INDEX registros_id ON registros (id);
+    CREATE INDEX registros_chave ON registros (chave);
+    CREATE INDEX registros_cliente ON registros (cliente_id, data);
+    CREATE INDEX registros_data ON registros (data);
+'''
+
+
+def caminho_indice(caminho) -> Path:
+    caminho = Path(caminho)
+    return caminho.with_name(caminho.name + EXTENSAO_INDICE)
+
+
+def eh_arquivo_indexado(caminho) -> bool:
+    caminho = Path(caminho)
+    return caminho.name.endswith(EXTENSAO) and caminho_indice(caminho).exists()
+
+
+def _data_iso(valor) -> Optional[str]:
+    if not valor:
+        return None
+    return str(valor.isoformat() if hasattr(valor, 'isoformat') else valor)[:10]
+
+
+class EscritorArquivo:
+    """
+    Grava registros em blocos à medida que chegam. Os arquivos são escritos
+    com nomes temporários e só aparecem (dados e índice) ao fechar sem erro.
+
+        with EscritorArquivo(caminho, metadados={'tipo': 'notas'}) as escritor:
+            for registro in registros:
+                escritor.adicionar(registro, chave=..., cliente_id=..., data=...)
+    """
+
+    def __init__(self, caminho, tamanho_bloco: int = TAMANHO_BLOCO, metadados: Optional[Dict[str, Any]] = None):
+        self.caminho = Path(caminho)
+        self.tamanho_bloco = tamanho_bloco
+        self.total = 0
+        self._temporario = self.caminho.with_name(self.caminho.name + '.tmp')
+        self._indice_temporario = caminho_indice(self._temporario)
+        self._indice_temporario.unlink(missing_ok=True)
+        self._arquivo = open(self._temporario, 'wb')
+        self._indice = sqlite3.connect(self._indice_temporario)
+        self._indice.executescript(_ESQUEMA_INDICE)
+        self._indice.executemany(
+            'INSERT INTO metadados (nome, valor) VALUES (?, ?)',
+            [(nome, json.dumps(valor, cls=DjangoJSONEncoder)) for nome, valor in (metadados or {}).items()],
+        )
+        self._linhas: List[bytes] = []
+        self._chaves: List[tuple] = []
+        self._bloco = 0
+
+    def adicionar(self, registro: Dict[str, Any], chave=None, cliente_id=None, data=None):
+        self._linhas.append(json.dumps(registro, cls=DjangoJSONEncoder, ensure_ascii=False).encode('utf-8') + b'\n')
+        self._chaves.append((
+            registro['id'],
+            None if chave is None else str(chave),
+            cliente_id,
+            _data_iso(data),
+            self._bloco,
+        ))
+        if len(self._linhas) >= self.tamanho_bloco:
+            self._gravar_bloco()
+
+    def _gravar_bloco(self):
+        if not self._linhas:
+            return
+        dados = gzip.compress(b''.join(self._linhas))
+        offset = self._arquivo.tell()
+        self._arquivo.write(dados)
+        self._indice.execute(
+            'INSERT INTO blocos (bloco, offset, tamanho, registros) VALUES (?, ?, ?, ?)',
+            (self._bloco, offset, len(dados), len(self._linhas)),
+        )
+        self._indice.executemany(
+            'INSERT INTO registros (id, chave, cliente_id, data, bloco) VALUES (?, ?, ?, ?, ?)',
+            self._chaves,
+        )
+        self.total += len(self._linhas)
+        self._bloco += 1
+        self._linhas, self._chaves = [], []
+
+    def fechar(self) -> Path:
+        self._gravar_bloco()
+        self._indice.executescript(_INDICES_INDICE)
+        self._indice.commit()
+        self._indice.close()
+        self._arquivo.flush()
+        os.fsync(self._arquivo.fileno())
+        self._arquivo.close()
+        os.replace(self._temporario, self.caminho)
+        os.replace(self._indice_temporario, caminho_indice(self.caminho))
+        return self.caminho
+
+    def descartar(self):
+        self._indice.close()
+        self._arquivo.close()
+        self._temporario.unlink(missing_ok=True)
+        self._indice_temporario.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_excecao, excecao, traceback):
+        if tipo_excecao is None:
+            self.fechar()
+        else:
+            self.descartar()
+        return False
+
+
+class LeitorArquivo:
+    """Consultas em um arquivo indexado, lendo só os blocos necessários."""
+
+    def __init__(self, caminho):
+        self.caminho = Path(caminho)
+        self._indice = sqlite3.connect(f'file:{caminho_indice(self.caminho)}?mode=ro', uri=True)
+        self._arquivo = open(self.caminho, 'rb')
+        self.blocos_lidos = 0
+
+    @property
+    def total(self) -> int:
+        return self._indice.execute('SELECT COALESCE(SUM(registros), 0) FROM blocos').fetchone()[0]
+
+    @property
+    def metadados(self) -> Dict[str, Any]:
+        return {nome: json.loads(valor) for nome, valor in self._indice.execute('SELECT nome, valor FROM metadados')}
+
+    def _ler_bloco(self, bloco: int) -> List[Dict[str, Any]]:
+        offset, tamanho = self._indice.execute(
+            'SELECT offset, tamanho FROM blocos WHERE bloco = ?', (bloco,)
+        ).fetchone()
+        self._arquivo.seek(offset)
+        self.blocos_lidos += 1
+        return [json.loads(linha) for linha in gzip.decompress(self._arquivo.read(tamanho)).splitlines()]
+
+    def registros(self) -> Iterator[Dict[str, Any]]:
+        """Todos os registros, bloco a bloco."""
+        for (bloco,) in self._indice.execute('SELECT bloco FROM blocos ORDER BY bloco').fetchall():
+            yield from self._ler_bloco(bloco)
+
+    def ids(self) -> Iterator[int]:
+        for (pk,) in self._indice.execute('SELECT id FROM registros ORDER BY bloco'):
+            yield pk
+
+    def buscar(
+        self,
+        id: Optional[int] = None,
+        chave: Optional[str] = None,
+        cliente_id: Optional[int] = None,
+        data_inicio=None,
+        data_fim=None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Registros que atendem a todos os filtros informados. `chave` casa por
+        trecho, sem diferenciar maiúsculas (LIKE do SQLite).
+        """
+        condicoes, params = [], []
+        if id is not None:
+            condicoes.append('id = ?')
+            params.append(id)
+        if chave:
+            condicoes.append('chave LIKE ?')
+            params.append(f'%{chave}%')
+        if cliente_id is not None:
+            condicoes.append('cliente_id = ?')
+            params.append(cliente_id)
+        if data_inicio:
+            condicoes.append('data >= ?')
+            params.append(_data_iso(data_inicio))
+        if data_fim:
+            condicoes.append('data <= ?')
+            params.append(_data_iso(data_fim))
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ''
+        cursor = self._indice.execute(f'SELECT bloco, id FROM registros {where} ORDER BY bloco', params)
+        for bloco, linhas in groupby(cursor, key=lambda linha: linha[0]):
+            ids = {pk for _bloco, pk in linhas}
+            for registro in self._ler_bloco(bloco):
+                if registro['id'] in ids:
+                    yield registro
+
+    def obter(self, id: int) -> Optional[Dict[str, Any]]:
+        return next(self.buscar(id=id), None)
+
+    def fechar(self):
+        self._indice.close()
+        self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+        return False
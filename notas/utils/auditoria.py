@@ -1,12 +1,13 @@
 """
 Utilitários para registrar logs de auditoria no sistema
 """
-import json
 from decimal import Decimal
+from functools import lru_cache
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
 from django.db import models
 from ..models import AuditoriaLog
+from .auditoria_fila import fila_auditoria
 
 
 def get_client_ip(request):
@@ -24,103 +25,120 @@ def get_user_agent(request):
     return request.META.get('HTTP_USER_AGENT', '')[:500]  # Limita a 500 caracteres
 
 
+# Campos que nunca entram no snapshot de auditoria
+CAMPOS_IGNORADOS_AUDITORIA = ('password', 'deleted_at', 'deleted_by')
+
+
+def _converter_valor(val):
+    """Converte um valor qualquer para algo JSON-serializável."""
+    if val is None or isinstance(val, (str, int, float, bool)):
+        return val
+    if isinstance(val, Decimal):
+        return float(val)
+    if hasattr(val, 'isoformat'):
+        return val.isoformat()
+    if isinstance(val, (list, tuple)):
+        return [_converter_valor(item) for item in val[:10]]
+    if isinstance(val, dict):
+        return {str(k): _converter_valor(v) for k, v in list(val.items())[:20]}
+    try:
+        return str(val)[:200]
+    except Exception:
+        return None
+
+
+def _converter_decimal(val):
+    return float(val) if val is not None else None
+
+
+def _converter_data(val):
+    return val.isoformat() if val is not None else None
+
+
+def _conversor_do_campo(field):
+    if isinstance(field, models.DecimalField):
+        return _converter_decimal
+    if isinstance(field, (models.DateField, models.TimeField)):
+        return _converter_data
+    if isinstance(field, (models.CharField, models.TextField, models.IntegerField,
+                          models.BooleanField, models.AutoField)):
+        return None
+    return _converter_valor
+
+
+@lru_cache(maxsize=None)
+def _serializador_do_modelo(model):
+    """
+    Compila, uma vez por modelo, a lista de campos do snapshot:
+    (nome, attname, conversor, campo_relacionado) para campos concretos
+    e os nomes dos ManyToMany.
+    """
+    campos = []
+    for field in model._meta.fields:
+        if field.name in CAMPOS_IGNORADOS_AUDITORIA:
+            continue
+        if field.is_relation:
+            campos.append((field.name, field.attname, None, field))
+        else:
+            campos.append((field.name, field.attname, _conversor_do_campo(field), None))
+    m2m = tuple(field.name for field in model._meta.many_to_many)
+    return tuple(campos), m2m
+
+
+def _ids_relacionados(instance, field_name):
+    """IDs de um ManyToMany, usando o prefetch se houver (senão, uma consulta)."""
+    cache = getattr(instance, '_prefetched_objects_cache', {})
+    if field_name in cache:
+        return [obj.pk for obj in cache[field_name]]
+    return list(getattr(instance, field_name).values_list('pk', flat=True))
+
+
 def serializer_modelo_para_dict(instance):
-    """Serializa um modelo para dicionário (para armazenar em JSONField)"""
+    """
+    Serializa um modelo para dicionário (para armazenar em JSONField).
+
+    ForeignKeys viram {'id': pk} sem carregar o objeto relacionado; 'repr'
+    só é incluído quando o objeto já está em cache na instância.
+    """
     if instance is None:
         return None
-    
-    dados = {}
-    
+
     try:
-        # Obter campos do modelo (não incluir ManyToMany aqui)
-        for field in instance._meta.fields:
-            field_name = field.name
-            
-            # Ignorar campos sensíveis
-            if field_name in ['password', 'deleted_at', 'deleted_by']:
-                continue
-            
-            try:
-                value = getattr(instance, field_name, None)
-                
-                # Função auxiliar para converter valor para JSON-serializável
-                def convert_to_serializable(val):
-                    if val is None:
-                        return None
-                    elif isinstance(val, (str, int, float, bool)):
-                        return val
-                    elif isinstance(val, Decimal):
-                        return float(val)
-                    elif hasattr(val, 'isoformat'):
-                        return val.isoformat()
-                    elif hasattr(val, 'pk'):
-                        # É um objeto relacionado
-                        try:
-                            return {
-                                'id': val.pk,
-                                'repr': str(val)[:100] if hasattr(val, '__str__') else None
-                            }
-                        except Exception:
-                            return val.pk if val else None
-                    elif isinstance(val, (list, tuple)):
-                        return [convert_to_serializable(item) for item in val[:10]]
-                    elif isinstance(val, dict):
-                        return {k: convert_to_serializable(v) for k, v in list(val.items())[:20]}
-                    else:
-                        # Tentar converter para string como último recurso
-                        try:
-                            str_val = str(val)
-                            return str_val[:200] if len(str_val) > 200 else str_val
-                        except Exception:
-                            return None
-                
-                dados[field_name] = convert_to_serializable(value)
-                        
-            except Exception as e:
-                # Se houver erro ao acessar o campo, pular mas registrar nome do campo
-                try:
-                    dados[field_name] = f'[Erro ao serializar: {str(e)[:50]}]'
-                except Exception:
+        campos, m2m = _serializador_do_modelo(type(instance))
+        dados = {}
+        for nome, attname, conversor, relacao in campos:
+            if attname in instance.__dict__:
+                valor = instance.__dict__[attname]
+            else:
+                valor = getattr(instance, attname, None)  # campo adiado (.only/.defer)
+            if relacao is not None:
+                if valor is None:
+                    dados[nome] = None
                     continue
-        
-        # Adicionar ManyToMany como lista de IDs (se houver)
-        for field in instance._meta.many_to_many:
-            field_name = field.name
+                item = {'id': valor}
+                if relacao.is_cached(instance):
+                    item['repr'] = str(relacao.get_cached_value(instance))[:100]
+                dados[nome] = item
+            else:
+                dados[nome] = conversor(valor) if conversor else valor
+
+        for nome in m2m:
             try:
-                related_objects = getattr(instance, field_name).all()
-                # Remover limite para garantir que todos os relacionamentos sejam salvos
-                dados[field_name] = [obj.pk for obj in related_objects]
+                dados[nome] = _ids_relacionados(instance, nome) if instance.pk else []
             except Exception as e:
-                try:
-                    dados[field_name] = f'[Erro ao serializar relacionamento: {str(e)[:50]}]'
-                except Exception:
-                    continue
-                
+                dados[nome] = f'[Erro ao serializar relacionamento: {str(e)[:50]}]'
+        return dados
     except Exception as e:
         # Se houver erro geral, retornar apenas informações básicas
         try:
-            dados = {
+            return {
                 'id': getattr(instance, 'pk', None),
-                'repr': str(instance)[:200] if hasattr(instance, '__str__') else 'Objeto',
+                'repr': str(instance)[:200],
                 'model': instance._meta.model_name if hasattr(instance, '_meta') else 'Desconhecido',
                 'error': f'Erro ao serializar: {str(e)[:100]}'
             }
         except Exception:
-            dados = {'error': 'Erro crítico ao serializar objeto'}
-    
-    # Garantir que o resultado final é JSON-serializável usando json.dumps
-    import json
-    try:
-        json.dumps(dados)  # Testa se é serializável
-        return dados
-    except (TypeError, ValueError) as e:
-        # Se ainda não for serializável, retornar versão simplificada
-        return {
-            'id': getattr(instance, 'pk', None),
-            'repr': str(instance)[:200] if hasattr(instance, '__str__') else 'Objeto',
-            'model': instance._meta.model_name if hasattr(instance, '_meta') else 'Desconhecido',
-            'error': 'Objeto não totalmente serializável - dados simplificados'
-        }
+            return {'error': 'Erro crítico ao serializar objeto'}
 
 
 def registrar_log_auditoria(
@@ -152,45 +170,36 @@ def registrar_log_auditoria(
     
     Nota: Se estiver em modo de impersonação (request.session tem 'admin_original_id'),
     o usuário do log será o administrador original, não o usuário impersonado.
+
+    O registro é gravado em lote, após o commit, por fila_auditoria (ver
+    auditoria_fila); DELETE é gravado no próprio on_commit. O AuditoriaLog
+    retornado só tem pk depois dessa gravação.
     """
+    impersonado_id = admin_id = None
     # Verificar se está em modo de impersonação
     if request and 'admin_original_id' in request.session:
-        try:
-            from ..models import Usuario
-            admin_original_id = request.session.get('admin_original_id')
-            admin_original = Usuario.objects.get(pk=admin_original_id)
-            # Usar o admin original para registrar o log
-            usuario = admin_original
-            # Adicionar informação de impersonação na descrição se não estiver presente
-            if descricao and 'impersonação' not in descricao.lower() and 'impersonate' not in descricao.lower():
-                usuario_impersonado_id = request.session.get('usuario_impersonado_id')
-                if usuario_impersonado_id:
-                    try:
-                        usuario_impersonado = Usuario.objects.get(pk=usuario_impersonado_id)
-                        descricao = f"[IMPERSONANDO {usuario_impersonado.username}] {descricao}"
-                    except Usuario.DoesNotExist:
-                        pass
-        except Exception:
-            # Se houver erro ao obter admin original, usar o usuário fornecido
-            pass
-    
+        # Usar o admin original para registrar o log; ele e o nome do usuário
+        # impersonado são resolvidos na gravação do lote.
+        admin_id = request.session.get('admin_original_id')
+        if descricao and 'impersonação' not in descricao.lower() and 'impersonate' not in descricao.lower():
+            impersonado_id = request.session.get('usuario_impersonado_id')
+
     # Serializar instâncias se fornecidas
     if instancia_anterior and dados_anteriores is None:
         dados_anteriores = serializer_modelo_para_dict(instancia_anterior)
-    
+
     if instancia_nova and dados_novos is None:
         dados_novos = serializer_modelo_para_dict(instancia_nova)
-    
+
     # Obter IP e User Agent do request se fornecido
     ip_address = None
     user_agent = ''
     if request:
         ip_address = get_client_ip(request)
         user_agent = get_user_agent(request)
-    
-    # Criar registro de auditoria
-    log = AuditoriaLog.objects.create(
-        usuario=usuario,
+
+    log = AuditoriaLog(
+        usuario_id=getattr(usuario, 'pk', None),
         acao=acao,
         modelo=modelo,
         objeto_id=objeto_id,
@@ -200,7 +209,9 @@ def registrar_log_auditoria(
         ip_address=ip_address,
         user_agent=user_agent
     )
-    
+    # DELETE é o que restaurar_registro procura: não pode ficar na fila
+    fila_auditoria.enfileirar(log, impersonado_id, admin_id, sincrono=acao == 'DELETE')
+
     return log
 
 
@@ -784,6 +795,13 @@ def restaurar_registro(modelo, objeto_id, usuario=None, request=None):
                     except Exception:
                         pass
         
+        # Romaneio restaurado volta a vincular notas: recalcular o status delas
+        if modelo_normalizado == 'RomaneioViagem':
+            from ..services.romaneio_service import RomaneioService
+            RomaneioService.recalcular_status_notas(
+                objeto_restaurado.notas_fiscais.values_list('pk', flat=True)
+            )
+        
         # Registrar a restauração na auditoria
         if usuario and request:
             registrar_restauracao(
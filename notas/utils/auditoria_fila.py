@@ -0,0 +1,151 @@
+"""
+Gravação em lote dos logs de auditoria fora do ciclo da requisição.
+
+registrar_log_auditoria monta o AuditoriaLog na requisição e o entrega a
+FilaAuditoria após o commit da transação. Uma thread de fundo acumula os
+registros e os grava com bulk_create. A fila é limitada: se encher, o
+registro é gravado na hora pela própria requisição, sem perder entradas.
+
+Registros de que a aplicação depende logo em seguida (o DELETE que
+restaurar_registro procura) são gravados pela própria requisição após o
+commit (sincrono=True): a fila é por processo e um lote pode estar em
+gravação na thread, então esvaziá-la não garantiria que o log já existe.
+
+Configuração (settings):
+- AUDITORIA_ASSINCRONA (bool, padrão True): desligado, grava na hora como antes.
+- AUDITORIA_TAMANHO_LOTE (int, padrão 100): máximo de registros por bulk_create.
+- AUDITORIA_TAMANHO_FILA (int, padrão 10000): limite da fila em memória.
+- AUDITORIA_INTERVALO_LOTE (float, padrão 0.5): segundos esperando completar um lote.
+"""
+import atexit
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class FilaAuditoria:
+    """Fila em memória, limitada, de AuditoriaLog pendentes de gravação."""
+
+    def __init__(self):
+        self._fila = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def assincrona():
+        return getattr(settings, 'AUDITORIA_ASSINCRONA', True)
+
+    @staticmethod
+    def _tamanho_lote():
+        return max(1, getattr(settings, 'AUDITORIA_TAMANHO_LOTE', 100))
+
+    def _iniciar(self):
+        with self._lock:
+            if self._fila is None:
+                self._fila = queue.Queue(maxsize=getattr(settings, 'AUDITORIA_TAMANHO_FILA', 10000))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._executar, name='auditoria-writer', daemon=True
+                )
+                self._thread.start()
+
+    def enfileirar(self, log, impersonado_id=None, admin_id=None, sincrono=False):
+        """
+        Agenda a gravação do log para depois do commit da transação atual
+        (imediatamente, se não houver transação aberta).
+
+        admin_id é o administrador original de uma impersonação: vira o
+        usuário do log se ainda existir (ver gravar). Com sincrono, o log é
+        gravado pela própria requisição no on_commit, sem passar pela fila.
+        """
+        item = (log, impersonado_id, admin_id)
+        if not self.assincrona():
+            self.gravar([item])
+            return
+        if sincrono:
+            transaction.on_commit(lambda: self.gravar([item]))
+            return
+        transaction.on_commit(lambda: self._colocar(item))
+
+    def _colocar(self, item):
+        self._iniciar()
+        try:
+            self._fila.put_nowait(item)
+        except queue.Full:
+            logger.warning('Fila de auditoria cheia; gravando registro na requisição.')
+            self.gravar([item])
+
+    def _retirar_lote(self, bloquear=True):
+        lote = []
+        intervalo = getattr(settings, 'AUDITORIA_INTERVALO_LOTE', 0.5)
+        try:
+            lote.append(self._fila.get(block=bloquear))
+            while len(lote) < self._tamanho_lote():
+                lote.append(self._fila.get(block=bloquear, timeout=intervalo if bloquear else None))
+        except queue.Empty:
+            pass
+        return lote
+
+    def _executar(self):
+        while True:
+            lote = self._retirar_lote()
+            try:
+                self.gravar(lote)
+            finally:
+                close_old_connections()
+
+    def descarregar(self):
+        """Grava na thread atual tudo o que ainda estiver na fila."""
+        if self._fila is None:
+            return
+        while True:
+            lote = self._retirar_lote(bloquear=False)
+            if not lote:
+                return
+            self.gravar(lote)
+
+    def gravar(self, lote):
+        """
+        Grava (log, impersonado_id, admin_id) com um bulk_create. O
+        administrador original e o prefixo de impersonação são resolvidos
+        aqui, com uma única consulta de usuários; admin que não existe mais
+        é ignorado e o log fica com o usuário que executou a ação.
+        """
+        if not lote:
+            return
+        from ..models import AuditoriaLog, Usuario
+
+        ids = {pk for _, imp, admin in lote for pk in (imp, admin) if pk}
+        if ids:
+            nomes = dict(Usuario.objects.filter(pk__in=ids).values_list('pk', 'username'))
+            for log, imp, admin in lote:
+                if admin in nomes:
+                    log.usuario_id = admin
+                if imp in nomes:
+                    log.observacoes = f"[IMPERSONANDO {nomes[imp]}] {log.observacoes}"
+
+        try:
+            with transaction.atomic():
+                AuditoriaLog.objects.bulk_create(
+                    [log for log, _, _ in lote], batch_size=self._tamanho_lote()
+                )
+            return
+        except Exception:
+            logger.exception('Erro ao gravar lote de auditoria; gravando um a um.')
+        for log, _, _ in lote:
+            try:
+                log.pk = None
+                log.save(force_insert=True)
+            except Exception:
+                logger.exception(
+                    'Erro ao gravar auditoria %s de %s #%s.', log.acao, log.modelo, log.objeto_id
+                )
+
+
+fila_auditoria = FilaAuditoria()
+atexit.register(fila_auditoria.descarregar)
@@ -0,0 +1,245 @@
+"""
+Benchmarks dos fluxos principais sobre uma massa sintética.
+
+Cada cenário é uma função preparar(contexto) que faz a parte não medida
+(escolher dados, limpar cache) e devolve a ação a medir, como o setup do
+pytest-benchmark. medir() faz uma execução de aquecimento (caches de
+templates, URLs e sessão), roda a ação `repeticoes` vezes e guarda a mediana
+do tempo de parede e o máximo de consultas SQL (RegistroConsultas); uma
+rodada extra com tracemalloc mede o pico de memória, para que o rastreio
+não distorça o tempo.
+
+O resultado é comparado com uma linha de base em JSON
+(BENCHMARK_LINHA_BASE, padrão config/benchmarks/linha_base.json): mais
+consultas que a base é sempre regressão; tempo e memória têm tolerância
+relativa (BENCHMARK_TOLERANCIA_TEMPO, padrão 1.0; BENCHMARK_TOLERANCIA_MEMORIA,
+padrão 0.25) e uma folga absoluta para medições muito pequenas.
+
+Uso (comando executar_benchmarks, que roda tudo numa transação desfeita
+no fim):
+
+    contexto = criar_contexto(DadosSinteticosService.gerar(...), usuario)
+    resultados = executar(contexto, repeticoes=5)
+    regressoes = comparar(resultados, carregar_linha_base()['cenarios'])
+"""
+import json
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from django.conf import settings
+from django.test import Client
+from django.urls import reverse
+
+from .monitor_consultas import RegistroConsultas
+
+FOLGA_TEMPO_MS = 10.0
+FOLGA_MEMORIA_KB = 64.0
+
+# nome -> (descrição, preparar(contexto) -> ação)
+CENARIOS: Dict[str, tuple] = {}
+
+
+def cenario(nome: str, descricao: str):
+    """Registra uma função preparar(contexto) como cenário de benchmark."""
+    def registrar(preparar):
+        CENARIOS[nome] = (descricao, preparar)
+        return preparar
+    return registrar
+
+
+def caminho_linha_base() -> Path:
+    return Path(getattr(
+        settings, 'BENCHMARK_LINHA_BASE', Path(settings.BASE_DIR) / 'config' / 'benchmarks' / 'linha_base.json'
+    ))
+
+
+def carregar_linha_base(caminho: Optional[Path] = None) -> Dict[str, Any]:
+    caminho = Path(caminho or caminho_linha_base())
+    if not caminho.exists():
+        return {}
+    return json.loads(caminho.read_text(encoding='utf-8'))
+
+
+def salvar_linha_base(resultados: Dict[str, dict], parametros: Dict[str, Any], caminho: Optional[Path] = None) -> Path:
+    caminho = Path(caminho or caminho_linha_base())
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    conteudo = {'parametros': parametros, 'cenarios': resultados}
+    caminho.write_text(json.dumps(conteudo, indent=2, sort_keys=True, ensure_ascii=False) + '\n', encoding='utf-8')
+    return caminho
+
+
+def criar_contexto(massa: Dict[str, Any], usuario) -> Dict[str, Any]:
+    """Contexto dos cenários: a massa gerada e um Client autenticado como `usuario`."""
+    hosts = [host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')]
+    cliente_http = Client(HTTP_HOST=hosts[0] if hosts else 'localhost')
+    cliente_http.force_login(usuario)
+    return {'massa': massa, 'usuario': usuario, 'http': cliente_http}
+
+
+# ============================================================================
+# MEDIÇÃO
+# ============================================================================
+
+def medir(preparar: Callable, contexto: Dict[str, Any], repeticoes: int = 5) -> Dict[str, float]:
+    """Mediana do tempo (ms), máximo de consultas e pico de memória (KB) da ação."""
+    preparar(contexto)()
+    tempos, consultas = [], []
+    for _ in range(max(1, repeticoes)):
+        acao = preparar(contexto)
+        with RegistroConsultas() as registro:
+            inicio = time.perf_counter()
+            acao()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        consultas.append(registro.total)
+
+    acao = preparar(contexto)
+    tracemalloc.start()
+    try:
+        acao()
+        _atual, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'tempo_ms': round(statistics.median(tempos), 2),
+        'consultas': max(consultas),
+        'memoria_kb': round(pico / 1024, 1),
+    }
+
+
+def executar(contexto: Dict[str, Any], repeticoes: int = 5, nomes: Optional[Sequence[str]] = None) -> Dict[str, dict]:
+    desconhecidos = set(nomes or ()) - set(CENARIOS)
+    if desconhecidos:
+        raise KeyError(f'Cenário(s) desconhecido(s): {", ".join(sorted(desconhecidos))}')
+    return {
+        nome: medir(preparar, contexto, repeticoes)
+        for nome, (_descricao, preparar) in CENARIOS.items()
+        if not nomes or nome in nomes
+    }
+
+
+def comparar(resultados: Dict[str, dict], linha_base: Dict[str, dict],
+             tolerancia_tempo: Optional[float] = None,
+             tolerancia_memoria: Optional[float] = None) -> List[str]:
+    """Descrição de cada métrica acima da linha base (cenários sem base são ignorados)."""
+    if tolerancia_tempo is None:
+        tolerancia_tempo = getattr(settings, 'BENCHMARK_TOLERANCIA_TEMPO', 1.0)
+    if tolerancia_memoria is None:
+        tolerancia_memoria = getattr(settings, 'BENCHMARK_TOLERANCIA_MEMORIA', 0.25)
+
+    regressoes = []
+    for nome, medido in resultados.items():
+        base = linha_base.get(nome)
+        if not base:
+            continue
+        if medido['consultas'] > base['consultas']:
+            regressoes.append(f"{nome}: {medido['consultas']} consultas (base {base['consultas']})")
+        limite_tempo = max(base['tempo_ms'] * (1 + tolerancia_tempo), base['tempo_ms'] + FOLGA_TEMPO_MS)
+        if medido['tempo_ms'] > limite_tempo:
+            regressoes.append(f"{nome}: {medido['tempo_ms']} ms (base {base['tempo_ms']} ms)")
+        limite_memoria = max(base['memoria_kb'] * (1 + tolerancia_memoria), base['memoria_kb'] + FOLGA_MEMORIA_KB)
+        if medido['memoria_kb'] > limite_memoria:
+            regressoes.append(f"{nome}: {medido['memoria_kb']} KB (base {base['memoria_kb']} KB)")
+    return regressoes
+
+
+# ============================================================================
+# CENÁRIOS
+# ============================================================================
+
+def _get(contexto, nome_url, *args, **params):
+    url = reverse(nome_url, args=args)
+
+    def acao():
+        resposta = contexto['http'].get(url, params)
+        if resposta.status_code != 200:
+            raise AssertionError(f'{nome_url} respondeu {resposta.status_code}')
+    return acao
+
+
+def _intervalo(contexto):
+    massa = contexto['massa']
+    return {'data_inicial': massa['data_inicio'].isoformat(), 'data_final': massa['data_fim'].isoformat()}
+
+
+@cenario('romaneio_criar_emitir', 'Cria um romaneio salvo com 5 notas em depósito e o emite (RomaneioService)')
+def _romaneio_criar_emitir(contexto):
+    from ..forms import RomaneioViagemForm
+    from ..models import Motorista, NotaFiscal, RomaneioViagem, Veiculo
+    from ..services import RomaneioService
+
+    livres = (
+        NotaFiscal.objects.filter(status='Depósito', cliente__status='Ativo')
+        .exclude(romaneios_vinculados__isnull=False)
+        .values_list('cliente_id', 'pk')
+    )
+    por_cliente: Dict[int, list] = {}
+    for cliente_id, pk in livres.iterator():
+        por_cliente.setdefault(cliente_id, []).append(pk)
+    cliente_id, nota_ids = max(por_cliente.items(), key=lambda item: len(item[1]))
+    dados = {
+        'data_romaneio': contexto['massa']['data_fim'].isoformat(),
+        'cliente': str(cliente_id),
+        'notas_fiscais': [str(pk) for pk in nota_ids[:5]],
+        'motorista': str(
+            Motorista.objects.filter(tipo_composicao_motorista__in=('Caminhão', 'CAMINHÃO'))
+            .order_by('pk').values_list('pk', flat=True).first()
+        ),
+        'veiculo_principal': str(
+            Veiculo.objects.filter(tipo_unidade='CAMINHÃO').order_by('pk').values_list('pk', flat=True).first()
+        ),
+    }
+
+    def acao():
+        form = RomaneioViagemForm(data=dados)
+        if not form.is_valid():
+            raise AssertionError(form.errors.as_text())
+        romaneio, sucesso, mensagem = RomaneioService.criar_romaneio(form, emitir=False)
+        if not sucesso:
+            raise AssertionError(mensagem)
+        _romaneio, sucesso, mensagem = RomaneioService.emitir_romaneio(RomaneioViagem.objects.get(pk=romaneio.pk))
+        if not sucesso:
+            raise AssertionError(mensagem)
+    return acao
+
+
+@cenario('dashboard', 'Dashboard do administrador')
+def _dashboard(contexto):
+    return _get(contexto, 'notas:dashboard')
+
+
+@cenario('totalizador_por_estado', 'Totalizador por estado no período da massa, sem cache')
+def _totalizador_por_estado(contexto):
+    from ..services import TotalizadorService
+
+    TotalizadorService.invalidar_cache()
+    return _get(contexto, 'notas:totalizador_por_estado', **_intervalo(contexto))
+
+
+@cenario('totalizador_por_cliente', 'Totalizador por cliente no período da massa, sem cache')
+def _totalizador_por_cliente(contexto):
+    from ..services import TotalizadorService
+
+    TotalizadorService.invalidar_cache()
+    return _get(contexto, 'notas:totalizador_por_cliente', **_intervalo(contexto))
+
+
+@cenario('mercadorias_deposito', 'Pesquisa de mercadorias em depósito por trecho da mercadoria')
+def _mercadorias_deposito(contexto):
+    return _get(contexto, 'notas:pesquisar_mercadorias_deposito', mercadoria='CIMENTO')
+
+
+@cenario('auditoria', 'Listagem dos logs de auditoria')
+def _auditoria(contexto):
+    return _get(contexto, 'notas:listar_logs_auditoria')
+
+
+@cenario('caixa', 'Visualização do período de caixa da massa (livro caixa)')
+def _caixa(contexto):
+    periodo_id = contexto['massa']['periodo_id']
+    if periodo_id is None:
+        return lambda: None
+    return _get(contexto, 'financeiro:visualizar_periodo_movimento_caixa', periodo_id)
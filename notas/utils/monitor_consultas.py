@@ -0,0 +1,205 @@
+"""
+Monitor de consultas SQL por requisição.
+
+RegistroConsultas conta as consultas executadas (via
+connection.execute_wrapper, sem depender de DEBUG) e agrupa cada uma pela
+sua forma: o SQL com literais trocados por "?" e listas IN colapsadas. A
+mesma forma repetida muitas vezes numa requisição é o sinal de N+1 (uma
+consulta por linha de uma lista).
+
+O MonitorConsultasMiddleware (notas/middleware.py) usa o registro em cada
+requisição: grava no log a contagem e o tempo por view, acumula as
+estatísticas exibidas em JSON (notas:monitor_consultas) e compara com o
+orçamento da view (notas/utils/orcamento_consultas.py). Com
+MONITOR_CONSULTAS_ESTRITO (ligado nos testes), estourar o orçamento ou
+repetir uma forma levanta OrcamentoConsultasExcedido.
+
+Nos testes, verificar_consultas() aplica as mesmas regras a um trecho:
+
+    with verificar_consultas(maximo=5):
+        RomaneioService.recalcular_status_notas(ids)
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+LIMITE_REPETICOES = 10
+
+_LITERAL_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_LITERAL_NUMERO = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LISTA_IN = re.compile(r'\bIN \((?:\s*(?:\?|%s)\s*,?)+\)', re.IGNORECASE)
+_ESPACOS = re.compile(r'\s+')
+
+
+class OrcamentoConsultasExcedido(AssertionError):
+    """Requisição (ou trecho verificado) acima do orçamento de consultas ou com N+1."""
+
+
+def forma_consulta(sql: str) -> str:
+    """SQL sem os valores: consultas que diferem só nos parâmetros têm a mesma forma."""
+    forma = _LITERAL_TEXTO.sub('?', sql)
+    forma = _LITERAL_NUMERO.sub('?', forma)
+    forma = _LISTA_IN.sub('IN (...)', forma)
+    return _ESPACOS.sub(' ', forma).strip()
+
+
+def limite_repeticoes() -> int:
+    return getattr(settings, 'MONITOR_CONSULTAS_LIMITE_REPETICOES', LIMITE_REPETICOES)
+
+
+class RegistroConsultas:
+    """
+    Context manager que registra as consultas da thread atual em todas as
+    conexões configuradas. Consultas de outras threads (ex.: fila de
+    auditoria) não entram na conta.
+    """
+
+    def __init__(self, guardar_sql: bool = False):
+        self.guardar_sql = guardar_sql
+        self.total = 0
+        self.tempo = 0.0
+        self.formas: Counter = Counter()
+        self.consultas: List[str] = []
+        self._pilha: Optional[ExitStack] = None
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tempo += time.perf_counter() - inicio
+            self.total += 1
+            self.formas[forma_consulta(sql)] += 1
+            if self.guardar_sql:
+                self.consultas.append(sql)
+
+    def __enter__(self):
+        self._pilha = ExitStack()
+        for conexao in connections.all(initialized_only=False):
+            self._pilha.enter_context(conexao.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *args):
+        self._pilha.close()
+        return False
+
+    @property
+    def tempo_ms(self) -> float:
+        return round(self.tempo * 1000, 2)
+
+    def repetidas(self, limite: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Formas executadas mais de `limite` vezes (suspeitas de N+1)."""
+        limite = limite_repeticoes() if limite is None else limite
+        return [(forma, vezes) for forma, vezes in self.formas.most_common() if vezes > limite]
+
+    def descrever(self, limite: Optional[int] = None) -> str:
+        linhas = [f'{self.total} consulta(s) em {self.tempo_ms} ms']
+        for forma, vezes in self.repetidas(limite):
+            linhas.append(f'  {vezes}x {forma[:300]}')
+        for sql in self.consultas:
+            linhas.append(f'  - {sql[:300]}')
+        return '\n'.join(linhas)
+
+
+class EstatisticasConsultas:
+    """Totais acumulados por view desde o início do processo (ou do último zerar())."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views: Dict[str, dict] = {}
+
+    def registrar(self, view: str, registro: RegistroConsultas, orcamento: Optional[int], repetidas) -> None:
+        with self._lock:
+            item = self._views.setdefault(view, {
+                'requisicoes': 0,
+                'consultas_total': 0,
+                'consultas_max': 0,
+                'tempo_total_ms': 0.0,
+                'tempo_max_ms': 0.0,
+                'acima_orcamento': 0,
+                'n_mais_1': 0,
+                'ultima_repeticao': None,
+            })
+            item['requisicoes'] += 1
+            item['consultas_total'] += registro.total
+            item['consultas_max'] = max(item['consultas_max'], registro.total)
+            item['tempo_total_ms'] = round(item['tempo_total_ms'] + registro.tempo_ms, 2)
+            item['tempo_max_ms'] = max(item['tempo_max_ms'], registro.tempo_ms)
+            item['orcamento'] = orcamento
+            if orcamento is not None and registro.total > orcamento:
+                item['acima_orcamento'] += 1
+            if repetidas:
+                item['n_mais_1'] += 1
+                forma, vezes = repetidas[0]
+                item['ultima_repeticao'] = {'forma': forma, 'vezes': vezes}
+
+    def resumo(self) -> Dict[str, dict]:
+        with self._lock:
+            resumo = {}
+            for view, item in sorted(self._views.items()):
+                resumo[view] = dict(
+                    item,
+                    consultas_media=round(item['consultas_total'] / item['requisicoes'], 2),
+                    tempo_medio_ms=round(item['tempo_total_ms'] / item['requisicoes'], 2),
+                )
+            return resumo
+
+    def zerar(self) -> None:
+        with self._lock:
+            self._views.clear()
+
+
+estatisticas = EstatisticasConsultas()
+
+
+def monitor_ativo() -> bool:
+    return getattr(settings, 'MONITOR_CONSULTAS_ATIVO', settings.DEBUG)
+
+
+def modo_estrito() -> bool:
+    return getattr(settings, 'MONITOR_CONSULTAS_ESTRITO', False)
+
+
+def avaliar_requisicao(view: str, registro: RegistroConsultas) -> None:
+    """Log, estatísticas e orçamento de uma requisição já registrada."""
+    from .orcamento_consultas import orcamento_da_view
+
+    orcamento = orcamento_da_view(view)
+    repetidas = registro.repetidas()
+    estatisticas.registrar(view, registro, orcamento, repetidas)
+
+    logger.info('Consultas %s: %d em %.2f ms', view, registro.total, registro.tempo_ms)
+    problemas = []
+    if orcamento is not None and registro.total > orcamento:
+        problemas.append(f'{registro.total} consultas, orçamento {orcamento}')
+    for forma, vezes in repetidas:
+        problemas.append(f'possível N+1: {vezes}x {forma[:300]}')
+    if not problemas:
+        return
+    mensagem = f'Consultas {view}: ' + '; '.join(problemas)
+    logger.warning(mensagem)
+    if modo_estrito():
+        raise OrcamentoConsultasExcedido(mensagem)
+
+
+@contextmanager
+def verificar_consultas(maximo: Optional[int] = None, limite: Optional[int] = None):
+    """
+    Falha (OrcamentoConsultasExcedido) se o trecho passar de `maximo`
+    consultas ou repetir uma forma mais de `limite` vezes.
+    """
+    with RegistroConsultas(guardar_sql=True) as registro:
+        yield registro
+    excedeu = maximo is not None and registro.total > maximo
+    if excedeu or registro.repetidas(limite):
+        cabecalho = f'máximo {maximo}' if excedeu else 'consultas repetidas (N+1)'
+        raise OrcamentoConsultasExcedido(f'{cabecalho}: {registro.descrever(limite)}')
@@ -3,12 +3,17 @@ Ordenação de notas fiscais pelo número da nota (campo texto).
 
 `order_by('nota')` ordena lexicograficamente (ex.: "10" antes de "2").
 Estas funções priorizam valor numérico quando a nota é só dígitos ou
-começa por dígitos.
+começa por dígitos. No banco, a mesma ordem é obtida pelo campo
+persistido NotaFiscal.ordem_nota (ver chave_ordenacao_persistida).
 """
 import re
 from typing import Any, Iterable, List
 
-from django.db.models import Case, IntegerField, QuerySet, When
+from django.db.models import QuerySet
+
+# Largura do prefixo numérico na chave persistida: o número da nota tem no
+# máximo 50 caracteres, então qualquer prefixo de dígitos cabe sem truncar.
+LARGURA_NUMERO_NOTA = 50
 
 
 def chave_ordenacao_numero_nota(valor: str) -> tuple:
@@ -23,6 +28,15 @@ def chave_ordenacao_numero_nota(valor: str) -> tuple:
     return (1, 0, s.lower())
 
 
+def chave_ordenacao_persistida(valor: str) -> str:
+    """
+    Versão texto de chave_ordenacao_numero_nota, comparável
+    lexicograficamente: grupo + número com zeros à esquerda + sufixo.
+    """
+    grupo, numero, sufixo = chave_ordenacao_numero_nota(valor)
+    return f"{grupo}{numero:0{LARGURA_NUMERO_NOTA}d}{sufixo}"
+
+
 def ordenar_instancias_notas_fiscais(notas: Iterable[Any], reverse: bool = False) -> List[Any]:
     return sorted(
         notas,
@@ -32,14 +46,6 @@ def ordenar_instancias_notas_fiscais(notas: Iterable[Any], reverse: bool = False
 
 
 def ordenar_queryset_notas_por_numero(qs: QuerySet, reverse: bool = False) -> QuerySet:
-    lista = list(qs)
-    if not lista:
-        return qs
-    lista.sort(key=lambda nf: chave_ordenacao_numero_nota(nf.nota), reverse=reverse)
-    ids = [nf.pk for nf in lista]
-    preserved = Case(
-        *[When(pk=pk, then=i) for i, pk in enumerate(ids)],
-        output_field=IntegerField(),
-    )
-    model = qs.model
-    return model.objects.filter(pk__in=ids).annotate(_ord_nota_num=preserved).order_by('_ord_nota_num')
+    if reverse:
+        return qs.order_by('-ordem_nota', '-pk')
+    return qs.order_by('ordem_nota', 'pk')
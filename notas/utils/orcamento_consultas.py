@@ -0,0 +1,192 @@
+"""
+Orçamento de consultas SQL por view (notas.urls e financeiro.urls), usado
+pelo MonitorConsultasMiddleware (notas/utils/monitor_consultas.py).
+
+Linha de base: maior contagem medida por view (suíte de testes e uma
+passada GET em todas as rotas com dados de desenvolvimento) + 10, arredondada
+para múltiplo de 5. A folga cobre variações de sessão/permissão; um N+1 com
+dados reais passa dela. Views novas entram aqui (o teste de cobertura em
+notas/tests/test_monitor_consultas.py exige); ajustes por ambiente vão em
+settings.MONITOR_CONSULTAS_ORCAMENTOS.
+"""
+from typing import Optional
+
+from django.conf import settings
+
+ORCAMENTO_PADRAO = 30
+
+ORCAMENTOS = {
+    # notas.urls
+    'notas:adicionar_cliente': 20,
+    'notas:adicionar_historico_consulta': 15,
+    'notas:adicionar_motorista': 20,
+    'notas:adicionar_nota_fiscal': 30,
+    'notas:adicionar_romaneio': 25,
+    'notas:adicionar_romaneio_generico': 25,
+    'notas:adicionar_veiculo': 15,
+    'notas:ajax_filtrar_veiculos': 15,
+    'notas:ajax_load_notas': 15,
+    'notas:ajax_load_notas_edicao': 15,
+    'notas:ajax_validar_credenciais_admin': 15,
+    'notas:alterar_senha': 15,
+    'notas:api_notas_fiscais_para_romaneio': 15,
+    'notas:atualizar_tabela_seguro_ajax': 15,
+    'notas:atualizar_tabela_seguros_em_lote_ajax': 15,
+    'notas:baixar_cobranca_carregamento': 15,
+    'notas:buscar_clientes_ativos': 15,
+    'notas:buscar_mercadorias_deposito': 15,
+    'notas:buscar_romaneios_filtrados': 15,
+    'notas:cadastrar_usuario': 15,
+    'notas:carregar_dados_romaneios': 15,
+    'notas:carregar_mais_romaneios': 15,
+    'notas:carregar_romaneios_cliente': 15,
+    'notas:cobranca_carregamento': 15,
+    'notas:cobranca_mensal': 15,
+    'notas:criar_cobranca_carregamento': 15,
+    'notas:criar_fechamento_frete': 15,
+    'notas:dashboard': 25,
+    'notas:dashboard_cliente': 25,
+    'notas:detalhes_cliente': 15,
+    'notas:detalhes_fechamento_frete': 15,
+    'notas:detalhes_log_auditoria': 15,
+    'notas:detalhes_motorista': 20,
+    'notas:detalhes_nota_fiscal': 25,
+    'notas:detalhes_romaneio': 20,
+    'notas:detalhes_veiculo': 15,
+    'notas:editar_cliente': 20,
+    'notas:editar_cobranca_carregamento': 20,
+    'notas:editar_fechamento_frete': 15,
+    'notas:editar_motorista': 20,
+    'notas:editar_nota_fiscal': 20,
+    'notas:editar_ocorrencia_nota_fiscal': 15,
+    'notas:editar_periodo_movimento_caixa_ajax': 15,
+    'notas:editar_romaneio': 30,
+    'notas:editar_setor_bancario': 15,
+    'notas:editar_tabela_seguro': 15,
+    'notas:editar_usuario': 15,
+    'notas:editar_veiculo': 15,
+    'notas:emitir_romaneio': 60,
+    'notas:excluir_cliente': 15,
+    'notas:excluir_cobranca_carregamento': 15,
+    'notas:excluir_motorista': 15,
+    'notas:excluir_nota_fiscal': 15,
+    'notas:excluir_ocorrencia_nota_fiscal': 15,
+    'notas:excluir_periodo_movimento_caixa_ajax': 15,
+    'notas:excluir_romaneio': 20,
+    'notas:excluir_usuario': 15,
+    'notas:excluir_veiculo': 15,
+    'notas:fechamento_frete': 15,
+    'notas:fechar_periodo_movimento_caixa_ajax': 15,
+    'notas:gerar_relatorio_cobranca_carregamento_pdf': 15,
+    'notas:gerar_relatorio_cobranca_carregamento_pdf_cliente': 20,
+    'notas:gerar_relatorio_consolidado_cobranca': 15,
+    'notas:gerar_romaneio_pdf': 15,
+    'notas:importar_notas_fiscais': 40,
+    'notas:imprimir_detalhes_cliente': 15,
+    'notas:imprimir_fechamento_frete': 15,
+    'notas:imprimir_nota_fiscal': 20,
+    'notas:imprimir_relatorio_clientes': 15,
+    'notas:imprimir_relatorio_deposito': 15,
+    'notas:imprimir_relatorio_mercadorias_deposito': 15,
+    'notas:imprimir_romaneio_novo': 15,
+    'notas:imprimir_romaneios_lote': 15,
+    'notas:imprimir_viagens_motorista': 15,
+    'notas:listar_clientes': 15,
+    'notas:listar_logs_auditoria': 20,
+    'notas:listar_motoristas': 15,
+    'notas:listar_notas_fiscais': 15,
+    'notas:listar_registros_excluidos': 15,
+    'notas:listar_romaneios': 25,
+    'notas:listar_setores_bancarios': 20,
+    'notas:listar_tabela_seguros': 15,
+    'notas:listar_usuarios': 15,
+    'notas:listar_veiculos': 15,
+    'notas:login': 20,
+    'notas:logout': 15,
+    'notas:meus_romaneios': 20,
+    'notas:minhas_cobrancas_carregamento': 15,
+    'notas:minhas_notas_fiscais': 15,
+    'notas:monitor_consultas': 15,
+    'notas:obter_ocorrencia_nota_fiscal': 15,
+    'notas:obter_periodo_movimento_caixa_ajax': 15,
+    'notas:obter_tipo_veiculo': 15,
+    'notas:perfil': 15,
+    'notas:pesquisar_mercadorias_deposito': 20,
+    'notas:procurar_mercadorias_deposito': 15,
+    'notas:registrar_consulta_motorista': 15,
+    'notas:relatorio_cobranca_cliente': 15,
+    'notas:restaurar_registro': 15,
+    'notas:salvar_ocorrencia_nota_fiscal': 15,
+    'notas:simular_carregamento': 15,
+    'notas:toggle_status_cliente': 15,
+    'notas:toggle_status_usuario': 15,
+    'notas:totalizador_por_cliente': 15,
+    'notas:totalizador_por_cliente_excel': 15,
+    'notas:totalizador_por_cliente_pdf': 15,
+    'notas:totalizador_por_estado': 15,
+    'notas:totalizador_por_estado_excel': 15,
+    'notas:totalizador_por_estado_pdf': 15,
+    'notas:visualizar_cobranca_carregamento': 15,
+    # financeiro.urls
+    'financeiro:a_pagar': 15,
+    'financeiro:a_receber': 20,
+    'financeiro:acertar_caixa_funcionario': 15,
+    'financeiro:acerto_diario_carregamento': 15,
+    'financeiro:adicionar_carregamento_cliente_ajax': 15,
+    'financeiro:adicionar_cobranca_ao_acerto_ajax': 15,
+    'financeiro:adicionar_distribuicao_funcionario_ajax': 15,
+    'financeiro:atualizar_controle_saldo': 15,
+    'financeiro:caixa_do_dia': 15,
+    'financeiro:criar_caixa_funcionario': 15,
+    'financeiro:criar_despesa': 15,
+    'financeiro:criar_funcionario_ajax': 15,
+    'financeiro:criar_movimento_bancario': 15,
+    'financeiro:criar_movimento_caixa_ajax': 15,
+    'financeiro:criar_receita_empresa': 15,
+    'financeiro:dashboard_fluxo_caixa': 15,
+    'financeiro:editar_despesa': 15,
+    'financeiro:editar_movimento_bancario': 15,
+    'financeiro:editar_movimento_caixa_ajax': 15,
+    'financeiro:editar_periodo_movimento_caixa_ajax': 15,
+    'financeiro:editar_receita_empresa': 15,
+    'financeiro:excluir_acerto_diario': 15,
+    'financeiro:excluir_despesa': 15,
+    'financeiro:excluir_movimento_bancario': 15,
+    'financeiro:excluir_movimento_caixa_ajax': 15,
+    'financeiro:excluir_periodo_movimento_caixa_ajax': 15,
+    'financeiro:excluir_receita_empresa': 15,
+    'financeiro:fechamento_caixa': 20,
+    'financeiro:fechamento_receita_entrada': 15,
+    'financeiro:fechar_periodo_movimento_caixa_ajax': 15,
+    'financeiro:fluxo_caixa_hub': 15,
+    'financeiro:gerenciar_movimento_caixa': 15,
+    'financeiro:imprimir_periodo_movimento_caixa': 15,
+    'financeiro:iniciar_periodo_movimento_caixa': 15,
+    'financeiro:listar_acertos_diarios': 15,
+    'financeiro:listar_cobrancas_pendentes_ajax': 15,
+    'financeiro:listar_despesas': 15,
+    'financeiro:movimento_caixa': 15,
+    'financeiro:obter_acumulado_funcionario_ajax': 15,
+    'financeiro:obter_movimento_caixa_ajax': 15,
+    'financeiro:obter_periodo_movimento_caixa_ajax': 15,
+    'financeiro:pagar_cte_terceiro': 15,
+    'financeiro:pagar_cte_terceiro_avulso': 15,
+    'financeiro:pagar_funcionario': 15,
+    'financeiro:pesquisar_periodo_movimento_caixa': 15,
+    'financeiro:receber_cobranca': 15,
+    'financeiro:receber_cobranca_cte_avulsa': 15,
+    'financeiro:receber_descarga_deposito': 15,
+    'financeiro:remover_carregamento_cliente_ajax': 15,
+    'financeiro:remover_distribuicao_funcionario_ajax': 15,
+    'financeiro:salvar_acerto_diario': 15,
+    'financeiro:salvar_valor_estelar_ajax': 15,
+    'financeiro:visualizar_periodo_movimento_caixa': 15,
+}
+
+
+def orcamento_da_view(view: str) -> Optional[int]:
+    """Orçamento da view: MONITOR_CONSULTAS_ORCAMENTOS, a tabela acima ou o padrão."""
+    personalizados = getattr(settings, 'MONITOR_CONSULTAS_ORCAMENTOS', {})
+    if view in personalizados:
+        return personalizados[view]
+    return ORCAMENTOS.get(view, ORCAMENTO_PADRAO)
@@ -0,0 +1,112 @@
+"""
+Paginação por cursor (keyset) para as listas JSON.
+
+Em vez de OFFSET, cada página continua a partir da última linha da anterior
+(ex.: data_emissao < x OR (data_emissao = x AND id < y)). A consulta usa o
+índice da ordenação e custa o mesmo em qualquer profundidade, e registros
+novos não deslocam as páginas seguintes.
+
+O cursor é opaco para o cliente (base64 de JSON com os valores da ordenação)
+e a ordenação deve terminar num campo único (normalmente o id). Campos da
+ordenação não podem ser nulos.
+"""
+import base64
+import binascii
+import json
+from datetime import date, time
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+
+LIMITE_MAXIMO = 200
+
+
+class CursorInvalido(ValueError):
+    """Cursor malformado ou incompatível com a ordenação da lista."""
+
+
+def _campo(modelo, nome: str):
+    if nome == 'pk':
+        return modelo._meta.pk
+    return modelo._meta.get_field(nome)
+
+
+def _valor_json(valor):
+    # isoformat completo: o DjangoJSONEncoder corta os microssegundos e o
+    # cursor deixaria de casar com empates na data.
+    if isinstance(valor, (date, time)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    raise TypeError(f'Valor não suportado no cursor: {type(valor).__name__}')
+
+
+def codificar_cursor(valores: Sequence[Any]) -> str:
+    texto = json.dumps(list(valores), default=_valor_json, separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor: str, modelo, campos: Sequence[str]) -> List[Any]:
+    """Valores da ordenação contidos no cursor, já convertidos pelos campos do modelo."""
+    try:
+        texto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        valores = json.loads(texto)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise CursorInvalido('Cursor inválido') from e
+    if not isinstance(valores, list) or len(valores) != len(campos):
+        raise CursorInvalido('Cursor inválido')
+    try:
+        return [_campo(modelo, nome).to_python(valor) for nome, valor in zip(campos, valores)]
+    except ValidationError as e:
+        raise CursorInvalido('Cursor inválido') from e
+
+
+def filtro_apos(ordenacao: Sequence[str], valores: Sequence[Any]) -> Q:
+    """
+    Q das linhas que vêm depois de `valores` na ordenação, na forma expandida
+    (a < x) OR (a = x AND b < y) ... que os bancos resolvem pelo índice composto.
+    """
+    filtro = Q()
+    iguais = {}
+    for item, valor in zip(ordenacao, valores):
+        nome = item.lstrip('-')
+        operador = 'lt' if item.startswith('-') else 'gt'
+        filtro |= Q(**iguais, **{f'{nome}__{operador}': valor})
+        iguais[nome] = valor
+    return filtro
+
+
+def ler_limite(valor, padrao: int) -> int:
+    """Limite de página vindo da querystring, restrito a 1..LIMITE_MAXIMO."""
+    try:
+        limite = int(valor) if valor not in (None, '') else padrao
+    except (TypeError, ValueError):
+        limite = padrao
+    return max(1, min(limite, LIMITE_MAXIMO))
+
+
+def paginar_por_cursor(
+    queryset: QuerySet,
+    ordenacao: Sequence[str],
+    cursor: Optional[str] = None,
+    limite: int = 20,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Uma página de `queryset` na ordem `ordenacao`, começando após `cursor`.
+
+    Retorna (itens, proximo_cursor); proximo_cursor é None na última página.
+    Busca limite + 1 linhas para saber se há mais, sem COUNT.
+    """
+    campos = [item.lstrip('-') for item in ordenacao]
+    queryset = queryset.order_by(*ordenacao)
+    if cursor:
+        queryset = queryset.filter(filtro_apos(ordenacao, decodificar_cursor(cursor, queryset.model, campos)))
+
+    itens = list(queryset[:limite + 1])
+    if len(itens) <= limite:
+        return itens, None
+    itens = itens[:limite]
+    ultimo = itens[-1]
+    return itens, codificar_cursor([getattr(ultimo, nome) for nome in campos])
@@ -0,0 +1,64 @@
+"""
+Renderização HTML -> PDF com WeasyPrint.
+
+Módulo sem dependências do Django: é executado pelos processos do pool de
+RomaneioPdfService. CSS e FontConfiguration são montados uma vez por
+processo e reutilizados entre renderizações.
+"""
+import os
+import tempfile
+from functools import lru_cache
+
+
+@lru_cache(maxsize=8)
+def _recursos(css_texto):
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+
+    font_config = FontConfiguration()
+    return CSS(string=css_texto, font_config=font_config), font_config
+
+
+def _gravar_atomico(destino, escrever):
+    """
+    Grava num temporário da mesma pasta e troca com os.replace, para que
+    leitores nunca vejam um PDF pela metade.
+    """
+    pasta = os.path.dirname(destino)
+    os.makedirs(pasta, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=pasta, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as arquivo:
+            escrever(arquivo)
+        os.replace(temporario, destino)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.unlink(temporario)
+        raise
+    return destino
+
+
+def renderizar_pdf(html, destino, css_texto, base_url=None):
+    """Renderiza um documento HTML em destino."""
+    from weasyprint import HTML
+
+    css, font_config = _recursos(css_texto)
+    return _gravar_atomico(destino, lambda arquivo: HTML(string=html, base_url=base_url).write_pdf(
+        arquivo, stylesheets=[css], font_config=font_config
+    ))
+
+
+def renderizar_pdf_lote(htmls, destino, css_texto, base_url=None):
+    """
+    Renderiza vários documentos HTML num único PDF: cada um é paginado
+    separadamente e as páginas são juntadas com Document.copy.
+    """
+    from weasyprint import HTML
+
+    css, font_config = _recursos(css_texto)
+    documentos = [
+        HTML(string=html, base_url=base_url).render(stylesheets=[css], font_config=font_config)
+        for html in htmls
+    ]
+    paginas = [pagina for documento in documentos for pagina in documento.pages]
+    return _gravar_atomico(destino, lambda arquivo: documentos[0].copy(paginas).write_pdf(arquivo))
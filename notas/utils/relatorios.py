@@ -2,10 +2,14 @@
 Utilitários para geração de relatórios em PDF e Excel (totalizadores por estado e por cliente).
 """
 import io
+import tempfile
 from datetime import datetime
 from decimal import Decimal
 
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+
+CONTENT_TYPE_EXCEL = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
 
 
 def format_brazilian_currency(value):
@@ -134,18 +138,43 @@ def gerar_relatorio_pdf_totalizador_estado(resultados, data_inicial, data_final,
     return pdf_content
 
 
-def gerar_relatorio_excel_totalizador_estado(resultados, data_inicial, data_final, total_geral, total_seguro_geral):
+def _celula(ws, valor, **estilo):
+    """Célula de planilha write-only com estilo (font, fill, alignment, border)."""
+    from openpyxl.cell import WriteOnlyCell
+
+    cell = WriteOnlyCell(ws, value=valor)
+    for atributo, valor_estilo in estilo.items():
+        if valor_estilo is not None:
+            setattr(cell, atributo, valor_estilo)
+    return cell
+
+
+def _salvar_workbook(wb, destino=None):
+    """Grava em destino (arquivo) ou, sem destino, retorna os bytes do arquivo."""
+    if destino is not None:
+        wb.save(destino)
+        return None
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def gerar_relatorio_excel_totalizador_estado(
+    resultados, data_inicial, data_final, total_geral, total_seguro_geral, destino=None
+):
     """
     Gera relatório Excel para Totalizador por Estado.
     data_inicial e data_final devem ser objetos date.
+    Usa planilha write-only; com destino, grava no arquivo e retorna None.
     """
     from openpyxl import Workbook
     from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
     from openpyxl.utils import get_column_letter
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Totalizador por Estado"
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Totalizador por Estado")
+    for col, width in enumerate([25, 15, 18, 12, 18], 1):
+        ws.column_dimensions[get_column_letter(col)].width = width
 
     title_font = Font(name='Arial', size=16, bold=True, color='FFFFFF')
     header_font = Font(name='Arial', size=12, bold=True, color='FFFFFF')
@@ -166,67 +195,59 @@ def gerar_relatorio_excel_totalizador_estado(resultados, data_inicial, data_fina
     data_ini = data_inicial.strftime('%d/%m/%Y') if hasattr(data_inicial, 'strftime') else str(data_inicial)
     data_fim = data_final.strftime('%d/%m/%Y') if hasattr(data_final, 'strftime') else str(data_final)
 
-    ws.merge_cells('A1:F1')
-    ws['A1'] = 'RELATÓRIO - TOTALIZADOR POR ESTADO'
-    ws['A1'].font = title_font
-    ws['A1'].fill = title_fill
-    ws['A1'].alignment = center_alignment
-
-    ws.merge_cells('A2:F2')
-    ws['A2'] = f'Período: {data_ini} a {data_fim}'
-    ws['A2'].font = data_font
-    ws['A2'].alignment = center_alignment
-
-    ws.merge_cells('A3:F3')
-    ws['A3'] = f'Relatório gerado em: {datetime.now().strftime("%d/%m/%Y às %H:%M")}'
-    ws['A3'].font = data_font
-    ws['A3'].alignment = center_alignment
-
-    ws['A5'] = 'RESUMO EXECUTIVO'
-    ws['A5'].font = header_font
-    ws['A5'].fill = header_fill
-    ws['A5'].alignment = left_alignment
-    ws['A6'] = 'Total de Estados:'
-    ws['B6'] = len(resultados)
-    ws['A7'] = 'Valor Total:'
-    ws['B7'] = format_brazilian_currency(total_geral)
-    ws['A8'] = 'Seguro Total:'
-    ws['B8'] = format_brazilian_currency(total_seguro_geral)
-    for row in range(6, 9):
-        ws[f'A{row}'].font = data_font
-        ws[f'B{row}'].font = data_font
-        ws[f'B{row}'].alignment = right_alignment
+    for row in (1, 2, 3):
+        ws.merged_cells.add(f'A{row}:F{row}')
+    ws.append([_celula(
+        ws, 'RELATÓRIO - TOTALIZADOR POR ESTADO',
+        font=title_font, fill=title_fill, alignment=center_alignment,
+    )])
+    ws.append([_celula(ws, f'Período: {data_ini} a {data_fim}', font=data_font, alignment=center_alignment)])
+    ws.append([_celula(
+        ws, f'Relatório gerado em: {datetime.now().strftime("%d/%m/%Y às %H:%M")}',
+        font=data_font, alignment=center_alignment,
+    )])
+    ws.append([])
+
+    ws.append([_celula(ws, 'RESUMO EXECUTIVO', font=header_font, fill=header_fill, alignment=left_alignment)])
+    resumo = [
+        ('Total de Estados:', len(resultados)),
+        ('Valor Total:', format_brazilian_currency(total_geral)),
+        ('Seguro Total:', format_brazilian_currency(total_seguro_geral)),
+    ]
+    for rotulo, valor in resumo:
+        ws.append([
+            _celula(ws, rotulo, font=data_font),
+            _celula(ws, valor, font=data_font, alignment=right_alignment),
+        ])
+    ws.append([])
 
     headers = ['ESTADO', 'QTD. ROMANEIOS', 'VALOR TOTAL', '% SEGURO', 'VALOR SEGURO']
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=10, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = center_alignment
-        cell.border = thin_border
+    ws.append([
+        _celula(ws, header, font=header_font, fill=header_fill, alignment=center_alignment, border=thin_border)
+        for header in headers
+    ])
 
     for row, resultado in enumerate(resultados, 11):
         pct = f"{float(resultado.get('percentual_seguro', 0)):.2f}%" if resultado.get('percentual_seguro') is not None else '0,00%'
-        ws.cell(row=row, column=1, value=f"{resultado['nome_estado']} ({resultado['estado']})")
-        ws.cell(row=row, column=2, value=resultado['quantidade_romaneios'])
-        ws.cell(row=row, column=3, value=format_brazilian_currency(resultado['total_valor']))
-        ws.cell(row=row, column=4, value=pct)
-        ws.cell(row=row, column=5, value=format_brazilian_currency(resultado['valor_seguro']))
-        for col in range(1, 6):
-            cell = ws.cell(row=row, column=col)
-            cell.font = data_font
-            cell.border = thin_border
-            if row % 2 == 0:
-                cell.fill = data_fill
-            cell.alignment = left_alignment if col == 1 else center_alignment
-
-    for col, width in enumerate([25, 15, 18, 12, 18], 1):
-        ws.column_dimensions[get_column_letter(col)].width = width
+        valores = [
+            f"{resultado['nome_estado']} ({resultado['estado']})",
+            resultado['quantidade_romaneios'],
+            format_brazilian_currency(resultado['total_valor']),
+            pct,
+            format_brazilian_currency(resultado['valor_seguro']),
+        ]
+        ws.append([
+            _celula(
+                ws, valor,
+                font=data_font,
+                border=thin_border,
+                fill=data_fill if row % 2 == 0 else None,
+                alignment=left_alignment if col == 1 else center_alignment,
+            )
+            for col, valor in enumerate(valores, 1)
+        ])
 
-    buffer = io.BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    return buffer.getvalue()
+    return _salvar_workbook(wb, destino)
 
 
 def gerar_relatorio_excel_totalizador_cliente(
@@ -237,10 +258,12 @@ def gerar_relatorio_excel_totalizador_cliente(
     data_final,
     total_geral,
     total_seguro_geral,
+    destino=None,
 ):
     """
     Gera relatório Excel para Totalizador por Cliente (agrupado por UF).
     data_inicial e data_final devem ser objetos date.
+    Usa planilha write-only; com destino, grava no arquivo e retorna None.
     """
     from itertools import groupby
 
@@ -248,9 +271,10 @@ def gerar_relatorio_excel_totalizador_cliente(
     from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
     from openpyxl.utils import get_column_letter
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Totalizador por Cliente"
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Totalizador por Cliente")
+    for col, width in enumerate([48, 8, 18, 18], 1):
+        ws.column_dimensions[get_column_letter(col)].width = width
 
     title_font = Font(name="Arial", size=16, bold=True, color="FFFFFF")
     header_font = Font(name="Arial", size=12, bold=True, color="FFFFFF")
@@ -274,36 +298,31 @@ def gerar_relatorio_excel_totalizador_cliente(
     data_ini = data_inicial.strftime("%d/%m/%Y") if hasattr(data_inicial, "strftime") else str(data_inicial)
     data_fim = data_final.strftime("%d/%m/%Y") if hasattr(data_final, "strftime") else str(data_final)
 
-    ws.merge_cells("A1:D1")
-    ws["A1"] = "RELATÓRIO - TOTALIZADOR POR CLIENTE"
-    ws["A1"].font = title_font
-    ws["A1"].fill = title_fill
-    ws["A1"].alignment = center_alignment
-
-    ws.merge_cells("A2:D2")
-    ws["A2"] = f"Período: {data_ini} a {data_fim}"
-    ws["A2"].font = data_font
-    ws["A2"].alignment = center_alignment
-
-    ws.merge_cells("A3:D3")
-    ws["A3"] = f"Relatório gerado em: {datetime.now().strftime('%d/%m/%Y às %H:%M')}"
-    ws["A3"].font = data_font
-    ws["A3"].alignment = center_alignment
-
-    ws["A5"] = "RESUMO EXECUTIVO"
-    ws["A5"].font = header_font
-    ws["A5"].fill = header_fill
-    ws["A5"].alignment = left_alignment
-    ws["A6"] = "Total de clientes (linhas):"
-    ws["B6"] = len(resultados)
-    ws["A7"] = "Valor total mercadoria:"
-    ws["B7"] = format_brazilian_currency(total_geral)
-    ws["A8"] = "Valor total seguro:"
-    ws["B8"] = format_brazilian_currency(total_seguro_geral)
-    for row in range(6, 9):
-        ws[f"A{row}"].font = data_font
-        ws[f"B{row}"].font = data_font
-        ws[f"B{row}"].alignment = right_alignment
+    for row in (1, 2, 3):
+        ws.merged_cells.add(f"A{row}:D{row}")
+    ws.append([_celula(
+        ws, "RELATÓRIO - TOTALIZADOR POR CLIENTE",
+        font=title_font, fill=title_fill, alignment=center_alignment,
+    )])
+    ws.append([_celula(ws, f"Período: {data_ini} a {data_fim}", font=data_font, alignment=center_alignment)])
+    ws.append([_celula(
+        ws, f"Relatório gerado em: {datetime.now().strftime('%d/%m/%Y às %H:%M')}",
+        font=data_font, alignment=center_alignment,
+    )])
+    ws.append([])
+
+    ws.append([_celula(ws, "RESUMO EXECUTIVO", font=header_font, fill=header_fill, alignment=left_alignment)])
+    resumo = [
+        ("Total de clientes (linhas):", len(resultados)),
+        ("Valor total mercadoria:", format_brazilian_currency(total_geral)),
+        ("Valor total seguro:", format_brazilian_currency(total_seguro_geral)),
+    ]
+    for rotulo, valor in resumo:
+        ws.append([
+            _celula(ws, rotulo, font=data_font),
+            _celula(ws, valor, font=data_font, alignment=right_alignment),
+        ])
+    ws.append([])
 
     def _rotulo_cliente(cliente):
         cnpj_raw = getattr(cliente, "cnpj", None)
@@ -314,79 +333,72 @@ def gerar_relatorio_excel_totalizador_cliente(
             return f"{cnpj} - {razao}"
         return razao or cnpj or "—"
 
+    def _linha_total(rotulo, valor_mercadoria, valor_seguro):
+        ws.merged_cells.add(f"A{current_row}:B{current_row}")
+        ws.append([
+            _celula(ws, rotulo, font=total_row_font, alignment=left_alignment),
+            None,
+            _celula(ws, format_brazilian_currency(valor_mercadoria),
+                    font=total_row_font, border=thin_border, alignment=right_alignment),
+            _celula(ws, format_brazilian_currency(valor_seguro),
+                    font=total_row_font, border=thin_border, alignment=right_alignment),
+        ])
+
     current_row = 10
     nomes = nomes_estados or {}
 
     for uf, grupo in groupby(resultados, key=lambda x: x["uf"]):
-        items = list(grupo)
         nome_estado = nomes.get(uf, "") if isinstance(nomes, dict) else ""
         titulo_secao = f"{uf} — {nome_estado}" if nome_estado else str(uf)
 
-        ws.merge_cells(f"A{current_row}:D{current_row}")
-        c = ws.cell(row=current_row, column=1, value=titulo_secao)
-        c.font = section_font
-        c.fill = section_fill
-        c.alignment = left_alignment
+        ws.merged_cells.add(f"A{current_row}:D{current_row}")
+        ws.append([_celula(ws, titulo_secao, font=section_font, fill=section_fill, alignment=left_alignment)])
         current_row += 1
 
         headers = ["CLIENTE", "UF", "R$ MERCADORIA", "R$ SEGURO"]
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=current_row, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = center_alignment if col > 1 else left_alignment
-            cell.border = thin_border
+        ws.append([
+            _celula(
+                ws, header,
+                font=header_font,
+                fill=header_fill,
+                alignment=center_alignment if col > 1 else left_alignment,
+                border=thin_border,
+            )
+            for col, header in enumerate(headers, 1)
+        ])
         current_row += 1
 
-        for item in items:
-            ws.cell(row=current_row, column=1, value=_rotulo_cliente(item["cliente"]))
-            ws.cell(row=current_row, column=2, value=item.get("uf") or "—")
-            ws.cell(row=current_row, column=3, value=format_brazilian_currency(item["valor_mercadoria"]))
-            ws.cell(row=current_row, column=4, value=format_brazilian_currency(item["valor_seguro"]))
-            for col in range(1, 5):
-                cell = ws.cell(row=current_row, column=col)
-                cell.font = data_font
-                cell.border = thin_border
-                cell.alignment = left_alignment if col == 1 else (center_alignment if col == 2 else right_alignment)
-                if current_row % 2 == 0:
-                    cell.fill = data_fill
+        for item in grupo:
+            valores = [
+                _rotulo_cliente(item["cliente"]),
+                item.get("uf") or "—",
+                format_brazilian_currency(item["valor_mercadoria"]),
+                format_brazilian_currency(item["valor_seguro"]),
+            ]
+            ws.append([
+                _celula(
+                    ws, valor,
+                    font=data_font,
+                    border=thin_border,
+                    alignment=left_alignment if col == 1 else (center_alignment if col == 2 else right_alignment),
+                    fill=data_fill if current_row % 2 == 0 else None,
+                )
+                for col, valor in enumerate(valores, 1)
+            ])
             current_row += 1
 
         tot = totais_por_estado.get(uf) or {}
-        vm = tot.get("valor_mercadoria", Decimal("0.0"))
-        vs = tot.get("valor_seguro", Decimal("0.0"))
-        ws.merge_cells(f"A{current_row}:B{current_row}")
-        c_tot = ws.cell(row=current_row, column=1, value=f"Total {uf}")
-        c_tot.font = total_row_font
-        c_tot.alignment = left_alignment
-        ws.cell(row=current_row, column=3, value=format_brazilian_currency(vm))
-        ws.cell(row=current_row, column=4, value=format_brazilian_currency(vs))
-        for col in (3, 4):
-            cell = ws.cell(row=current_row, column=col)
-            cell.font = total_row_font
-            cell.border = thin_border
-            cell.alignment = right_alignment
+        _linha_total(
+            f"Total {uf}",
+            tot.get("valor_mercadoria", Decimal("0.0")),
+            tot.get("valor_seguro", Decimal("0.0")),
+        )
+        ws.append([])
         current_row += 2
 
-    ws.merge_cells(f"A{current_row}:B{current_row}")
-    c_g = ws.cell(row=current_row, column=1, value="TOTAL GERAL")
-    c_g.font = total_row_font
-    c_g.alignment = left_alignment
-    ws.cell(row=current_row, column=3, value=format_brazilian_currency(total_geral))
-    ws.cell(row=current_row, column=4, value=format_brazilian_currency(total_seguro_geral))
-    for col in (3, 4):
-        cell = ws.cell(row=current_row, column=col)
-        cell.font = total_row_font
-        cell.border = thin_border
-        cell.alignment = right_alignment
-
-    for col, width in enumerate([48, 8, 18, 18], 1):
-        ws.column_dimensions[get_column_letter(col)].width = width
+    _linha_total("TOTAL GERAL", total_geral, total_seguro_geral)
 
-    buffer = io.BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    return buffer.getvalue()
+    return _salvar_workbook(wb, destino)
 
 
 def gerar_resposta_pdf(conteudo_pdf, nome_arquivo, inline=False):
@@ -402,12 +414,38 @@ def gerar_resposta_excel(conteudo_excel, nome_arquivo):
     """Cria resposta HTTP para Excel."""
     response = HttpResponse(
         conteudo_excel,
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        content_type=CONTENT_TYPE_EXCEL,
     )
     response['Content-Disposition'] = f'attachment; filename="{nome_arquivo}"'
     return response
 
 
+def gerar_resposta_excel_streaming(gerar, nome_arquivo, *args, **kwargs):
+    """
+    Resposta de download para um gerador de Excel que aceita destino=,
+    ex.: gerar_resposta_excel_streaming(gerar_relatorio_excel_totalizador_estado, nome, ...).
+
+    A planilha é gravada num arquivo temporário (em memória só até
+    RELATORIO_MEMORIA_MAXIMA bytes, depois em disco) e enviada em blocos com
+    FileResponse, que fecha o arquivo ao terminar.
+    """
+    arquivo = tempfile.SpooledTemporaryFile(
+        max_size=getattr(settings, 'RELATORIO_MEMORIA_MAXIMA', 512 * 1024)
+    )
+    try:
+        gerar(*args, destino=arquivo, **kwargs)
+        arquivo.seek(0)
+    except Exception:
+        arquivo.close()
+        raise
+    return FileResponse(
+        arquivo,
+        as_attachment=True,
+        filename=nome_arquivo,
+        content_type=CONTENT_TYPE_EXCEL,
+    )
+
+
 def gerar_relatorio_pdf_cobranca_carregamento(cobranca):
     """Gera PDF detalhado de uma cobrança de carregamento."""
     from reportlab.lib.pagesizes import A4
@@ -3,7 +3,9 @@ Montagem de contexto para impressão de romaneios.
 """
 from typing import Any, Dict, List
 
-from ..models import RomaneioViagem
+from django.db.models import Prefetch
+
+from ..models import NotaFiscal, RomaneioViagem
 from ..services.romaneio_service import RomaneioService
 from ..utils.nota_ordering import ordenar_instancias_notas_fiscais
 
@@ -48,3 +50,35 @@ def montar_item_impressao_romaneio(romaneio: RomaneioViagem) -> Dict[str, Any]:
         'total_peso': totais['total_peso'],
         'total_valor': totais['total_valor'],
     }
+
+
+def carregar_romaneios_para_impressao():
+    """
+    Romaneios com tudo o que a impressão usa em duas consultas: uma com os
+    relacionamentos diretos e uma com as notas, já na ordem numérica do banco.
+    """
+    return RomaneioViagem.objects.select_related(
+        'cliente', 'motorista', 'veiculo_principal', 'reboque_1', 'reboque_2'
+    ).prefetch_related(
+        Prefetch('notas_fiscais', queryset=NotaFiscal.objects.order_by('ordem_nota', 'pk'))
+    )
+
+
+def montar_itens_impressao_lote(romaneios) -> List[Dict[str, Any]]:
+    """
+    Contexto de impressão de vários romaneios (de carregar_romaneios_para_impressao),
+    sem consultas adicionais: mesmas chaves de montar_item_impressao_romaneio.
+    """
+    itens = []
+    for romaneio in romaneios:
+        notas_romaneadas = list(romaneio.notas_fiscais.all())
+        paginas_notas = paginar_notas_romaneio(notas_romaneadas)
+        itens.append({
+            'romaneio': romaneio,
+            'notas_romaneadas': notas_romaneadas,
+            'paginas_notas': paginas_notas,
+            'total_paginas': len(paginas_notas),
+            'total_peso': sum(nota.peso for nota in notas_romaneadas),
+            'total_valor': sum(nota.valor for nota in notas_romaneadas),
+        })
+    return itens
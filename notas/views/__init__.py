@@ -65,6 +65,7 @@ from .veiculo_views import (
 from .nota_fiscal_views import (
     listar_notas_fiscais,
     adicionar_nota_fiscal,
+    importar_notas_fiscais,
     editar_nota_fiscal,
     excluir_nota_fiscal,
     detalhes_nota_fiscal,
@@ -173,7 +174,7 @@ __all__ = [
     'listar_veiculos', 'adicionar_veiculo', 'editar_veiculo',
     'excluir_veiculo', 'detalhes_veiculo',
     # Nota Fiscal
-    'listar_notas_fiscais', 'adicionar_nota_fiscal', 'editar_nota_fiscal',
+    'listar_notas_fiscais', 'adicionar_nota_fiscal', 'importar_notas_fiscais', 'editar_nota_fiscal',
     'excluir_nota_fiscal', 'detalhes_nota_fiscal', 'buscar_mercadorias_deposito',
     'pesquisar_mercadorias_deposito', 'procurar_mercadorias_deposito',
     'imprimir_relatorio_mercadorias_deposito', 'minhas_notas_fiscais',
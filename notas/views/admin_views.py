@@ -34,6 +34,7 @@ from .setor_bancario_views import (
     listar_setores_bancarios,
     editar_setor_bancario,
 )
+from .monitor_consultas_views import monitor_consultas
 
 __all__ = [
     'cadastrar_usuario',
@@ -58,4 +59,5 @@ __all__ = [
     'restaurar_registro',
     'listar_setores_bancarios',
     'editar_setor_bancario',
+    'monitor_consultas',
 ]
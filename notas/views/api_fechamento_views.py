@@ -3,14 +3,18 @@ Views API para Fechamento de Frete
 """
 import logging
 from sistema_estelar.api_utils import json_success, json_error
-from django.db.models import Sum, Q
+from django.db.models import Sum
 from datetime import datetime
 from ..models import RomaneioViagem, Cliente
 from ..decorators import admin_required
+from ..services import BuscaService
 from ..utils.date_utils import parse_date_iso
+from ..utils.paginacao_cursor import CursorInvalido, ler_limite, paginar_por_cursor
 
 logger = logging.getLogger(__name__)
 
+ORDENACAO_ROMANEIOS = ('-data_emissao', '-id')
+
 
 @admin_required
 def carregar_dados_romaneios(request):
@@ -129,20 +133,23 @@ def carregar_mais_romaneios(request):
     API para carregar mais romaneios (scroll infinito)
     
     Parâmetros GET:
-        - offset: Número de romaneios já carregados
+        - cursor: Cursor devolvido pela página anterior (vazio na primeira)
         - limit: Quantidade de romaneios para carregar (padrão: 10)
     
     Retorna:
         - romaneios: Lista de romaneios
         - has_more: Se há mais romaneios para carregar
+        - cursor: Cursor da próxima página (null na última)
     """
     try:
-        offset = int(request.GET.get('offset', 0))
-        limit = int(request.GET.get('limit', 10))
+        limit = ler_limite(request.GET.get('limit'), 10)
         
-        romaneios = RomaneioViagem.objects.filter(
-            status='Emitido'
-        ).select_related('cliente', 'motorista').order_by('-data_emissao', '-id')[offset:offset + limit]
+        romaneios, proximo_cursor = paginar_por_cursor(
+            RomaneioViagem.objects.filter(status='Emitido').select_related('cliente', 'motorista'),
+            ORDENACAO_ROMANEIOS,
+            cursor=request.GET.get('cursor'),
+            limite=limit,
+        )
         
         romaneios_data = []
         for romaneio in romaneios:
@@ -159,16 +166,14 @@ def carregar_mais_romaneios(request):
                 'valor_total': float(romaneio.valor_total or 0),
             })
         
-        # Verificar se há mais romaneios
-        total_romaneios = RomaneioViagem.objects.filter(status='Emitido').count()
-        has_more = (offset + limit) < total_romaneios
-        
         return json_success(
             romaneios=romaneios_data,
-            has_more=has_more,
-            offset=offset + len(romaneios_data),
+            has_more=proximo_cursor is not None,
+            cursor=proximo_cursor,
         )
         
+    except CursorInvalido as e:
+        return json_error(str(e), code='CURSOR_INVALIDO', status=400)
     except Exception as e:
         logger.error('Erro ao carregar mais romaneios: %s', str(e), exc_info=True)
         return json_error('Erro ao processar', status=500)
@@ -191,11 +196,7 @@ def buscar_clientes_ativos(request):
         clientes = Cliente.objects.filter(status='Ativo').order_by('razao_social')
         
         if busca:
-            clientes = clientes.filter(
-                Q(razao_social__icontains=busca) |
-                Q(nome_fantasia__icontains=busca) |
-                Q(cnpj__icontains=busca)
-            )
+            clientes = BuscaService.filtrar(clientes, busca, campos=('razao_social', 'nome_fantasia', 'cnpj'))
         
         clientes_data = []
         for cliente in clientes[:100]:  # Limitar a 100 resultados
@@ -229,13 +230,14 @@ def buscar_romaneios_filtrados(request):
         - cliente_id: ID do cliente (opcional)
         - motorista_id: ID do motorista (opcional)
         - busca: Termo de busca (código do romaneio) (opcional)
-        - offset: Offset para paginação (opcional)
+        - cursor: Cursor devolvido pela página anterior (opcional)
         - limit: Limite de resultados (padrão: 50)
     
     Retorna:
         - romaneios: Lista de romaneios
-        - total: Total de romaneios encontrados
+        - total: Total de romaneios encontrados (só na primeira página)
         - has_more: Se há mais romaneios
+        - cursor: Cursor da próxima página (null na última)
     """
     try:
         data_inicio = request.GET.get('data_inicio', '')
@@ -243,8 +245,8 @@ def buscar_romaneios_filtrados(request):
         cliente_id = request.GET.get('cliente_id', '')
         motorista_id = request.GET.get('motorista_id', '')
         busca = request.GET.get('busca', '').strip()
-        offset = int(request.GET.get('offset', 0))
-        limit = int(request.GET.get('limit', 50))
+        cursor = request.GET.get('cursor')
+        limit = ler_limite(request.GET.get('limit'), 50)
         
         romaneios = RomaneioViagem.objects.filter(status='Emitido').select_related(
             'cliente', 'motorista'
@@ -272,13 +274,14 @@ def buscar_romaneios_filtrados(request):
                 pass
         
         if busca:
-            romaneios = romaneios.filter(codigo__icontains=busca)
+            romaneios = BuscaService.filtrar(romaneios, busca, campos=('codigo',))
         
-        # Contar total antes de aplicar offset/limit
-        total = romaneios.count()
+        # O total só é contado na primeira página; as seguintes custam o mesmo que ela
+        total = None if cursor else romaneios.count()
         
-        # Ordenar e aplicar paginação
-        romaneios = romaneios.order_by('-data_emissao', '-id')[offset:offset + limit]
+        romaneios, proximo_cursor = paginar_por_cursor(
+            romaneios, ORDENACAO_ROMANEIOS, cursor=cursor, limite=limit
+        )
         
         romaneios_data = []
         for romaneio in romaneios:
@@ -295,15 +298,15 @@ def buscar_romaneios_filtrados(request):
                 'valor_total': float(romaneio.valor_total or 0),
             })
         
-        has_more = (offset + limit) < total
-        
         return json_success(
             romaneios=romaneios_data,
             total=total,
-            has_more=has_more,
-            offset=offset + len(romaneios_data),
+            has_more=proximo_cursor is not None,
+            cursor=proximo_cursor,
         )
         
+    except CursorInvalido as e:
+        return json_error(str(e), code='CURSOR_INVALIDO', status=400)
     except Exception as e:
         logger.error('Erro ao buscar romaneios: %s', str(e), exc_info=True)
         return json_error('Erro ao processar', status=500)
@@ -13,22 +13,39 @@ from django.db.models import Q
 from ..models import NotaFiscal, Cliente, RomaneioViagem, Veiculo, OcorrenciaNotaFiscal, FotoOcorrencia
 from ..decorators import admin_required
 from ..utils.nota_ordering import ordenar_instancias_notas_fiscais
+from ..utils.paginacao_cursor import CursorInvalido, ler_limite, paginar_por_cursor
 
 logger = logging.getLogger(__name__)
 
 
 @login_required
 def load_notas_fiscais(request):
-    """Carrega notas fiscais via AJAX baseado no cliente selecionado"""
+    """
+    Carrega notas fiscais via AJAX baseado no cliente selecionado.
+
+    Sem limit/cursor devolve todas as notas em depósito do cliente; com eles,
+    pagina por cursor na ordem numérica (resposta inclui cursor da próxima página).
+    """
     cliente_id = request.GET.get('cliente_id')
     
     if cliente_id:
-        notas = ordenar_instancias_notas_fiscais(
-            NotaFiscal.objects.filter(
-                cliente_id=cliente_id,
-                status='Depósito'
-            )
+        notas = NotaFiscal.objects.filter(
+            cliente_id=cliente_id,
+            status='Depósito'
         )
+        extras = {}
+        if 'limit' in request.GET or 'cursor' in request.GET:
+            try:
+                notas, extras['cursor'] = paginar_por_cursor(
+                    notas,
+                    ('ordem_nota', 'id'),
+                    cursor=request.GET.get('cursor'),
+                    limite=ler_limite(request.GET.get('limit'), 50),
+                )
+            except CursorInvalido as e:
+                return json_error(str(e), code='CURSOR_INVALIDO', status=400)
+        else:
+            notas = ordenar_instancias_notas_fiscais(notas)
         
         notas_data = [{
             'id': nota.id,
@@ -37,7 +54,7 @@ def load_notas_fiscais(request):
             'peso': str(nota.peso),
         } for nota in notas]
         
-        return json_success(notas=notas_data)
+        return json_success(notas=notas_data, **extras)
     
     return json_success(notas=[])
 
@@ -158,7 +175,10 @@ def filtrar_veiculos_por_composicao(request):
 
 @login_required
 def carregar_romaneios_cliente(request, cliente_id):
-    """Carrega romaneios de um cliente via AJAX"""
+    """
+    Carrega romaneios de um cliente via AJAX, paginados por cursor
+    (parâmetros opcionais cursor e limit; a resposta traz o próximo cursor).
+    """
     cliente = get_object_or_404(Cliente, pk=cliente_id)
     para_relatorio = request.GET.get('para_relatorio') == '1'
 
@@ -166,15 +186,24 @@ def carregar_romaneios_cliente(request, cliente_id):
         RomaneioViagem.objects
         .filter(cliente=cliente)
         .select_related('motorista', 'veiculo_principal', 'reboque_1', 'reboque_2')
-        .order_by('-data_emissao')
     )
 
     if para_relatorio:
         # Relatório provisório ao cliente: romaneios emitidos (sem limite de cobrança).
-        romaneios = queryset.filter(status='Emitido')[:50]
+        queryset, limite_padrao = queryset.filter(status='Emitido'), 50
     else:
         # Cobrança financeira: apenas romaneios ainda não vinculados.
-        romaneios = queryset.filter(cobrancas_vinculadas__isnull=True)[:10]
+        queryset, limite_padrao = queryset.filter(cobrancas_vinculadas__isnull=True), 10
+
+    try:
+        romaneios, proximo_cursor = paginar_por_cursor(
+            queryset,
+            ('-data_emissao', '-id'),
+            cursor=request.GET.get('cursor'),
+            limite=ler_limite(request.GET.get('limit'), limite_padrao),
+        )
+    except CursorInvalido as e:
+        return json_error(str(e), code='CURSOR_INVALIDO', status=400)
 
     romaneios_data = [{
         'id': romaneio.id,
@@ -186,7 +215,7 @@ def carregar_romaneios_cliente(request, cliente_id):
         'valor_total': str(romaneio.valor_total),
     } for romaneio in romaneios]
 
-    return json_success(romaneios=romaneios_data)
+    return json_success(romaneios=romaneios_data, cursor=proximo_cursor)
 
 
 @login_required
@@ -9,59 +9,27 @@ from ..models import TabelaSeguro
 from ..utils.formatters import formatar_valor_brasileiro, formatar_peso_brasileiro
 
 # Funções de geração de código provisório para preview em formulários
-# Nota: A geração real do código é feita pelo método gerar_codigo_automatico() do modelo RomaneioViagem
-# Estas funções são usadas apenas para mostrar um código provisório no formulário antes de salvar
+# Nota: O código real é reservado na gravação (RomaneioService via SequenciaService).
+# Estas funções apenas consultam a sequência, sem reservar o número.
 
 def get_next_romaneio_codigo():
     """
-    Gera código provisório para preview no formulário (formato antigo: ROM-NNN).
+    Gera código provisório para preview no formulário (formato: ROM-NNN).
     
-    Nota: O código real é gerado automaticamente pelo modelo no formato ROM-YYYY-MM-NNNN
-    Esta função é usada apenas para preview no formulário.
+    Esta função é usada apenas para preview no formulário; o número não é reservado.
     """
-    from ..models import RomaneioViagem
-    prefix = "ROM-"
-    last_romaneio = RomaneioViagem.objects.filter(
-        codigo__startswith=prefix
-    ).exclude(
-        codigo__startswith="ROM-100-"
-    ).order_by('-codigo').first()
-
-    next_sequence = 1
-    if last_romaneio and last_romaneio.codigo:
-        try:
-            parts = last_romaneio.codigo.split('-')
-            if len(parts) == 2 and parts[0] == 'ROM':
-                next_sequence = int(parts[1]) + 1
-        except (ValueError, IndexError):
-            pass
-
-    return f"ROM-{next_sequence:03d}"
+    from ..services.romaneio_service import previsualizar_codigo_romaneio
+    return previsualizar_codigo_romaneio('normal')
 
 
 def get_next_romaneio_generico_codigo():
     """
     Gera código provisório para preview no formulário (formato: ROM-100-NNN).
     
-    Nota: O código real é gerado automaticamente pelo modelo no formato ROM-YYYY-MM-NNNN
-    Esta função é usada apenas para preview no formulário.
+    Esta função é usada apenas para preview no formulário; o número não é reservado.
     """
-    from ..models import RomaneioViagem
-    prefix = "ROM-100-"
-    last_romaneio = RomaneioViagem.objects.filter(
-        codigo__startswith=prefix
-    ).order_by('-codigo').first()
-
-    next_sequence = 1
-    if last_romaneio and last_romaneio.codigo:
-        try:
-            parts = last_romaneio.codigo.split('-')
-            if len(parts) == 3 and parts[0] == 'ROM' and parts[1] == '100':
-                next_sequence = int(parts[2]) + 1
-        except (ValueError, IndexError):
-            pass
-
-    return f"ROM-100-{next_sequence:03d}"
+    from ..services.romaneio_service import previsualizar_codigo_romaneio
+    return previsualizar_codigo_romaneio('generico')
 
 
 def is_admin(user):
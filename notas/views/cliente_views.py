@@ -31,6 +31,7 @@ from django.db import IntegrityError
 from ..models import Cliente
 from ..forms import ClienteForm, ClienteSearchForm
 from ..decorators import rate_limit_critical
+from ..services import BuscaService
 from ..utils.search_utils import tem_filtro_preenchido
 
 # Configurar logger
@@ -509,9 +510,9 @@ def listar_clientes(request):
             status = search_form.cleaned_data.get('status')
 
             if razao_social:
-                queryset = queryset.filter(razao_social__icontains=razao_social)
+                queryset = BuscaService.filtrar(queryset, razao_social, campos=('razao_social',))
             if cnpj:
-                queryset = queryset.filter(cnpj__icontains=cnpj)
+                queryset = BuscaService.filtrar(queryset, cnpj, campos=('cnpj',))
             if status:
                 queryset = queryset.filter(status=status)
 
@@ -549,9 +550,9 @@ def imprimir_relatorio_clientes(request):
         status = search_form.cleaned_data.get('status')
 
         if razao_social:
-            queryset = queryset.filter(razao_social__icontains=razao_social)
+            queryset = BuscaService.filtrar(queryset, razao_social, campos=('razao_social',))
         if cnpj:
-            queryset = queryset.filter(cnpj__icontains=cnpj)
+            queryset = BuscaService.filtrar(queryset, cnpj, campos=('cnpj',))
         if status:
             queryset = queryset.filter(status=status)
         
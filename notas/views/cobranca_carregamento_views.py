@@ -377,7 +377,11 @@ def gerar_relatorio_consolidado_cobranca_pdf(request):
     data_inicio = request.GET.get('data_inicio')
     data_fim = request.GET.get('data_fim')
 
-    base_qs = CobrancaCarregamento.objects.all().select_related('cliente').prefetch_related('romaneios')
+    base_qs = (
+        CobrancaCarregamento.objects.all()
+        .select_related('cliente')
+        .prefetch_related('romaneios')
+    )
     data_inicio_obj = parse_date_iso(data_inicio) if data_inicio else None
     data_fim_obj = parse_date_iso(data_fim) if data_fim else None
 
@@ -411,7 +415,7 @@ def gerar_relatorio_consolidado_cobranca_pdf(request):
         except Cliente.DoesNotExist:
             pass
 
-    itens = list(cobrancas.order_by('-criado_em'))
+    itens = CobrancaCarregamento.resolver_observacoes_exibicao(cobrancas.order_by('-criado_em'))
     total_carregamento = Decimal('0.00')
     total_distribuicao = Decimal('0.00')
     total_margem_estelar = Decimal('0.00')
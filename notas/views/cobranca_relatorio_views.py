@@ -1,19 +1,52 @@
 """
 Views de relatórios de cobrança (cobrança mensal e listagem de cobrança de carregamento).
 """
-from django.shortcuts import render
+from django.shortcuts import render, redirect
 from django.contrib import messages
+from django.urls import reverse
+from django.utils import timezone
 
 from ..models import Cliente, CobrancaCarregamento
-from ..decorators import admin_required
+from ..decorators import admin_required, rate_limit_critical
+from ..services import CobrancaMensalService
 from ..utils.date_utils import parse_date_iso
 
 
+def _competencia(valor):
+    """(ano, mes) de 'AAAA-MM'; vazio ou inválido = mês anterior ao atual."""
+    try:
+        ano, mes = (int(parte) for parte in (valor or '').split('-'))
+        if 1 <= mes <= 12:
+            return ano, mes
+    except ValueError:
+        pass
+    hoje = timezone.localdate()
+    return (hoje.year - 1, 12) if hoje.month == 1 else (hoje.year, hoje.month - 1)
+
+
 @admin_required
+@rate_limit_critical
 def cobranca_mensal(request):
-    """View para cobrança mensal"""
-    messages.info(request, 'Funcionalidade de cobrança mensal em desenvolvimento')
-    return render(request, 'notas/relatorios/cobranca_mensal.html')
+    """Fechamento mensal: prévia (GET) e geração (POST) das cobranças dos clientes Mensalistas."""
+    if request.method == 'POST':
+        ano, mes = _competencia(request.POST.get('competencia'))
+        cobrancas = CobrancaMensalService.gerar(ano, mes)
+        if cobrancas:
+            messages.success(request, f'{len(cobrancas)} cobrança(s) mensal(is) de {mes:02d}/{ano} gerada(s) com sucesso!')
+            return redirect(f"{reverse('notas:cobranca_carregamento')}?status=Pendente")
+        messages.info(request, f'Nenhum romaneio a cobrar em {mes:02d}/{ano}.')
+        return redirect(f"{reverse('notas:cobranca_mensal')}?competencia={ano}-{mes:02d}")
+
+    ano, mes = _competencia(request.GET.get('competencia'))
+    previa = CobrancaMensalService.previa(ano, mes)
+    context = {
+        'competencia': f'{ano}-{mes:02d}',
+        'previa': previa,
+        'total_romaneios': sum(linha['quantidade_romaneios'] for linha in previa),
+        'total_carregamento': sum(linha['valor_carregamento'] for linha in previa),
+        'data_vencimento': CobrancaMensalService.data_vencimento(ano, mes),
+    }
+    return render(request, 'notas/relatorios/cobranca_mensal.html', context)
 
 
 @admin_required
@@ -23,7 +56,11 @@ def cobranca_carregamento(request):
     if status_filtro not in ('Pendente', 'Baixado'):
         cobrancas = CobrancaCarregamento.objects.none()
     else:
-        cobrancas = CobrancaCarregamento.objects.filter(status=status_filtro).select_related('cliente').prefetch_related('romaneios')
+        cobrancas = (
+            CobrancaCarregamento.objects.filter(status=status_filtro)
+            .select_related('cliente')
+            .prefetch_related('romaneios')
+        )
         cliente_id = request.GET.get('cliente')
         data_inicio = request.GET.get('data_inicio')
         data_fim = request.GET.get('data_fim')
@@ -35,6 +72,7 @@ def cobranca_carregamento(request):
         data_fim_obj = parse_date_iso(data_fim) if data_fim else None
         if data_fim_obj:
             cobrancas = cobrancas.filter(criado_em__date__lte=data_fim_obj)
+        cobrancas = CobrancaCarregamento.resolver_observacoes_exibicao(cobrancas)
 
     clientes = Cliente.objects.filter(status='Ativo').order_by('razao_social')
 
@@ -3,11 +3,12 @@ Views de Dashboard
 """
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Sum, Q
+from django.db.models import Count, Sum
 from django.db.models.functions import Upper, Trim
 from datetime import datetime, date, timedelta
 
 from ..models import NotaFiscal, Cliente, Motorista, Veiculo, RomaneioViagem
+from ..services.resumo_dashboard_service import ResumoDashboardService
 
 
 @login_required
@@ -25,25 +26,22 @@ def dashboard(request):
     if hasattr(request.user, 'is_cliente') and request.user.is_cliente:
         return dashboard_cliente(request)
     
-    # Estatísticas básicas para o dashboard
-    total_notas = NotaFiscal.objects.count()
+    # Estatísticas básicas para o dashboard (notas/romaneios vêm dos resumos diários)
+    totais_notas = ResumoDashboardService.obter_totais_notas()
+    totais_romaneios = ResumoDashboardService.obter_totais_romaneios()
+    total_notas = totais_notas['total_notas']
     total_clientes = Cliente.objects.count()
     total_motoristas = Motorista.objects.count()
     total_veiculos = Veiculo.objects.count()
-    total_romaneios = RomaneioViagem.objects.count()
+    total_romaneios = totais_romaneios['total_romaneios']
     
     # Notas por status
-    notas_deposito = NotaFiscal.objects.filter(status='Depósito').count()
-    notas_enviadas = NotaFiscal.objects.filter(status='Enviada').count()
+    notas_deposito = totais_notas['notas_deposito']
+    notas_enviadas = totais_notas['notas_enviadas']
     
     # Valores financeiros
-    valor_total_deposito = NotaFiscal.objects.filter(status='Depósito').aggregate(
-        total=Sum('valor')
-    )['total'] or 0
-    
-    valor_total_enviadas = NotaFiscal.objects.filter(status='Enviada').aggregate(
-        total=Sum('valor')
-    )['total'] or 0
+    valor_total_deposito = totais_notas['valor_total_deposito']
+    valor_total_enviadas = totais_notas['valor_total_enviadas']
     
     # Atividade recente (últimos 7 dias)
     data_limite = datetime.now() - timedelta(days=7)
@@ -58,9 +56,7 @@ def dashboard(request):
     ).prefetch_related('notas_fiscais').order_by('-data_emissao')[:5]
     
     # Top clientes por valor em depósito
-    top_clientes_deposito = Cliente.objects.annotate(
-        valor_deposito=Sum('notas_fiscais__valor', filter=Q(notas_fiscais__status='Depósito'))
-    ).filter(valor_deposito__gt=0).order_by('-valor_deposito')[:5]
+    top_clientes_deposito = ResumoDashboardService.top_clientes_deposito(limite=5)
 
     # Quantidade de clientes por estado (UF) para o mapa do dashboard
     clientes_por_estado = list(
@@ -122,19 +118,15 @@ def dashboard_cliente(request):
         messages.error(request, 'Cliente não encontrado. Entre em contato com o administrador.')
         return redirect('notas:login')
     
-    # Estatísticas do cliente
-    total_notas_cliente = NotaFiscal.objects.filter(cliente=cliente).count()
-    notas_deposito_cliente = NotaFiscal.objects.filter(cliente=cliente, status='Depósito').count()
-    notas_enviadas_cliente = NotaFiscal.objects.filter(cliente=cliente, status='Enviada').count()
+    # Estatísticas do cliente (resumos diários)
+    totais_notas_cliente = ResumoDashboardService.obter_totais_notas(cliente_id=cliente.pk)
+    total_notas_cliente = totais_notas_cliente['total_notas']
+    notas_deposito_cliente = totais_notas_cliente['notas_deposito']
+    notas_enviadas_cliente = totais_notas_cliente['notas_enviadas']
     
     # Valores financeiros do cliente
-    valor_total_deposito_cliente = NotaFiscal.objects.filter(
-        cliente=cliente, status='Depósito'
-    ).aggregate(total=Sum('valor'))['total'] or 0
-    
-    valor_total_enviadas_cliente = NotaFiscal.objects.filter(
-        cliente=cliente, status='Enviada'
-    ).aggregate(total=Sum('valor'))['total'] or 0
+    valor_total_deposito_cliente = totais_notas_cliente['valor_total_deposito']
+    valor_total_enviadas_cliente = totais_notas_cliente['valor_total_enviadas']
     
     # Últimas notas do cliente (últimos 30 dias)
     data_limite = datetime.now() - timedelta(days=30)
@@ -217,20 +209,22 @@ def dashboard_funcionario(request):
     if not (hasattr(request.user, 'tipo_usuario') and request.user.tipo_usuario == 'funcionario'):
         return redirect('notas:dashboard')
     
-    # Estatísticas básicas para funcionários
-    total_notas = NotaFiscal.objects.count()
+    # Estatísticas básicas para funcionários (notas/romaneios vêm dos resumos diários)
+    totais_notas = ResumoDashboardService.obter_totais_notas()
+    totais_romaneios = ResumoDashboardService.obter_totais_romaneios()
+    total_notas = totais_notas['total_notas']
     total_clientes = Cliente.objects.count()
     total_motoristas = Motorista.objects.count()
     total_veiculos = Veiculo.objects.count()
-    total_romaneios = RomaneioViagem.objects.count()
+    total_romaneios = totais_romaneios['total_romaneios']
     
     # Notas por status
-    notas_deposito = NotaFiscal.objects.filter(status='Depósito').count()
-    notas_enviadas = NotaFiscal.objects.filter(status='Enviada').count()
+    notas_deposito = totais_notas['notas_deposito']
+    notas_enviadas = totais_notas['notas_enviadas']
     
     # Valores financeiros
-    valor_total_notas = NotaFiscal.objects.aggregate(total=Sum('valor'))['total'] or 0
-    valor_total_romaneios = RomaneioViagem.objects.aggregate(total=Sum('valor_total'))['total'] or 0
+    valor_total_notas = totais_notas['valor_total_notas']
+    valor_total_romaneios = totais_romaneios['valor_total_romaneios']
     
     # Atividade recente (últimas 5 notas fiscais)
     notas_recentes = NotaFiscal.objects.select_related('cliente').order_by('-data')[:5]
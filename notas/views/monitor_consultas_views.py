@@ -0,0 +1,24 @@
+"""
+Estatísticas de consultas SQL por view (apenas administradores).
+"""
+from sistema_estelar.api_utils import json_success
+
+from ..decorators import admin_required
+from ..utils.monitor_consultas import estatisticas, limite_repeticoes, modo_estrito, monitor_ativo
+
+
+@admin_required
+def monitor_consultas(request):
+    """
+    JSON com consultas por view desde o início do processo: requisições,
+    máximo/média de consultas, tempo, orçamento e ocorrências de N+1.
+    POST zera as estatísticas.
+    """
+    if request.method == 'POST':
+        estatisticas.zerar()
+    return json_success(data={
+        'ativo': monitor_ativo(),
+        'estrito': modo_estrito(),
+        'limite_repeticoes': limite_repeticoes(),
+        'views': estatisticas.resumo(),
+    })
@@ -17,7 +17,9 @@ from datetime import datetime
 
 from ..models import NotaFiscal, CobrancaCarregamento, OcorrenciaNotaFiscal, Cliente
 from ..forms import NotaFiscalForm, NotaFiscalSearchForm, MercadoriaDepositoSearchForm
-from ..decorators import rate_limit_critical
+from ..decorators import funcionario_required, rate_limit_critical
+from ..services import BuscaService, ImportacaoNotasService
+from ..services.importacao_notas_service import ErroImportacao
 from ..utils.date_utils import parse_date_iso
 from ..utils.nota_ordering import ordenar_queryset_notas_por_numero
 from ..utils.search_utils import tem_filtro_preenchido
@@ -89,6 +91,52 @@ def adicionar_nota_fiscal(request):
     return render(request, 'notas/adicionar_nota.html', {'form': form})
 
 
+@funcionario_required
+@rate_limit_critical
+def importar_notas_fiscais(request):
+    """View para importar notas fiscais em lote (CSV, XLSX ou XML de NF-e)"""
+    resultado = None
+    cliente_id = request.POST.get('cliente') or ''
+    if request.method == 'POST':
+        arquivo = request.FILES.get('arquivo')
+        cliente = Cliente.objects.filter(pk=cliente_id).first() if cliente_id.isdigit() else None
+        if arquivo is None:
+            messages.error(request, 'Selecione um arquivo para importar.')
+        else:
+            try:
+                formato = ImportacaoNotasService.formato_do_arquivo(arquivo.name)
+                resultado = ImportacaoNotasService.importar(
+                    ImportacaoNotasService.ler(arquivo.file, formato),
+                    cliente=cliente,
+                    dry_run='validar' in request.POST,
+                )
+            except ErroImportacao as e:
+                messages.error(request, str(e))
+            else:
+                logger.info(
+                    f'Importação de notas fiscais: {arquivo.name}',
+                    extra={
+                        'user': request.user.username,
+                        'lidas': resultado['lidas'],
+                        'importadas': resultado['importadas'],
+                        'erros': len(resultado['erros']),
+                    }
+                )
+                if 'validar' in request.POST:
+                    messages.info(request, f'{resultado["importadas"]} nota(s) válida(s) de {resultado["lidas"]} lida(s). Nada foi gravado.')
+                elif resultado['importadas']:
+                    messages.success(request, f'{resultado["importadas"]} nota(s) fiscal(is) importada(s) com sucesso!')
+                if resultado['erros']:
+                    messages.warning(request, f'{len(resultado["erros"])} registro(s) com erro não foram importados.')
+
+    return render(request, 'notas/importar_notas.html', {
+        'resultado': resultado,
+        'erros': resultado['erros'][:500] if resultado else [],
+        'clientes': Cliente.objects.filter(status='Ativo').order_by('razao_social').only('pk', 'razao_social'),
+        'cliente_id': cliente_id,
+    })
+
+
 @login_required
 @rate_limit_critical
 def editar_nota_fiscal(request, pk):
@@ -289,7 +337,7 @@ def listar_notas_fiscais(request):
             status = search_form.cleaned_data.get('status')
 
             if nota:
-                queryset = queryset.filter(nota__icontains=nota)
+                queryset = BuscaService.filtrar(queryset, nota, campos=('nota',))
             if cliente:
                 queryset = queryset.filter(cliente=cliente)
             if data:
@@ -322,10 +370,14 @@ def buscar_mercadorias_deposito(request):
     galpoes_com_mercadorias = set()
     galpoes_info = []
     
-    for choice in NotaFiscal.LOCAL_CHOICES:
-        codigo = choice[0]
-        nome = choice[1]
-        contagem = NotaFiscal.objects.filter(local=codigo, status='Depósito').count()
+    # Uma consulta agrupada para todos os galpões
+    contagem_por_local = dict(
+        NotaFiscal.objects.filter(status='Depósito').order_by().values('local').annotate(
+            total=Count('id')
+        ).values_list('local', 'total')
+    )
+    for codigo, nome in NotaFiscal.LOCAL_CHOICES:
+        contagem = contagem_por_local.get(codigo, 0)
         contagem_galpoes[nome] = contagem
         galpoes_info.append({
             'codigo': codigo,
@@ -347,9 +399,9 @@ def buscar_mercadorias_deposito(request):
         if cliente:
             queryset = queryset.filter(cliente=cliente)
         if mercadoria:
-            queryset = queryset.filter(mercadoria__icontains=mercadoria)
+            queryset = BuscaService.filtrar(queryset, mercadoria, campos=('mercadoria',))
         if nota:
-            queryset = queryset.filter(nota__icontains=nota)
+            queryset = BuscaService.filtrar(queryset, nota, campos=('nota',))
         if data_inicio:
             queryset = queryset.filter(data__gte=data_inicio)
         if data_fim:
@@ -440,9 +492,9 @@ def pesquisar_mercadorias_deposito(request):
         if cliente:
             queryset = queryset.filter(cliente=cliente)
         if mercadoria:
-            queryset = queryset.filter(mercadoria__icontains=mercadoria)
+            queryset = BuscaService.filtrar(queryset, mercadoria, campos=('mercadoria',))
         if fornecedor:
-            queryset = queryset.filter(fornecedor__icontains=fornecedor)
+            queryset = BuscaService.filtrar(queryset, fornecedor, campos=('fornecedor',))
         if data_inicio:
             queryset = queryset.filter(data__gte=data_inicio)
         if data_fim:
@@ -483,21 +535,20 @@ def procurar_mercadorias_deposito(request):
 def simular_carregamento(request):
     """Tela para simular carregamento de mercadorias do depósito (clientes e totais)."""
     # Clientes com mercadorias no depósito: totais de peso e valor por cliente
-    agregado = NotaFiscal.objects.filter(status='Depósito').values('cliente').annotate(
+    agregado = list(NotaFiscal.objects.filter(status='Depósito').values('cliente').annotate(
         total_peso=Sum('peso'),
         total_valor=Sum('valor'),
-    ).order_by('cliente')
-    clientes_deposito = []
-    for item in agregado:
-        try:
-            cliente = Cliente.objects.get(pk=item['cliente'])
-            clientes_deposito.append({
-                'cliente': cliente,
-                'total_peso': item['total_peso'] or Decimal('0'),
-                'total_valor': item['total_valor'] or Decimal('0'),
-            })
-        except Cliente.DoesNotExist:
-            continue
+    ).order_by('cliente'))
+    clientes = Cliente.objects.in_bulk([item['cliente'] for item in agregado])
+    clientes_deposito = [
+        {
+            'cliente': clientes[item['cliente']],
+            'total_peso': item['total_peso'] or Decimal('0'),
+            'total_valor': item['total_valor'] or Decimal('0'),
+        }
+        for item in agregado
+        if item['cliente'] in clientes
+    ]
     clientes_deposito.sort(key=lambda x: (x['cliente'].razao_social or '').upper())
     # JSON para o front: listar clientes disponíveis e adicionar um por vez à tabela
     clientes_deposito_json = json.dumps([
@@ -534,9 +585,9 @@ def imprimir_relatorio_mercadorias_deposito(request):
             if cliente:
                 mercadorias = mercadorias.filter(cliente=cliente)
             if mercadoria:
-                mercadorias = mercadorias.filter(mercadoria__icontains=mercadoria)
+                mercadorias = BuscaService.filtrar(mercadorias, mercadoria, campos=('mercadoria',))
             if nota:
-                mercadorias = mercadorias.filter(nota__icontains=nota)
+                mercadorias = BuscaService.filtrar(mercadorias, nota, campos=('nota',))
             if local:
                 mercadorias = mercadorias.filter(local=local)
             if data_inicio:
@@ -626,7 +677,7 @@ def imprimir_relatorio_deposito(request):
             notas_fiscais = NotaFiscal.objects.select_related('cliente')
 
         if nota:
-            notas_fiscais = notas_fiscais.filter(nota__icontains=nota)
+            notas_fiscais = BuscaService.filtrar(notas_fiscais, nota, campos=('nota',))
         if cliente_id:
             notas_fiscais = notas_fiscais.filter(cliente_id=cliente_id)
         if data:
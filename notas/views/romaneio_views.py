@@ -3,7 +3,7 @@ Views relacionadas a Romaneios
 """
 import logging
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.db import IntegrityError
@@ -14,10 +14,15 @@ from ..models import RomaneioViagem, Cliente, NotaFiscal
 from ..forms import RomaneioViagemForm, RomaneioSearchForm
 from ..decorators import rate_limit_critical
 from .base import get_next_romaneio_codigo, get_next_romaneio_generico_codigo, is_cliente
-from ..services import RomaneioService, NotaFiscalService
+from ..services import RomaneioService, NotaFiscalService, RomaneioPdfService, BuscaService
 from ..utils.nota_ordering import ordenar_instancias_notas_fiscais, ordenar_queryset_notas_por_numero
 from ..utils.search_utils import tem_filtro_preenchido
-from ..utils.romaneio_impressao import montar_item_impressao_romaneio
+from ..utils.romaneio_impressao import (
+    carregar_romaneios_para_impressao,
+    montar_item_impressao_romaneio,
+    montar_itens_impressao_lote,
+)
+from ..utils.date_utils import parse_date_iso
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -312,10 +317,6 @@ def detalhes_romaneio(request, pk):
     
     # Notas já foram carregadas via prefetch_related; ordenar por número da nota
     notas_romaneadas = ordenar_instancias_notas_fiscais(romaneio.notas_fiscais.all())
-    
-    # Garantir que os totais estejam calculados
-    if notas_romaneadas:
-        romaneio.calcular_totais()
 
     context = {
         'romaneio': romaneio,
@@ -378,11 +379,11 @@ def listar_romaneios(request):
 
     def _base_queryset():
         if request.user.is_cliente and request.user.cliente:
-            return RomaneioViagem.objects.filter(
-                notas_fiscais__cliente=request.user.cliente
+            return RomaneioService.romaneios_com_notas_do_cliente(
+                request.user.cliente
             ).select_related(
                 'cliente', 'motorista', 'veiculo_principal'
-            ).prefetch_related('notas_fiscais').distinct()
+            ).prefetch_related('notas_fiscais')
         return RomaneioViagem.objects.select_related(
             'cliente', 'motorista', 'veiculo_principal'
         ).prefetch_related('notas_fiscais')
@@ -408,7 +409,7 @@ def listar_romaneios(request):
             data_fim = search_form.cleaned_data.get('data_fim')
 
             if codigo:
-                queryset = queryset.filter(codigo__icontains=codigo)
+                queryset = BuscaService.filtrar(queryset, codigo, campos=('codigo',))
             if tipo_romaneio:
                 if tipo_romaneio == 'normal':
                     queryset = queryset.filter(codigo__startswith='ROM-').exclude(codigo__startswith='ROM-100-')
@@ -485,9 +486,13 @@ def imprimir_romaneio_novo(request, pk):
 
 @login_required
 def gerar_romaneio_pdf(request, pk):
-    """View para gerar PDF do romaneio"""
-    from django.template.loader import get_template
-    
+    """
+    View para gerar PDF do romaneio.
+
+    O PDF vem do cache de RomaneioPdfService; se ainda estiver sendo gerado
+    após ROMANEIO_PDF_ESPERA segundos, responde 202 com uma página que
+    recarrega sozinha até o arquivo ficar pronto.
+    """
     # Otimizar query com select_related e prefetch_related
     romaneio = get_object_or_404(
         RomaneioViagem.objects.select_related(
@@ -495,143 +500,124 @@ def gerar_romaneio_pdf(request, pk):
         ).prefetch_related('notas_fiscais'),
         pk=pk
     )
-    
-    notas_romaneadas = ordenar_instancias_notas_fiscais(romaneio.notas_fiscais.all())
-    
-    # Usar serviço para calcular totais
-    from ..services.romaneio_service import RomaneioService
-    totais = RomaneioService.calcular_totais_romaneio(romaneio)
-    total_peso = totais['total_peso']
-    total_valor = totais['total_valor']
-    
-    # Paginação: 1ª página 17 notas, 2ª em diante 24 notas (igual à view de impressão)
-    LINHAS_PRIMEIRA = 17
-    LINHAS_DEMAIS = 24
-    notas_list = list(notas_romaneadas)
-    if not notas_list:
-        paginas_notas = [[]]
+
+    if RomaneioPdfService.disponivel():
+        try:
+            caminho = RomaneioPdfService.obter_pdf(romaneio)
+        except Exception as e:
+            logger.error(
+                f'Erro ao gerar PDF do romaneio {pk}',
+                extra={'romaneio_id': pk, 'error': str(e), 'error_type': type(e).__name__},
+                exc_info=True
+            )
+            messages.error(request, f'Erro ao gerar PDF do romaneio: {str(e)}')
+        else:
+            if caminho is None:
+                return render(
+                    request,
+                    'notas/romaneio_pdf_em_geracao.html',
+                    {'romaneio': romaneio},
+                    status=202,
+                )
+            return FileResponse(
+                open(caminho, 'rb'),
+                as_attachment=True,
+                filename=f'romaneio_{romaneio.codigo}.pdf',
+                content_type='application/pdf',
+            )
     else:
-        primeira = notas_list[:LINHAS_PRIMEIRA]
-        restante = notas_list[LINHAS_PRIMEIRA:]
-        demais = [
-            restante[i:i + LINHAS_DEMAIS]
-            for i in range(0, len(restante), LINHAS_DEMAIS)
-        ]
-        paginas_notas = [primeira] + demais
-        while len(paginas_notas[0]) < LINHAS_PRIMEIRA:
-            paginas_notas[0].append(None)
-        for pagina in paginas_notas[1:]:
-            while len(pagina) < LINHAS_DEMAIS:
-                pagina.append(None)
-    
-    import time
-    version = int(time.time())
-    template = get_template('notas/visualizar_romaneio_para_impressao.html')
-    html = template.render({
-        'romaneio': romaneio,
-        'notas_romaneadas': notas_romaneadas,
-        'paginas_notas': paginas_notas,
-        'total_paginas': len(paginas_notas),
-        'total_peso': total_peso,
-        'total_valor': total_valor,
-        'version': version
-    })
-    
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="romaneio_{romaneio.codigo}.pdf"'
-    
-    try:
-        from weasyprint import HTML, CSS
-        from weasyprint.text.fonts import FontConfiguration
-        
-        font_config = FontConfiguration()
-        css = CSS(string='''
-            @page {
-                size: A4;
-                margin: 0.8cm;
-            }
-            body {
-                font-family: Arial, sans-serif;
-                font-size: 11px;
-                line-height: 1.2;
-                margin: 0;
-                padding: 0;
-            }
-            .header {
-                text-align: center;
-                margin-bottom: 8px;
-                padding-bottom: 5px;
-                border-bottom: 2px solid #000;
-            }
-            .header h1 {
-                font-size: 17px;
-                margin: 0;
-            }
-            .info-container {
-                display: flex;
-                justify-content: space-between;
-                margin-bottom: 8px;
-                gap: 8px;
-            }
-            .romaneio-info, .motorista-info, .cliente-info {
-                flex: 1;
-                padding: 5px;
-                background-color: #f9f9f9;
-                border: 1px solid #ddd;
-            }
-            .report-title {
-                text-align: center;
-                margin: 8px 0 5px 0;
-                font-size: 13px;
-                font-weight: bold;
-                border-bottom: 1px solid #000;
-                padding-bottom: 3px;
-            }
-            .table {
-                width: 100%;
-                border-collapse: collapse;
-                margin: 5px 0 8px 0;
-            }
-            .table th, .table td {
-                border: 1px solid #ddd;
-                padding: 3px 4px;
-                font-size: 9px;
-            }
-            .table th {
-                background-color: #f2f2f2;
-                font-weight: bold;
-            }
-            .table tbody tr:nth-child(even) {
-                background-color: #f9f9f9;
-            }
-            .no-print {
-                display: none !important;
-            }
-            .print-button {
-                display: none !important;
-            }
-        ''', font_config=font_config)
-        
-        HTML(string=html).write_pdf(response, stylesheets=[css], font_config=font_config)
-        
-    except ImportError:
-        response = HttpResponse(html, content_type='text/html')
-        response['Content-Disposition'] = f'inline; filename="romaneio_{romaneio.codigo}.html"'
         messages.warning(request, 'Biblioteca WeasyPrint não encontrada. Instale com: pip install weasyprint')
-    
+
+    response = HttpResponse(RomaneioPdfService.renderizar_html(romaneio), content_type='text/html')
+    response['Content-Disposition'] = f'inline; filename="romaneio_{romaneio.codigo}.html"'
     return response
 
 
+@login_required
+def imprimir_romaneios_lote(request):
+    """
+    Impressão de vários romaneios num único documento.
+
+    Filtros (GET): data=AAAA-MM-DD (data de emissão) ou ids=1,2,3 (ou ids
+    repetidos), e status opcional. Com formato=pdf devolve um único PDF,
+    com o mesmo cache/espera de gerar_romaneio_pdf; senão, o HTML de impressão.
+    Usuários cliente só imprimem romaneios com suas notas, como em listar_romaneios.
+    """
+    data = parse_date_iso(request.GET.get('data'))
+    ids = [
+        int(valor)
+        for parametro in request.GET.getlist('ids')
+        for valor in parametro.split(',')
+        if valor.strip().isdigit()
+    ]
+    lista = 'notas:meus_romaneios' if request.user.is_cliente else 'notas:listar_romaneios'
+    if data is None and not ids:
+        messages.error(request, 'Informe uma data ou os romaneios a imprimir.')
+        return redirect(lista)
+
+    romaneios = carregar_romaneios_para_impressao()
+    if request.user.is_cliente:
+        if not request.user.cliente:
+            romaneios = romaneios.none()
+        else:
+            romaneios = romaneios.filter(
+                pk__in=RomaneioService.romaneios_com_notas_do_cliente(request.user.cliente).values('pk')
+            )
+    if data is not None:
+        romaneios = romaneios.filter(data_emissao__date=data)
+    if ids:
+        romaneios = romaneios.filter(pk__in=ids)
+    status = request.GET.get('status')
+    if status:
+        romaneios = romaneios.filter(status=status)
+
+    itens = montar_itens_impressao_lote(romaneios.order_by('data_emissao', 'codigo'))
+    if not itens:
+        messages.warning(request, 'Nenhum romaneio encontrado para impressão.')
+        return redirect(lista)
+
+    if request.GET.get('formato') == 'pdf':
+        if RomaneioPdfService.disponivel():
+            try:
+                caminho = RomaneioPdfService.obter_pdf_lote(itens)
+            except Exception as e:
+                logger.error(
+                    'Erro ao gerar PDF do lote de romaneios',
+                    extra={'quantidade': len(itens), 'error': str(e), 'error_type': type(e).__name__},
+                    exc_info=True
+                )
+                messages.error(request, f'Erro ao gerar PDF dos romaneios: {str(e)}')
+            else:
+                if caminho is None:
+                    return render(
+                        request,
+                        'notas/romaneio_pdf_em_geracao.html',
+                        {'quantidade': len(itens)},
+                        status=202,
+                    )
+                nome = f'romaneios_{data:%Y%m%d}.pdf' if data else 'romaneios.pdf'
+                return FileResponse(
+                    open(caminho, 'rb'),
+                    as_attachment=True,
+                    filename=nome,
+                    content_type='application/pdf',
+                )
+        else:
+            messages.warning(request, 'Biblioteca WeasyPrint não encontrada. Instale com: pip install weasyprint')
+
+    return render(request, 'notas/visualizar_romaneios_lote_para_impressao.html', {'itens': itens})
+
+
 @login_required
 @user_passes_test(is_cliente)
 def meus_romaneios(request):
     """View para clientes verem apenas seus romaneios"""
     if request.user.tipo_usuario.upper() == 'CLIENTE' and request.user.cliente:
-        romaneios = RomaneioViagem.objects.filter(
-            notas_fiscais__cliente=request.user.cliente
+        romaneios = RomaneioService.romaneios_com_notas_do_cliente(
+            request.user.cliente
         ).select_related(
             'cliente', 'motorista', 'veiculo_principal'
-        ).prefetch_related('notas_fiscais').distinct().order_by('-data_emissao')
+        ).prefetch_related('notas_fiscais').order_by('-data_emissao')
     else:
         romaneios = RomaneioViagem.objects.all().select_related(
             'cliente', 'motorista', 'veiculo_principal'
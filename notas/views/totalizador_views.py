@@ -5,8 +5,9 @@ from decimal import Decimal
 from django.shortcuts import render, redirect
 from django.contrib import messages
 
-from ..models import RomaneioViagem, TabelaSeguro
+from ..models import TabelaSeguro
 from ..decorators import admin_required
+from ..services import TotalizadorService
 from ..utils.date_utils import parse_date_iso
 
 
@@ -14,57 +15,18 @@ def _obter_dados_totalizador_estado(data_inicial_str, data_final_str):
     """
     Retorna (resultados, total_geral, total_seguro_geral, data_inicial_obj, data_final_obj)
     para o período informado. Se datas inválidas ou vazias, retorna (None, None, None, None, None).
+    O cálculo fica em cache no TotalizadorService (compartilhado entre tela, PDF e Excel).
     """
     data_inicial_obj = parse_date_iso(data_inicial_str or '')
     data_final_obj = parse_date_iso(data_final_str or '')
     if not data_inicial_obj or not data_final_obj:
         return None, None, None, None, None
 
-    romaneios_periodo = RomaneioViagem.objects.filter(
-        data_emissao__date__range=[data_inicial_obj, data_final_obj],
-        status='Emitido'
-    ).select_related('cliente').prefetch_related('notas_fiscais')
-
-    tabelas_seguro = {ts.estado: ts.percentual_seguro for ts in TabelaSeguro.objects.all()}
-    estados_agrupados = {}
-
-    for romaneio in romaneios_periodo:
-        estado_cliente = romaneio.cliente.estado if romaneio.cliente else None
-        if not estado_cliente:
-            continue
-        if estado_cliente not in estados_agrupados:
-            estados_agrupados[estado_cliente] = {
-                'estado': estado_cliente,
-                'nome_estado': dict(TabelaSeguro.ESTADOS_BRASIL).get(estado_cliente, estado_cliente),
-                'total_valor': Decimal('0.0'),
-                'quantidade_romaneios': 0,
-                'romaneios_ids': set()
-            }
-        for nota in romaneio.notas_fiscais.all():
-            estados_agrupados[estado_cliente]['total_valor'] += nota.valor
-        estados_agrupados[estado_cliente]['romaneios_ids'].add(romaneio.id)
-
-    resultados = []
-    total_geral = Decimal('0.0')
-    total_seguro_geral = Decimal('0.0')
-    for estado, dados in estados_agrupados.items():
-        total_valor_estado = dados['total_valor']
-        quantidade_romaneios = len(dados['romaneios_ids'])
-        percentual_seguro = tabelas_seguro.get(estado, Decimal('0.0'))
-        valor_seguro_estado = total_valor_estado * (percentual_seguro / Decimal('100.0'))
-        if total_valor_estado > 0:
-            resultados.append({
-                'estado': estado,
-                'nome_estado': dados['nome_estado'],
-                'total_valor': total_valor_estado,
-                'percentual_seguro': percentual_seguro,
-                'valor_seguro': valor_seguro_estado,
-                'quantidade_romaneios': quantidade_romaneios
-            })
-            total_geral += total_valor_estado
-            total_seguro_geral += valor_seguro_estado
-    resultados.sort(key=lambda x: x['total_valor'], reverse=True)
-    return resultados, total_geral, total_seguro_geral, data_inicial_obj, data_final_obj
+    dados = TotalizadorService.totais_por_estado(data_inicial_obj, data_final_obj)
+    return (
+        dados['resultados'], dados['total_geral'], dados['total_seguro_geral'],
+        data_inicial_obj, data_final_obj,
+    )
 
 
 @admin_required
@@ -154,12 +116,13 @@ def totalizador_por_estado_excel(request):
         return redirect('notas:totalizador_por_estado')
 
     try:
-        from ..utils.relatorios import gerar_relatorio_excel_totalizador_estado, gerar_resposta_excel
-        excel_content = gerar_relatorio_excel_totalizador_estado(
-            resultados, data_inicial_obj, data_final_obj, total_geral, total_seguro_geral
-        )
+        from ..utils.relatorios import gerar_relatorio_excel_totalizador_estado, gerar_resposta_excel_streaming
         nome_arquivo = f"totalizador_por_estado_{data_inicial}_{data_final}.xlsx"
-        return gerar_resposta_excel(excel_content, nome_arquivo)
+        return gerar_resposta_excel_streaming(
+            gerar_relatorio_excel_totalizador_estado,
+            nome_arquivo,
+            resultados, data_inicial_obj, data_final_obj, total_geral, total_seguro_geral,
+        )
     except ImportError:
         messages.error(
             request,
@@ -179,55 +142,12 @@ def _obter_dados_totalizador_cliente(data_inicial_str, data_final_str):
     if not data_inicial_obj or not data_final_obj:
         return None, None, None, None, None, None, None
 
-    romaneios_periodo = RomaneioViagem.objects.filter(
-        data_emissao__date__range=[data_inicial_obj, data_final_obj],
-        status='Emitido'
-    ).select_related('cliente').prefetch_related('notas_fiscais')
-
-    tabelas_seguro = {ts.estado: ts.percentual_seguro for ts in TabelaSeguro.objects.all()}
-    clientes_agrupados = {}
-    resultados = []
-    total_geral = Decimal('0.0')
-    total_seguro_geral = Decimal('0.0')
+    dados = TotalizadorService.totais_por_cliente(data_inicial_obj, data_final_obj)
     nomes_estados = dict(TabelaSeguro.ESTADOS_BRASIL)
-
-    for romaneio in romaneios_periodo:
-        cliente = romaneio.cliente
-        if not cliente:
-            continue
-        if cliente.id not in clientes_agrupados:
-            clientes_agrupados[cliente.id] = {
-                'cliente': cliente,
-                'total_valor': Decimal('0.0'),
-            }
-        for nota in romaneio.notas_fiscais.all():
-            clientes_agrupados[cliente.id]['total_valor'] += nota.valor
-
-    for cliente_id, dados in clientes_agrupados.items():
-        total_valor_cliente = dados['total_valor']
-        cliente = dados['cliente']
-        percentual_seguro = tabelas_seguro.get(cliente.estado or '', Decimal('0.0'))
-        valor_seguro_cliente = total_valor_cliente * (percentual_seguro / Decimal('100.0'))
-        if total_valor_cliente > 0:
-            resultados.append({
-                'cliente': cliente,
-                'uf': cliente.estado or '—',
-                'valor_mercadoria': total_valor_cliente,
-                'valor_seguro': valor_seguro_cliente,
-            })
-            total_geral += total_valor_cliente
-            total_seguro_geral += valor_seguro_cliente
-
-    resultados.sort(key=lambda x: ((x['uf'] or '').upper(), (x['cliente'].razao_social or '').upper()))
-    totais_por_estado = {}
-    for r in resultados:
-        uf = r['uf']
-        if uf not in totais_por_estado:
-            totais_por_estado[uf] = {'valor_mercadoria': Decimal('0.0'), 'valor_seguro': Decimal('0.0')}
-        totais_por_estado[uf]['valor_mercadoria'] += r['valor_mercadoria']
-        totais_por_estado[uf]['valor_seguro'] += r['valor_seguro']
-
-    return resultados, totais_por_estado, total_geral, total_seguro_geral, data_inicial_obj, data_final_obj, nomes_estados
+    return (
+        dados['resultados'], dados['totais_por_estado'], dados['total_geral'],
+        dados['total_seguro_geral'], data_inicial_obj, data_final_obj, nomes_estados,
+    )
 
 
 @admin_required
@@ -328,9 +248,12 @@ def totalizador_por_cliente_excel(request):
     ) = out
 
     try:
-        from ..utils.relatorios import gerar_relatorio_excel_totalizador_cliente, gerar_resposta_excel
+        from ..utils.relatorios import gerar_relatorio_excel_totalizador_cliente, gerar_resposta_excel_streaming
 
-        excel_content = gerar_relatorio_excel_totalizador_cliente(
+        nome_arquivo = f"totalizador_por_cliente_{data_inicial}_{data_final}.xlsx"
+        return gerar_resposta_excel_streaming(
+            gerar_relatorio_excel_totalizador_cliente,
+            nome_arquivo,
             resultados,
             totais_por_estado,
             nomes_estados,
@@ -339,8 +262,6 @@ def totalizador_por_cliente_excel(request):
             total_geral,
             total_seguro_geral,
         )
-        nome_arquivo = f"totalizador_por_cliente_{data_inicial}_{data_final}.xlsx"
-        return gerar_resposta_excel(excel_content, nome_arquivo)
     except ImportError:
         messages.error(
             request,